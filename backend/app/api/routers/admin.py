@@ -1,4 +1,5 @@
 # AIMETA P=管理员API_用户管理和系统配置|R=管理员CRUD_系统配置_统计|NR=不含普通用户功能|E=route:POST_GET_/api/admin/*|X=http|A=用户CRUD_配置_统计|D=fastapi,sqlalchemy|S=db|RD=./README.ai
+import asyncio
 import logging
 from typing import List, Optional
 
@@ -12,6 +13,7 @@ from ...models import NovelProject, UsageMetric, User
 from ...schemas.admin import (
     AdminNovelSummary,
     DailyRequestLimit,
+    EmbeddingCacheStats,
     Statistics,
     UpdateLogCreate,
     UpdateLogRead,
@@ -34,9 +36,11 @@ from ...schemas.user import (
 from ...services.auth_service import AuthService
 from ...services.admin_setting_service import AdminSettingService
 from ...services.config_service import ConfigService
+from ...services.embedding_cache import embedding_cache
 from ...services.novel_service import NovelService
 from ...services.prompt_service import PromptService
 from ...services.update_log_service import UpdateLogService
+from ...services.usage_counter_service import usage_counters
 from ...services.user_service import UserService
 logger = logging.getLogger(__name__)
 
@@ -78,10 +82,29 @@ async def read_statistics(
 ) -> Statistics:
     novel_count = await session.scalar(select(func.count(NovelProject.id))) or 0
     user_count = await session.scalar(select(func.count(User.id))) or 0
-    usage = await session.get(UsageMetric, "api_request_count")
-    api_request_count = usage.value if usage else 0
+
+    async def metric(key: str) -> int:
+        usage = await session.get(UsageMetric, key)
+        # 叠加本进程尚未写回数据库的计数增量
+        return (usage.value if usage else 0) + usage_counters.pending(key)
+
+    api_request_count = await metric("api_request_count")
     logger.info("管理员获取统计数据：小说=%s，用户=%s，请求=%s", novel_count, user_count, api_request_count)
-    return Statistics(novel_count=novel_count, user_count=user_count, api_request_count=api_request_count)
+    return Statistics(
+        novel_count=novel_count,
+        user_count=user_count,
+        api_request_count=api_request_count,
+        cancelled_stream_count=await metric("llm_cancelled_streams"),
+        cancelled_tokens_saved=await metric("llm_cancelled_tokens_saved"),
+    )
+
+
+@router.get("/stats/embedding-cache", response_model=EmbeddingCacheStats)
+async def read_embedding_cache_stats(
+    _: None = Depends(get_current_admin),
+) -> EmbeddingCacheStats:
+    stats = await asyncio.to_thread(embedding_cache.stats)
+    return EmbeddingCacheStats(**stats)
 
 
 @router.get("/users", response_model=List[UserSchema])
@@ -207,7 +230,7 @@ async def admin_generate_cover(
     
     # 获取项目所有者ID
     repo = NovelRepository(session)
-    project = await repo.get_by_id(project_id)
+    project = await repo.get_basic(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
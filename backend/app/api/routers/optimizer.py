@@ -105,13 +105,10 @@ async def optimize_chapter(
     llm_service = LLMService(session)
     
     # 验证项目所有权
-    project = await novel_service.ensure_project_owner(request.project_id, current_user.id)
+    await novel_service.ensure_project_owner(request.project_id, current_user.id)
     
     # 获取章节内容
-    chapter = next(
-        (ch for ch in project.chapters if ch.chapter_number == request.chapter_number),
-        None
-    )
+    chapter = await novel_service.get_chapter(request.project_id, request.chapter_number)
     if not chapter:
         raise HTTPException(status_code=404, detail="章节不存在")
     
@@ -144,8 +141,10 @@ async def optimize_chapter(
     # 获取角色DNA信息（用于心理活动优化）
     character_dna = {}
     if request.dimension == "psychology":
-        project_schema = await novel_service._serialize_project(project)
-        for char in project_schema.blueprint.characters:
+        project = await novel_service.load_writer_context(
+            request.project_id, current_user.id, include_selected_version=False
+        )
+        for char in novel_service._build_blueprint_schema(project).characters:
             if "extra" in char and "dna_profile" in char.get("extra", {}):
                 character_dna[char.get("name", "")] = char["extra"]["dna_profile"]
     
@@ -232,13 +231,10 @@ async def apply_optimization(
     novel_service = NovelService(session)
     
     # 验证项目所有权
-    project = await novel_service.ensure_project_owner(project_id, current_user.id)
+    await novel_service.ensure_project_owner(project_id, current_user.id)
     
     # 获取章节
-    chapter = next(
-        (ch for ch in project.chapters if ch.chapter_number == chapter_number),
-        None
-    )
+    chapter = await novel_service.get_chapter(project_id, chapter_number)
     if not chapter:
         raise HTTPException(status_code=404, detail="章节不存在")
     
@@ -1,10 +1,12 @@
-# AIMETA P=写作API_章节生成和大纲创建|R=章节生成_大纲生成_评审_L2导演脚本_护栏检查|NR=不含数据存储|E=route:POST_/api/writer/*|X=http|A=生成_评审_过滤|D=fastapi,openai|S=net,db|RD=./README.ai
+# AIMETA P=写作API_章节生成和大纲创建|R=章节生成_客户端断开取消生成_并发生成去重_后台生成任务_大纲生成_评审_L2导演脚本_护栏检查|NR=不含数据存储|E=route:POST_/api/writer/*|X=http|A=生成_评审_过滤|D=fastapi,openai|S=net,db|RD=./README.ai
 """Writer API Router - 人类化起点长篇写作系统"""
+import asyncio
 import json
 import logging
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -12,7 +14,8 @@ from sqlalchemy.orm import selectinload
 from ...core.config import settings
 from ...core.dependencies import get_current_user
 from ...db.session import get_session, AsyncSessionLocal
-from ...models.novel import Chapter, ChapterOutline, ChapterVersion
+from ...models.generation_job import ChapterGenerationJob
+from ...models.novel import Chapter, ChapterVersion
 from ...schemas.novel import (
     Chapter as ChapterSchema,
     ChapterGenerationStatus,
@@ -23,11 +26,13 @@ from ...schemas.novel import (
     EvaluateChapterRequest,
     FinalizeChapterRequest,
     FinalizeChapterResponse,
+    GenerationJobResponse,
     VectorRetryRequest,
     VectorRetryResponse,
     GenerateChapterRequest,
     GenerateOutlineRequest,
     NovelProject as NovelProjectSchema,
+    NovelProjectDelta,
     SelectVersionRequest,
     UpdateChapterOutlineRequest,
 )
@@ -42,16 +47,50 @@ from ...services.finalize_service import FinalizeService
 from ...services.chapter_version_review_service import ChapterVersionReviewService
 from ...utils.json_utils import remove_think_tags, unwrap_markdown_json
 from ...utils.text_utils import compute_content_hash, normalize_content
-from ...services.pipeline_orchestrator import PipelineOrchestrator
+from ...services.pipeline_orchestrator import EventSink, PipelineOrchestrator
+from ...services.generation_job_service import GenerationJobService
+from ...services.generation_single_flight import generation_single_flight, request_fingerprint
+from ...services.summary_backfill_service import SummaryBackfillService
 
 router = APIRouter(prefix="/api/writer", tags=["Writer"])
 logger = logging.getLogger(__name__)
 
+# 流式生成时无事件输出的心跳间隔，防止代理因空闲而断开连接
+STREAM_HEARTBEAT_SECONDS = 15.0
+# 同步生成期间检查客户端是否已断开的间隔
+DISCONNECT_POLL_SECONDS = 1.0
+# 生成接口的幂等键：客户端重试时携带同一个值，结果保留期内直接返回原结果
+IDEMPOTENCY_KEY_HEADER = Header(default=None, alias="Idempotency-Key", max_length=128)
+
+
+# 写作操作的响应模型：默认返回完整项目，?delta=true 时只返回变更章节与修订号
+ProjectResponse = Union[NovelProjectSchema, NovelProjectDelta]
+DELTA_QUERY = Query(False, description="为 true 时只返回本次变更的章节与项目修订号，而非完整项目")
+
 
 async def _load_project_schema(service: NovelService, project_id: str, user_id: int) -> NovelProjectSchema:
     return await service.get_project_schema(project_id, user_id)
 
 
+async def _project_response(
+    service: NovelService,
+    project_id: str,
+    user_id: int,
+    *,
+    delta: bool,
+    chapter_numbers: Iterable[int] = (),
+    deleted_chapters: Iterable[int] = (),
+) -> ProjectResponse:
+    if not delta:
+        return await _load_project_schema(service, project_id, user_id)
+    return await service.get_project_delta(
+        project_id,
+        user_id,
+        chapter_numbers=chapter_numbers,
+        deleted_chapters=deleted_chapters,
+    )
+
+
 async def _append_manual_version(
     session: AsyncSession,
     chapter: Chapter,
@@ -102,6 +141,7 @@ async def _refresh_edit_summary_and_ingest(
     """
     async with AsyncSessionLocal() as session:
         try:
+            await SummaryBackfillService(session).enqueue(project_id, [chapter_number], user_id=user_id)
             if settings.vector_store_enabled:
                 try:
                     llm_service = LLMService(session)
@@ -111,13 +151,14 @@ async def _refresh_edit_summary_and_ingest(
                     chapter = await novel_service.get_chapter(project_id, chapter_number)
 
                     if chapter:
-                        title = chapter.title or f"第{chapter_number}章"
+                        title = getattr(chapter, "title", None) or f"第{chapter_number}章"
                         await ingest_service.ingest_chapter(
                             project_id=project_id,
                             chapter_number=chapter_number,
                             title=title,
                             content=content,
                             summary=None,
+                            user_id=user_id,
                         )
                         logger.info(
                             "Background: Ingested chapter %s for project %s",
@@ -131,27 +172,299 @@ async def _refresh_edit_summary_and_ingest(
 
 
 
+async def _run_generation(
+    *,
+    project_id: str,
+    chapter_number: int,
+    user_id: int,
+    writing_notes: Optional[str] = None,
+    flow_config: Optional[Dict[str, Any]] = None,
+    event_sink: Optional[EventSink] = None,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    执行一次请求内的章节生成。同一章节相同的进行中请求（含其他进程）只生成一次并共享结果，
+    后加入的请求收不到 token 增量事件；生成被取消（所有等待方都已断开）时把章节从"生成中"复位。
+    """
+    # 先校验归属，避免无权访问的请求借 409 探知章节是否在生成
+    async with AsyncSessionLocal() as session:
+        await NovelService(session).ensure_project_owner(project_id, user_id)
+
+    async def generate() -> Dict[str, Any]:
+        # 生成可能比发起它的请求活得更久（其他请求仍在等待），因此不使用请求的依赖会话
+        try:
+            async with AsyncSessionLocal() as session:
+                return await PipelineOrchestrator(session).generate_chapter(
+                    project_id=project_id,
+                    chapter_number=chapter_number,
+                    user_id=user_id,
+                    writing_notes=writing_notes,
+                    flow_config=flow_config,
+                    event_sink=event_sink,
+                )
+        except asyncio.CancelledError:
+            logger.info("客户端已断开，取消章节生成: project=%s chapter=%s", project_id, chapter_number)
+            try:
+                async with AsyncSessionLocal() as cleanup_session:
+                    await GenerationJobService(cleanup_session).restore_chapter_status(
+                        project_id, chapter_number, failed=False
+                    )
+            except Exception:  # noqa: BLE001 - 复位失败不应掩盖取消本身
+                logger.exception("取消后复位章节状态失败: project=%s chapter=%s", project_id, chapter_number)
+            raise
+
+    return await generation_single_flight.run(
+        project_id,
+        chapter_number,
+        generate,
+        fingerprint=request_fingerprint(user_id, writing_notes, flow_config),
+        idempotency_key=idempotency_key,
+    )
+
+
+async def _until_disconnected(http_request: Request, task: "asyncio.Task[Any]") -> Any:
+    """等待生成任务结束；客户端提前断开时取消任务，中止仍在进行的模型调用。"""
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="客户端已断开，生成已取消")
+    finally:
+        # 处理函数自身被取消时同样不能让生成在后台继续
+        if not task.done():
+            task.cancel()
+
+
 @router.post("/advanced/generate", response_model=AdvancedGenerateResponse)
 async def advanced_generate_chapter(
     request: AdvancedGenerateRequest,
-    session: AsyncSession = Depends(get_session),
+    http_request: Request,
     current_user: UserInDB = Depends(get_current_user),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
 ) -> AdvancedGenerateResponse:
     """
     高级写作入口：通过 PipelineOrchestrator 统一编排生成流程。
+
+    客户端断开时取消生成，不再继续请求模型；需要断线后继续的场景请使用 /advanced/jobs。
+    同一章节相同的请求并发到达时只生成一次；携带 Idempotency-Key 重试时返回原结果。
     """
-    orchestrator = PipelineOrchestrator(session)
-    result = await orchestrator.generate_chapter(
+    task = asyncio.create_task(
+        _run_generation(
+            project_id=request.project_id,
+            chapter_number=request.chapter_number,
+            writing_notes=request.writing_notes,
+            user_id=current_user.id,
+            flow_config=request.flow_config.model_dump(),
+            idempotency_key=idempotency_key,
+        )
+    )
+    result = await _until_disconnected(http_request, task)
+    # 显式标记生成阶段未定稿，防止前端误判
+    result["finalized"] = False
+
+    return AdvancedGenerateResponse(**result)
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/advanced/generate/stream")
+async def advanced_generate_chapter_stream(
+    request: AdvancedGenerateRequest,
+    current_user: UserInDB = Depends(get_current_user),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
+) -> StreamingResponse:
+    """
+    高级写作流式入口：以 SSE 推送流水线阶段事件与各版本的 token 增量，
+    最后推送与 /advanced/generate 相同结构的 result 事件。
+    """
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    async def sink(event: Dict[str, Any]) -> None:
+        await queue.put(event)
+
+    async def run_pipeline() -> Dict[str, Any]:
+        try:
+            # 流式响应期间依赖注入的会话已释放，这里自行管理会话生命周期
+            result = await _run_generation(
+                project_id=request.project_id,
+                chapter_number=request.chapter_number,
+                writing_notes=request.writing_notes,
+                user_id=current_user.id,
+                flow_config=request.flow_config.model_dump(),
+                event_sink=sink,
+                idempotency_key=idempotency_key,
+            )
+            result["finalized"] = False
+            return AdvancedGenerateResponse(**result).model_dump()
+        finally:
+            await queue.put(None)
+
+    async def event_stream() -> AsyncIterator[str]:
+        task = asyncio.create_task(run_pipeline())
+        try:
+            yield _format_sse("stage", {"stage": "accepted", "status": "started"})
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield _format_sse(event.pop("event", "message"), event)
+
+            try:
+                payload = await task
+            except HTTPException as exc:
+                yield _format_sse("error", {"status_code": exc.status_code, "detail": exc.detail})
+            except Exception as exc:  # pragma: no cover - 兜底，保证客户端收到结束事件
+                logger.exception("流式生成失败: project=%s chapter=%s", request.project_id, request.chapter_number)
+                yield _format_sse("error", {"status_code": 500, "detail": str(exc)})
+            else:
+                yield _format_sse("result", payload)
+        finally:
+            # 客户端断开时响应生成器被关闭：取消流水线，进行中的模型流随之关闭，章节状态在任务内复位
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _job_response(job: ChapterGenerationJob) -> GenerationJobResponse:
+    return GenerationJobResponse(
+        job_id=job.id,
+        project_id=job.project_id,
+        chapter_number=job.chapter_number,
+        status=job.status,
+        stage=job.stage,
+        progress=job.progress or [],
+        attempts=job.attempts,
+        cancel_requested=job.cancel_requested,
+        result=job.result,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.post("/advanced/jobs", response_model=GenerationJobResponse, status_code=202)
+async def submit_generation_job(
+    request: AdvancedGenerateRequest,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserInDB = Depends(get_current_user),
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
+) -> GenerationJobResponse:
+    """
+    后台生成入口：提交生成任务后立即返回任务 ID，生成在后台执行，客户端断开不影响任务。
+    通过轮询、SSE 进度接口获取结果，可随时取消。
+    重复提交（相同幂等键，或该章节已有内容相同的排队/执行中任务）返回已有任务。
+    """
+    novel_service = NovelService(session)
+    await novel_service.ensure_project_owner(request.project_id, current_user.id)
+    if not await novel_service.get_outline(request.project_id, request.chapter_number):
+        raise HTTPException(status_code=404, detail="蓝图中未找到对应章节纲要")
+    job = await GenerationJobService(session).submit(
         project_id=request.project_id,
         chapter_number=request.chapter_number,
-        writing_notes=request.writing_notes,
         user_id=current_user.id,
+        writing_notes=request.writing_notes,
         flow_config=request.flow_config.model_dump(),
+        idempotency_key=idempotency_key,
     )
-    # 显式标记生成阶段未定稿，防止前端误判
-    result["finalized"] = False
+    logger.info(
+        "用户 %s 提交生成任务: job=%s project=%s chapter=%s",
+        current_user.id,
+        job.id,
+        request.project_id,
+        request.chapter_number,
+    )
+    return _job_response(job)
 
-    return AdvancedGenerateResponse(**result)
+
+@router.get("/advanced/jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserInDB = Depends(get_current_user),
+) -> GenerationJobResponse:
+    """轮询生成任务的状态、阶段进度与结果。"""
+    job = await GenerationJobService(session).get_for_user(job_id, current_user.id)
+    return _job_response(job)
+
+
+@router.get("/advanced/jobs/{job_id}/events")
+async def stream_generation_job(
+    job_id: str,
+    after: int = Query(-1, description="只推送 seq 大于该值的进度事件，断线重连时传入最后收到的 seq"),
+    current_user: UserInDB = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    以 SSE 推送生成任务的阶段进度，任务结束时推送 result / error / cancelled 事件。
+    进度读取自任务表，任务在任意进程执行都可订阅。
+    """
+    async with AsyncSessionLocal() as session:
+        await GenerationJobService(session).get_for_user(job_id, current_user.id)
+
+    async def event_stream() -> AsyncIterator[str]:
+        last_seq = after
+        idle = 0.0
+        while True:
+            try:
+                async with AsyncSessionLocal() as session:
+                    job = await GenerationJobService(session).get_for_user(job_id, current_user.id)
+            except HTTPException as exc:
+                yield _format_sse("error", {"status_code": exc.status_code, "detail": exc.detail})
+                return
+            for entry in job.progress or []:
+                if entry.get("seq", -1) <= last_seq:
+                    continue
+                last_seq = entry["seq"]
+                payload = dict(entry)
+                yield _format_sse(payload.pop("event", "message"), payload)
+                idle = 0.0
+            if job.status == "succeeded":
+                yield _format_sse("result", {"job_id": job.id, **(job.result or {})})
+                return
+            if job.status == "failed":
+                yield _format_sse("error", {"job_id": job.id, "status_code": 500, "detail": job.error})
+                return
+            if job.status == "cancelled":
+                yield _format_sse("cancelled", {"job_id": job.id})
+                return
+            await asyncio.sleep(settings.generation_job_poll_seconds)
+            idle += settings.generation_job_poll_seconds
+            if idle >= STREAM_HEARTBEAT_SECONDS:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/advanced/jobs/{job_id}/cancel", response_model=GenerationJobResponse)
+async def cancel_generation_job(
+    job_id: str,
+    session: AsyncSession = Depends(get_session),
+    current_user: UserInDB = Depends(get_current_user),
+) -> GenerationJobResponse:
+    """取消生成任务：排队中的任务立即取消，执行中的任务在下一次心跳时中止。"""
+    job = await GenerationJobService(session).request_cancel(job_id, current_user.id)
+    logger.info("用户 %s 取消生成任务: job=%s status=%s", current_user.id, job_id, job.status)
+    return _job_response(job)
 
 
 @router.post("/chapters/{chapter_number}/finalize", response_model=FinalizeChapterResponse)
@@ -197,6 +510,8 @@ async def finalize_chapter(
     chapter.status = ChapterGenerationStatus.SUCCESSFUL.value
     chapter.word_count = len(selected_version.content or "")
     await session.commit()
+    await novel_service.touch_project(request.project_id)
+    await SummaryBackfillService(session).enqueue(request.project_id, [chapter_number], user_id=current_user.id)
 
     vector_store = None
     if settings.vector_store_enabled and not request.skip_vector_update:
@@ -206,7 +521,12 @@ async def finalize_chapter(
             logger.warning("向量库初始化失败，跳过定稿写入: %s", exc)
 
     sync_session = getattr(session, "sync_session", session)
-    finalize_service = FinalizeService(sync_session, LLMService(session), vector_store)
+    finalize_service = FinalizeService(
+        sync_session,
+        LLMService(session),
+        vector_store,
+        session_factory=AsyncSessionLocal,
+    )
     finalize_result = await finalize_service.finalize_chapter(
         project_id=request.project_id,
         chapter_number=chapter_number,
@@ -218,7 +538,7 @@ async def finalize_chapter(
 
     vector_status = finalize_result.get("updates", {}).get("vector_store")
     if vector_status:
-        if vector_status.get("status") == "failed":
+        if vector_status.get("status") in ("failed", "partial"):
             selected_version.needs_vector_retry = True
         else:
             selected_version.needs_vector_retry = False
@@ -292,16 +612,19 @@ async def retry_vector_ingest(
 
 @router.post(
     "/novels/{project_id}/chapters/generate",
-    response_model=NovelProjectSchema,
+    response_model=ProjectResponse,
     deprecated=True,
 )
 async def generate_chapter(
     project_id: str,
     request: GenerateChapterRequest,
+    http_request: Request,
     response: Response,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+    idempotency_key: Optional[str] = IDEMPOTENCY_KEY_HEADER,
+) -> ProjectResponse:
     """Deprecated wrapper that delegates to PipelineOrchestrator. Use /api/writer/advanced/generate."""
 
     response.headers["Deprecation"] = "true"
@@ -310,28 +633,34 @@ async def generate_chapter(
         "Deprecated endpoint /chapters/generate invoked by user %s; delegating to unified pipeline.",
         current_user.id,
     )
-    orchestrator = PipelineOrchestrator(session)
-    await orchestrator.generate_chapter(
-        project_id=project_id,
-        chapter_number=request.chapter_number,
-        writing_notes=request.writing_notes,
-        user_id=current_user.id,
+    task = asyncio.create_task(
+        _run_generation(
+            project_id=project_id,
+            chapter_number=request.chapter_number,
+            writing_notes=request.writing_notes,
+            user_id=current_user.id,
+            idempotency_key=idempotency_key,
+        )
     )
+    await _until_disconnected(http_request, task)
 
     # Return latest project schema for backward compatibility; generation stays side-effect free w.r.t finalize.
     novel_service = NovelService(session)
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+    )
 
 
-@router.post("/novels/{project_id}/chapters/select", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/select", response_model=ProjectResponse)
 async def select_chapter_version(
     project_id: str,
     request: SelectVersionRequest,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
-    project = await novel_service.ensure_project_owner(project_id, current_user.id)
+    await novel_service.ensure_project_owner(project_id, current_user.id)
     chapter = await novel_service.get_or_create_chapter(project_id, request.chapter_number)
 
     if chapter.status != ChapterGenerationStatus.WAITING_FOR_CONFIRM.value:
@@ -347,6 +676,8 @@ async def select_chapter_version(
         await session.rollback()
         raise HTTPException(status_code=400, detail="选中的版本内容为空，无法确认为最终版")
 
+    await SummaryBackfillService(session).enqueue(project_id, [request.chapter_number], user_id=current_user.id)
+
     # 异步触发向量化入库
     try:
         llm_service = LLMService(session)
@@ -354,25 +685,29 @@ async def select_chapter_version(
         await ingest_service.ingest_chapter(
             project_id=project_id,
             chapter_number=request.chapter_number,
-            title=chapter.title or f"第{request.chapter_number}章",
+            title=getattr(chapter, "title", None) or f"第{request.chapter_number}章",
             content=selected_version.content,
-            summary=None
+            summary=None,
+            user_id=current_user.id,
         )
         logger.info(f"章节 {request.chapter_number} 向量化入库成功")
     except Exception as e:
         logger.error(f"章节 {request.chapter_number} 向量化入库失败: {e}")
         # 向量化失败不应阻止版本选择，仅记录错误
 
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+    )
 
 
-@router.post("/novels/{project_id}/chapters/evaluate", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/evaluate", response_model=ProjectResponse)
 async def evaluate_chapter(
     project_id: str,
     request: EvaluateChapterRequest,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
     prompt_service = PromptService(session)
     llm_service = LLMService(session)
@@ -432,7 +767,9 @@ async def evaluate_chapter(
             feedback="未配置评审提示词",
             decision="skipped"
         )
-        return await _load_project_schema(novel_service, project_id, current_user.id)
+        return await _project_response(
+            novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+        )
 
     try:
         evaluation_raw = await llm_service.get_llm_response(
@@ -491,16 +828,19 @@ async def evaluate_chapter(
         # 抛出异常，让前端知道评审失败
         raise HTTPException(status_code=500, detail=f"评审失败: {str(exc)}")
     
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+    )
 
 
-@router.post("/novels/{project_id}/chapters/update-outline", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/update-outline", response_model=ProjectResponse)
 async def update_chapter_outline(
     project_id: str,
     request: UpdateChapterOutlineRequest,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
     await novel_service.ensure_project_owner(project_id, current_user.id)
 
@@ -511,43 +851,47 @@ async def update_chapter_outline(
     outline.title = request.title
     outline.summary = request.summary
     await session.commit()
+    await novel_service.touch_project(project_id)
 
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+    )
 
 
-@router.post("/novels/{project_id}/chapters/delete", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/delete", response_model=ProjectResponse)
 async def delete_chapters(
     project_id: str,
     request: DeleteChapterRequest,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
     await novel_service.ensure_project_owner(project_id, current_user.id)
 
-    for ch_num in request.chapter_numbers:
-        await novel_service.delete_chapter(project_id, ch_num)
-
-    await session.commit()
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    await novel_service.delete_chapters(project_id, request.chapter_numbers)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, deleted_chapters=request.chapter_numbers
+    )
 
 
-@router.post("/novels/{project_id}/chapters/outline", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/outline", response_model=ProjectResponse)
 async def generate_chapters_outline(
     project_id: str,
     request: GenerateOutlineRequest,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
     prompt_service = PromptService(session)
     llm_service = LLMService(session)
 
-    project = await novel_service.ensure_project_owner(project_id, current_user.id)
+    project = await novel_service.load_writer_context(project_id, current_user.id, include_selected_version=False)
     
     # 获取蓝图信息
-    project_schema = await novel_service._serialize_project(project)
-    blueprint_text = json.dumps(project_schema.blueprint.model_dump(), ensure_ascii=False, indent=2)
+    blueprint = novel_service._build_blueprint_schema(project)
+    blueprint_text = json.dumps(blueprint.model_dump(), ensure_ascii=False, indent=2)
     
     # 获取已有的章节大纲
     existing_outlines = [
@@ -595,18 +939,26 @@ async def generate_chapters_outline(
     except Exception as exc:
         logger.exception("生成大纲解析失败: %s", exc)
         raise HTTPException(status_code=500, detail=f"大纲生成失败: {str(exc)}")
+    await novel_service.touch_project(project_id)
 
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service,
+        project_id,
+        current_user.id,
+        delta=delta,
+        chapter_numbers=[item["chapter_number"] for item in new_outlines],
+    )
 
 
-@router.post("/novels/{project_id}/chapters/edit", response_model=NovelProjectSchema)
+@router.post("/novels/{project_id}/chapters/edit", response_model=ProjectResponse)
 async def edit_chapter_content(
     project_id: str,
     request: EditChapterRequest,
     background_tasks: BackgroundTasks,
+    delta: bool = DELTA_QUERY,
     session: AsyncSession = Depends(get_session),
     current_user: UserInDB = Depends(get_current_user),
-) -> NovelProjectSchema:
+) -> ProjectResponse:
     novel_service = NovelService(session)
     
     await novel_service.ensure_project_owner(project_id, current_user.id)
@@ -621,6 +973,7 @@ async def edit_chapter_content(
     chapter.status = ChapterGenerationStatus.SUCCESSFUL.value
     chapter.word_count = len(new_version.content or "")
     await session.commit()
+    await novel_service.touch_project(project_id)
 
     background_tasks.add_task(
         _refresh_edit_summary_and_ingest,
@@ -630,7 +983,9 @@ async def edit_chapter_content(
         current_user.id,
     )
 
-    return await _load_project_schema(novel_service, project_id, current_user.id)
+    return await _project_response(
+        novel_service, project_id, current_user.id, delta=delta, chapter_numbers=[request.chapter_number]
+    )
 
 
 @router.post("/novels/{project_id}/chapters/edit-fast", response_model=ChapterSchema)
@@ -655,7 +1010,7 @@ async def edit_chapter_content_fast(
     chapter.status = ChapterGenerationStatus.SUCCESSFUL.value
     chapter.word_count = len(new_version.content or "")
     await session.commit()
-    await session.refresh(chapter)
+    await novel_service.touch_project(project_id)
 
     background_tasks.add_task(
         _refresh_edit_summary_and_ingest,
@@ -665,53 +1020,4 @@ async def edit_chapter_content_fast(
         current_user.id,
     )
 
-    stmt = (
-        select(Chapter)
-        .options(
-            selectinload(Chapter.versions),
-            selectinload(Chapter.evaluations),
-            selectinload(Chapter.selected_version),
-        )
-        .where(
-            Chapter.project_id == project_id,
-            Chapter.chapter_number == request.chapter_number,
-        )
-    )
-    result = await session.execute(stmt)
-    chapter = result.scalars().first()
-    if not chapter:
-        raise HTTPException(status_code=404, detail="章节不存在")
-
-    outline_stmt = select(ChapterOutline).where(
-        ChapterOutline.project_id == project_id,
-        ChapterOutline.chapter_number == request.chapter_number,
-    )
-    outline_result = await session.execute(outline_stmt)
-    outline = outline_result.scalars().first()
-
-    title = outline.title if outline else f"第{request.chapter_number}章"
-    summary = outline.summary if outline else ""
-    real_summary = chapter.real_summary
-    content = chapter.selected_version.content if chapter.selected_version else None
-    versions = (
-        [v.content for v in sorted(chapter.versions, key=lambda item: item.created_at)]
-        if chapter.versions
-        else None
-    )
-    evaluation_text = None
-    if chapter.evaluations:
-        latest = sorted(chapter.evaluations, key=lambda item: item.created_at)[-1]
-        evaluation_text = latest.feedback or latest.decision
-    status_value = chapter.status or ChapterGenerationStatus.NOT_GENERATED.value
-
-    return ChapterSchema(
-        chapter_number=request.chapter_number,
-        title=title,
-        summary=summary,
-        real_summary=real_summary,
-        content=content,
-        versions=versions,
-        evaluation=evaluation_text,
-        generation_status=ChapterGenerationStatus(status_value),
-        word_count=chapter.word_count or 0,
-    )
+    return await novel_service.get_chapter_schema(project_id, current_user.id, request.chapter_number)
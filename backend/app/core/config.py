@@ -67,6 +67,20 @@ class Settings(BaseSettings):
     admin_default_password: str = Field(default="ChangeMe123!", env="ADMIN_DEFAULT_PASSWORD", description="默认管理员密码")
     admin_default_email: Optional[str] = Field(default=None, env="ADMIN_DEFAULT_EMAIL", description="默认管理员邮箱")
 
+    # -------------------- 系统配置缓存 --------------------
+    system_config_cache_ttl: float = Field(
+        default=60.0,
+        ge=0,
+        env="SYSTEM_CONFIG_CACHE_TTL",
+        description="进程内系统配置缓存的有效期（秒），兜底覆盖绕过管理接口的直接改库，0 表示关闭缓存",
+    )
+    system_config_cache_sync_interval: float = Field(
+        default=2.0,
+        ge=0,
+        env="SYSTEM_CONFIG_CACHE_SYNC_INTERVAL",
+        description="检查系统配置版本号的最小间隔（秒），其他进程通过管理接口修改配置后最迟在该间隔内生效",
+    )
+
     # -------------------- LLM 相关配置 --------------------
     openai_api_key: Optional[str] = Field(default=None, env="OPENAI_API_KEY", description="默认的 LLM API Key")
     openai_base_url: Optional[HttpUrl] = Field(
@@ -83,6 +97,219 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("WRITER_CHAPTER_VERSION_COUNT", "WRITER_CHAPTER_VERSIONS"),
         description="每次生成章节的候选版本数量",
     )
+    writer_parallel_versions: bool = Field(
+        default=False,
+        env="WRITER_PARALLEL_VERSIONS",
+        description="是否并发生成章节的多个候选版本（可被 flow_config.parallel_versions 覆盖）",
+    )
+    writer_version_concurrency_global: int = Field(
+        default=8,
+        ge=1,
+        env="WRITER_VERSION_CONCURRENCY_GLOBAL",
+        description="进程内同时生成中的章节版本数上限",
+    )
+    writer_version_concurrency_per_user: int = Field(
+        default=3,
+        ge=1,
+        env="WRITER_VERSION_CONCURRENCY_PER_USER",
+        description="单个用户同时生成中的章节版本数上限",
+    )
+    analysis_concurrency_global: int = Field(
+        default=8,
+        ge=1,
+        env="ANALYSIS_CONCURRENCY_GLOBAL",
+        description="进程内同时进行的只读分析类 LLM 调用（多维批评、读者模拟）上限",
+    )
+    analysis_concurrency_per_user: int = Field(
+        default=4,
+        ge=1,
+        env="ANALYSIS_CONCURRENCY_PER_USER",
+        description="单个用户同时进行的只读分析类 LLM 调用上限",
+    )
+    writer_context_mission_timeout: float = Field(
+        default=150.0,
+        gt=0,
+        env="WRITER_CONTEXT_MISSION_TIMEOUT",
+        description="上下文汇聚阶段：章节导演脚本的超时时间（秒），超时则按无脚本继续",
+    )
+    writer_context_enhanced_timeout: float = Field(
+        default=60.0,
+        gt=0,
+        env="WRITER_CONTEXT_ENHANCED_TIMEOUT",
+        description="上下文汇聚阶段：宪法/人格/伏笔/势力上下文的超时时间（秒）",
+    )
+    writer_context_memory_timeout: float = Field(
+        default=10.0,
+        gt=0,
+        env="WRITER_CONTEXT_MEMORY_TIMEOUT",
+        description="上下文汇聚阶段：项目记忆读取的超时时间（秒）",
+    )
+    writer_context_rag_timeout: float = Field(
+        default=30.0,
+        gt=0,
+        env="WRITER_CONTEXT_RAG_TIMEOUT",
+        description="上下文汇聚阶段：RAG 检索的超时时间（秒），超时则不带检索片段继续",
+    )
+    repair_context_paragraphs: int = Field(
+        default=1,
+        ge=0,
+        env="REPAIR_CONTEXT_PARAGRAPHS",
+        description="局部修复时在每个待修段落前后附带的只读上下文段落数",
+    )
+    repair_max_paragraph_ratio: float = Field(
+        default=0.4,
+        gt=0,
+        le=1,
+        env="REPAIR_MAX_PARAGRAPH_RATIO",
+        description="待修段落占全章比例超过该值时放弃局部修复，回退为整章重写",
+    )
+    llm_continuation_max_rounds: int = Field(
+        default=3,
+        ge=0,
+        env="LLM_CONTINUATION_MAX_ROUNDS",
+        description="文本输出因长度截断时自动续写的轮数上限，0 表示不续写、直接报错",
+    )
+    llm_continuation_tail_chars: int = Field(
+        default=1500,
+        ge=100,
+        env="LLM_CONTINUATION_TAIL_CHARS",
+        description="续写请求附带的已生成正文结尾字数",
+    )
+    llm_continuation_max_overlap: int = Field(
+        default=300,
+        ge=0,
+        env="LLM_CONTINUATION_MAX_OVERLAP",
+        description="拼接续写时检测的最大重叠字数，续写开头会先缓冲这么多字再转发",
+    )
+    writer_stream_guard_enabled: bool = Field(
+        default=True,
+        env="WRITER_STREAM_GUARD_ENABLED",
+        description="是否在章节流式生成过程中增量检查禁止角色等硬性违规，命中即中止上游请求",
+    )
+    writer_stream_guard_max_restarts: int = Field(
+        default=1,
+        ge=0,
+        env="WRITER_STREAM_GUARD_MAX_RESTARTS",
+        description="流式护栏中止后带修正指令重新生成的次数上限，用尽后改为生成完整正文再局部修复",
+    )
+    finalize_max_parallel_steps: int = Field(
+        default=4,
+        ge=1,
+        env="FINALIZE_MAX_PARALLEL_STEPS",
+        description="章节定稿时可并发执行的步骤数上限",
+    )
+    summary_backfill_enabled: bool = Field(
+        default=True,
+        env="SUMMARY_BACKFILL_ENABLED",
+        description="是否在进程内运行章节摘要回填后台任务",
+    )
+    summary_backfill_concurrency: int = Field(
+        default=3,
+        ge=1,
+        env="SUMMARY_BACKFILL_CONCURRENCY",
+        description="单个进程同时生成章节摘要的任务数上限",
+    )
+    summary_backfill_poll_seconds: float = Field(
+        default=5.0,
+        gt=0,
+        env="SUMMARY_BACKFILL_POLL_SECONDS",
+        description="摘要回填队列为空时的轮询间隔（秒）",
+    )
+    summary_backfill_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        env="SUMMARY_BACKFILL_MAX_ATTEMPTS",
+        description="单个摘要回填任务的最大尝试次数，超过后标记为 failed",
+    )
+    generation_jobs_enabled: bool = Field(
+        default=True,
+        env="GENERATION_JOBS_ENABLED",
+        description="是否在进程内运行章节生成任务的后台消费者",
+    )
+    generation_job_concurrency: int = Field(
+        default=2,
+        ge=1,
+        env="GENERATION_JOB_CONCURRENCY",
+        description="单个进程同时执行的章节生成任务数上限",
+    )
+    generation_job_poll_seconds: float = Field(
+        default=2.0,
+        gt=0,
+        env="GENERATION_JOB_POLL_SECONDS",
+        description="生成任务队列为空时的轮询间隔（秒），也是任务进度 SSE 接口的刷新间隔",
+    )
+    generation_job_heartbeat_seconds: float = Field(
+        default=5.0,
+        gt=0,
+        env="GENERATION_JOB_HEARTBEAT_SECONDS",
+        description="执行中任务刷新心跳并检查取消标记的间隔（秒）",
+    )
+    generation_job_stale_seconds: float = Field(
+        default=120.0,
+        gt=0,
+        env="GENERATION_JOB_STALE_SECONDS",
+        description="心跳停止超过该时长（秒）的任务视为所在进程已崩溃，放回队列从检查点继续",
+    )
+    generation_job_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        env="GENERATION_JOB_MAX_ATTEMPTS",
+        description="生成任务因进程中断被重新执行的最大次数，超过后标记为 failed",
+    )
+    generation_lock_lease_seconds: float = Field(
+        default=60.0,
+        gt=0,
+        env="GENERATION_LOCK_LEASE_SECONDS",
+        description="章节生成租约时长（秒），持有进程定期续期；进程崩溃后租约过期即可被其他请求接管",
+    )
+    generation_lock_poll_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        env="GENERATION_LOCK_POLL_SECONDS",
+        description="相同请求等待其他进程中的生成结果时的轮询间隔（秒）",
+    )
+    generation_idempotency_ttl_seconds: float = Field(
+        default=600.0,
+        ge=0,
+        env="GENERATION_IDEMPOTENCY_TTL_SECONDS",
+        description="携带幂等键的生成结果保留时长（秒），期间以相同幂等键重试直接返回该结果",
+    )
+    usage_flush_interval: float = Field(
+        default=5.0,
+        gt=0,
+        env="USAGE_FLUSH_INTERVAL",
+        description="调用计数写回数据库的间隔（秒），期间的增量在内存中聚合后批量写入",
+    )
+    daily_limit_lease_size: int = Field(
+        default=10,
+        ge=1,
+        env="DAILY_LIMIT_LEASE_SIZE",
+        description="每日请求额度每次向数据库预占的次数上限（接近上限时按剩余额度减半），进程内用完再预占；1 表示每次请求都写库",
+    )
+    llm_http_max_connections: int = Field(
+        default=100,
+        ge=1,
+        env="LLM_HTTP_MAX_CONNECTIONS",
+        description="每个共享 LLM/嵌入客户端的最大连接数",
+    )
+    llm_http_max_keepalive_connections: int = Field(
+        default=20,
+        ge=0,
+        env="LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS",
+        description="每个共享客户端保持的空闲长连接数",
+    )
+    llm_http_keepalive_expiry: float = Field(
+        default=60.0,
+        ge=0,
+        env="LLM_HTTP_KEEPALIVE_EXPIRY",
+        description="空闲长连接的保活时间（秒）",
+    )
+    llm_client_idle_ttl: float = Field(
+        default=600.0,
+        ge=0,
+        env="LLM_CLIENT_IDLE_TTL",
+        description="共享客户端空闲多久后被回收（秒），0 表示不回收",
+    )
     embedding_provider: str = Field(
         default="openai",
         env="EMBEDDING_PROVIDER",
@@ -119,6 +346,29 @@ class Settings(BaseSettings):
         env="OLLAMA_EMBEDDING_MODEL",
         description="Ollama 嵌入模型名称",
     )
+    embedding_batch_size: int = Field(
+        default=64,
+        ge=1,
+        env="EMBEDDING_BATCH_SIZE",
+        description="OpenAI 兼容接口单次嵌入请求的最大文本条数",
+    )
+    embedding_concurrency: int = Field(
+        default=4,
+        ge=1,
+        env="EMBEDDING_CONCURRENCY",
+        description="不支持批量的提供方（如 Ollama）并发嵌入请求上限",
+    )
+    embedding_cache_path: Optional[str] = Field(
+        default="storage/embedding_cache.db",
+        env="EMBEDDING_CACHE_PATH",
+        description="嵌入向量持久化缓存的 SQLite 文件路径（相对路径以 backend 目录为基准），留空关闭",
+    )
+    embedding_cache_max_mb: int = Field(
+        default=512,
+        ge=0,
+        env="EMBEDDING_CACHE_MAX_MB",
+        description="嵌入向量缓存的容量上限（MB），超出后按最近使用时间淘汰，0 表示关闭",
+    )
     vector_db_url: Optional[str] = Field(
         default=None,
         env="VECTOR_DB_URL",
@@ -153,6 +403,12 @@ class Settings(BaseSettings):
         env="VECTOR_CHUNK_OVERLAP",
         description="章节分块重叠字数",
     )
+    vector_index_cache_mb: int = Field(
+        default=256,
+        ge=0,
+        env="VECTOR_INDEX_CACHE_MB",
+        description="进程内按项目向量索引缓存的内存预算（MB），0 表示关闭",
+    )
 
     # -------------------- Linux.do OAuth 配置 --------------------
     linuxdo_client_id: Optional[str] = Field(default=None, env="LINUXDO_CLIENT_ID", description="Linux.do OAuth Client ID")
@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from ..core.config import settings
 from ..core.security import hash_password
-from ..models import Prompt, SystemConfig, User
+from ..models import Prompt, SystemConfig, SystemConfigRevision, User
 from .base import Base
 from .system_config_defaults import SYSTEM_CONFIG_DEFAULTS
 from .session import AsyncSessionLocal, engine
@@ -67,6 +67,10 @@ async def init_db() -> None:
                 )
             )
 
+        # 配置版本号表只有一行，预先写入避免多进程首次修改配置时并发插入
+        if await session.get(SystemConfigRevision, 1) is None:
+            session.add(SystemConfigRevision(id=1, revision=0))
+
         await _ensure_default_prompts(session)
 
         await session.commit()
@@ -116,6 +120,9 @@ async def _ensure_schema_updates() -> None:
             columns = {col["name"] for col in inspector.get_columns("chapter_outlines")}
             if "metadata" not in columns:
                 sync_conn.execute(text("ALTER TABLE chapter_outlines ADD COLUMN metadata JSON"))
+            project_columns = {col["name"] for col in inspector.get_columns("novel_projects")}
+            if "revision" not in project_columns:
+                sync_conn.execute(text("ALTER TABLE novel_projects ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"))
         await conn.run_sync(_upgrade)
 
 
@@ -1,7 +1,11 @@
-# AIMETA P=数据库会话_异步会话工厂|R=异步会话_连接池|NR=不含查询逻辑|E=AsyncSessionLocal_get_db|X=internal|A=会话工厂|D=sqlalchemy|S=db|RD=./README.ai
+# AIMETA P=数据库会话_异步会话工厂|R=异步会话_连接池_长等待前归还连接|NR=不含查询逻辑|E=AsyncSessionLocal_get_db_release_connection|X=internal|A=会话工厂|D=sqlalchemy|S=db|RD=./README.ai
+import logging
 from collections.abc import AsyncGenerator
+from typing import Optional
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import NullPool
 
 from ..core.config import settings
@@ -24,8 +28,47 @@ engine = create_async_engine(settings.sqlalchemy_database_uri, **engine_kwargs)
 # 统一的 Session 工厂，禁用 expire_on_commit 方便返回模型对象
 AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 
+logger = logging.getLogger(__name__)
+
+# 记录当前事务是否已经 flush 过写入：自动 flush 后 new/dirty/deleted 会清空，但改动仍未提交
+_FLUSHED_WRITES = "has_flushed_writes"
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed_writes(session: Session, flush_context) -> None:
+    session.info[_FLUSHED_WRITES] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_flushed_writes(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_FLUSHED_WRITES, None)
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """FastAPI 依赖项：提供一个作用域内共享的数据库会话。"""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def release_connection(session: Optional[AsyncSession], *, keep_pending_writes: bool = False) -> bool:
+    """结束会话当前的事务，把占用的连接归还连接池，返回是否已归还。
+
+    会话在首次执行 SQL 时开启事务并取出一个连接，直到提交或回滚才归还。长时间等待 LLM
+    之前调用，避免流式生成期间空占连接；之后再执行 SQL 时会话会自动取用新的连接。
+    结束事务采用提交（会一并提交尚未提交的改动）：会话工厂关闭了 expire_on_commit，
+    已加载的模型对象提交后仍可直接使用，而回滚会使其全部过期。
+
+    ``keep_pending_writes=True`` 用于不掌握事务边界的调用方（如 LLMService）：会话中有未提交的
+    改动时保持事务不动，不替调用方提交半完成的状态，只在事务只读时归还连接。
+    """
+    in_transaction = getattr(session, "in_transaction", None)
+    if in_transaction is None or not in_transaction():
+        return False
+    if keep_pending_writes and (
+        session.new or session.dirty or session.deleted or session.info.get(_FLUSHED_WRITES)
+    ):
+        logger.info("会话存在未提交的改动，保留事务与连接直到调用方提交或回滚")
+        return False
+    await session.commit()
+    return True
@@ -13,6 +13,11 @@ from .db.init_db import init_db
 from .services.prompt_service import PromptService
 from .db.session import AsyncSessionLocal
 from .api.routers import api_router
+from .services.summary_backfill_service import summary_backfill_worker
+from .services.generation_job_service import generation_job_worker
+from .services.usage_counter_service import usage_counters
+from .services.embedding_cache import embedding_cache
+from .utils.client_registry import client_registry
 
 
 dictConfig(
@@ -72,7 +77,20 @@ async def lifespan(app: FastAPI):
     async with AsyncSessionLocal() as session:
         prompt_service = PromptService(session)
         await prompt_service.preload()
+    if settings.summary_backfill_enabled:
+        summary_backfill_worker.start()
+    if settings.generation_jobs_enabled:
+        generation_job_worker.start()
+    usage_counters.start()
     yield
+    # 执行中的生成任务放回队列，重启后从最近完成的阶段继续
+    await generation_job_worker.stop()
+    await summary_backfill_worker.stop()
+    # 写回尚未落库的调用计数，并退还本进程预占但未用完的每日额度
+    await usage_counters.stop()
+    # 应用退出时关闭共享的 LLM/嵌入客户端连接池与嵌入缓存文件
+    await client_registry.aclose()
+    embedding_cache.close()
 
 
 app = FastAPI(
@@ -20,11 +20,18 @@ from .update_log import UpdateLog
 from .usage_metric import UsageMetric
 from .user import User
 from .user_daily_request import UserDailyRequest
-from .system_config import SystemConfig
+from .system_config import SystemConfig, SystemConfigRevision
 
 # 新增：项目记忆模型
 from .project_memory import ProjectMemory, ChapterSnapshot
 
+# 新增：摘要回填任务模型
+from .summary_task import ChapterSummaryTask
+
+# 新增：章节生成任务模型
+from .generation_job import ChapterGenerationJob
+from .generation_lock import ChapterGenerationLock
+
 # 新增：章节蓝图模型
 from .chapter_blueprint import (
     ChapterBlueprint,
@@ -72,9 +79,15 @@ __all__ = [
     "User",
     "UserDailyRequest",
     "SystemConfig",
+    "SystemConfigRevision",
     # 项目记忆模型
     "ProjectMemory",
     "ChapterSnapshot",
+    # 摘要回填任务模型
+    "ChapterSummaryTask",
+    # 章节生成任务模型
+    "ChapterGenerationJob",
+    "ChapterGenerationLock",
     # 章节蓝图模型
     "ChapterBlueprint",
     "BlueprintTemplate",
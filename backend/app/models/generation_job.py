@@ -0,0 +1,45 @@
+# AIMETA P=章节生成任务模型_持久化生成队列|R=生成任务表_阶段检查点_进度与结果|NR=不含调度逻辑|E=ChapterGenerationJob|X=internal|A=ORM模型|D=sqlalchemy|S=none|RD=./README.ai
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import JSON, Boolean, DateTime, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class ChapterGenerationJob(Base):
+    """章节生成任务：请求参数、执行状态、阶段检查点与最终结果。"""
+
+    __tablename__ = "chapter_generation_jobs"
+    __table_args__ = (
+        Index("idx_generation_job_chapter", "project_id", "chapter_number"),
+        Index("idx_generation_job_idempotency", "user_id", "idempotency_key"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    project_id: Mapped[str] = mapped_column(ForeignKey("novel_projects.id", ondelete="CASCADE"), nullable=False)
+    chapter_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # queued / running / succeeded / failed / cancelled
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="queued", index=True)
+    # 生成请求：writing_notes 与 flow_config
+    request: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False)
+    # 最近一次进入的阶段，供轮询展示
+    stage: Mapped[Optional[str]] = mapped_column(String(64))
+    # 阶段名 → 该阶段结果，恢复执行时跳过已完成的阶段
+    checkpoints: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    # 阶段进度事件（不含 token 增量），按发生顺序排列
+    progress: Mapped[Optional[List[Dict[str, Any]]]] = mapped_column(JSON)
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # 客户端提供的幂等键：同一用户重复提交时直接返回已有任务
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(128))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # 执行期间定期刷新，作为心跳判断任务所在进程是否存活
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,34 @@
+# AIMETA P=章节生成租约模型_跨进程单飞|R=章节生成租约表_请求指纹_幂等键_结果暂存|NR=不含加锁逻辑|E=ChapterGenerationLock|X=internal|A=ORM模型|D=sqlalchemy|S=none|RD=./README.ai
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class ChapterGenerationLock(Base):
+    """每个章节一行的生成租约：同一章节同一时刻只有一个生成在执行，其余相同请求等待其结果。"""
+
+    __tablename__ = "chapter_generation_locks"
+
+    project_id: Mapped[str] = mapped_column(
+        ForeignKey("novel_projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    chapter_number: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 租约持有者标识，每次获取租约时重新生成，条件更新据此判断租约是否易手
+    owner: Mapped[str] = mapped_column(String(36), nullable=False)
+    # running / succeeded / failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="running")
+    # 请求指纹（用户、写作指令、流程配置的哈希），相同指纹的请求共享同一次生成
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    idempotency_key: Mapped[Optional[str]] = mapped_column(String(128))
+    result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    # 失败时的状态码与错误信息，等待方按原样抛出
+    error: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON)
+    # running 时为租约到期时间（持有者定期续期）；结束后为结果的保留期限
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
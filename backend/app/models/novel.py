@@ -40,6 +40,8 @@ class NovelProject(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     cover_url: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+    # 项目修订号：每次写操作自增，供前端按增量响应合并本地状态时校验是否漏更
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     owner: Mapped["User"] = relationship("User", back_populates="novel_projects")
     blueprint: Mapped[Optional["NovelBlueprint"]] = relationship(
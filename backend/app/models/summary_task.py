@@ -0,0 +1,32 @@
+# AIMETA P=摘要回填任务模型_持久化工作队列|R=章节摘要回填任务表|NR=不含调度逻辑|E=ChapterSummaryTask|X=internal|A=ORM模型|D=sqlalchemy|S=none|RD=./README.ai
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+from .novel import BIGINT_PK_TYPE
+
+
+class ChapterSummaryTask(Base):
+    """章节摘要回填任务，每章至多一条；重新入队时复位为 pending。"""
+
+    __tablename__ = "chapter_summary_tasks"
+    __table_args__ = (UniqueConstraint("project_id", "chapter_number", name="uq_summary_task_chapter"),)
+
+    id: Mapped[int] = mapped_column(BIGINT_PK_TYPE, primary_key=True, autoincrement=True)
+    project_id: Mapped[str] = mapped_column(ForeignKey("novel_projects.id", ondelete="CASCADE"), nullable=False)
+    chapter_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 用于解析该用户的 LLM 配置与配额
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # pending / running / done / failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    # 失败重试的最早执行时间
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,5 @@
-# AIMETA P=系统配置模型_全局配置存储|R=系统配置表|NR=不含配置逻辑|E=SystemConfig|X=internal|A=ORM模型|D=sqlalchemy|S=none|RD=./README.ai
-from sqlalchemy import String, Text
+# AIMETA P=系统配置模型_全局配置存储|R=系统配置表|NR=不含配置逻辑|E=SystemConfig_SystemConfigRevision|X=internal|A=ORM模型|D=sqlalchemy|S=none|RD=./README.ai
+from sqlalchemy import Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -13,3 +13,12 @@ class SystemConfig(Base):
     key: Mapped[str] = mapped_column(String(100), primary_key=True)
     value: Mapped[str] = mapped_column(Text, nullable=False)
     description: Mapped[str | None] = mapped_column(String(255))
+
+
+class SystemConfigRevision(Base):
+    """系统配置版本号（单行），每次通过管理接口修改配置时递增，供各进程的配置缓存判断是否过期。"""
+
+    __tablename__ = "system_config_revisions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
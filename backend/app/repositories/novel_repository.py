@@ -11,7 +11,40 @@ from ..models import Chapter, NovelProject
 class NovelRepository(BaseRepository[NovelProject]):
     model = NovelProject
 
+    async def get_basic(self, project_id: str, *, with_blueprint: bool = False) -> Optional[NovelProject]:
+        """只按主键读取项目本身的列（可选附带蓝图主体），不加载其他关联，用于归属校验。"""
+        stmt = select(NovelProject).where(NovelProject.id == project_id)
+        if with_blueprint:
+            stmt = stmt.options(selectinload(NovelProject.blueprint))
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
+    async def get_writer_context(
+        self,
+        project_id: str,
+        *,
+        include_selected_version: bool = True,
+    ) -> Optional[NovelProject]:
+        """读取写作所需的上下文：蓝图、角色、关系、大纲与章节（仅选中版本），不含对话、全部版本与评审。"""
+        chapters_loader = selectinload(NovelProject.chapters)
+        if include_selected_version:
+            chapters_loader = chapters_loader.selectinload(Chapter.selected_version)
+        stmt = (
+            select(NovelProject)
+            .where(NovelProject.id == project_id)
+            .options(
+                selectinload(NovelProject.blueprint),
+                selectinload(NovelProject.characters),
+                selectinload(NovelProject.relationships_),
+                selectinload(NovelProject.outlines),
+                chapters_loader,
+            )
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
     async def get_by_id(self, project_id: str) -> Optional[NovelProject]:
+        """完整加载项目及全部关联（含每章所有版本与评审），仅用于需要完整项目快照的场景。"""
         stmt = (
             select(NovelProject)
             .where(NovelProject.id == project_id)
@@ -0,0 +1,91 @@
+# AIMETA P=系统配置缓存_进程内配置读取加速|R=按键缓存配置值_TTL过期_版本号跨进程失效|NR=不含数据库访问|E=SystemConfigCache_system_config_cache|X=internal|A=缓存类|D=none|S=mem|RD=./README.ai
+from __future__ import annotations
+
+"""
+进程内的系统配置缓存。
+
+按配置键缓存数据库中的值（包括"不存在"），条目在 ``system_config_cache_ttl`` 秒后过期。
+管理接口写入配置时递增 ``system_config_revisions`` 中的版本号并清除本进程缓存；
+其他进程在读取配置时至多每 ``system_config_cache_sync_interval`` 秒比对一次版本号，
+发现变化即整体清空，从而在多 worker 部署下也能及时感知配置修改。
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+from ..core.config import settings
+
+# 缓存未命中的哨兵值，区别于"已缓存的不存在（None）"
+MISSING = object()
+
+
+class SystemConfigCache:
+    """按键缓存系统配置值，TTL 过期并通过版本号感知其他进程的写入。"""
+
+    def __init__(self, *, ttl: float, sync_interval: float) -> None:
+        self.ttl = max(0.0, float(ttl))
+        self.sync_interval = max(0.0, float(sync_interval))
+        self.revision: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[Optional[str], float]] = {}
+        self._synced_at = float("-inf")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> object:
+        """返回缓存的值（可能为 None，表示库中没有该配置）；未命中或已过期时返回 ``MISSING``。"""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, value: Optional[str]) -> None:
+        if self.enabled:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def needs_sync(self) -> bool:
+        """距离上次比对版本号已超过同步间隔时返回 True。"""
+        return self.enabled and time.monotonic() - self._synced_at >= self.sync_interval
+
+    def sync(self, revision: int) -> None:
+        """记录最新读到的版本号；版本号变化说明配置被修改过，清空全部条目。"""
+        if self.revision is not None and revision != self.revision:
+            self._entries.clear()
+        self.revision = revision
+        self._synced_at = time.monotonic()
+
+    def invalidate(self, key: Optional[str] = None, *, revision: Optional[int] = None) -> None:
+        """本进程写入配置并提交后调用，``revision`` 为写入后的版本号。
+
+        版本号恰好比缓存记录的大一时只清除对应条目；否则说明期间其他进程也修改过配置
+        （或未指定键），清空全部条目。
+        """
+        if key is not None and revision is not None and self.revision == revision - 1:
+            self._entries.pop(key, None)
+        else:
+            self._entries.clear()
+        self.revision = revision
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.revision = None
+        self._synced_at = float("-inf")
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+system_config_cache = SystemConfigCache(
+    ttl=settings.system_config_cache_ttl,
+    sync_interval=settings.system_config_cache_sync_interval,
+)
+
+
+__all__ = ["MISSING", "SystemConfigCache", "system_config_cache"]
@@ -1,10 +1,14 @@
-# AIMETA P=系统配置仓库_配置数据访问|R=配置CRUD|NR=不含业务逻辑|E=SystemConfigRepository|X=internal|A=仓库类|D=sqlalchemy|S=db|RD=./README.ai
-from typing import Iterable, Optional
+# AIMETA P=系统配置仓库_配置数据访问|R=配置CRUD_缓存读取_版本号递增|NR=不含业务逻辑|E=SystemConfigRepository|X=internal|A=仓库类|D=sqlalchemy|S=db,mem|RD=./README.ai
+from typing import Dict, Iterable, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from .base import BaseRepository
-from ..models import SystemConfig
+from .system_config_cache import MISSING, system_config_cache
+from ..models import SystemConfig, SystemConfigRevision
+
+# 版本号表只有一行
+_REVISION_ROW_ID = 1
 
 
 class SystemConfigRepository(BaseRepository[SystemConfig]):
@@ -17,3 +21,56 @@ class SystemConfigRepository(BaseRepository[SystemConfig]):
     async def list_all(self) -> Iterable[SystemConfig]:
         result = await self.session.execute(select(SystemConfig).order_by(SystemConfig.key))
         return result.scalars().all()
+
+    async def get_value(self, key: str) -> Optional[str]:
+        """读取配置值，优先使用进程内缓存；不存在时返回 None。"""
+        return (await self.get_values([key]))[key]
+
+    async def get_int(self, key: str) -> Optional[int]:
+        """读取整数配置，不存在或无法解析时返回 None。"""
+        value = await self.get_value(key)
+        try:
+            return int(value) if value not in (None, "") else None
+        except ValueError:
+            return None
+
+    async def get_values(self, keys: Sequence[str]) -> Dict[str, Optional[str]]:
+        """批量读取配置值（按传入顺序返回），缓存未命中的键合并为一次查询。"""
+        cache = system_config_cache
+        if cache.needs_sync():
+            cache.sync(await self._read_revision())
+        values: Dict[str, Optional[str]] = {}
+        missing = []
+        for key in keys:
+            cached = cache.get(key)
+            if cached is MISSING:
+                missing.append(key)
+            else:
+                values[key] = cached  # type: ignore[assignment]
+        if missing:
+            result = await self.session.execute(
+                select(SystemConfig.key, SystemConfig.value).where(SystemConfig.key.in_(missing))
+            )
+            found = dict(result.all())
+            for key in missing:
+                values[key] = found.get(key)
+                cache.put(key, values[key])
+        return {key: values[key] for key in keys}
+
+    async def bump_revision(self) -> int:
+        """递增配置版本号并返回新值，与配置写入在同一事务内提交，通知其他进程清空缓存。"""
+        result = await self.session.execute(
+            update(SystemConfigRevision)
+            .where(SystemConfigRevision.id == _REVISION_ROW_ID)
+            .values(revision=SystemConfigRevision.revision + 1)
+        )
+        if not result.rowcount:
+            self.session.add(SystemConfigRevision(id=_REVISION_ROW_ID, revision=1))
+            await self.session.flush()
+        return await self._read_revision()
+
+    async def _read_revision(self) -> int:
+        result = await self.session.execute(
+            select(SystemConfigRevision.revision).where(SystemConfigRevision.id == _REVISION_ROW_ID)
+        )
+        return int(result.scalar() or 0)
@@ -9,6 +9,17 @@ class Statistics(BaseModel):
     novel_count: int
     user_count: int
     api_request_count: int
+    cancelled_stream_count: int = Field(0, description="因客户端断开或任务取消而中止的模型流式调用次数")
+    cancelled_tokens_saved: int = Field(0, description="取消后上游未再生成的输出 token 估算值")
+
+
+class EmbeddingCacheStats(BaseModel):
+    entries: int = Field(..., description="缓存的向量条数")
+    bytes: int = Field(..., description="缓存向量占用的字节数")
+    max_bytes: int = Field(..., description="容量上限（字节）")
+    hits: int = Field(..., description="本进程启动以来的命中次数")
+    misses: int = Field(..., description="本进程启动以来的未命中次数")
+    evictions: int = Field(..., description="本进程启动以来淘汰的条数")
 
 
 class DailyRequestLimit(BaseModel):
@@ -1,4 +1,5 @@
 # AIMETA P=小说模式_小说和章节请求响应|R=小说结构_章节结构|NR=不含业务逻辑|E=NovelSchema_ChapterSchema|X=internal|A=Pydantic模式|D=pydantic|S=none|RD=./README.ai
+from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
@@ -93,11 +94,26 @@ class NovelProject(BaseModel):
     conversation_history: List[Dict[str, Any]] = []
     blueprint: Optional[Blueprint] = None
     chapters: List[Chapter] = []
+    revision: int = 0
 
     class Config:
         from_attributes = True
 
 
+class NovelProjectDelta(BaseModel):
+    """写作操作的增量响应：只包含本次变更的章节（含大纲字段）与删除的章节号。
+
+    revision 是项目的新鲜度标记：任何写入（包括不产生增量的写入）都会使其递增，不能用来判断增量是否连续。
+    前端将增量合并到本地后记下新的 revision；若新 revision 比本地持有的大 1 以上，说明期间可能有其他写入，
+    应改为拉取完整项目。
+    """
+
+    project_id: str
+    revision: int
+    chapters: List[Chapter] = []
+    deleted_chapters: List[int] = []
+
+
 class NovelProjectSummary(BaseModel):
     id: str
     title: str
@@ -148,6 +164,13 @@ class FlowConfig(BaseModel):
     async_finalize: Optional[bool] = Field(default=None, description="是否异步定稿")
     enable_rag: Optional[bool] = Field(default=None, description="是否启用 RAG")
     rag_mode: Optional[str] = Field(default=None, description="simple|two_stage")
+    parallel_versions: Optional[bool] = Field(default=None, description="是否并发生成多个候选版本")
+    optimizer_mode: Optional[str] = Field(
+        default=None, description="sequential|fused|patch，未指定时按预设的系统配置或默认 sequential"
+    )
+    optimizer_dimensions: Optional[List[str]] = Field(
+        default=None, description="优化维度子集：dialogue/environment/psychology/rhythm，默认全部"
+    )
 
 
 class AdvancedGenerateRequest(BaseModel):
@@ -176,6 +199,22 @@ class AdvancedGenerateResponse(BaseModel):
     finalized: bool = Field(default=False, description="是否已定稿，生成阶段恒为 False")
 
 
+class GenerationJobResponse(BaseModel):
+    job_id: str
+    project_id: str
+    chapter_number: int
+    status: str = Field(description="queued / running / succeeded / failed / cancelled")
+    stage: Optional[str] = Field(default=None, description="最近一次进入的流水线阶段")
+    progress: List[Dict[str, Any]] = Field(default_factory=list, description="阶段进度事件，seq 递增")
+    attempts: int = 0
+    cancel_requested: bool = False
+    result: Optional[AdvancedGenerateResponse] = Field(default=None, description="任务成功时的生成结果")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 class FinalizeChapterRequest(BaseModel):
     project_id: str
     selected_version_id: int
@@ -123,11 +123,8 @@ class AuthService:
             "smtp.password",
             "smtp.from",
         ]
-        configs = {}
-        for key in keys:
-            config = await self.system_config_repo.get_by_key(key)
-            if config:
-                configs[key] = config.value
+        values = await self.system_config_repo.get_values(keys)
+        configs = {key: value for key, value in values.items() if value is not None}
 
         required_keys = {"smtp.server", "smtp.port", "smtp.username", "smtp.password", "smtp.from"}
         if not required_keys.issubset(configs.keys()):
@@ -330,8 +327,7 @@ class AuthService:
         return await self.create_access_token(user)
 
     async def _get_config_value(self, key: str) -> Optional[str]:
-        config = await self.system_config_repo.get_by_key(key)
-        return config.value if config else None
+        return await self.system_config_repo.get_value(key)
 
     async def get_config_value(self, key: str) -> Optional[str]:
         """对外暴露的配置读取接口，便于路由层复用。"""
@@ -1,4 +1,4 @@
-# AIMETA P=章节护栏_后置一致性检查|R=禁止角色检测_全知视角检测_登场协议检查|NR=不含LLM调用|E=none|X=internal|A=检测_验证|D=re|S=none|RD=./README.ai
+# AIMETA P=章节护栏_后置一致性检查|R=禁止角色检测_全知视角检测_登场协议检查_流式增量检查|NR=不含LLM调用|E=ChapterGuardrails_StreamGuard|X=internal|A=检测_验证|D=re|S=none|RD=./README.ai
 """
 ChapterGuardrails: 章节后置一致性检查服务
 
@@ -7,11 +7,12 @@ ChapterGuardrails: 章节后置一致性检查服务
 2. 检测全知视角的 cue 词
 3. 检测新角色登场是否符合协议
 4. 输出违规列表，供自动修复使用
+5. StreamGuard：在流式生成过程中增量检查硬性违规，命中即可中止上游请求
 """
 
 import re
 from dataclasses import dataclass, field
-from typing import List, Optional, Set
+from typing import List, Optional, Sequence, Set
 
 
 @dataclass
@@ -21,6 +22,7 @@ class Violation:
     severity: str  # high | medium | low
     description: str
     position: Optional[int] = None  # 违规位置（字符索引）
+    end: Optional[int] = None  # 违规片段结束位置（不含），供局部修复定位
     context: Optional[str] = None  # 违规上下文（前后 50 字）
 
 
@@ -148,6 +150,7 @@ class ChapterGuardrails:
                         severity="high",
                         description=f"出现了禁止角色「{name}」的名字",
                         position=pos,
+                        end=match.end(),
                         context=context,
                     )
                 )
@@ -164,6 +167,7 @@ class ChapterGuardrails:
                     severity="medium",
                     description=f"出现全知视角 cue 词「{cue}」",
                     position=pos,
+                    end=match.end(),
                     context=context,
                 )
             )
@@ -194,6 +198,7 @@ class ChapterGuardrails:
                         severity="medium",
                         description=f"新角色「{name}」首次出现前缺少介绍性描写",
                         position=pos,
+                        end=match.end(),
                         context=context,
                     )
                 )
@@ -217,3 +222,67 @@ class ChapterGuardrails:
             if v.context:
                 lines.append(f"   上下文：{v.context}")
         return "\n".join(lines)
+
+
+@dataclass
+class StreamHit:
+    """流式检查命中的硬性违规"""
+    type: str  # forbidden_name | omniscient_cue
+    text: str  # 命中的名字或 cue 词
+    offset: int  # 在模型原始输出中的起始字符位置
+    end: int
+
+
+class StreamGuard:
+    """
+    流式增量护栏。
+
+    把禁止角色名与强全知视角 cue 预编译成一个多模式正则，每收到一段增量只扫描
+    新增部分（连同上一段末尾可能被截断的重叠区），命中即返回 StreamHit。
+    <think> 推理块内的内容不计入检查，与正文清洗逻辑保持一致。
+    """
+
+    def __init__(
+        self,
+        forbidden_characters: Sequence[str],
+        *,
+        omniscient_cues: Sequence[str] = (),
+    ):
+        self._types = {}
+        for cue in omniscient_cues:
+            if cue:
+                self._types[cue] = "omniscient_cue"
+        for name in forbidden_characters:
+            if name:
+                self._types[name] = "forbidden_name"
+        # 长词优先，避免短名抢先匹配长名的前缀
+        literals = sorted(self._types, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(item) for item in literals)) if literals else None
+        self._overlap = max((len(item) for item in literals), default=1) - 1
+        self._buffer = ""
+        self._scanned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._pattern is not None
+
+    def feed(self, delta: str) -> Optional[StreamHit]:
+        """追加一段模型输出并检查新增部分；未命中返回 None。"""
+        if self._pattern is None or not delta:
+            return None
+        self._buffer += delta
+        start = max(0, self._scanned - self._overlap)
+        self._scanned = len(self._buffer)
+        for match in self._pattern.finditer(self._buffer, start):
+            if self._inside_think(match.start()):
+                continue
+            return StreamHit(
+                type=self._types[match.group()],
+                text=match.group(),
+                offset=match.start(),
+                end=match.end(),
+            )
+        return None
+
+    def _inside_think(self, pos: int) -> bool:
+        return self._buffer.rfind("<think>", 0, pos) > self._buffer.rfind("</think>", 0, pos)
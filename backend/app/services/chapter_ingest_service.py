@@ -8,18 +8,20 @@ from __future__ import annotations
 """
 
 import logging
-from typing import Dict, List, Optional, Sequence
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Set
 
 from ..core.config import settings
 from ..services.llm_service import LLMService
-from ..services.vector_store_service import VectorStoreService
+from ..services.vector_store_service import VectorStoreService, content_hash
 
 logger = logging.getLogger(__name__)
 
-try:  # noqa: SIM105 - 提示缺少可选依赖
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-except ImportError:  # pragma: no cover - 未安装时会走后备方案
-    RecursiveCharacterTextSplitter = None  # type: ignore[assignment]
+# 段落哈希对该值取模为 0 时视为"锚点段落"，块在锚点后切分；期望每块约含此数量的锚点间隔
+_ANCHOR_DIVISOR = 4
+# 超长段落按句末标点拆成句子后再参与分块
+_SENTENCE_END = re.compile(r"(?<=[。！？!?；;…])")
 
 
 class ChapterIngestionService:
@@ -32,8 +34,9 @@ class ChapterIngestionService:
         vector_store: Optional[VectorStoreService] = None,
     ) -> None:
         self._llm_service = llm_service
+        # 调用方显式注入向量库时以注入的实例为准，不再受全局 VECTOR_DB_URL 开关约束
+        self._enabled = vector_store is not None or settings.vector_store_enabled
         self._vector_store = vector_store or VectorStoreService()
-        self._text_splitter = self._init_text_splitter()
 
     async def ingest_chapter(
         self,
@@ -44,43 +47,74 @@ class ChapterIngestionService:
         content: str,
         summary: Optional[str],
         user_id: int,
-    ) -> None:
-        """将章节正文与摘要写入向量库，供后续 RAG 检索使用。"""
-        if not settings.vector_store_enabled:
+    ) -> Dict[str, Any]:
+        """将章节正文与摘要增量同步到向量库，供后续 RAG 检索使用。
+
+        片段按内容哈希与库中已有片段比对：未变化的片段沿用原有向量，只更新位置；
+        仅新增或改动的片段与摘要通过 ``LLMService.get_embeddings`` 批量生成向量，
+        不再出现的旧片段被删除。返回写入报告：``status`` 为 ``updated``（全部成功）、
+        ``partial``（部分片段或摘要失败）、``failed``（无任何向量可用）或 ``skipped``；
+        调用方据此决定是否标记 needs_vector_retry。
+        """
+        if not self._enabled:
             logger.warning("向量库未启用，跳过章节向量写入: project=%s chapter=%s", project_id, chapter_number)
-            return
+            return {"status": "skipped", "reason": "vector_store_disabled"}
         if not content.strip():
             logger.warning("章节正文为空，跳过向量写入: project=%s chapter=%s", project_id, chapter_number)
-            return
+            return {"status": "skipped", "reason": "empty_content"}
 
         chunks = self._split_into_chunks(content)
         if not chunks:
             logger.warning("章节正文切分后为空，跳过向量写入: project=%s chapter=%s", project_id, chapter_number)
-            return
+            return {"status": "skipped", "reason": "empty_chunks"}
+
+        # 同一哈希可能对应多个旧片段（重复段落），按多重集合逐个认领
+        existing = await self._vector_store.chapter_chunk_hashes(project_id=project_id, chapter_number=chapter_number)
+        reusable: Dict[str, List[str]] = defaultdict(list)
+        for record_id, digest in existing.items():
+            reusable[digest].append(record_id)
+        hashes = [content_hash(chunk_text) for chunk_text in chunks]
+        reused_ids = [reusable[digest].pop(0) if reusable.get(digest) else None for digest in hashes]
+        pending = [index for index, record_id in enumerate(reused_ids) if record_id is None]
 
         logger.info(
-            "开始写入章节向量: project=%s chapter=%s chunks=%d",
+            "开始写入章节向量: project=%s chapter=%s chunks=%d reused=%d",
             project_id,
             chapter_number,
             len(chunks),
+            len(chunks) - len(pending),
         )
-        await self._vector_store.delete_by_chapters(project_id, [chapter_number])
+
+        cleaned_summary = (summary or "").strip()
+        inputs = [chunks[index] for index in pending]
+        if cleaned_summary:
+            inputs.append(cleaned_summary)
+        # 待嵌入的片段与摘要合并为一次批量嵌入，结果与输入顺序一一对应
+        embeddings = list(await self._llm_service.get_embeddings(inputs, user_id=user_id)) if inputs else []
+        embeddings = embeddings + [[]] * (len(inputs) - len(embeddings))
+        embedded = dict(zip(pending, embeddings))
 
         chunk_records = []
+        kept_chunks = []
+        failed_chunks: List[int] = []
+        used_ids: Set[str] = {record_id for record_id in reused_ids if record_id}
         for index, chunk_text in enumerate(chunks):
-            embedding = await self._llm_service.get_embedding(
-                chunk_text,
-                user_id=user_id,
-            )
-            if not embedding:
-                logger.warning(
-                    "生成章节片段向量失败，已跳过: project=%s chapter=%s chunk=%s",
-                    project_id,
-                    chapter_number,
-                    index,
+            record_id = reused_ids[index]
+            if record_id is not None:
+                kept_chunks.append(
+                    {
+                        "id": record_id,
+                        "chunk_index": index,
+                        "chapter_title": title,
+                        "metadata": {"chunk_id": record_id, "length": len(chunk_text)},
+                    }
                 )
                 continue
-            record_id = f"{project_id}:{chapter_number}:{index}"
+            embedding = embedded[index]
+            if not embedding:
+                failed_chunks.append(index)
+                continue
+            record_id = self._new_chunk_id(project_id, chapter_number, hashes[index], used_ids)
             chunk_records.append(
                 {
                     "id": record_id,
@@ -89,6 +123,7 @@ class ChapterIngestionService:
                     "chunk_index": index,
                     "chapter_title": title,
                     "content": chunk_text,
+                    "content_hash": hashes[index],
                     "embedding": embedding,
                     "metadata": {
                         "chunk_id": record_id,
@@ -96,52 +131,102 @@ class ChapterIngestionService:
                     },
                 }
             )
-
-        if chunk_records:
-            await self._vector_store.upsert_chunks(records=chunk_records)
-            logger.info(
-                "章节正文向量写入完成: project=%s chapter=%s 成功片段=%d",
+        if failed_chunks:
+            logger.warning(
+                "生成章节片段向量失败，已跳过: project=%s chapter=%s chunks=%s",
                 project_id,
                 chapter_number,
-                len(chunk_records),
+                failed_chunks,
             )
 
-        if summary:
-            cleaned_summary = summary.strip()
-            if cleaned_summary:
-                summary_embedding = await self._llm_service.get_embedding(
-                    cleaned_summary,
-                    user_id=user_id,
+        summary_records = []
+        summary_status = "skipped"
+        if cleaned_summary:
+            summary_embedding = embeddings[len(pending)]
+            if summary_embedding:
+                summary_records.append(
+                    {
+                        "id": f"{project_id}:{chapter_number}:summary",
+                        "project_id": project_id,
+                        "chapter_number": chapter_number,
+                        "title": title,
+                        "summary": cleaned_summary,
+                        "embedding": summary_embedding,
+                    }
                 )
-                if summary_embedding:
-                    summary_id = f"{project_id}:{chapter_number}:summary"
-                    await self._vector_store.upsert_summaries(
-                        records=[
-                            {
-                                "id": summary_id,
-                                "project_id": project_id,
-                                "chapter_number": chapter_number,
-                                "title": title,
-                                "summary": cleaned_summary,
-                                "embedding": summary_embedding,
-                            }
-                        ]
-                    )
-                    logger.info(
-                        "章节摘要向量写入完成: project=%s chapter=%s",
-                        project_id,
-                        chapter_number,
-                    )
-                else:
-                    logger.warning(
-                        "生成章节摘要向量失败，已跳过: project=%s chapter=%s",
-                        project_id,
-                        chapter_number,
-                    )
+                summary_status = "updated"
+            else:
+                summary_status = "failed"
+                logger.warning(
+                    "生成章节摘要向量失败，已跳过: project=%s chapter=%s",
+                    project_id,
+                    chapter_number,
+                )
+
+        if not chunk_records and not summary_records and (failed_chunks or summary_status == "failed"):
+            # 没有任何新向量可写：不动库中的旧数据，由 needs_vector_retry 重新入库
+            return {
+                "status": "failed",
+                "error": "embedding_failed",
+                "chunks_total": len(chunks),
+                "chunks_embedded": 0,
+                "chunks_reused": len(kept_chunks),
+                "failed_chunks": failed_chunks,
+                "summary": summary_status,
+                "rows_written": 0,
+            }
+
+        # 有片段嵌入失败时保留全部未沿用的旧片段，摘要嵌入失败时保留旧摘要，避免删掉旧向量却没有新向量替代；
+        # 重试入库成功后再清理
+        reused = {record_id for record_id in reused_ids if record_id}
+        stale_ids = [record_id for record_id in existing if record_id not in reused]
+        # 删除过期片段、更新沿用片段与写入新向量在同一事务内完成，写入失败时旧数据保持不变
+        written = await self._vector_store.replace_chapter(
+            project_id=project_id,
+            chapter_number=chapter_number,
+            chunk_records=chunk_records,
+            summary_records=summary_records,
+            kept_chunks=kept_chunks,
+            retain_ids=stale_ids if failed_chunks else (),
+            replace_summaries=summary_status != "failed",
+        )
+        if written["chunks"] < len(chunk_records) or written["summaries"] < len(summary_records):
+            return {
+                "status": "failed",
+                "error": "vector_write_failed",
+                "chunks_total": len(chunks),
+                "chunks_embedded": len(chunk_records),
+                "rows_written": written["chunks"] + written["summaries"],
+            }
+        logger.info(
+            "章节向量写入完成: project=%s chapter=%s 新增片段=%d 沿用片段=%d 摘要=%s",
+            project_id,
+            chapter_number,
+            len(chunk_records),
+            len(kept_chunks),
+            summary_status,
+        )
+
+        if not chunk_records and not kept_chunks and summary_status != "updated":
+            status = "failed"
+        elif failed_chunks or summary_status == "failed":
+            status = "partial"
+        else:
+            status = "updated"
+        return {
+            "status": status,
+            "chunks_total": len(chunks),
+            "chunks_embedded": len(chunk_records),
+            "chunks_reused": len(kept_chunks),
+            "chunks_deleted": written.get("deleted", 0),
+            "failed_chunks": failed_chunks,
+            "summary": summary_status,
+            "rows_written": written["chunks"] + written["summaries"],
+        }
 
     async def delete_chapters(self, project_id: str, chapter_numbers: Sequence[int]) -> None:
         """从向量库中删除指定章节的所有片段与摘要。"""
-        if not settings.vector_store_enabled or not chapter_numbers:
+        if not self._enabled or not chapter_numbers:
             return
         logger.info(
             "准备删除章节向量: project=%s chapters=%s",
@@ -151,113 +236,88 @@ class ChapterIngestionService:
         await self._vector_store.delete_by_chapters(project_id, list(chapter_numbers))
 
     def _split_into_chunks(self, text: str) -> List[str]:
-        """按照配置的 chunk 大小与重叠度切分章节正文。"""
-        normalized = text.strip()
-        if not normalized:
-            return []
-
-        if self._text_splitter:
-            parts = [segment.strip() for segment in self._text_splitter.split_text(normalized)]
-            filtered = [part for part in parts if part]
-            if filtered:
-                logger.debug(
-                    "使用 LangChain 文本切分器完成分段: count=%d chunk_size=%d overlap=%d",
-                    len(filtered),
-                    settings.vector_chunk_size,
-                    settings.vector_chunk_overlap,
-                )
-                return filtered
-
-        return self._legacy_split(normalized)
-
-    @staticmethod
-    def _find_split_offset(segment: str) -> Optional[int]:
-        """在片段内部寻找更自然的分割点，优先换行，其次常见标点。"""
-        candidates: Dict[str, int] = {}
-        newline_pos = segment.rfind("\n\n")
-        if newline_pos == -1:
-            newline_pos = segment.rfind("\n")
-        if newline_pos > 0:
-            candidates["newline"] = newline_pos
-
-        punctuation_marks = ["。", "！", "？", "!", "?", ".", ";", "；"]
-        for mark in punctuation_marks:
-            idx = segment.rfind(mark)
-            if idx > 0:
-                candidates.setdefault("punctuation", idx + len(mark))
-
-        if not candidates:
-            return None
-
-        # 选择最接近末尾但又不过短的分割点
-        best_offset = max(candidates.values())
-        if best_offset < len(segment) * 0.4:
-            return None
-        return best_offset
-
-    def _init_text_splitter(self) -> Optional["RecursiveCharacterTextSplitter"]:
-        """初始化 LangChain 文本切分器，可根据配置动态调整。"""
-        if RecursiveCharacterTextSplitter is None:
-            logger.warning("未安装 langchain-text-splitters，章节切分将回退至内置策略。")
-            return None
+        """按段落做内容定义分块（content-defined chunking），使块边界在编辑前后保持稳定。
 
+        块达到最小长度后，在"锚点段落"（由段落自身哈希决定）之后切分；再加入下一段会超过
+        ``vector_chunk_size`` 时强制切分。边界只取决于附近段落的内容，修改一句话只会改变
+        所在块（以及以其结尾为重叠前缀的下一块），其余块文本不变，增量入库时可直接沿用。
+        块之间的重叠由上一块末尾的整段组成，总长不超过 ``vector_chunk_overlap``。
+        """
         chunk_size = settings.vector_chunk_size
         overlap = min(settings.vector_chunk_overlap, chunk_size // 2)
-        separators = [
-            "\n\n",
-            "\n",
-            "。", "！", "？",
-            "!", "?", "；", ";",
-            "，", ",",
-            " ",
-        ]
-        splitter = RecursiveCharacterTextSplitter(
-            separators=separators,
-            chunk_size=chunk_size,
-            chunk_overlap=overlap,
-            keep_separator=False,
-            strip_whitespace=True,
-        )
-        logger.info(
-            "已初始化 LangChain 文本切分器: chunk_size=%d overlap=%d",
-            chunk_size,
-            overlap,
-        )
-        return splitter
+        min_size = chunk_size // 2
+        units = self._split_units(text, chunk_size)
+        if not units:
+            return []
 
-    def _legacy_split(self, text: str) -> List[str]:
-        """内置切分策略，作为 LangChain 缺失时的后备方案。"""
-        chunk_size = settings.vector_chunk_size
-        overlap = min(settings.vector_chunk_overlap, chunk_size // 2)
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_length = 0
+        for unit in units:
+            if current and current_length + len(unit) > chunk_size:
+                groups.append(current)
+                current, current_length = [], 0
+            current.append(unit)
+            current_length += len(unit)
+            if current_length >= min_size and self._is_anchor(unit):
+                groups.append(current)
+                current, current_length = [], 0
+        if current:
+            groups.append(current)
 
         chunks: List[str] = []
-        start = 0
-        total_length = len(text)
-
-        while start < total_length:
-            end = min(total_length, start + chunk_size)
-            segment = text[start:end]
-
-            split_offset = self._find_split_offset(segment)
-            if split_offset is not None and start + split_offset < total_length:
-                end = start + split_offset
-                segment = text[start:end]
-
-            chunk_text = segment.strip()
-            if chunk_text:
-                chunks.append(chunk_text)
-
-            if end >= total_length:
-                break
-            start = max(0, end - overlap)
-
+        previous: List[str] = []
+        for group in groups:
+            prefix: List[str] = []
+            prefix_length = 0
+            for unit in reversed(previous):
+                if prefix_length + len(unit) > overlap:
+                    break
+                prefix.insert(0, unit)
+                prefix_length += len(unit)
+            chunks.append("\n".join(prefix + group))
+            previous = group
         logger.debug(
-            "使用内置策略完成章节切分: count=%d chunk_size=%d overlap=%d",
+            "章节切分完成: units=%d chunks=%d chunk_size=%d overlap=%d",
+            len(units),
             len(chunks),
             chunk_size,
             overlap,
         )
         return chunks
 
+    @staticmethod
+    def _split_units(text: str, chunk_size: int) -> List[str]:
+        """把正文拆成分块的最小单元：段落；超长段落再按句拆分，超长句子按长度硬切。"""
+        units: List[str] = []
+        for paragraph in text.splitlines():
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= chunk_size:
+                units.append(paragraph)
+                continue
+            for sentence in _SENTENCE_END.split(paragraph):
+                sentence = sentence.strip()
+                for start in range(0, len(sentence), chunk_size):
+                    units.append(sentence[start:start + chunk_size])
+        return units
+
+    @staticmethod
+    def _is_anchor(unit: str) -> bool:
+        return int(content_hash(unit)[:8], 16) % _ANCHOR_DIVISOR == 0
+
+    @staticmethod
+    def _new_chunk_id(project_id: str, chapter_number: int, digest: str, used_ids: Set[str]) -> str:
+        """新片段的 ID 由内容哈希派生，不随位置变化；同章内重复内容追加序号。"""
+        base = f"{project_id}:{chapter_number}:{digest[:16]}"
+        record_id = base
+        suffix = 1
+        while record_id in used_ids:
+            record_id = f"{base}:{suffix}"
+            suffix += 1
+        used_ids.add(record_id)
+        return record_id
+
 
 __all__ = ["ChapterIngestionService"]
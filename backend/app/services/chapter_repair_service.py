@@ -0,0 +1,160 @@
+# AIMETA P=章节局部修复_按违规位置只重写受影响段落|R=违规位置映射段落_附带上下文_局部重写_拼回原文|NR=不含违规检测|E=ChapterRepairService_RepairSpan_RepairResult|X=internal|A=服务类|D=llm_service|S=net|RD=./README.ai
+"""
+章节局部修复服务 (ChapterRepairService)
+
+护栏、生成后校验与一致性检查发现的问题通常集中在少数位置（一个禁止角色名、
+一句全知视角描写）。本服务把违规位置映射到段落，只让模型重写受影响的段落，
+并附带前后段落作为只读上下文，最后按段落拼回原文，其余正文逐字保留。
+
+无法定位、或受影响段落占比过高时返回 None，由调用方回退为整章重写。
+"""
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..core.config import settings
+from ..utils.json_utils import remove_think_tags, unwrap_markdown_json
+from ..utils.paragraphs import ParagraphText
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RepairSpan:
+    """待修复的位置：原文 ``[start, end)`` 区间及问题说明。"""
+    start: int
+    end: Optional[int]
+    issue: str
+
+
+@dataclass
+class RepairResult:
+    """局部修复结果"""
+    content: str
+    paragraphs: List[int] = field(default_factory=list)  # 请求修复的段落序号
+    repaired: List[int] = field(default_factory=list)  # 实际被替换的段落序号
+
+
+REPAIR_SYSTEM_PROMPT = """\
+你是一位严谨的小说修订编辑。下面给出章节中的部分段落（JSON），其中：
+- role 为 "fix" 的段落存在问题，issues 列出了具体问题，需要你改写；
+- role 为 "context" 的段落仅供理解上下文，不要改写，也不要输出。
+
+修订要求：
+1. 只改写 role 为 "fix" 的段落，逐条消除 issues 中的问题；
+2. 保持原有情节、人物关系与写作风格，改写后的段落要与前后文自然衔接；
+3. 改动尽量小，与问题无关的句子保持原样；
+4. 遵守 instructions 中的额外修正指令（如有），参考 reference 中的设定信息（如有）。
+
+仅返回 JSON：
+{"paragraphs": [{"index": 段落序号, "text": "改写后的完整段落"}]}
+"""
+
+
+class ChapterRepairService:
+    """按违规位置对章节做段落级局部重写。"""
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        *,
+        context_paragraphs: Optional[int] = None,
+        max_paragraph_ratio: Optional[float] = None,
+    ):
+        self.llm_service = llm_service
+        self.context_paragraphs = (
+            settings.repair_context_paragraphs if context_paragraphs is None else context_paragraphs
+        )
+        self.max_paragraph_ratio = (
+            settings.repair_max_paragraph_ratio if max_paragraph_ratio is None else max_paragraph_ratio
+        )
+
+    async def repair(
+        self,
+        text: str,
+        spans: Sequence[RepairSpan],
+        *,
+        user_id: Optional[int],
+        instructions: Optional[str] = None,
+        reference: Optional[str] = None,
+    ) -> Optional[RepairResult]:
+        """
+        只重写违规位置所在的段落。
+
+        Returns:
+            修复结果；无法局部修复（无法定位、受影响段落过多、模型未返回有效段落）时返回 None
+        """
+        document = ParagraphText(text)
+        if not spans or not len(document):
+            return None
+
+        issues: Dict[int, List[str]] = {}
+        for span in spans:
+            indices = document.indices_for_span(span.start, span.end)
+            if not indices:
+                return None
+            for idx in indices:
+                bucket = issues.setdefault(idx, [])
+                if span.issue not in bucket:
+                    bucket.append(span.issue)
+
+        targets = sorted(issues)
+        limit = max(1, int(len(document) * self.max_paragraph_ratio))
+        if len(targets) > limit:
+            logger.info("待修段落过多，回退整章重写: targets=%d limit=%d", len(targets), limit)
+            return None
+
+        payload: Dict[str, Any] = {"paragraphs": self._build_window(document, issues)}
+        if instructions:
+            payload["instructions"] = instructions
+        if reference:
+            payload["reference"] = reference
+
+        try:
+            response = await self.llm_service.get_llm_response(
+                system_prompt=REPAIR_SYSTEM_PROMPT,
+                conversation_history=[{"role": "user", "content": json.dumps(payload, ensure_ascii=False)}],
+                temperature=0.3,
+                user_id=user_id,
+                timeout=180.0,
+            )
+            parsed = json.loads(unwrap_markdown_json(remove_think_tags(response)))
+        except Exception as exc:
+            logger.warning("局部修复失败: %s", exc)
+            return None
+
+        repaired: List[int] = []
+        items = parsed.get("paragraphs") if isinstance(parsed, dict) else None
+        for item in items if isinstance(items, list) else []:
+            index = item.get("index") if isinstance(item, dict) else None
+            new_text = item.get("text") if isinstance(item, dict) else None
+            if index not in issues or index in repaired or not isinstance(new_text, str) or not new_text.strip():
+                continue
+            document.replace(index, new_text.strip())
+            repaired.append(index)
+
+        if not repaired:
+            return None
+        return RepairResult(content=document.render(), paragraphs=targets, repaired=sorted(repaired))
+
+    def _build_window(self, document: ParagraphText, issues: Dict[int, List[str]]) -> List[Dict[str, Any]]:
+        """待修段落及其前后各 ``context_paragraphs`` 段的只读上下文，按原文顺序排列。"""
+        window = set()
+        for idx in issues:
+            window.update(
+                range(max(0, idx - self.context_paragraphs), min(len(document), idx + self.context_paragraphs + 1))
+            )
+        paragraphs = []
+        for idx in sorted(window):
+            entry: Dict[str, Any] = {"index": idx, "role": "fix" if idx in issues else "context", "text": document[idx]}
+            if idx in issues:
+                entry["issues"] = issues[idx]
+            paragraphs.append(entry)
+        return paragraphs
+
+
+__all__ = ["ChapterRepairService", "RepairResult", "RepairSpan"]
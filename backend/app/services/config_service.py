@@ -3,13 +3,17 @@ from typing import Iterable, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..repositories.system_config_cache import system_config_cache
 from ..repositories.system_config_repository import SystemConfigRepository
 from ..models import SystemConfig
 from ..schemas.config import SystemConfigCreate, SystemConfigRead, SystemConfigUpdate
 
 
 class ConfigService:
-    """系统配置服务：提供 CRUD 接口，并负责转换 Pydantic 模型。"""
+    """系统配置服务：提供 CRUD 接口，并负责转换 Pydantic 模型。
+
+    写入操作在同一事务内递增配置版本号，提交后清除本进程缓存，其他进程据版本号感知修改。
+    """
 
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -30,7 +34,7 @@ class ConfigService:
         else:
             instance = SystemConfig(**payload.model_dump())
             await self.repo.add(instance)
-        await self.session.commit()
+        await self._commit_change(payload.key)
         return SystemConfigRead.model_validate(instance)
 
     async def patch_config(self, key: str, payload: SystemConfigUpdate) -> Optional[SystemConfigRead]:
@@ -38,7 +42,7 @@ class ConfigService:
         if not instance:
             return None
         await self.repo.update_fields(instance, **payload.model_dump(exclude_unset=True))
-        await self.session.commit()
+        await self._commit_change(key)
         return SystemConfigRead.model_validate(instance)
 
     async def remove_config(self, key: str) -> bool:
@@ -46,5 +50,10 @@ class ConfigService:
         if not instance:
             return False
         await self.repo.delete(instance)
-        await self.session.commit()
+        await self._commit_change(key)
         return True
+
+    async def _commit_change(self, key: str) -> None:
+        revision = await self.repo.bump_revision()
+        await self.session.commit()
+        system_config_cache.invalidate(key, revision=revision)
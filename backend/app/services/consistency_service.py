@@ -1,4 +1,4 @@
-# AIMETA P=一致性检查服务_剧情逻辑矛盾检测|R=一致性检查_冲突检测_修复建议|NR=不含生成逻辑|E=ConsistencyService|X=internal|A=一致性检查_自动修复|D=llm_service|S=none|RD=./README.ai
+# AIMETA P=一致性检查服务_剧情逻辑矛盾检测|R=一致性检查_冲突检测_修复建议_局部修复|NR=不含生成逻辑|E=ConsistencyService|X=internal|A=一致性检查_自动修复|D=llm_service|S=none|RD=./README.ai
 """
 一致性检查服务 (ConsistencyService)
 
@@ -14,6 +14,7 @@
 - minor: 轻微问题，仅标注提示
 """
 import logging
+import re
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
@@ -23,6 +24,7 @@ from sqlalchemy.orm import Session
 from ..models.project_memory import ProjectMemory
 from ..models.novel import NovelBlueprint, Chapter
 from ..models.foreshadowing import Foreshadowing
+from .chapter_repair_service import ChapterRepairService, RepairSpan
 from .llm_service import LLMService
 
 logger = logging.getLogger(__name__)
@@ -252,6 +254,24 @@ class ConsistencyService:
             for v in violations
         ])
         
+        # 冲突都能在原文中定位时，只重写相关段落
+        spans = self._locate_violations(chapter_text, violations)
+        if spans:
+            reference = "\n".join(
+                f"{label}：{context[key]}"
+                for label, key in (("小说设定", "novel_setting"), ("角色状态", "character_state"), ("前文摘要", "global_summary"))
+                if context.get(key)
+            )
+            repair = await ChapterRepairService(self.llm_service).repair(
+                chapter_text,
+                spans,
+                user_id=user_id,
+                reference=reference or None,
+            )
+            if repair:
+                logger.info("一致性问题已局部修复: 段落 %s", repair.repaired)
+                return repair.content
+        
         prompt = GENERATE_FIX_PROMPT.format(
             chapter_text=chapter_text,
             violations=violations_text,
@@ -272,6 +292,32 @@ class ConsistencyService:
             logger.error(f"自动修复失败: {e}")
             return None
     
+    @staticmethod
+    def _locate_violations(
+        chapter_text: str,
+        violations: List[ConsistencyViolation],
+    ) -> Optional[List[RepairSpan]]:
+        """按 location 引用的原文定位冲突；任一冲突无法定位时返回 None。"""
+        spans = []
+        for v in violations:
+            quote = (v.location or "").strip().strip("\"'“”‘’「」『』")
+            # 引用常带省略号，取能在原文中找到的最长片段
+            pieces = sorted(re.split(r"…+|\.{3,}", quote), key=len, reverse=True)
+            start = -1
+            for piece in pieces:
+                piece = piece.strip()
+                if len(piece) >= 4:
+                    start = chapter_text.find(piece)
+                    if start >= 0:
+                        break
+            if start < 0:
+                return None
+            issue = f"[{v.severity.value}] {v.category}: {v.description}"
+            if v.suggested_fix:
+                issue += f"（建议：{v.suggested_fix}）"
+            spans.append(RepairSpan(start, start + len(piece), issue))
+        return spans
+
     async def check_and_fix(
         self,
         project_id: str,
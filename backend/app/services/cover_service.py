@@ -16,6 +16,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..models import NovelProject
 from ..repositories.novel_repository import NovelRepository
 from ..repositories.system_config_repository import SystemConfigRepository
+from ..utils.client_registry import client_registry
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,7 @@ class CoverService:
             封面文件的相对URL路径
         """
         # 获取项目信息
-        project = await self.repo.get_by_id(project_id)
+        project = await self.repo.get_basic(project_id, with_blueprint=True)
         if not project:
             raise HTTPException(status_code=404, detail="项目不存在")
         if project.user_id != user_id:
@@ -81,7 +82,7 @@ class CoverService:
         """
         更新项目封面URL（管理员接口）。
         """
-        project = await self.repo.get_by_id(project_id)
+        project = await self.repo.get_basic(project_id)
         if not project:
             raise HTTPException(status_code=404, detail="项目不存在")
         
@@ -105,7 +106,7 @@ class CoverService:
         cover_path = await self._save_cover_image(project_id, image_data)
         
         # 更新项目的封面 URL
-        project = await self.repo.get_by_id(project_id)
+        project = await self.repo.get_basic(project_id)
         if project:
             project.cover_url = cover_path
             await self.session.commit()
@@ -190,16 +191,17 @@ class CoverService:
         
         logger.info("调用 Gemini 图像生成 API: url=%s, model=%s", url, model)
         
-        async with httpx.AsyncClient(timeout=180.0) as client:
-            try:
+        client = client_registry.get_http(timeout=180.0)
+        try:
+            async with client_registry.in_use(client):
                 response = await client.post(url, json=request_body, headers=headers)
-                response.raise_for_status()
-            except httpx.HTTPStatusError as e:
-                logger.error("Gemini API 请求失败: status=%s, response=%s", e.response.status_code, e.response.text)
-                raise HTTPException(status_code=503, detail=f"图像生成服务请求失败: {e.response.status_code}")
-            except httpx.RequestError as e:
-                logger.error("Gemini API 连接失败: %s", str(e))
-                raise HTTPException(status_code=503, detail="无法连接到图像生成服务")
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.error("Gemini API 请求失败: status=%s, response=%s", e.response.status_code, e.response.text)
+            raise HTTPException(status_code=503, detail=f"图像生成服务请求失败: {e.response.status_code}")
+        except httpx.RequestError as e:
+            logger.error("Gemini API 连接失败: %s", str(e))
+            raise HTTPException(status_code=503, detail="无法连接到图像生成服务")
         
         # 解析响应
         result = response.json()
@@ -241,9 +243,9 @@ class CoverService:
 
     async def _get_config_value(self, key: str) -> Optional[str]:
         """获取系统配置值。"""
-        record = await self.system_config_repo.get_by_key(key)
-        if record:
-            return record.value
+        value = await self.system_config_repo.get_value(key)
+        if value is not None:
+            return value
         # 兼容环境变量
         env_key = key.upper().replace(".", "_")
         return os.getenv(env_key)
@@ -0,0 +1,244 @@
+# AIMETA P=嵌入向量缓存_跨重启复用|R=按内容寻址缓存向量_float32存储_LRU容量淘汰_命中统计|NR=不含嵌入调用|E=EmbeddingCache_embedding_cache|X=internal|A=缓存类|D=sqlite3|S=fs|RD=./README.ai
+from __future__ import annotations
+
+"""
+持久化的嵌入向量缓存。
+
+以 (提供方, 模型, 维度, sha256(文本)) 为键，把向量以 float32 BLOB 存入本地 SQLite 文件，
+进程重启后依然有效，多个 worker 进程共享同一文件（WAL 模式）。总字节数超过上限时按
+最近使用时间淘汰。重新入库未改动的章节、重复的检索查询都不再重复调用嵌入接口。
+
+SQLite 调用均为同步 IO，统一放到线程池执行，避免阻塞事件循环。
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (provider, model, dim, text_hash)
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used)"
+# SQLite 单条语句的参数个数有上限，按批查询
+_LOOKUP_BATCH = 500
+# 超出容量时一次淘汰到上限的该比例，避免每次写入都触发淘汰
+_EVICT_TARGET_RATIO = 0.9
+# 总字节数在进程内累计维护，每隔该写入次数重新统计一次，校正其他 worker 进程写入与淘汰带来的偏差
+_RESYNC_WRITES = 1000
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """按内容寻址的嵌入向量缓存，SQLite 文件持久化，LRU 容量淘汰。"""
+
+    def __init__(self, *, path: Optional[str], max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # 缓存表中向量的总字节数：打开时统计一次，此后随写入与淘汰增减，避免每次写入都全表求和
+        self._total_bytes = 0
+        self._writes_since_sync = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.max_bytes > 0
+
+    async def get_many(
+        self, provider: str, model: str, dim: int, texts: Sequence[str]
+    ) -> List[Optional[List[float]]]:
+        """按输入顺序返回缓存的向量，未命中的位置为 None；命中的条目刷新最近使用时间。"""
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+        hashes = [text_hash(text) for text in texts]
+        try:
+            found = await asyncio.to_thread(self._lookup, provider, model, dim, hashes)
+        except sqlite3.Error as exc:
+            logger.warning("读取嵌入缓存失败，按未命中处理: %s", exc)
+            found = {}
+        results: List[Optional[List[float]]] = []
+        for digest in hashes:
+            blob = found.get(digest)
+            results.append(_from_f32_blob(blob) if blob else None)
+        hit_count = sum(1 for item in results if item is not None)
+        self.hits += hit_count
+        self.misses += len(results) - hit_count
+        return results
+
+    async def put_many(
+        self, provider: str, model: str, dim: int, items: Sequence[Tuple[str, Sequence[float]]]
+    ) -> None:
+        """写入 (文本, 向量) 列表，空向量忽略；写入后超过容量则按 LRU 淘汰。"""
+        rows = [(text_hash(text), _to_f32_blob(vector)) for text, vector in items if vector]
+        if not self.enabled or not rows:
+            return
+        try:
+            await asyncio.to_thread(self._store, provider, model, dim, rows)
+        except sqlite3.Error as exc:
+            logger.warning("写入嵌入缓存失败: %s", exc)
+
+    def stats(self) -> Dict[str, int]:
+        entries, total = 0, 0
+        if self.enabled:
+            try:
+                with self._lock:
+                    entries, total = self._connection().execute(
+                        "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache"
+                    ).fetchone()
+            except sqlite3.Error as exc:
+                logger.warning("读取嵌入缓存统计失败: %s", exc)
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            resolved = Path(self.path).expanduser()  # type: ignore[arg-type]
+            if not resolved.is_absolute():
+                # 相对路径以 backend 目录为基准，与 SQLite 主库的路径解析一致
+                resolved = Path(__file__).resolve().parents[2] / resolved
+            resolved.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(resolved), check_same_thread=False, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(_INDEX)
+            conn.commit()
+            self._conn = conn
+            self._sync_total(conn)
+        return self._conn
+
+    def _sync_total(self, conn: sqlite3.Connection) -> None:
+        (self._total_bytes,) = conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache").fetchone()
+        self._writes_since_sync = 0
+
+    def _lookup(self, provider: str, model: str, dim: int, hashes: List[str]) -> Dict[str, bytes]:
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embedding_cache "
+                    f"WHERE provider = ? AND model = ? AND dim = ? AND text_hash IN ({placeholders})",
+                    (provider, model, dim, *batch),
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? "
+                    "WHERE provider = ? AND model = ? AND dim = ? AND text_hash = ?",
+                    [(now, provider, model, dim, digest) for digest in found],
+                )
+                conn.commit()
+        return found
+
+    def _store(self, provider: str, model: str, dim: int, rows: List[Tuple[str, bytes]]) -> None:
+        now = time.time()
+        latest = dict(rows)
+        with self._lock:
+            conn = self._connection()
+            # 被覆盖的旧条目按主键查出大小，用于增量维护总字节数
+            replaced = 0
+            digests = list(latest)
+            for start in range(0, len(digests), _LOOKUP_BATCH):
+                batch = digests[start:start + _LOOKUP_BATCH]
+                (size,) = conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embedding_cache "
+                    f"WHERE provider = ? AND model = ? AND dim = ? AND text_hash IN ({','.join('?' * len(batch))})",
+                    (provider, model, dim, *batch),
+                ).fetchone()
+                replaced += size
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (provider, model, dim, text_hash, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(provider, model, dim, digest, blob, now) for digest, blob in latest.items()],
+            )
+            conn.commit()
+            self._total_bytes += sum(len(blob) for blob in latest.values()) - replaced
+            self._writes_since_sync += 1
+            if self._writes_since_sync >= _RESYNC_WRITES:
+                self._sync_total(conn)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        # 超出容量时才全表统计一次，校正累计值后再决定淘汰多少
+        self._sync_total(conn)
+        total = self._total_bytes
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        removed = 0
+        cursor = conn.execute("SELECT rowid, LENGTH(vector) FROM embedding_cache ORDER BY last_used ASC")
+        doomed: List[int] = []
+        for rowid, size in cursor:
+            if total <= target:
+                break
+            doomed.append(rowid)
+            total -= size
+        for start in range(0, len(doomed), _LOOKUP_BATCH):
+            batch = doomed[start:start + _LOOKUP_BATCH]
+            conn.execute(f"DELETE FROM embedding_cache WHERE rowid IN ({','.join('?' * len(batch))})", batch)
+            removed += len(batch)
+        conn.commit()
+        self._total_bytes = total
+        self.evictions += removed
+        logger.info("嵌入缓存超出容量，已淘汰 %d 条", removed)
+
+
+def _to_f32_blob(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _from_f32_blob(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+embedding_cache = EmbeddingCache(
+    path=settings.embedding_cache_path,
+    max_bytes=settings.embedding_cache_max_mb * 1024 * 1024,
+)
+
+
+__all__ = ["EmbeddingCache", "embedding_cache", "text_hash"]
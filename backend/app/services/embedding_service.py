@@ -7,13 +7,13 @@
 2. 本地嵌入模型（可选）
 3. 批量嵌入生成
 
-用于支持向量检索功能。
+用于支持向量检索功能。向量缓存与 LLMService 共用持久化的 embedding_cache。
 """
 import logging
 from typing import List, Optional, Sequence
-import hashlib
 
 from ..core.config import settings
+from .embedding_cache import embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +28,15 @@ class EmbeddingService:
     def __init__(self):
         self._client = None
         self._model = settings.embedding_model if hasattr(settings, 'embedding_model') else "text-embedding-3-small"
-        self._cache = {}  # 简单的内存缓存
         self._init_client()
     
     def _init_client(self):
         """初始化 OpenAI 客户端"""
         try:
-            from openai import AsyncOpenAI
+            from ..utils.client_registry import client_registry
             api_key = settings.openai_api_key if hasattr(settings, 'openai_api_key') else None
             if api_key:
-                self._client = AsyncOpenAI(api_key=api_key)
+                self._client = client_registry.get_openai(api_key=api_key)
                 logger.info("嵌入服务初始化成功")
             else:
                 logger.warning("未配置 OpenAI API Key，嵌入服务不可用")
@@ -66,9 +65,9 @@ class EmbeddingService:
         
         # 检查缓存
         if use_cache:
-            cache_key = self._get_cache_key(text)
-            if cache_key in self._cache:
-                return self._cache[cache_key]
+            (cached,) = await embedding_cache.get_many("openai", self._model, 0, [text])
+            if cached is not None:
+                return cached
         
         try:
             response = await self._client.embeddings.create(
@@ -79,7 +78,7 @@ class EmbeddingService:
             
             # 存入缓存
             if use_cache:
-                self._cache[cache_key] = embedding
+                await embedding_cache.put_many("openai", self._model, 0, [(text, embedding)])
             
             return embedding
         
@@ -105,17 +104,18 @@ class EmbeddingService:
         if not texts or not self._client:
             return [None] * len(texts)
         
-        results = []
+        results: List[Optional[List[float]]] = []
         uncached_indices = []
         uncached_texts = []
         
         # 检查缓存
+        cached_items = (
+            await embedding_cache.get_many("openai", self._model, 0, texts) if use_cache else [None] * len(texts)
+        )
         for i, text in enumerate(texts):
-            if use_cache:
-                cache_key = self._get_cache_key(text)
-                if cache_key in self._cache:
-                    results.append(self._cache[cache_key])
-                    continue
+            if cached_items[i] is not None:
+                results.append(cached_items[i])
+                continue
             
             results.append(None)
             uncached_indices.append(i)
@@ -129,29 +129,22 @@ class EmbeddingService:
                     input=uncached_texts
                 )
                 
+                fetched = []
                 for j, embedding_data in enumerate(response.data):
                     idx = uncached_indices[j]
                     embedding = embedding_data.embedding
                     results[idx] = embedding
-                    
-                    # 存入缓存
-                    if use_cache:
-                        cache_key = self._get_cache_key(texts[idx])
-                        self._cache[cache_key] = embedding
+                    fetched.append((texts[idx], embedding))
+                
+                # 存入缓存
+                if use_cache:
+                    await embedding_cache.put_many("openai", self._model, 0, fetched)
             
             except Exception as e:
                 logger.error(f"批量生成嵌入向量失败: {e}")
         
         return results
     
-    def _get_cache_key(self, text: str) -> str:
-        """生成缓存键"""
-        return hashlib.md5(text.encode()).hexdigest()
-    
-    def clear_cache(self):
-        """清空缓存"""
-        self._cache.clear()
-    
     @property
     def is_available(self) -> bool:
         """检查服务是否可用"""
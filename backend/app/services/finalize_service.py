@@ -1,4 +1,4 @@
-# AIMETA P=定稿服务_章节定稿和记忆更新|R=定稿流程_摘要更新_状态更新_向量库写入|NR=不含生成逻辑|E=FinalizeService|X=internal|A=定稿_记忆更新|D=llm_service_vector_store_service|S=none|RD=./README.ai
+# AIMETA P=定稿服务_章节定稿和记忆更新|R=定稿流程_摘要更新_状态更新_向量库写入_步骤依赖图并发|NR=不含生成逻辑|E=FinalizeService|X=internal|A=定稿_记忆更新|D=llm_service_vector_store_service|S=none|RD=./README.ai
 """
 定稿服务 (FinalizeService)
 
@@ -10,11 +10,17 @@
 5. 创建章节快照 (chapter_snapshot)
 
 这是"生成后闭环"的核心服务，确保长程一致性。
+
+上述步骤按依赖图并发执行：摘要、角色状态、剧情线、向量入库与章节摘要互不依赖，
+可同时调用 LLM；快照步骤等待其输入全部就绪后再写入。
 """
 import logging
-from typing import Optional, Dict, Any, List
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from datetime import datetime
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models.project_memory import ProjectMemory, ChapterSnapshot
@@ -24,6 +30,8 @@ from ..models.chapter_blueprint import ChapterBlueprint
 from .llm_service import LLMService
 from .vector_store_service import VectorStoreService
 from .chapter_ingest_service import ChapterIngestionService
+from ..core.config import settings
+from ..utils.concurrency import DagStep, run_dag
 from ..utils.text_utils import compute_content_hash
 
 logger = logging.getLogger(__name__)
@@ -143,17 +151,38 @@ class FinalizeService:
     定稿服务
     
     负责章节定稿后的一系列处理，包括更新记忆、状态和向量库。
+
+    传入 ``session_factory`` 时，每个并发的 LLM 步骤使用独立会话构造自己的
+    LLMService（LLMService 会读写配置与配额，不能在同一会话上并发）；未传入时
+    只能共享 ``llm_service``，步骤退化为逐个执行。
     """
     
     def __init__(
         self,
         db: Session,
         llm_service: LLMService,
-        vector_store_service: Optional[VectorStoreService] = None
+        vector_store_service: Optional[VectorStoreService] = None,
+        *,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        max_parallel_steps: Optional[int] = None,
     ):
         self.db = db
         self.llm_service = llm_service
         self.vector_store_service = vector_store_service
+        self.session_factory = session_factory
+        if session_factory is None:
+            self.max_parallel_steps = 1
+        else:
+            self.max_parallel_steps = max_parallel_steps or settings.finalize_max_parallel_steps
+
+    @asynccontextmanager
+    async def _step_llm(self) -> AsyncIterator[LLMService]:
+        """为单个定稿步骤提供 LLMService：有会话工厂时使用独立会话。"""
+        if self.session_factory is None:
+            yield self.llm_service
+            return
+        async with self.session_factory() as step_session:
+            yield type(self.llm_service)(step_session)
     
     async def finalize_chapter(
         self,
@@ -185,82 +214,126 @@ class FinalizeService:
             "chapter_number": chapter_number,
             "updates": {}
         }
-        
-        try:
-            # 1. 获取或创建项目记忆
-            project_memory = await self._get_or_create_project_memory(project_id)
-            
-            # 2. 更新全局摘要
-            new_summary = await self._update_global_summary(
-                chapter_text=chapter_text,
-                old_summary=project_memory.global_summary or "",
-                user_id=user_id
-            )
+        updates = result["updates"]
+        update_vector = not skip_vector_update and self.vector_store_service is not None
+
+        # 数据库步骤为同步调用，执行期间不会让出事件循环，可与 LLM 步骤安全交错
+        async def load_memory(_: Dict[str, Any]) -> ProjectMemory:
+            return await self._get_or_create_project_memory(project_id)
+
+        async def load_character_state(_: Dict[str, Any]) -> str:
+            return await self._get_character_state_text(project_id)
+
+        async def update_global_summary(done: Dict[str, Any]) -> Optional[str]:
+            memory = done["memory"]
+            async with self._step_llm() as llm:
+                new_summary = await self._update_global_summary(
+                    chapter_text=chapter_text,
+                    old_summary=memory.global_summary or "",
+                    user_id=user_id,
+                    llm_service=llm,
+                )
             if new_summary:
-                project_memory.global_summary = new_summary
-                result["updates"]["global_summary"] = "updated"
-            
-            # 3. 更新角色状态
-            old_state = await self._get_character_state_text(project_id)
-            new_state = await self._update_character_state(
-                chapter_text=chapter_text,
-                old_state=old_state,
-                user_id=user_id
-            )
+                memory.global_summary = new_summary
+                updates["global_summary"] = "updated"
+            return new_summary
+
+        async def update_character_state(done: Dict[str, Any]) -> Optional[str]:
+            async with self._step_llm() as llm:
+                new_state = await self._update_character_state(
+                    chapter_text=chapter_text,
+                    old_state=done["character_state_input"],
+                    user_id=user_id,
+                    llm_service=llm,
+                )
             if new_state:
                 await self._save_character_state(project_id, chapter_number, new_state)
-                result["updates"]["character_state"] = "updated"
-            
-            # 4. 更新剧情线追踪
-            new_plot_arcs = await self._update_plot_arcs(
-                chapter_text=chapter_text,
-                chapter_number=chapter_number,
-                old_plot_arcs=project_memory.plot_arcs or {},
-                user_id=user_id
-            )
+                updates["character_state"] = "updated"
+            return new_state
+
+        async def update_plot_arcs(done: Dict[str, Any]) -> Optional[Dict]:
+            memory = done["memory"]
+            async with self._step_llm() as llm:
+                new_plot_arcs = await self._update_plot_arcs(
+                    chapter_text=chapter_text,
+                    chapter_number=chapter_number,
+                    old_plot_arcs=memory.plot_arcs or {},
+                    user_id=user_id,
+                    llm_service=llm,
+                )
             if new_plot_arcs:
-                project_memory.plot_arcs = new_plot_arcs
-                result["updates"]["plot_arcs"] = "updated"
-            
-            # 5. 更新向量库（失败时返回状态供补偿）
-            if not skip_vector_update and self.vector_store_service:
+                memory.plot_arcs = new_plot_arcs
+                updates["plot_arcs"] = "updated"
+            return new_plot_arcs
+
+        async def update_vector_store(_: Dict[str, Any]) -> Dict[str, Any]:
+            # 失败时返回状态供补偿，不影响其余步骤
+            async with self._step_llm() as llm:
                 vector_status = await self._update_vector_store(
                     project_id=project_id,
                     chapter_number=chapter_number,
                     chapter_text=chapter_text,
                     user_id=user_id,
+                    llm_service=llm,
+                )
+            updates["vector_store"] = vector_status
+            if vector_status.get("status") in ("failed", "partial"):
+                result["needs_vector_retry"] = True
+            return vector_status
+
+        async def generate_chapter_summary(_: Dict[str, Any]) -> Optional[str]:
+            async with self._step_llm() as llm:
+                return await self._generate_chapter_summary(
+                    chapter_text=chapter_text,
+                    chapter_number=chapter_number,
+                    user_id=user_id,
+                    llm_service=llm,
                 )
-                result["updates"]["vector_store"] = vector_status
-                if vector_status.get("status") != "updated":
-                    result["needs_vector_retry"] = True
 
-            # 6. 创建章节快照
-            chapter_summary = await self._generate_chapter_summary(
-                chapter_text=chapter_text,
-                chapter_number=chapter_number,
-                user_id=user_id
-            )
-            content_hash = compute_content_hash(chapter_text)
+        async def create_snapshot(done: Dict[str, Any]) -> None:
+            memory = done["memory"]
             await self._create_chapter_snapshot(
                 project_id=project_id,
                 chapter_number=chapter_number,
                 version_id=chapter_version_id,
-                content_hash=content_hash,
-                global_summary=new_summary or project_memory.global_summary,
-                character_states=new_state,
-                plot_arcs=new_plot_arcs or project_memory.plot_arcs,
-                chapter_summary=chapter_summary,
+                content_hash=compute_content_hash(chapter_text),
+                global_summary=done["global_summary"] or memory.global_summary,
+                character_states=done["character_state"],
+                plot_arcs=done["plot_arcs"] or memory.plot_arcs,
+                chapter_summary=done["chapter_summary"],
                 word_count=len(chapter_text)
             )
-            result["updates"]["snapshot"] = "created"
-            
-            # 7. 更新项目记忆的最后更新章节
+            updates["snapshot"] = "created"
+
+        async def update_blueprint_status(_: Dict[str, Any]) -> None:
+            await self._update_blueprint_status(project_id, chapter_number)
+
+        steps: Dict[str, DagStep] = {
+            "memory": ((), load_memory),
+            "character_state_input": ((), load_character_state),
+            "global_summary": (("memory",), update_global_summary),
+            "character_state": (("character_state_input",), update_character_state),
+            "plot_arcs": (("memory",), update_plot_arcs),
+            "chapter_summary": ((), generate_chapter_summary),
+            "snapshot": (("memory", "global_summary", "character_state", "plot_arcs", "chapter_summary"), create_snapshot),
+            "blueprint_status": ((), update_blueprint_status),
+        }
+        if update_vector:
+            steps["vector_store"] = ((), update_vector_store)
+
+        started = time.perf_counter()
+        try:
+            done, reports = await run_dag(steps, max_parallel=self.max_parallel_steps)
+            result["steps"] = reports
+            failed = [name for name, report in reports.items() if report["status"] == "failed"]
+            if failed:
+                raise RuntimeError("; ".join(f"{name}: {reports[name]['error']}" for name in failed))
+
+            # 更新项目记忆的最后更新章节
+            project_memory = done["memory"]
             project_memory.last_updated_chapter = chapter_number
             project_memory.version += 1
             
-            # 8. 更新章节蓝图状态
-            await self._update_blueprint_status(project_id, chapter_number)
-            
             self.db.commit()
             logger.info(f"定稿处理完成: project={project_id}, chapter={chapter_number}")
             
@@ -269,6 +342,7 @@ class FinalizeService:
             self.db.rollback()
             result["success"] = False
             result["error"] = str(e)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
         
         return result
     
@@ -297,7 +371,8 @@ class FinalizeService:
         self,
         chapter_text: str,
         old_summary: str,
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Optional[str]:
         """更新全局摘要"""
         prompt = UPDATE_GLOBAL_SUMMARY_PROMPT.format(
@@ -306,7 +381,7 @@ class FinalizeService:
         )
         
         try:
-            response = await self.llm_service.generate(
+            response = await (llm_service or self.llm_service).generate(
                 prompt=prompt,
                 user_id=user_id,
                 max_tokens=3000,
@@ -356,7 +431,8 @@ class FinalizeService:
         self,
         chapter_text: str,
         old_state: str,
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Optional[str]:
         """更新角色状态"""
         prompt = UPDATE_CHARACTER_STATE_PROMPT.format(
@@ -365,7 +441,7 @@ class FinalizeService:
         )
         
         try:
-            response = await self.llm_service.generate(
+            response = await (llm_service or self.llm_service).generate(
                 prompt=prompt,
                 user_id=user_id,
                 max_tokens=4000,
@@ -400,7 +476,8 @@ class FinalizeService:
         chapter_text: str,
         chapter_number: int,
         old_plot_arcs: Dict,
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Optional[Dict]:
         """更新剧情线追踪"""
         import json
@@ -412,7 +489,7 @@ class FinalizeService:
         )
         
         try:
-            response = await self.llm_service.generate(
+            response = await (llm_service or self.llm_service).generate(
                 prompt=prompt,
                 user_id=user_id,
                 max_tokens=2000,
@@ -439,17 +516,19 @@ class FinalizeService:
         chapter_number: int,
         chapter_text: str,
         user_id: int,
-    ) -> Dict[str, str]:
+        llm_service: Optional[LLMService] = None,
+    ) -> Dict[str, Any]:
         """更新向量库，返回状态字典而非静默失败。"""
         if not self.vector_store_service:
             return {"status": "skipped", "reason": "vector_store_disabled"}
 
         try:
             ingest_service = ChapterIngestionService(
-                llm_service=self.llm_service,
+                llm_service=llm_service or self.llm_service,
                 vector_store=self.vector_store_service,
             )
-            await ingest_service.ingest_chapter(
+            # 部分片段嵌入失败时返回 partial，由上层标记 needs_vector_retry
+            return await ingest_service.ingest_chapter(
                 project_id=project_id,
                 chapter_number=chapter_number,
                 title=f"第{chapter_number}章",
@@ -457,7 +536,6 @@ class FinalizeService:
                 summary=None,
                 user_id=user_id,
             )
-            return {"status": "updated"}
         except Exception as exc:
             logger.error("更新向量库失败: %s", exc)
             return {"status": "failed", "error": str(exc)}
@@ -466,7 +544,8 @@ class FinalizeService:
         self,
         chapter_text: str,
         chapter_number: int,
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Optional[str]:
         """生成章节摘要"""
         prompt = GENERATE_CHAPTER_SUMMARY_PROMPT.format(
@@ -475,7 +554,7 @@ class FinalizeService:
         )
         
         try:
-            response = await self.llm_service.generate(
+            response = await (llm_service or self.llm_service).generate(
                 prompt=prompt,
                 user_id=user_id,
                 max_tokens=500,
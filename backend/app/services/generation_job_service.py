@@ -0,0 +1,534 @@
+# AIMETA P=章节生成任务_持久化后台生成|R=任务提交_重复提交去重_认领执行_阶段检查点_进度记录_取消_崩溃恢复|NR=不含生成流程实现|E=GenerationJobService_GenerationJobWorker_generation_job_worker|X=internal|A=服务类_后台任务|D=sqlalchemy,pipeline_orchestrator,generation_single_flight|S=db,net|RD=./README.ai
+"""
+章节生成任务（基于数据库的持久化工作队列）。
+
+生成请求写入 ``chapter_generation_jobs`` 后立即返回任务 ID，由各进程内的
+``GenerationJobWorker`` 认领执行，客户端断开或代理超时不会丢弃已完成的 LLM 工作：
+
+- 流水线每完成一个阶段（上下文、各候选版本、评审）就把结果写入任务的检查点，
+  进程重启后任务回到队列，重新认领时跳过已完成的阶段；
+- 阶段进度事件（不含 token 增量）写入任务行，供轮询与 SSE 接口读取；
+- 执行期间定期刷新 ``updated_at`` 作为心跳，并检查取消标记；心跳停止超过
+  ``generation_job_stale_seconds`` 的任务视为所在进程已崩溃，重新放回队列。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.generation_job import ChapterGenerationJob
+from ..models.novel import Chapter, ChapterVersion
+from ..schemas.novel import ChapterGenerationStatus
+from .generation_single_flight import check_shareable, generation_single_flight, request_fingerprint
+from .pipeline_orchestrator import PipelineOrchestrator, StageCheckpoints
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+# 任务行中保留的进度事件条数上限
+_PROGRESS_LIMIT = 200
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _jsonable(data: Any) -> Any:
+    return json.loads(json.dumps(data, ensure_ascii=False, default=str))
+
+
+def _job_fingerprint(job: ChapterGenerationJob) -> str:
+    return request_fingerprint(job.user_id, job.request.get("writing_notes"), job.request.get("flow_config"))
+
+
+class GenerationJobService:
+    """生成任务的提交、查询、取消、认领与崩溃恢复。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def submit(
+        self,
+        *,
+        project_id: str,
+        chapter_number: int,
+        user_id: int,
+        writing_notes: Optional[str] = None,
+        flow_config: Optional[Dict[str, Any]] = None,
+        idempotency_key: Optional[str] = None,
+        notify: bool = True,
+    ) -> ChapterGenerationJob:
+        """提交生成任务；同一用户的重复提交（幂等键或请求内容相同）返回已有任务，同章节内容不同的返回 409。"""
+        existing = await self._find_duplicate(
+            project_id,
+            chapter_number,
+            user_id=user_id,
+            fingerprint=request_fingerprint(user_id, writing_notes, flow_config),
+            idempotency_key=idempotency_key,
+        )
+        if existing is not None:
+            return existing
+        job = ChapterGenerationJob(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            chapter_number=chapter_number,
+            user_id=user_id,
+            status="queued",
+            request={"writing_notes": writing_notes, "flow_config": flow_config or {}},
+            checkpoints={},
+            progress=[],
+            attempts=0,
+            cancel_requested=False,
+            idempotency_key=idempotency_key,
+        )
+        self.session.add(job)
+        await self.session.commit()
+        if notify:
+            generation_job_worker.notify()
+        return job
+
+    async def _find_duplicate(
+        self,
+        project_id: str,
+        chapter_number: int,
+        *,
+        user_id: int,
+        fingerprint: str,
+        idempotency_key: Optional[str],
+    ) -> Optional[ChapterGenerationJob]:
+        if idempotency_key:
+            result = await self.session.execute(
+                select(ChapterGenerationJob)
+                .where(ChapterGenerationJob.user_id == user_id, ChapterGenerationJob.idempotency_key == idempotency_key)
+                .order_by(ChapterGenerationJob.created_at.desc())
+                .limit(1)
+            )
+            job = result.scalars().first()
+            if job is not None:
+                check_shareable(
+                    fingerprint,
+                    idempotency_key,
+                    running_fingerprint=_job_fingerprint(job),
+                    running_key=job.idempotency_key,
+                )
+                return job
+        result = await self.session.execute(
+            select(ChapterGenerationJob).where(
+                ChapterGenerationJob.project_id == project_id,
+                ChapterGenerationJob.chapter_number == chapter_number,
+                ChapterGenerationJob.status.in_(("queued", "running")),
+            )
+        )
+        job = result.scalars().first()
+        if job is not None:
+            check_shareable(
+                fingerprint,
+                idempotency_key,
+                running_fingerprint=_job_fingerprint(job),
+                running_key=job.idempotency_key,
+            )
+        return job
+
+    async def get_for_user(self, job_id: str, user_id: int) -> ChapterGenerationJob:
+        job = await self.session.get(ChapterGenerationJob, job_id, populate_existing=True)
+        if job is None or job.user_id != user_id:
+            raise HTTPException(status_code=404, detail="生成任务不存在")
+        return job
+
+    async def request_cancel(self, job_id: str, user_id: int) -> ChapterGenerationJob:
+        """排队中的任务直接取消；执行中的任务打上取消标记，由执行进程在下一次心跳时中止。"""
+        job = await self.get_for_user(job_id, user_id)
+        if job.status in TERMINAL_STATUSES:
+            return job
+        outcome = await self.session.execute(
+            update(ChapterGenerationJob)
+            .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "queued")
+            .values(status="cancelled", cancel_requested=True, finished_at=_utcnow(), updated_at=_utcnow())
+        )
+        if outcome.rowcount:
+            # 崩溃后重新排队的任务可能已把章节标记为生成中
+            await self.restore_chapter_status(job.project_id, job.chapter_number, failed=False)
+        else:
+            await self.session.execute(
+                update(ChapterGenerationJob)
+                .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "running")
+                .values(cancel_requested=True)
+            )
+        await self.session.commit()
+        return await self.get_for_user(job_id, user_id)
+
+    async def claim(self, limit: int) -> List[str]:
+        """认领至多 ``limit`` 个排队中的任务（先提交先执行），返回任务 ID。"""
+        if limit <= 0:
+            return []
+        result = await self.session.execute(
+            select(ChapterGenerationJob.id)
+            .where(ChapterGenerationJob.status == "queued")
+            .order_by(ChapterGenerationJob.created_at)
+            .limit(limit)
+        )
+        claimed: List[str] = []
+        for job_id in result.scalars().all():
+            outcome = await self.session.execute(
+                update(ChapterGenerationJob)
+                .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "queued")
+                .values(status="running", attempts=ChapterGenerationJob.attempts + 1, updated_at=_utcnow())
+            )
+            if outcome.rowcount == 1:
+                claimed.append(job_id)
+        await self.session.commit()
+        return claimed
+
+    async def requeue_stale(self, older_than_seconds: Optional[float] = None) -> int:
+        """心跳停止的 running 任务放回队列（保留检查点）；已达最大尝试次数的标记为失败。"""
+        cutoff = _utcnow() - timedelta(seconds=older_than_seconds or settings.generation_job_stale_seconds)
+        result = await self.session.execute(
+            select(ChapterGenerationJob).where(
+                ChapterGenerationJob.status == "running", ChapterGenerationJob.updated_at < cutoff
+            )
+        )
+        recovered = 0
+        for job in result.scalars().all():
+            exhausted = job.attempts >= settings.generation_job_max_attempts
+            values: Dict[str, Any] = {"status": "queued", "updated_at": _utcnow()}
+            if exhausted:
+                values.update(status="failed", error="任务所在进程多次中断，已放弃", finished_at=_utcnow())
+            outcome = await self.session.execute(
+                update(ChapterGenerationJob)
+                .where(ChapterGenerationJob.id == job.id, ChapterGenerationJob.status == "running")
+                .values(**values)
+            )
+            if outcome.rowcount and exhausted:
+                await self.restore_chapter_status(job.project_id, job.chapter_number, failed=True)
+            recovered += outcome.rowcount or 0
+        await self.session.commit()
+        return recovered
+
+    async def finish(self, job_id: str, status: str, **values: Any) -> bool:
+        """把执行中的任务置为终态，返回是否写入成功。"""
+        outcome = await self.session.execute(
+            update(ChapterGenerationJob)
+            .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "running")
+            .values(status=status, finished_at=_utcnow(), updated_at=_utcnow(), **values)
+        )
+        await self.session.commit()
+        return outcome.rowcount == 1
+
+    async def release(self, job_id: str) -> None:
+        """进程退出时把执行中的任务放回队列，下次认领从检查点继续。"""
+        await self.session.execute(
+            update(ChapterGenerationJob)
+            .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "running")
+            .values(status="queued", updated_at=_utcnow())
+        )
+        await self.session.commit()
+
+    async def restore_chapter_status(self, project_id: str, chapter_number: int, *, failed: bool) -> None:
+        """生成未完成时复位仍停留在 generating 的章节状态。
+
+        失败时标记为 failed；取消时按是否已有候选版本恢复为待确认或未生成。
+        """
+        if failed:
+            status = ChapterGenerationStatus.FAILED.value
+        else:
+            versions = await self.session.execute(
+                select(func.count(ChapterVersion.id))
+                .join(Chapter, ChapterVersion.chapter_id == Chapter.id)
+                .where(Chapter.project_id == project_id, Chapter.chapter_number == chapter_number)
+            )
+            status = (
+                ChapterGenerationStatus.WAITING_FOR_CONFIRM.value
+                if versions.scalar()
+                else ChapterGenerationStatus.NOT_GENERATED.value
+            )
+        await self.session.execute(
+            update(Chapter)
+            .where(
+                Chapter.project_id == project_id,
+                Chapter.chapter_number == chapter_number,
+                Chapter.status == ChapterGenerationStatus.GENERATING.value,
+            )
+            .values(status=status)
+        )
+        await self.session.commit()
+
+
+class _JobRecorder:
+    """把编排器的进度事件与阶段检查点写回任务行；并发版本同时回调时串行写入。"""
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], job: ChapterGenerationJob) -> None:
+        self.session_factory = session_factory
+        self.job_id = job.id
+        self.progress: List[Dict[str, Any]] = list(job.progress or [])
+        self.checkpoints: Dict[str, Any] = dict(job.checkpoints or {})
+        self._seq = self.progress[-1]["seq"] + 1 if self.progress else 0
+        self._lock = asyncio.Lock()
+
+    async def record(self, event: Dict[str, Any]) -> None:
+        if event.get("event") == "token":
+            return
+        entry = _jsonable({**event, "seq": self._seq})
+        self._seq += 1
+        self.progress = [*self.progress, entry][-_PROGRESS_LIMIT:]
+        values: Dict[str, Any] = {"progress": self.progress}
+        if event.get("event") == "stage":
+            values["stage"] = event.get("stage")
+        await self._write(values)
+
+    async def save_checkpoint(self, stage: str, data: Any) -> None:
+        self.checkpoints = {**self.checkpoints, stage: data}
+        try:
+            await self._write({"checkpoints": self.checkpoints})
+        except Exception:  # noqa: BLE001 - 检查点写入失败只影响恢复，不中断生成
+            logger.exception("生成任务检查点写入失败: job=%s stage=%s", self.job_id, stage)
+
+    async def _write(self, values: Dict[str, Any]) -> None:
+        async with self._lock:
+            async with self.session_factory() as session:
+                await session.execute(
+                    update(ChapterGenerationJob)
+                    .where(ChapterGenerationJob.id == self.job_id, ChapterGenerationJob.status == "running")
+                    .values(updated_at=_utcnow(), **values)
+                )
+                await session.commit()
+
+
+class GenerationJobWorker:
+    """进程内的生成任务消费者：有空闲名额时认领任务，执行期间维持心跳并响应取消。"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        *,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.concurrency = concurrency or settings.generation_job_concurrency
+        self.poll_interval = poll_interval or settings.generation_job_poll_seconds
+        self.heartbeat_interval = heartbeat_interval or settings.generation_job_heartbeat_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._jobs: Dict[str, asyncio.Task] = {}
+        self._cancelled: set = set()
+        self._recovered_at = float("-inf")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("生成任务后台消费已启动: concurrency=%d", self.concurrency)
+
+    async def stop(self) -> None:
+        """停止认领新任务，中止执行中的任务并放回队列，由下次启动（或其他进程）从检查点继续。"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        jobs = list(self._jobs.values())
+        for job_task in jobs:
+            job_task.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    def notify(self) -> None:
+        """有新任务提交或执行名额释放时唤醒轮询；未启动时忽略。"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """认领一批任务并等待其执行结束，返回处理的任务数。"""
+        job_ids = await self._claim()
+        await asyncio.gather(*(self._jobs[job_id] for job_id in job_ids), return_exceptions=True)
+        return len(job_ids)
+
+    async def drain(self) -> int:
+        """反复处理直到队列为空，返回处理总数。"""
+        total = 0
+        while True:
+            processed = await self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+    async def _claim(self) -> List[str]:
+        async with self.session_factory() as session:
+            job_ids = await GenerationJobService(session).claim(self.concurrency - len(self._jobs))
+        for job_id in job_ids:
+            job_task = asyncio.get_running_loop().create_task(self._process(job_id))
+            self._jobs[job_id] = job_task
+            job_task.add_done_callback(lambda _, job_id=job_id: self._on_done(job_id))
+        return job_ids
+
+    def _on_done(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+        self._cancelled.discard(job_id)
+        self.notify()
+
+    async def _process(self, job_id: str) -> None:
+        async with self.session_factory() as session:
+            job = await session.get(ChapterGenerationJob, job_id)
+        if job is None:
+            return
+        recorder = _JobRecorder(self.session_factory, job)
+        checkpoints = StageCheckpoints(recorder.checkpoints, saver=recorder.save_checkpoint)
+
+        async def generate() -> Dict[str, Any]:
+            # 单飞下生成可能比本任务活得更久（其他请求仍在等待），因此使用独立会话
+            try:
+                async with self.session_factory() as session:
+                    return await PipelineOrchestrator(
+                        session, session_factory=self.session_factory
+                    ).generate_chapter(
+                        project_id=job.project_id,
+                        chapter_number=job.chapter_number,
+                        user_id=job.user_id,
+                        writing_notes=job.request.get("writing_notes"),
+                        flow_config=job.request.get("flow_config"),
+                        event_sink=recorder.record,
+                        checkpoints=checkpoints,
+                    )
+            except asyncio.CancelledError:
+                # 只有生成本身被取消（已没有其他等待方）时才复位章节；进程退出时任务重新排队，章节保持生成中
+                if job_id in self._cancelled:
+                    await self._restore_chapter(job)
+                raise
+
+        stopped = asyncio.Event()
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(job_id, asyncio.current_task(), stopped))
+        try:
+            # 同一章节已有相同的生成在执行（同步请求或其他进程）时直接等待其结果
+            result = await generation_single_flight.run(
+                job.project_id,
+                job.chapter_number,
+                generate,
+                fingerprint=_job_fingerprint(job),
+                idempotency_key=job.idempotency_key,
+            )
+        except asyncio.CancelledError:
+            if job_id in self._cancelled:
+                logger.info("生成任务已取消: job=%s", job_id)
+                # 章节状态不在这里复位：同步请求可能仍挂在同一次生成上，生成被拆除时由 generate 复位
+                await self._finish(job, "cancelled", restore_chapter=False)
+            else:
+                logger.info("进程退出，生成任务放回队列: job=%s", job_id)
+                await self._release(job_id)
+            raise
+        except Exception as exc:  # noqa: BLE001 - 失败记录在任务上，不中断后台循环
+            detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+            logger.exception("生成任务失败: job=%s project=%s chapter=%s", job_id, job.project_id, job.chapter_number)
+            await self._finish(job, "failed", error=str(detail)[:2000])
+        else:
+            result["finalized"] = False
+            await self._finish(job, "succeeded", result=_jsonable(result))
+        finally:
+            # 不直接取消心跳：取消落在提交途中会把未结束的事务留在连接池里
+            stopped.set()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job_id: str, job_task: asyncio.Task, stopped: asyncio.Event) -> None:
+        """定期刷新任务心跳；发现取消标记时中止执行中的任务，stopped 置位后退出。"""
+        while True:
+            try:
+                await asyncio.wait_for(stopped.wait(), timeout=self.heartbeat_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(
+                        update(ChapterGenerationJob)
+                        .where(ChapterGenerationJob.id == job_id, ChapterGenerationJob.status == "running")
+                        .values(updated_at=_utcnow())
+                    )
+                    await session.commit()
+                    cancel_requested = (
+                        await session.execute(
+                            select(ChapterGenerationJob.cancel_requested).where(ChapterGenerationJob.id == job_id)
+                        )
+                    ).scalar()
+            except Exception:  # noqa: BLE001 - 数据库短暂不可用时等待下一次心跳
+                logger.warning("生成任务心跳失败: job=%s", job_id, exc_info=True)
+                continue
+            if cancel_requested:
+                self._cancelled.add(job_id)
+                job_task.cancel()
+                return
+
+    async def _finish(
+        self, job: ChapterGenerationJob, status: str, *, restore_chapter: bool = True, **values: Any
+    ) -> None:
+        async with self.session_factory() as session:
+            service = GenerationJobService(session)
+            finished = await service.finish(job.id, status, **values)
+            if finished and restore_chapter and status != "succeeded":
+                await service.restore_chapter_status(job.project_id, job.chapter_number, failed=status == "failed")
+
+    async def _restore_chapter(self, job: ChapterGenerationJob) -> None:
+        try:
+            async with self.session_factory() as session:
+                await GenerationJobService(session).restore_chapter_status(
+                    job.project_id, job.chapter_number, failed=False
+                )
+        except Exception:  # noqa: BLE001 - 复位失败不应掩盖取消本身
+            logger.exception("取消后复位章节状态失败: project=%s chapter=%s", job.project_id, job.chapter_number)
+
+    async def _release(self, job_id: str) -> None:
+        async with self.session_factory() as session:
+            await GenerationJobService(session).release(job_id)
+
+    async def _run(self) -> None:
+        while True:
+            await self._recover_stale()
+            try:
+                claimed = await self._claim() if len(self._jobs) < self.concurrency else []
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - 数据库短暂不可用时等待下一轮
+                logger.exception("生成任务轮询失败")
+                claimed = []
+            if claimed and len(self._jobs) < self.concurrency:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _recover_stale(self) -> None:
+        """启动时及之后每半个超时周期回收一次心跳停止的任务（包括其他进程崩溃遗留的任务）。"""
+        if time.monotonic() - self._recovered_at < settings.generation_job_stale_seconds / 2:
+            return
+        self._recovered_at = time.monotonic()
+        try:
+            async with self.session_factory() as session:
+                recovered = await GenerationJobService(session).requeue_stale()
+            if recovered:
+                logger.info("恢复 %d 个中断的生成任务", recovered)
+        except Exception:  # noqa: BLE001 - 恢复失败不影响正常消费
+            logger.exception("恢复中断的生成任务失败")
+
+
+generation_job_worker = GenerationJobWorker()
+
+
+__all__ = ["TERMINAL_STATUSES", "GenerationJobService", "GenerationJobWorker", "generation_job_worker"]
@@ -0,0 +1,317 @@
+# AIMETA P=章节生成单飞_并发生成请求去重|R=进程内共享进行中的生成_跨进程数据库租约_幂等键结果重放|NR=不含生成流程实现|E=GenerationSingleFlight_generation_single_flight_request_fingerprint_check_shareable|X=internal|A=服务类|D=sqlalchemy|S=db,mem|RD=./README.ai
+"""
+章节生成单飞（single-flight）。
+
+前端双击、超时重试常在同一章节上同时发起多次生成，每次都完整调用模型，并在替换候选版本时互相覆盖。
+这里按 (项目, 章节) 保证同一时刻只执行一次生成：
+
+- 进程内：进行中的生成登记为共享任务，相同的请求直接等待它的结果；所有等待方都离开
+  （客户端断开、任务取消）后才取消生成；
+- 跨进程：执行前在 ``chapter_generation_locks`` 中以条件写入获取租约，执行期间定期续期；
+  其他进程的相同请求轮询租约行，生成结束后读取暂存的结果或错误；持有进程崩溃时租约过期，可被接管；
+- 生成进行期间内容不同的请求返回 409；携带 ``Idempotency-Key`` 的请求在结果保留期内重试时直接返回原结果。
+
+请求指纹一致（同一用户、相同写作指令与流程配置）或幂等键一致即视为相同请求。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.generation_lock import ChapterGenerationLock
+
+logger = logging.getLogger(__name__)
+
+FlightKey = Tuple[str, int]
+GenerateFn = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # 数据库读回的时间不带时区，按写入时的 UTC 解释
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _jsonable(data: Any) -> Any:
+    return json.loads(json.dumps(data, ensure_ascii=False, default=str))
+
+
+def request_fingerprint(user_id: int, writing_notes: Optional[str], flow_config: Optional[Dict[str, Any]]) -> str:
+    """生成请求的指纹：用户、写作指令与流程配置都相同的请求视为同一请求。"""
+    payload = json.dumps(
+        {"user_id": user_id, "writing_notes": writing_notes or None, "flow_config": flow_config or {}},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def check_shareable(
+    fingerprint: str,
+    idempotency_key: Optional[str],
+    *,
+    running_fingerprint: str,
+    running_key: Optional[str],
+) -> None:
+    """判断新请求能否共享已有的生成：幂等键相同但内容不同返回 422，内容不同返回 409。"""
+    if idempotency_key and idempotency_key == running_key:
+        if fingerprint != running_fingerprint:
+            raise HTTPException(status_code=422, detail="幂等键已用于内容不同的生成请求")
+        return
+    if fingerprint != running_fingerprint:
+        raise HTTPException(status_code=409, detail="该章节正在生成中，请等待当前生成完成")
+
+
+def _where(key: FlightKey):
+    return (
+        ChapterGenerationLock.project_id == key[0],
+        ChapterGenerationLock.chapter_number == key[1],
+    )
+
+
+@dataclass
+class _Flight:
+    task: "asyncio.Task[Dict[str, Any]]"
+    fingerprint: str
+    idempotency_key: Optional[str]
+    waiters: int = 0
+
+
+class GenerationSingleFlight:
+    """按 (项目, 章节) 合并并发的生成请求，同一章节同一时刻只执行一次生成。"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        *,
+        lease_seconds: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        result_ttl: Optional[float] = None,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.lease_seconds = lease_seconds or settings.generation_lock_lease_seconds
+        self.poll_interval = poll_interval or settings.generation_lock_poll_seconds
+        self.result_ttl = settings.generation_idempotency_ttl_seconds if result_ttl is None else result_ttl
+        self._flights: Dict[FlightKey, _Flight] = {}
+
+    def waiters(self, project_id: str, chapter_number: int) -> int:
+        """本进程中等待该章节生成结果的请求数，没有进行中的生成时为 0。"""
+        flight = self._flights.get((project_id, chapter_number))
+        return flight.waiters if flight else 0
+
+    async def run(
+        self,
+        project_id: str,
+        chapter_number: int,
+        generate: GenerateFn,
+        *,
+        fingerprint: str,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """执行该章节的生成，或加入进行中的相同生成，返回生成结果。"""
+        key = (project_id, chapter_number)
+        flight = self._flights.get(key)
+        if flight is not None:
+            check_shareable(
+                fingerprint,
+                idempotency_key,
+                running_fingerprint=flight.fingerprint,
+                running_key=flight.idempotency_key,
+            )
+            logger.info("加入进行中的章节生成: project=%s chapter=%s", project_id, chapter_number)
+        else:
+            task = asyncio.get_running_loop().create_task(self._lead(key, generate, fingerprint, idempotency_key))
+            flight = _Flight(task, fingerprint, idempotency_key)
+            self._flights[key] = flight
+            task.add_done_callback(lambda _: self._forget(key, flight))
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 所有等待方都已离开，结果无人需要：取消生成以停止模型调用，后续请求重新发起
+                self._forget(key, flight)
+                flight.task.cancel()
+                await asyncio.gather(flight.task, return_exceptions=True)
+
+    def _forget(self, key: FlightKey, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _lead(
+        self,
+        key: FlightKey,
+        generate: GenerateFn,
+        fingerprint: str,
+        idempotency_key: Optional[str],
+    ) -> Dict[str, Any]:
+        while True:
+            owner = str(uuid.uuid4())
+            lease = await self._acquire(key, owner, fingerprint, idempotency_key)
+            if lease is None:
+                return await self._execute(key, owner, generate)
+            if lease.status == "succeeded":
+                logger.info("按幂等键返回已完成的章节生成: project=%s chapter=%s", *key)
+                return lease.result
+            logger.info("等待其他进程中的章节生成: project=%s chapter=%s", *key)
+            result = await self._follow(key, lease.owner)
+            if result is not None:
+                return result
+
+    async def _acquire(
+        self,
+        key: FlightKey,
+        owner: str,
+        fingerprint: str,
+        idempotency_key: Optional[str],
+    ) -> Optional[ChapterGenerationLock]:
+        """获取章节的生成租约；成功返回 None，否则返回应当共享的租约行（进行中，或可按幂等键重放的结果）。"""
+        values = dict(
+            owner=owner,
+            status="running",
+            fingerprint=fingerprint,
+            idempotency_key=idempotency_key,
+            result=None,
+            error=None,
+        )
+        while True:
+            now = _utcnow()
+            expires_at = now + timedelta(seconds=self.lease_seconds)
+            async with self.session_factory() as session:
+                lease = await session.get(ChapterGenerationLock, key, populate_existing=True)
+                if lease is None:
+                    session.add(
+                        ChapterGenerationLock(
+                            project_id=key[0], chapter_number=key[1], expires_at=expires_at, **values
+                        )
+                    )
+                    try:
+                        await session.commit()
+                        return None
+                    except IntegrityError:
+                        # 其他进程同时插入了租约，重新读取后按其状态处理
+                        await session.rollback()
+                        continue
+                live = _as_utc(lease.expires_at) > now
+                if live and lease.status == "running":
+                    check_shareable(
+                        fingerprint,
+                        idempotency_key,
+                        running_fingerprint=lease.fingerprint,
+                        running_key=lease.idempotency_key,
+                    )
+                    return lease
+                replayable = lease.status == "succeeded" and idempotency_key and lease.idempotency_key == idempotency_key
+                if live and replayable:
+                    check_shareable(
+                        fingerprint,
+                        idempotency_key,
+                        running_fingerprint=lease.fingerprint,
+                        running_key=lease.idempotency_key,
+                    )
+                    return lease
+                # 租约空闲、已结束或持有进程已崩溃：以条件更新接管，期间被他人抢先则重新判断
+                outcome = await session.execute(
+                    update(ChapterGenerationLock)
+                    .where(*_where(key), ChapterGenerationLock.owner == lease.owner)
+                    .values(expires_at=expires_at, **values)
+                )
+                await session.commit()
+                if outcome.rowcount == 1:
+                    return None
+
+    async def _execute(self, key: FlightKey, owner: str, generate: GenerateFn) -> Dict[str, Any]:
+        stopped = asyncio.Event()
+        renewal = asyncio.get_running_loop().create_task(self._renew(key, owner, stopped))
+        try:
+            try:
+                result = await generate()
+            finally:
+                stopped.set()
+                await asyncio.gather(renewal, return_exceptions=True)
+        except asyncio.CancelledError:
+            # 生成被取消：删除租约，等待中的其他进程随即接管
+            await self._write(key, owner, None)
+            raise
+        except HTTPException as exc:
+            error = {"status_code": exc.status_code, "detail": exc.detail}
+            await self._write(key, owner, {"status": "failed", "error": error})
+            raise
+        except Exception as exc:
+            await self._write(key, owner, {"status": "failed", "error": {"status_code": 500, "detail": str(exc)}})
+            raise
+        await self._write(key, owner, {"status": "succeeded", "result": _jsonable(result)})
+        return result
+
+    async def _follow(self, key: FlightKey, owner: str) -> Optional[Dict[str, Any]]:
+        """等待其他进程持有的生成结束：成功返回结果，失败按原错误抛出；租约被删除或过期时返回 None 重新竞争。"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            async with self.session_factory() as session:
+                lease = await session.get(ChapterGenerationLock, key, populate_existing=True)
+            if lease is None or lease.owner != owner:
+                return None
+            if lease.status == "succeeded":
+                return lease.result
+            if lease.status == "failed":
+                error = lease.error or {}
+                raise HTTPException(
+                    status_code=error.get("status_code", 500), detail=error.get("detail") or "章节生成失败"
+                )
+            if _as_utc(lease.expires_at) <= _utcnow():
+                return None
+
+    async def _renew(self, key: FlightKey, owner: str, stopped: asyncio.Event) -> None:
+        """执行期间定期续期租约，停止信号置位后退出。"""
+        while True:
+            try:
+                await asyncio.wait_for(stopped.wait(), timeout=self.lease_seconds / 3)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(
+                        update(ChapterGenerationLock)
+                        .where(*_where(key), ChapterGenerationLock.owner == owner)
+                        .values(expires_at=_utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await session.commit()
+            except Exception:  # noqa: BLE001 - 数据库短暂不可用时等待下一次续期
+                logger.warning("章节生成租约续期失败: project=%s chapter=%s", *key, exc_info=True)
+
+    async def _write(self, key: FlightKey, owner: str, values: Optional[Dict[str, Any]]) -> None:
+        """写入生成结束状态（结果保留 ``result_ttl`` 秒）；values 为 None 时删除租约。"""
+        try:
+            async with self.session_factory() as session:
+                if values is None:
+                    statement = delete(ChapterGenerationLock)
+                else:
+                    expires_at = _utcnow() + timedelta(seconds=self.result_ttl)
+                    statement = update(ChapterGenerationLock).values(expires_at=expires_at, **values)
+                await session.execute(statement.where(*_where(key), ChapterGenerationLock.owner == owner))
+                await session.commit()
+        except Exception:  # noqa: BLE001 - 写入失败时租约到期后自动释放
+            logger.exception("章节生成租约写入失败: project=%s chapter=%s", *key)
+
+
+# 进程级共享：进程内的去重依赖同一个实例
+generation_single_flight = GenerationSingleFlight()
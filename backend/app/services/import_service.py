@@ -14,6 +14,7 @@ from ..schemas.novel import Blueprint
 from ..services.llm_service import LLMService
 from ..services.novel_service import NovelService
 from ..services.prompt_service import PromptService
+from ..services.summary_backfill_service import SummaryBackfillService
 from ..utils.json_utils import remove_think_tags, sanitize_json_like_text, unwrap_markdown_json
 
 logger = logging.getLogger(__name__)
@@ -150,6 +151,11 @@ class ImportService:
         # 更新项目状态
         project.status = "blueprint_ready"
         await self.session.commit()
+
+        # 章节摘要交给后台回填队列，避免首次生成时逐章同步补摘要
+        await SummaryBackfillService(self.session).enqueue(
+            project.id, range(1, len(chapters) + 1), user_id=user_id
+        )
         
         return project.id
 
@@ -1,29 +1,88 @@
 # AIMETA P=LLM服务_大模型调用封装|R=API调用_流式生成|NR=不含业务逻辑|E=LLMService|X=internal|A=服务类|D=openai,httpx|S=net|RD=./README.ai
+import asyncio
 import logging
 import os
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 
 import httpx
 from fastapi import HTTPException, status
-from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError
+from openai import APIConnectionError, APITimeoutError, InternalServerError
 
 from ..core.config import settings
+from ..db.session import release_connection
 from ..repositories.llm_config_repository import LLMConfigRepository
 from ..repositories.system_config_repository import SystemConfigRepository
-from ..repositories.user_repository import UserRepository
 from ..services.admin_setting_service import AdminSettingService
+from ..services.embedding_cache import embedding_cache
 from ..services.prompt_service import PromptService
+from ..services.usage_counter_service import usage_counters
 from ..services.usage_service import UsageService
+from ..utils.client_registry import client_registry
+from ..utils.concurrency import ConcurrencyLimiter
+from ..utils.continuation import OverlapStitcher
 from ..utils.llm_tool import ChatMessage, LLMClient
 
 logger = logging.getLogger(__name__)
 
+# 流式增量回调：每收到一段模型输出即被调用，用于向前端转发 token
+DeltaCallback = Callable[[str], Awaitable[None]]
+# 流式护栏：每收到一段模型输出即被调用，返回非 None（命中信息）时立即中止上游请求
+StreamGuardCallback = Callable[[str], Optional[Any]]
+
+# 只读分析类调用（多维批评、读者模拟）的进程内共享并发限流：全局上限 + 单用户上限
+analysis_limiter = ConcurrencyLimiter(
+    settings.analysis_concurrency_global,
+    settings.analysis_concurrency_per_user,
+)
+
 try:  # pragma: no cover - 运行环境未安装时兼容
     from ollama import AsyncClient as OllamaAsyncClient
 except ImportError:  # pragma: no cover - Ollama 为可选依赖
     OllamaAsyncClient = None
 
 
+# 长度截断后的续写指令；助手消息只携带已生成正文的结尾，避免小上下文模型再次超限
+CONTINUATION_PROMPT = "上一条回复因长度限制被截断。请从截断处直接继续输出剩余内容，不要重复已输出的文字，不要添加任何说明或开场白。"
+
+
+@dataclass
+class StreamStats:
+    """单次调用的流式统计，由调用方传入并在返回后读取。"""
+    continuation_rounds: int = 0  # 因长度截断自动续写的轮数
+    truncated: bool = False  # 续写轮数用尽后仍被截断
+    finish_reason: Optional[str] = None
+
+
+@dataclass
+class OutputLengthEstimate:
+    """本进程已完成的流式调用的平均输出长度（按流式分片计，与 token 数接近），用于估算取消节省的输出。"""
+    streams: int = 0
+    chunks: int = 0
+
+    def observe(self, chunks: int) -> None:
+        self.streams += 1
+        self.chunks += chunks
+
+    def remaining(self, received: int, max_tokens: Optional[int] = None) -> int:
+        """中途取消时估算上游未再生成的 token 数：有 max_tokens 时以其为上限，否则按平均输出长度。"""
+        expected = max_tokens or (self.chunks // self.streams if self.streams else 0)
+        return max(expected - received, 0)
+
+
+# 进程级共享：取消节省的估算需要跨请求积累完整输出的长度
+output_length_estimate = OutputLengthEstimate()
+
+
+class StreamAborted(Exception):
+    """流式护栏命中后中止生成；携带已收到的部分输出与命中信息。"""
+
+    def __init__(self, partial: str, hit: Any):
+        super().__init__(f"LLM stream aborted by guard at offset {len(partial)}")
+        self.partial = partial
+        self.hit = hit
+
+
 class LLMService:
     """封装与大模型交互的所有逻辑，包括配额控制与配置选择。"""
 
@@ -31,7 +90,6 @@ class LLMService:
         self.session = session
         self.llm_repo = LLMConfigRepository(session)
         self.system_config_repo = SystemConfigRepository(session)
-        self.user_repo = UserRepository(session)
         self.admin_setting_service = AdminSettingService(session)
         self.usage_service = UsageService(session)
         self._embedding_dimensions: Dict[str, int] = {}
@@ -47,6 +105,9 @@ class LLMService:
         response_format: Optional[str] = "json_object",
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        on_delta: Optional[DeltaCallback] = None,
+        stream_guard: Optional[StreamGuardCallback] = None,
+        stats: Optional[StreamStats] = None,
     ) -> str:
         messages = [{"role": "system", "content": system_prompt}, *conversation_history]
         return await self._stream_and_collect(
@@ -57,6 +118,9 @@ class LLMService:
             response_format=response_format,
             max_tokens=max_tokens,
             top_p=top_p,
+            on_delta=on_delta,
+            stream_guard=stream_guard,
+            stats=stats,
         )
 
     async def generate(
@@ -114,14 +178,23 @@ class LLMService:
         response_format: Optional[str] = None,
         max_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
+        on_delta: Optional[DeltaCallback] = None,
+        stream_guard: Optional[StreamGuardCallback] = None,
+        stats: Optional[StreamStats] = None,
     ) -> str:
         config = await self._resolve_llm_config(user_id)
+        # 以下只等待模型输出、不再访问数据库，先把连接还给连接池
+        await release_connection(self.session, keep_pending_writes=True)
         client = LLMClient(api_key=config["api_key"], base_url=config.get("base_url"))
+        stats = stats if stats is not None else StreamStats()
 
-        chat_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in messages]
+        collected: List[str] = []
 
-        full_response = ""
-        finish_reason = None
+        async def forward(delta: str) -> Optional[Any]:
+            collected.append(delta)
+            if on_delta is not None:
+                await on_delta(delta)
+            return stream_guard(delta) if stream_guard is not None else None
 
         logger.info(
             "Streaming LLM response: model=%s user_id=%s messages=%d",
@@ -130,55 +203,77 @@ class LLMService:
             len(messages),
         )
 
-        try:
-            async for part in client.stream_chat(
-                messages=chat_messages,
-                model=config.get("model"),
-                temperature=temperature,
-                timeout=int(timeout),
-                response_format=response_format,
-                max_tokens=max_tokens,
-                top_p=top_p,
-            ):
-                if part.get("content"):
-                    full_response += part["content"]
-                if part.get("finish_reason"):
-                    finish_reason = part["finish_reason"]
-        except InternalServerError as exc:
-            detail = "AI 服务内部错误，请稍后重试"
-            response = getattr(exc, "response", None)
-            if response is not None:
-                try:
-                    payload = response.json()
-                    error_data = payload.get("error", {}) if isinstance(payload, dict) else {}
-                    detail = error_data.get("message_zh") or error_data.get("message") or detail
-                except Exception:
-                    detail = str(exc) or detail
-            else:
-                detail = str(exc) or detail
-            logger.error(
-                "LLM stream internal error: model=%s user_id=%s detail=%s",
+        round_kwargs = dict(
+            client=client,
+            config=config,
+            user_id=user_id,
+            temperature=temperature,
+            timeout=timeout,
+            response_format=response_format,
+            max_tokens=max_tokens,
+            top_p=top_p,
+        )
+        finish_reason, guard_hit = await self._stream_round(messages, on_part=forward, **round_kwargs)
+
+        # 纯文本输出被长度截断时保留已生成内容，携带结尾续写，JSON 输出无法安全拼接仍按截断处理
+        quota_exhausted = False
+        while (
+            finish_reason == "length"
+            and guard_hit is None
+            and response_format is None
+            and stats.continuation_rounds < settings.llm_continuation_max_rounds
+        ):
+            # 每轮续写都是一次真实的上游请求：使用系统共享 Key 时同样占用每日额度，额度用尽即停止续写
+            if config.get("metered") and not await self._acquire_daily_request(user_id):
+                logger.warning(
+                    "Daily quota exhausted, stop continuing truncated response: user_id=%s round=%d",
+                    user_id,
+                    stats.continuation_rounds,
+                )
+                quota_exhausted = True
+                break
+            await self.usage_service.increment("api_request_count")
+            stats.continuation_rounds += 1
+            head = "".join(collected)
+            logger.info(
+                "LLM response truncated, continuing: model=%s user_id=%s round=%d chars=%d",
                 config.get("model"),
                 user_id,
-                detail,
-                exc_info=exc,
+                stats.continuation_rounds,
+                len(head),
             )
-            raise HTTPException(status_code=503, detail=detail)
-        except (httpx.RemoteProtocolError, httpx.ReadTimeout, APIConnectionError, APITimeoutError) as exc:
-            if isinstance(exc, httpx.RemoteProtocolError):
-                detail = "AI 服务连接被意外中断，请稍后重试"
-            elif isinstance(exc, (httpx.ReadTimeout, APITimeoutError)):
-                detail = "AI 服务响应超时，请稍后重试"
-            else:
-                detail = "无法连接到 AI 服务，请稍后重试"
-            logger.error(
-                "LLM stream failed: model=%s user_id=%s detail=%s",
+            stitcher = OverlapStitcher(head, max_overlap=settings.llm_continuation_max_overlap)
+
+            async def forward_continuation(delta: str) -> Optional[Any]:
+                piece = stitcher.feed(delta)
+                return await forward(piece) if piece else None
+
+            continuation_messages = [
+                *messages,
+                {"role": "assistant", "content": head[-settings.llm_continuation_tail_chars:]},
+                {"role": "user", "content": CONTINUATION_PROMPT},
+            ]
+            finish_reason, guard_hit = await self._stream_round(
+                continuation_messages, on_part=forward_continuation, **round_kwargs
+            )
+            if guard_hit is None:
+                rest = stitcher.flush()
+                if rest:
+                    guard_hit = await forward(rest)
+
+        full_response = "".join(collected)
+        stats.finish_reason = finish_reason
+
+        if guard_hit is not None:
+            logger.info(
+                "LLM stream aborted by guard: model=%s user_id=%s chars=%d hit=%s",
                 config.get("model"),
                 user_id,
-                detail,
-                exc_info=exc,
+                len(full_response),
+                guard_hit,
             )
-            raise HTTPException(status_code=503, detail=detail) from exc
+            await self.usage_service.increment("api_request_count")
+            raise StreamAborted(full_response, guard_hit)
 
         logger.debug(
             "LLM response collected: model=%s user_id=%s finish_reason=%s preview=%s",
@@ -190,15 +285,19 @@ class LLMService:
 
         if finish_reason == "length":
             logger.warning(
-                "LLM response truncated: model=%s user_id=%s response_length=%d",
+                "LLM response truncated: model=%s user_id=%s response_length=%d continuation_rounds=%d",
                 config.get("model"),
                 user_id,
                 len(full_response),
+                stats.continuation_rounds,
             )
-            raise HTTPException(
-                status_code=500,
-                detail=f"AI 响应因长度限制被截断（已生成 {len(full_response)} 字符），请缩短输入内容或调整模型参数"
-            )
+            if not stats.continuation_rounds and not quota_exhausted:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"AI 响应因长度限制被截断（已生成 {len(full_response)} 字符），请缩短输入内容或调整模型参数"
+                )
+            # 续写轮数或每日额度用尽：保留已生成的内容，由调用方根据 stats.truncated 决定如何处理
+            stats.truncated = True
 
         if not full_response:
             logger.error(
@@ -214,14 +313,113 @@ class LLMService:
 
         await self.usage_service.increment("api_request_count")
         logger.info(
-            "LLM response success: model=%s user_id=%s chars=%d",
+            "LLM response success: model=%s user_id=%s chars=%d continuation_rounds=%d",
             config.get("model"),
             user_id,
             len(full_response),
+            stats.continuation_rounds,
         )
         return full_response
 
-    async def _resolve_llm_config(self, user_id: Optional[int]) -> Dict[str, Optional[str]]:
+    async def _stream_round(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        client: LLMClient,
+        config: Dict[str, Optional[str]],
+        user_id: Optional[int],
+        temperature: float,
+        timeout: float,
+        response_format: Optional[str],
+        max_tokens: Optional[int],
+        top_p: Optional[float],
+        on_part: Callable[[str], Awaitable[Optional[Any]]],
+    ) -> Tuple[Optional[str], Optional[Any]]:
+        """
+        发起一次流式请求，把每段输出交给 ``on_part``；``on_part`` 返回护栏命中信息时立即中止。
+
+        Returns:
+            (结束原因, 护栏命中信息)
+        """
+        chat_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in messages]
+        finish_reason = None
+        guard_hit = None
+        received = 0
+        stream = client.stream_chat(
+            messages=chat_messages,
+            model=config.get("model"),
+            temperature=temperature,
+            timeout=int(timeout),
+            response_format=response_format,
+            max_tokens=max_tokens,
+            top_p=top_p,
+        )
+        try:
+            async for part in stream:
+                if part.get("content"):
+                    received += 1
+                    guard_hit = await on_part(part["content"])
+                    if guard_hit is not None:
+                        break
+                if part.get("finish_reason"):
+                    finish_reason = part["finish_reason"]
+        except asyncio.CancelledError:
+            # 调用方取消（客户端断开、任务取消）：finally 中关闭流即断开上游连接，这里记录节省的输出
+            saved = output_length_estimate.remaining(received, max_tokens)
+            logger.info(
+                "LLM stream cancelled: model=%s user_id=%s received_chunks=%d estimated_saved_tokens=%d",
+                config.get("model"),
+                user_id,
+                received,
+                saved,
+            )
+            await usage_counters.record("llm_cancelled_streams")
+            if saved:
+                await usage_counters.record("llm_cancelled_tokens_saved", saved)
+            raise
+        except InternalServerError as exc:
+            detail = "AI 服务内部错误，请稍后重试"
+            response = getattr(exc, "response", None)
+            if response is not None:
+                try:
+                    payload = response.json()
+                    error_data = payload.get("error", {}) if isinstance(payload, dict) else {}
+                    detail = error_data.get("message_zh") or error_data.get("message") or detail
+                except Exception:
+                    detail = str(exc) or detail
+            else:
+                detail = str(exc) or detail
+            logger.error(
+                "LLM stream internal error: model=%s user_id=%s detail=%s",
+                config.get("model"),
+                user_id,
+                detail,
+                exc_info=exc,
+            )
+            raise HTTPException(status_code=503, detail=detail)
+        except (httpx.RemoteProtocolError, httpx.ReadTimeout, APIConnectionError, APITimeoutError) as exc:
+            if isinstance(exc, httpx.RemoteProtocolError):
+                detail = "AI 服务连接被意外中断，请稍后重试"
+            elif isinstance(exc, (httpx.ReadTimeout, APITimeoutError)):
+                detail = "AI 服务响应超时，请稍后重试"
+            else:
+                detail = "无法连接到 AI 服务，请稍后重试"
+            logger.error(
+                "LLM stream failed: model=%s user_id=%s detail=%s",
+                config.get("model"),
+                user_id,
+                detail,
+                exc_info=exc,
+            )
+            raise HTTPException(status_code=503, detail=detail) from exc
+        finally:
+            # 提前退出（护栏中止、取消或异常）时显式关闭流，断开上游连接
+            await stream.aclose()
+        if finish_reason is not None and guard_hit is None:
+            output_length_estimate.observe(received)
+        return finish_reason, guard_hit
+
+    async def _resolve_llm_config(self, user_id: Optional[int]) -> Dict[str, Any]:
         if user_id:
             config = await self.llm_repo.get_by_user(user_id)
             if config and config.llm_provider_api_key:
@@ -246,7 +444,8 @@ class LLMService:
                 detail="未配置默认 LLM API Key，请联系管理员配置系统默认 API Key 或在个人设置中配置自定义 API Key"
             )
 
-        return {"api_key": api_key, "base_url": base_url, "model": model}
+        # metered：使用系统共享 Key，后续的续写请求同样按每日额度计数
+        return {"api_key": api_key, "base_url": base_url, "model": model, "metered": bool(user_id)}
 
     async def get_embedding(
         self,
@@ -256,6 +455,24 @@ class LLMService:
         model: Optional[str] = None,
     ) -> List[float]:
         """生成文本向量，用于章节 RAG 检索，支持 openai 与 ollama 双提供方。"""
+        embeddings = await self.get_embeddings([text], user_id=user_id, model=model)
+        return embeddings[0] if embeddings else []
+
+    async def get_embeddings(
+        self,
+        texts: Sequence[str],
+        *,
+        user_id: Optional[int] = None,
+        model: Optional[str] = None,
+    ) -> List[List[float]]:
+        """批量生成文本向量，结果与输入一一对应，失败的条目返回空列表。
+
+        OpenAI 按 embedding_batch_size 分批、每批一次请求；Ollama 逐条请求但以
+        embedding_concurrency 限制并发。已缓存的文本直接复用持久化缓存中的向量，
+        只为未命中的文本调用嵌入接口。
+        """
+        if not texts:
+            return []
         provider = await self._get_config_value("embedding.provider") or "openai"
         default_model = (
             await self._get_config_value("ollama.embedding_model") or "nomic-embed-text:latest"
@@ -263,28 +480,55 @@ class LLMService:
             else await self._get_config_value("embedding.model") or "text-embedding-3-large"
         )
         target_model = model or default_model
+        vector_size_str = await self._get_config_value("embedding.model_vector_size")
+        # 缓存键中的维度取配置的向量维度（0 表示模型默认维度），调整维度配置后旧向量自然失效
+        configured_dim = int(vector_size_str) if vector_size_str else 0
+
+        embeddings = await embedding_cache.get_many(provider, target_model, configured_dim, texts)
+        # 同一批内重复的文本只请求一次
+        missing = list(dict.fromkeys(text for text, cached in zip(texts, embeddings) if cached is None))
+        if missing:
+            if provider == "ollama":
+                fetched = await self._embed_with_ollama(missing, target_model)
+            else:
+                fetched = await self._embed_with_openai(missing, target_model, user_id)
+            by_text = dict(zip(missing, fetched))
+            embeddings = [cached if cached is not None else by_text.get(text, []) for text, cached in zip(texts, embeddings)]
+            await embedding_cache.put_many(provider, target_model, configured_dim, list(by_text.items()))
+        else:
+            logger.debug("嵌入缓存全部命中: model=%s count=%d", target_model, len(texts))
+
+        dimension = next((len(item) for item in embeddings if item), 0) or configured_dim
+        if dimension:
+            self._embedding_dimensions[target_model] = dimension
+        return embeddings
 
-        if provider == "ollama":
-            if OllamaAsyncClient is None:
-                logger.error("未安装 ollama 依赖，无法调用本地嵌入模型。")
-                raise HTTPException(status_code=500, detail="缺少 Ollama 依赖，请先安装 ollama 包。")
+    async def _embed_with_ollama(self, texts: Sequence[str], target_model: str) -> List[List[float]]:
+        if OllamaAsyncClient is None:
+            logger.error("未安装 ollama 依赖，无法调用本地嵌入模型。")
+            raise HTTPException(status_code=500, detail="缺少 Ollama 依赖，请先安装 ollama 包。")
 
-            base_url = (
-                await self._get_config_value("ollama.embedding_base_url")
-                or await self._get_config_value("embedding.base_url")
-            )
-            client = OllamaAsyncClient(host=base_url)
-            try:
-                response = await client.embeddings(model=target_model, prompt=text)
-            except Exception as exc:  # pragma: no cover - 本地服务调用失败
-                logger.error(
-                    "Ollama 嵌入请求失败: model=%s base_url=%s error=%s",
-                    target_model,
-                    base_url,
-                    exc,
-                    exc_info=True,
-                )
-                return []
+        base_url = (
+            await self._get_config_value("ollama.embedding_base_url")
+            or await self._get_config_value("embedding.base_url")
+        )
+        await release_connection(self.session, keep_pending_writes=True)
+        client = client_registry.get_ollama(host=base_url)
+        semaphore = asyncio.Semaphore(settings.embedding_concurrency)
+
+        async def embed_one(text: str) -> List[float]:
+            async with semaphore:
+                try:
+                    response = await client.embeddings(model=target_model, prompt=text)
+                except Exception as exc:  # pragma: no cover - 本地服务调用失败
+                    logger.error(
+                        "Ollama 嵌入请求失败: model=%s base_url=%s error=%s",
+                        target_model,
+                        base_url,
+                        exc,
+                        exc_info=True,
+                    )
+                    return []
             embedding: Optional[List[float]]
             if isinstance(response, dict):
                 embedding = response.get("embedding")
@@ -293,44 +537,55 @@ class LLMService:
             if not embedding:
                 logger.warning("Ollama 返回空向量: model=%s", target_model)
                 return []
-            if not isinstance(embedding, list):
-                embedding = list(embedding)
-        else:
-            config = await self._resolve_llm_config(user_id)
-            api_key = await self._get_config_value("embedding.api_key") or config["api_key"]
-            base_url = await self._get_config_value("embedding.base_url") or config.get("base_url")
-            client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-            try:
-                response = await client.embeddings.create(
-                    input=text,
-                    model=target_model,
-                )
-            except Exception as exc:  # pragma: no cover - 网络或鉴权失败
-                logger.error(
-                    "OpenAI 嵌入请求失败: model=%s base_url=%s user_id=%s error=%s",
-                    target_model,
-                    base_url,
-                    user_id,
-                    exc,
-                    exc_info=True,
-                )
-                return []
-            if not response.data:
-                logger.warning("OpenAI 嵌入请求返回空数据: model=%s user_id=%s", target_model, user_id)
-                return []
-            embedding = response.data[0].embedding
+            return list(embedding)
 
-        if not isinstance(embedding, list):
-            embedding = list(embedding)
+        async with client_registry.in_use(client):
+            return list(await asyncio.gather(*(embed_one(text) for text in texts)))
 
-        dimension = len(embedding)
-        if not dimension:
-            vector_size_str = await self._get_config_value("embedding.model_vector_size")
-            if vector_size_str:
-                dimension = int(vector_size_str)
-        if dimension:
-            self._embedding_dimensions[target_model] = dimension
-        return embedding
+    async def _embed_with_openai(
+        self,
+        texts: Sequence[str],
+        target_model: str,
+        user_id: Optional[int],
+    ) -> List[List[float]]:
+        config = await self._resolve_llm_config(user_id)
+        api_key = await self._get_config_value("embedding.api_key") or config["api_key"]
+        base_url = await self._get_config_value("embedding.base_url") or config.get("base_url")
+        await release_connection(self.session, keep_pending_writes=True)
+        client = client_registry.get_openai(api_key=api_key, base_url=base_url)
+
+        results: List[List[float]] = [[] for _ in texts]
+        batch_size = settings.embedding_batch_size
+        async with client_registry.in_use(client):
+            for start in range(0, len(texts), batch_size):
+                batch = list(texts[start:start + batch_size])
+                try:
+                    response = await client.embeddings.create(
+                        input=batch,
+                        model=target_model,
+                    )
+                except Exception as exc:  # pragma: no cover - 网络或鉴权失败
+                    logger.error(
+                        "OpenAI 嵌入请求失败: model=%s base_url=%s user_id=%s batch=%d error=%s",
+                        target_model,
+                        base_url,
+                        user_id,
+                        len(batch),
+                        exc,
+                        exc_info=True,
+                    )
+                    continue
+                if not response.data:
+                    logger.warning("OpenAI 嵌入请求返回空数据: model=%s user_id=%s", target_model, user_id)
+                    continue
+                for position, item in enumerate(response.data):
+                    # 以返回的 index 对齐输入顺序，兼容不保证顺序的兼容服务
+                    offset = getattr(item, "index", None)
+                    if not isinstance(offset, int):
+                        offset = position
+                    if 0 <= offset < len(batch) and item.embedding:
+                        results[start + offset] = list(item.embedding)
+        return results
 
     async def get_embedding_dimension(self, model: Optional[str] = None) -> Optional[int]:
         """获取嵌入向量维度，优先返回缓存结果，其次读取配置。"""
@@ -347,21 +602,25 @@ class LLMService:
         return int(vector_size_str) if vector_size_str else None
 
     async def _enforce_daily_limit(self, user_id: int) -> None:
-        limit_str = await self.admin_setting_service.get("daily_request_limit", "100")
-        limit = int(limit_str or 10)
-        used = await self.user_repo.get_daily_request(user_id)
-        if used >= limit:
+        if not await self._acquire_daily_request(user_id):
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="今日请求次数已达上限，请明日再试或设置自定义 API Key。",
             )
-        await self.user_repo.increment_daily_request(user_id)
-        await self.session.commit()
+
+    async def _acquire_daily_request(self, user_id: int) -> bool:
+        """占用用户今日的一次请求额度，额度已满时返回 False。"""
+        limit_str = await self.admin_setting_service.get("daily_request_limit", "100")
+        limit = int(limit_str or 10)
+        # 额度预占使用独立会话，先归还当前会话的连接，避免一次调用同时占用两个连接
+        await release_connection(self.session, keep_pending_writes=True)
+        # 额度按块从数据库预占后在进程内扣减，不再每次调用都读改写提交
+        return await usage_counters.acquire_daily_request(user_id, limit)
 
     async def _get_config_value(self, key: str) -> Optional[str]:
-        record = await self.system_config_repo.get_by_key(key)
-        if record:
-            return record.value
+        value = await self.system_config_repo.get_value(key)
+        if value is not None:
+            return value
         # 兼容环境变量，首次迁移时无需立即写入数据库
         env_key = key.upper().replace(".", "_")
         return os.getenv(env_key)
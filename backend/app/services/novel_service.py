@@ -103,6 +103,7 @@ from ..schemas.novel import (
     ChapterGenerationStatus,
     ChapterOutline as ChapterOutlineSchema,
     NovelProject as NovelProjectSchema,
+    NovelProjectDelta,
     NovelProjectSummary,
     NovelSectionResponse,
     NovelSectionType,
@@ -132,8 +133,36 @@ class NovelService:
         await self.session.refresh(project)
         return project
 
+    # 项目加载分三档，按需选用最轻的一档：
+    # ensure_project_owner  —— 单条主键查询，只含项目自身字段，用于归属校验；
+    # load_writer_context   —— 蓝图/角色/关系/大纲 + 各章选中版本，用于写作与蓝图拼装；
+    # load_full_project     —— 含对话、每章全部版本与评审，仅用于完整项目序列化。
     async def ensure_project_owner(self, project_id: str, user_id: int) -> NovelProject:
+        """校验项目归属，返回不含关联数据的项目对象。"""
+        project = await self.repo.get_basic(project_id)
+        return self._check_owner(project, user_id)
+
+    async def load_writer_context(
+        self,
+        project_id: str,
+        user_id: int,
+        *,
+        include_selected_version: bool = True,
+    ) -> NovelProject:
+        """校验归属并加载写作上下文（不含对话、全部版本与评审）。"""
+        project = await self.repo.get_writer_context(
+            project_id,
+            include_selected_version=include_selected_version,
+        )
+        return self._check_owner(project, user_id)
+
+    async def load_full_project(self, project_id: str, user_id: int) -> NovelProject:
+        """校验归属并完整加载项目。"""
         project = await self.repo.get_by_id(project_id)
+        return self._check_owner(project, user_id)
+
+    @staticmethod
+    def _check_owner(project: Optional[NovelProject], user_id: int) -> NovelProject:
         if not project:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="项目不存在")
         if project.user_id != user_id:
@@ -141,7 +170,7 @@ class NovelService:
         return project
 
     async def get_project_schema(self, project_id: str, user_id: int) -> NovelProjectSchema:
-        project = await self.ensure_project_owner(project_id, user_id)
+        project = await self.load_full_project(project_id, user_id)
         return await self._serialize_project(project)
 
     async def get_section_data(
@@ -150,7 +179,8 @@ class NovelService:
         user_id: int,
         section: NovelSectionType,
     ) -> NovelSectionResponse:
-        project = await self.ensure_project_owner(project_id, user_id)
+        # 分区数据只返回元数据，章节列表也不含正文，无需加载任何版本
+        project = await self.load_writer_context(project_id, user_id, include_selected_version=False)
         return self._build_section_response(project, section)
 
     async def get_chapter_schema(
@@ -160,7 +190,7 @@ class NovelService:
         chapter_number: int,
     ) -> ChapterSchema:
         project = await self.ensure_project_owner(project_id, user_id)
-        return self._build_chapter_schema(project, chapter_number)
+        return await self._load_single_chapter_schema(project, chapter_number)
 
     async def list_projects_for_user(self, user_id: int) -> List[NovelProjectSummary]:
         projects = await self.repo.list_by_user(user_id)
@@ -214,7 +244,8 @@ class NovelService:
 
     async def delete_projects(self, project_ids: List[str], user_id: int) -> None:
         for pid in project_ids:
-            project = await self.ensure_project_owner(pid, user_id)
+            # ORM 级联删除需要关联集合已加载
+            project = await self.load_full_project(pid, user_id)
             await self.repo.delete(project)
         await self.session.commit()
 
@@ -249,7 +280,7 @@ class NovelService:
         )
         self.session.add(convo)
         await self.session.commit()
-        await self._touch_project(project_id)
+        await self.touch_project(project_id)
 
     # ------------------------------------------------------------------
     # 蓝图管理
@@ -315,7 +346,7 @@ class NovelService:
             )
 
         await self.session.commit()
-        await self._touch_project(project_id)
+        await self.touch_project(project_id)
 
     async def patch_blueprint(self, project_id: str, patch: Dict) -> None:
         blueprint = await self.session.get(NovelBlueprint, project_id)
@@ -378,7 +409,7 @@ class NovelService:
                     )
                 )
         await self.session.commit()
-        await self._touch_project(project_id)
+        await self.touch_project(project_id)
 
     # ------------------------------------------------------------------
     # 章节与版本
@@ -426,6 +457,19 @@ class NovelService:
         await self.session.flush()
         return outline
 
+    async def get_chapter(self, project_id: str, chapter_number: int) -> Optional[Chapter]:
+        """读取单个章节及其选中版本，不存在时返回 None。"""
+        stmt = (
+            select(Chapter)
+            .options(selectinload(Chapter.selected_version))
+            .where(
+                Chapter.project_id == project_id,
+                Chapter.chapter_number == chapter_number,
+            )
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().first()
+
     async def get_or_create_chapter(self, project_id: str, chapter_number: int) -> Chapter:
         stmt = (
             select(Chapter)
@@ -517,7 +561,7 @@ class NovelService:
         chapter.selected_version_id = None
         await self.session.commit()
         await self.session.refresh(chapter)
-        await self._touch_project(chapter.project_id)
+        await self.touch_project(chapter.project_id)
         return versions
 
     async def select_chapter_version(self, chapter: Chapter, version_index: int) -> ChapterVersion:
@@ -538,7 +582,7 @@ class NovelService:
         chapter.word_count = len(selected.content or "")
         await self.session.commit()
         await self.session.refresh(chapter)
-        await self._touch_project(chapter.project_id)
+        await self.touch_project(chapter.project_id)
         return selected
 
     async def add_chapter_evaluation(self, chapter: Chapter, version: Optional[ChapterVersion], feedback: str, decision: Optional[str] = None) -> None:
@@ -560,7 +604,7 @@ class NovelService:
         chapter.status = ChapterGenerationStatus.WAITING_FOR_CONFIRM.value
         await self.session.commit()
         await self.session.refresh(chapter)
-        await self._touch_project(chapter.project_id)
+        await self.touch_project(chapter.project_id)
 
     async def delete_chapters(self, project_id: str, chapter_numbers: Iterable[int]) -> None:
         await self.session.execute(
@@ -576,7 +620,7 @@ class NovelService:
             )
         )
         await self.session.commit()
-        await self._touch_project(project_id)
+        await self.touch_project(project_id)
 
     # ------------------------------------------------------------------
     # 序列化辅助
@@ -592,7 +636,7 @@ class NovelService:
         project_id: str,
         section: NovelSectionType,
     ) -> NovelSectionResponse:
-        project = await self.repo.get_by_id(project_id)
+        project = await self.repo.get_writer_context(project_id, include_selected_version=False)
         if not project:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="项目不存在")
         return self._build_section_response(project, section)
@@ -602,10 +646,71 @@ class NovelService:
         project_id: str,
         chapter_number: int,
     ) -> ChapterSchema:
-        project = await self.repo.get_by_id(project_id)
+        project = await self.repo.get_basic(project_id)
         if not project:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="项目不存在")
-        return self._build_chapter_schema(project, chapter_number)
+        return await self._load_single_chapter_schema(project, chapter_number)
+
+    async def get_project_delta(
+        self,
+        project_id: str,
+        user_id: int,
+        *,
+        chapter_numbers: Iterable[int] = (),
+        deleted_chapters: Iterable[int] = (),
+    ) -> NovelProjectDelta:
+        """构造写作操作的增量响应：只序列化变更的章节，并附带当前修订号。"""
+        project = await self.ensure_project_owner(project_id, user_id)
+        revision = await self.session.scalar(select(NovelProject.revision).where(NovelProject.id == project_id))
+        chapters = await self._load_chapter_schemas(project, chapter_numbers)
+        return NovelProjectDelta(
+            project_id=project_id,
+            revision=revision or 0,
+            chapters=chapters,
+            deleted_chapters=sorted(set(deleted_chapters)),
+        )
+
+    async def _load_single_chapter_schema(self, project: NovelProject, chapter_number: int) -> ChapterSchema:
+        """只读取目标章节的大纲、版本与评审，避免为单章详情加载整个项目。"""
+        chapters = await self._load_chapter_schemas(project, [chapter_number])
+        if not chapters:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="章节不存在")
+        return chapters[0]
+
+    async def _load_chapter_schemas(self, project: NovelProject, chapter_numbers: Iterable[int]) -> List[ChapterSchema]:
+        """批量读取指定章节的大纲、版本与评审；大纲和章节都不存在的章节号会被跳过。"""
+        numbers = sorted(set(chapter_numbers))
+        if not numbers:
+            return []
+        outlines_result = await self.session.execute(
+            select(ChapterOutline).where(
+                ChapterOutline.project_id == project.id,
+                ChapterOutline.chapter_number.in_(numbers),
+            )
+        )
+        # 写操作刚提交过，身份映射中的章节可能持有旧的版本集合，这里强制刷新
+        chapters_result = await self.session.execute(
+            select(Chapter)
+            .where(Chapter.project_id == project.id, Chapter.chapter_number.in_(numbers))
+            .options(
+                selectinload(Chapter.versions),
+                selectinload(Chapter.evaluations),
+                selectinload(Chapter.selected_version),
+            )
+            .execution_options(populate_existing=True)
+        )
+        outlines_map = {outline.chapter_number: outline for outline in outlines_result.scalars().all()}
+        chapters_map = {chapter.chapter_number: chapter for chapter in chapters_result.scalars().all()}
+        return [
+            self._build_chapter_schema(
+                project,
+                number,
+                outlines_map=outlines_map,
+                chapters_map=chapters_map,
+            )
+            for number in numbers
+            if number in outlines_map or number in chapters_map
+        ]
 
     async def _serialize_project(self, project: NovelProject) -> NovelProjectSchema:
         conversations = [
@@ -636,13 +741,15 @@ class NovelService:
             conversation_history=conversations,
             blueprint=blueprint_schema,
             chapters=chapters_schema,
+            revision=project.revision or 0,
         )
 
-    async def _touch_project(self, project_id: str) -> None:
+    async def touch_project(self, project_id: str) -> None:
+        """刷新项目更新时间并递增修订号，所有写操作提交后都应调用。"""
         await self.session.execute(
             update(NovelProject)
             .where(NovelProject.id == project_id)
-            .values(updated_at=datetime.now(timezone.utc))
+            .values(updated_at=datetime.now(timezone.utc), revision=NovelProject.revision + 1)
         )
         await self.session.commit()
 
@@ -771,8 +878,16 @@ class NovelService:
         chapters_map: Optional[Dict[int, Chapter]] = None,
         include_content: bool = True,
     ) -> ChapterSchema:
-        outlines = outlines_map or {outline.chapter_number: outline for outline in project.outlines}
-        chapters = chapters_map or {chapter.chapter_number: chapter for chapter in project.chapters}
+        outlines = (
+            outlines_map
+            if outlines_map is not None
+            else {outline.chapter_number: outline for outline in project.outlines}
+        )
+        chapters = (
+            chapters_map
+            if chapters_map is not None
+            else {chapter.chapter_number: chapter for chapter in project.chapters}
+        )
         outline = outlines.get(chapter_number)
         chapter = chapters.get(chapter_number)
 
@@ -1,38 +1,108 @@
 # AIMETA P=写作流水线编排_统一生成入口|R=上下文汇聚_生成_审查_优化|NR=不含API路由|E=PipelineOrchestrator|X=internal|A=编排器|D=fastapi,sqlalchemy|S=db,net|RD=./README.ai
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
+import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import settings
+from ..db.session import AsyncSessionLocal, release_connection
 from ..models.novel import Chapter
 from ..models.project_memory import ProjectMemory
 from ..repositories.system_config_repository import SystemConfigRepository
 from ..services.ai_review_service import AIReviewService
 from ..services.chapter_context_service import ChapterContextService
-from ..services.chapter_guardrails import ChapterGuardrails
+from ..services.chapter_repair_service import ChapterRepairService, RepairResult, RepairSpan
+from ..services.chapter_guardrails import ChapterGuardrails, StreamGuard, StreamHit
 from ..services.consistency_service import ConsistencyService, ViolationSeverity
 from ..services.enhanced_writing_flow import EnhancedWritingFlow
 from ..services.enrichment_service import EnrichmentService
-from ..services.llm_service import LLMService
+from ..services.llm_service import DeltaCallback, LLMService, StreamAborted, StreamStats
 from ..services.novel_service import NovelService
 from ..services.preview_generation_service import PreviewGenerationService
 from ..services.prompt_service import PromptService
 from ..services.self_critique_service import CritiqueDimension, SelfCritiqueService
-from ..services.post_gen_validator import PostGenValidator
+from ..services.summary_backfill_service import SummaryBackfillService
+from ..services.post_gen_validator import POV_CUES_STRONG, PostGenValidator
 from ..services.vector_store_service import VectorStoreService
 from ..services.writer_context_builder import WriterContextBuilder
+from ..utils.concurrency import ConcurrencyLimiter, gather_in_order
 from ..utils.json_utils import remove_think_tags, unwrap_markdown_json
+from ..utils.paragraphs import ParagraphText
 
 logger = logging.getLogger(__name__)
 
+# 流水线事件回调：接收阶段进度与 token 增量事件（dict），供流式接口转发
+EventSink = Callable[[Dict[str, Any]], Awaitable[None]]
+# 上下文来源：接收绑定独立会话的编排器实例，返回该来源的上下文
+ContextFetch = Callable[["PipelineOrchestrator"], Awaitable[Any]]
+# 检查点持久化回调：接收阶段名与该阶段的结果
+CheckpointSaver = Callable[[str, Any], Awaitable[None]]
+
+# 进程内共享的版本生成并发限流：全局上限 + 单用户上限
+_version_limiter = ConcurrencyLimiter(
+    settings.writer_version_concurrency_global,
+    settings.writer_version_concurrency_per_user,
+)
+
+# 优化器维度：单维度提示词（sequential 模式）及合并/补丁模式下提供给模型的关注点
+OPTIMIZER_DIMENSIONS: Dict[str, Dict[str, Any]] = {
+    "dialogue": {
+        "prompt": "optimize_dialogue",
+        "name": "对话",
+        "focus": ["角色说话方式是否有区分度", "潜台词与言外之意", "对话节奏与动作神态的配合"],
+    },
+    "environment": {
+        "prompt": "optimize_environment",
+        "name": "环境描写",
+        "focus": ["环境是否服务情绪与情节", "多感官描写", "避免大段静态堆砌"],
+    },
+    "psychology": {
+        "prompt": "optimize_psychology",
+        "name": "心理活动",
+        "focus": ["展示而非告知", "内心独白与身体反应结合", "动机与情绪变化是否清晰"],
+    },
+    "rhythm": {
+        "prompt": "optimize_rhythm",
+        "name": "节奏韵律",
+        "focus": ["长短句交替", "重要情节放慢、过渡情节加快", "段落长度与呼吸感"],
+    },
+}
+# sequential：逐维度整章改写；fused：单次改写合并全部维度；patch：只返回需改写段落的补丁
+OPTIMIZER_MODES = ("sequential", "fused", "patch")
+# 默认保持原有的逐维度改写，fused / patch 需由请求、预设或系统配置显式选择，避免已部署环境的输出悄然变化
+DEFAULT_OPTIMIZER_MODE = "sequential"
+
+
+class StageCheckpoints:
+    """生成流水线的阶段检查点，供后台任务中断后从最近完成的阶段继续。
+
+    阶段：``context``（导演脚本与各上下文来源）、``version:<i>``（第 i 个候选版本）、
+    ``review``（评审与润色后的全部版本）。``completed`` 中已有的阶段直接复用结果，
+    新完成的阶段先转换为可 JSON 序列化的数据（ORM 实例等记为 null），再交给 ``saver`` 持久化。
+    """
+
+    def __init__(self, completed: Optional[Dict[str, Any]] = None, saver: Optional[CheckpointSaver] = None):
+        self.completed: Dict[str, Any] = dict(completed or {})
+        self.saver = saver
+
+    def get(self, stage: str) -> Any:
+        return self.completed.get(stage)
+
+    async def save(self, stage: str, data: Any) -> None:
+        data = json.loads(json.dumps(data, ensure_ascii=False, default=lambda _: None))
+        self.completed[stage] = data
+        if self.saver is not None:
+            await self.saver(stage, data)
+
 
 @dataclass
 class PipelineConfig:
@@ -51,13 +121,23 @@ class PipelineConfig:
     rag_mode: str = "simple"
     enable_foreshadowing: bool = False
     enable_faction: bool = False
+    parallel_versions: bool = False
+    optimizer_mode: str = DEFAULT_OPTIMIZER_MODE
+    optimizer_dimensions: Tuple[str, ...] = tuple(OPTIMIZER_DIMENSIONS)
 
 
 class PipelineOrchestrator:
     """统一写作流水线编排器。"""
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        *,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
         self.session = session
+        # 并发生成版本时，每个版本使用独立会话，避免共享 AsyncSession
+        self.session_factory = session_factory or AsyncSessionLocal
         self.llm_service = LLMService(session)
         self.prompt_service = PromptService(session)
         self.novel_service = NovelService(session)
@@ -65,6 +145,8 @@ class PipelineOrchestrator:
         self.guardrails = ChapterGuardrails()
         self.validator = PostGenValidator()
         self._last_fallback_reason: Optional[str] = None
+        self.event_sink: Optional[EventSink] = None
+        self.checkpoints: Optional[StageCheckpoints] = None
 
     async def generate_chapter(
         self,
@@ -74,9 +156,44 @@ class PipelineOrchestrator:
         user_id: int,
         writing_notes: Optional[str] = None,
         flow_config: Optional[Dict[str, Any]] = None,
+        event_sink: Optional[EventSink] = None,
+        checkpoints: Optional[StageCheckpoints] = None,
     ) -> Dict[str, Any]:
+        self.event_sink = event_sink
+        self.checkpoints = checkpoints
+        try:
+            return await self._generate_chapter(
+                project_id=project_id,
+                chapter_number=chapter_number,
+                user_id=user_id,
+                writing_notes=writing_notes,
+                flow_config=flow_config,
+            )
+        except asyncio.CancelledError:
+            # 调用方取消（客户端断开、任务取消）：进行中的模型流已随取消关闭，这里放弃未提交的写入，
+            # 章节状态由调用方按场景处理（请求断开时复位，进程退出时任务重新排队）
+            logger.info("Chapter generation cancelled: project=%s chapter=%s", project_id, chapter_number)
+            try:
+                await self.session.rollback()
+            except Exception as exc:  # pragma: no cover - 连接已失效时由会话关闭兜底
+                logger.warning("Rollback after cancellation failed: %s", exc)
+            raise
+
+    async def _generate_chapter(
+        self,
+        *,
+        project_id: str,
+        chapter_number: int,
+        user_id: int,
+        writing_notes: Optional[str],
+        flow_config: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        # 流水线按"数据库阶段 / LLM 阶段"交替执行：数据库阶段结束时归还连接，LLM 阶段只在内存中处理，
+        # 需要读写时会话再自动取用连接。LLMService 在每次请求模型前也会归还连接（仅当会话没有未提交的改动时）。
+        # ---- 数据库阶段：加载上下文并标记章节为生成中 ----
         config = await self._resolve_config(flow_config)
-        project = await self.novel_service.ensure_project_owner(project_id, user_id)
+        # 只加载写作上下文（蓝图、大纲、各章选中版本），不拉取全部历史版本与评审
+        project = await self.novel_service.load_writer_context(project_id, user_id)
 
         outline = await self.novel_service.get_outline(project_id, chapter_number)
         if not outline:
@@ -88,6 +205,7 @@ class PipelineOrchestrator:
         chapter.status = "generating"
         await self.session.commit()
 
+        await self._emit_stage("history", "started")
         outlines_map = {item.chapter_number: item for item in project.outlines}
         history_context = await self._collect_history_context(
             project_id=project_id,
@@ -97,26 +215,50 @@ class PipelineOrchestrator:
             user_id=user_id,
         )
 
-        project_schema = await self.novel_service._serialize_project(project)
-        blueprint_dict = self._normalize_blueprint(project_schema.blueprint.model_dump())
+        blueprint_schema = self.novel_service._build_blueprint_schema(project)
+        blueprint_dict = self._normalize_blueprint(blueprint_schema.model_dump())
 
         outline_title = outline.title or f"第{outline.chapter_number}章"
         outline_summary = outline.summary or "暂无摘要"
         writing_notes = writing_notes or "无额外写作指令"
 
         all_characters = [c.get("name") for c in blueprint_dict.get("characters", []) if c.get("name")]
-
-        chapter_mission = await self._generate_chapter_mission(
-            blueprint_dict=blueprint_dict,
-            previous_summary=history_context["previous_summary"],
-            previous_tail=history_context["previous_tail"],
-            outline_title=outline_title,
-            outline_summary=outline_summary,
-            writing_notes=writing_notes,
-            introduced_characters=[],
-            all_characters=all_characters,
-            user_id=user_id,
-        )
+        await self._emit_stage("history", "finished", completed_chapters=len(history_context["completed_chapters"]))
+        await self._end_db_phase("load_context")
+
+        # ---- LLM 阶段：各上下文来源使用独立会话并发准备 ----
+        resumed_context = self._checkpoint("context")
+        if resumed_context is not None:
+            context_sources, context_latency = resumed_context["sources"], resumed_context["latency"]
+            await self._emit_stage("context", "resumed")
+        else:
+            context_sources, context_latency = await self._assemble_context(
+                config=config,
+                project_id=project_id,
+                chapter_number=chapter_number,
+                user_id=user_id,
+                outline_summary=outline_summary,
+                mission_kwargs={
+                    "blueprint_dict": blueprint_dict,
+                    "previous_summary": history_context["previous_summary"],
+                    "previous_tail": history_context["previous_tail"],
+                    "outline_title": outline_title,
+                    "outline_summary": outline_summary,
+                    "writing_notes": writing_notes,
+                    "introduced_characters": [],
+                    "all_characters": all_characters,
+                    "user_id": user_id,
+                },
+                rag_kwargs={
+                    "project_id": project_id,
+                    "outline_title": outline_title,
+                    "outline_summary": outline_summary,
+                    "writing_notes": writing_notes,
+                    "user_id": user_id,
+                },
+            )
+            await self._save_checkpoint("context", {"sources": context_sources, "latency": context_latency})
+        chapter_mission = context_sources.get("mission")
 
         allowed_new_characters = chapter_mission.get("allowed_new_characters", []) if chapter_mission else []
 
@@ -143,31 +285,20 @@ class PipelineOrchestrator:
             len(forbidden_characters),
         )
 
+        enhanced_context = context_sources.get("enhanced_context")
+        # 增强上下文已在汇聚阶段并发准备；这里只保留绑定主会话的实例，供提示词拼装与六维审查使用
         enhanced_flow = None
-        enhanced_context = None
-        if config.enable_constitution or config.enable_persona or config.enable_foreshadowing or config.enable_faction:
+        if self._enhanced_context_enabled(config):
             enhanced_flow = EnhancedWritingFlow(self.session, self.llm_service, self.prompt_service)
-            enhanced_context = await enhanced_flow.prepare_writing_context(
-                project_id=project_id,
-                chapter_number=chapter_number,
-                chapter_outline=outline_summary,
-            )
 
-        project_memory_text = await self._get_project_memory_text(project_id)
+        project_memory_text = context_sources.get("project_memory")
         memory_context = None
 
         outline_constraints = getattr(config, "outline_constraints", {}) or {}
 
-        rag_context = None
+        rag_context = context_sources.get("rag")
         rag_stats = None
         if config.enable_rag:
-            rag_context = await self._get_rag_context(
-                project_id=project_id,
-                outline_title=outline_title,
-                outline_summary=outline_summary,
-                writing_notes=writing_notes,
-                user_id=user_id,
-            )
             rag_stats = {
                 "mode": "simple",
                 "chunks": len(rag_context.get("chunks", [])) if rag_context else 0,
@@ -179,6 +310,7 @@ class PipelineOrchestrator:
             writer_prompt = await self.prompt_service.get_prompt("writing")
         if not writer_prompt:
             raise HTTPException(status_code=500, detail="缺少写作提示词，请联系管理员配置")
+        await self._end_db_phase("writer_prompt")
 
         prompt_sections = self._build_prompt_sections(
             writer_blueprint=writer_blueprint,
@@ -215,33 +347,122 @@ class PipelineOrchestrator:
             chapter_mission=chapter_mission,
         )
 
-        versions: List[Dict[str, Any]] = []
-        for idx in range(version_count):
-            style_hint = version_style_hints[idx] if idx < len(version_style_hints) else None
-            generated = await self._generate_single_version(
-                index=idx,
-                prompt_input=prompt_input,
-                writer_prompt=writer_prompt,
-                style_hint=style_hint,
+        # ---- LLM 阶段：生成版本与评审、润色，期间不占用连接 ----
+        reviewed = self._checkpoint("review")
+        if reviewed is not None:
+            versions = reviewed["versions"]
+            best_version_index = reviewed["best_version_index"]
+            review_summaries = reviewed["review_summaries"]
+            await self._emit_stage("review", "resumed", best_version_index=best_version_index)
+        else:
+            versions = await self._generate_versions(
+                version_count=version_count,
+                version_style_hints=version_style_hints,
+                user_id=user_id,
+                config=config,
+                version_kwargs={
+                    "prompt_input": prompt_input,
+                    "writer_prompt": writer_prompt,
+                    "project_id": project_id,
+                    "chapter_number": chapter_number,
+                    "outline_title": outline_title,
+                    "outline_summary": outline_summary,
+                    "chapter_mission": chapter_mission,
+                    "forbidden_characters": forbidden_characters,
+                    "allowed_new_characters": allowed_new_characters,
+                    "writer_blueprint": writer_blueprint,
+                    "memory_context": memory_context,
+                    "enhanced_context": enhanced_context,
+                    "writing_context": writing_context,
+                    "outline_constraints": outline_constraints,
+                },
+            )
+            best_version_index, review_summaries = await self._review_versions(
+                versions,
+                config=config,
+                enhanced_flow=enhanced_flow,
                 project_id=project_id,
                 chapter_number=chapter_number,
                 outline_title=outline_title,
-                outline_summary=outline_summary,
                 chapter_mission=chapter_mission,
-                forbidden_characters=forbidden_characters,
-                allowed_new_characters=allowed_new_characters,
-                user_id=user_id,
+                previous_summary=history_context["previous_summary"],
                 writer_blueprint=writer_blueprint,
-                memory_context=memory_context,
-                enhanced_context=enhanced_context,
-                config=config,
-                writing_context=writing_context,
-                outline_constraints=outline_constraints,
+                user_id=user_id,
             )
-            if generated:
-                # Keep only the latest attempt per version; retry history is stored in metadata.
-                versions.append(generated[-1])
+            await self._save_checkpoint(
+                "review",
+                {"versions": versions, "best_version_index": best_version_index, "review_summaries": review_summaries},
+            )
+
+        contents = [v.get("content", "") for v in versions]
+        metadata: List[Dict[str, Any]] = []
+        review_payloads: List[List[Dict[str, Any]]] = []
+        for v in versions:
+            meta = v.get("metadata") or {}
+            meta["lineage"] = v.get("lineage")
+            if v.get("validation"):
+                meta["validation"] = v.get("validation")
+            metadata.append(meta)
+            review_payloads.append([{"review_type": "validator", "payload": v.get("validation")}])
 
+        # ---- 数据库阶段：会话重新取用连接，写入版本并提交 ----
+        await self._emit_stage("persist", "started")
+        versions_models = await self.novel_service.replace_chapter_versions(
+            chapter, contents, metadata, reviews=review_payloads
+        )
+        await self._emit_stage("persist", "finished")
+
+        variants = []
+        for idx, version_model in enumerate(versions_models):
+            variant = {
+                "index": idx,
+                "version_id": version_model.id,
+                "content": versions[idx].get("content", ""),
+                "metadata": versions[idx].get("metadata"),
+                "validation": versions[idx].get("validation"),
+            }
+            variants.append(variant)
+
+        return {
+            "project_id": project_id,
+            "chapter_number": chapter_number,
+            "preset": config.preset,
+            "best_version_index": best_version_index,
+            "variants": variants,
+            "review_summaries": review_summaries,
+            "debug_metadata": {
+                "context_stats": writing_context.get("context_stats"),
+                "requested_preset": flow_config.get("preset", "basic") if flow_config else "basic",
+                "effective_preset": config.preset,
+                "fallback_reason": getattr(self, "_last_fallback_reason", None),
+                "version_count": version_count,
+                "parallel_versions": config.parallel_versions,
+                "stages": self._build_stage_flags(config),
+                "retrieval_stats": rag_stats,
+                "context_latency": context_latency,
+            },
+        }
+
+    async def _review_versions(
+        self,
+        versions: List[Dict[str, Any]],
+        *,
+        config: PipelineConfig,
+        enhanced_flow: Optional[EnhancedWritingFlow],
+        project_id: str,
+        chapter_number: int,
+        outline_title: str,
+        chapter_mission: Optional[dict],
+        previous_summary: Optional[str],
+        writer_blueprint: Dict[str, Any],
+        user_id: int,
+    ) -> Tuple[int, Dict[str, Any]]:
+        """评审候选版本并选出最佳版本，再依次执行启用的审查与润色阶段（原地改写最佳版本的正文）。
+
+        Returns:
+            (最佳版本序号, 各阶段评审摘要)
+        """
+        await self._emit_stage("review", "started", versions=len(versions))
         best_version_index, ai_review_result = await self._run_ai_review(
             versions=versions,
             chapter_mission=chapter_mission,
@@ -262,99 +483,85 @@ class PipelineOrchestrator:
             best_version_index = valid_indices[0]
         elif not valid_indices and versions:
             best_version_index = 0
+        await self._emit_stage("review", "finished", best_version_index=best_version_index)
 
         if versions:
             best_version = versions[best_version_index]
             best_content = best_version["content"]
 
             if enhanced_flow and config.enable_six_dimension:
+                await self._emit_stage("six_dimension", "started")
                 review_result = await enhanced_flow.post_generation_review(
                     project_id=project_id,
                     chapter_number=chapter_number,
                     chapter_title=outline_title,
                     chapter_content=best_content,
                     chapter_plan=json.dumps(chapter_mission, ensure_ascii=False) if chapter_mission else None,
-                    previous_summary=history_context["previous_summary"],
+                    previous_summary=previous_summary,
                 )
                 review_summaries["enhanced_review"] = review_result
+                await self._emit_stage("six_dimension", "finished")
 
             if config.enable_self_critique:
+                await self._emit_stage("self_critique", "started")
                 best_content, critique_summary = await self._run_self_critique(
                     best_content,
                     user_id=user_id,
                     context={
                         "character_profiles": json.dumps(writer_blueprint.get("characters", []), ensure_ascii=False),
-                        "previous_summary": history_context["previous_summary"],
+                        "previous_summary": previous_summary,
                     },
                 )
                 review_summaries["self_critique"] = critique_summary
+                await self._emit_stage("self_critique", "finished")
 
             if config.enable_consistency:
+                await self._emit_stage("consistency", "started")
                 best_content, consistency_report = await self._run_consistency_check(
                     project_id=project_id,
                     chapter_text=best_content,
                     user_id=user_id,
                 )
                 review_summaries["consistency"] = consistency_report
+                await self._emit_stage("consistency", "finished")
 
             if config.enable_optimizer:
-                best_content, optimizer_report = await self._run_optimizer(best_content, user_id=user_id)
+                await self._emit_stage("optimizer", "started")
+                best_content, optimizer_report = await self._run_optimizer(
+                    best_content,
+                    user_id=user_id,
+                    mode=config.optimizer_mode,
+                    dimensions=config.optimizer_dimensions,
+                )
                 review_summaries["optimizer"] = optimizer_report
+                await self._emit_stage("optimizer", "finished")
 
             if config.enable_enrichment:
+                await self._emit_stage("enrichment", "started")
                 best_content, enrichment_report = await self._run_enrichment(
                     best_content,
                     user_id=user_id,
                 )
                 if enrichment_report:
                     review_summaries["enrichment"] = enrichment_report
+                await self._emit_stage("enrichment", "finished")
 
             best_version["content"] = best_content
             best_version.setdefault("metadata", {})["review_summaries"] = review_summaries
 
-        contents = [v.get("content", "") for v in versions]
-        metadata: List[Dict[str, Any]] = []
-        review_payloads: List[List[Dict[str, Any]]] = []
-        for v in versions:
-            meta = v.get("metadata") or {}
-            meta["lineage"] = v.get("lineage")
-            if v.get("validation"):
-                meta["validation"] = v.get("validation")
-            metadata.append(meta)
-            review_payloads.append([{"review_type": "validator", "payload": v.get("validation")}])
+        return best_version_index, review_summaries
 
-        versions_models = await self.novel_service.replace_chapter_versions(
-            chapter, contents, metadata, reviews=review_payloads
-        )
+    def _checkpoint(self, stage: str) -> Any:
+        return self.checkpoints.get(stage) if self.checkpoints is not None else None
 
-        variants = []
-        for idx, version_model in enumerate(versions_models):
-            variant = {
-                "index": idx,
-                "version_id": version_model.id,
-                "content": versions[idx].get("content", ""),
-                "metadata": versions[idx].get("metadata"),
-                "validation": versions[idx].get("validation"),
-            }
-            variants.append(variant)
+    async def _save_checkpoint(self, stage: str, data: Any) -> None:
+        if self.checkpoints is not None:
+            await self.checkpoints.save(stage, data)
 
-        return {
-            "project_id": project_id,
-            "chapter_number": chapter_number,
-            "preset": config.preset,
-            "best_version_index": best_version_index,
-            "variants": variants,
-            "review_summaries": review_summaries,
-            "debug_metadata": {
-                "context_stats": writing_context.get("context_stats"),
-                "requested_preset": flow_config.get("preset", "basic") if flow_config else "basic",
-                "effective_preset": config.preset,
-                "fallback_reason": getattr(self, "_last_fallback_reason", None),
-                "version_count": version_count,
-                "stages": self._build_stage_flags(config),
-                "retrieval_stats": rag_stats,
-            },
-        }
+    async def _end_db_phase(self, phase: str) -> None:
+        """结束一个数据库阶段：提交主会话的事务，在接下来的 LLM 等待期间把连接还给连接池。"""
+        await release_connection(self.session)
+        logger.debug("Pipeline DB phase finished: phase=%s", phase)
 
     async def _resolve_config(self, flow_config: Optional[Dict[str, Any]]) -> PipelineConfig:
         flow_config = flow_config or {}
@@ -362,6 +569,7 @@ class PipelineOrchestrator:
 
         config = PipelineConfig(preset=preset)
         config.version_count = await self._resolve_version_count(flow_config.get("versions"))
+        config.parallel_versions = bool(settings.writer_parallel_versions)
         fallback_reason = None
         outline_constraints = flow_config.get("outline_constraints") if flow_config else {}
 
@@ -387,6 +595,7 @@ class PipelineOrchestrator:
             "enable_enrichment",
             "async_finalize",
             "enable_rag",
+            "parallel_versions",
         ):
             if key in flow_config and flow_config[key] is not None:
                 setattr(config, key, bool(flow_config[key]))
@@ -402,6 +611,14 @@ class PipelineOrchestrator:
             config.enable_six_dimension = False
             config.enable_self_critique = False
 
+        if config.enable_optimizer:
+            config.optimizer_mode = await self._resolve_optimizer_mode(preset, flow_config.get("optimizer_mode"))
+            requested_dimensions = flow_config.get("optimizer_dimensions")
+            if requested_dimensions:
+                config.optimizer_dimensions = tuple(
+                    dimension for dimension in OPTIMIZER_DIMENSIONS if dimension in requested_dimensions
+                )
+
         self._last_fallback_reason = fallback_reason
 
         # attach outline constraints for downstream context
@@ -409,6 +626,21 @@ class PipelineOrchestrator:
 
         return config
 
+    async def _resolve_optimizer_mode(self, preset: str, requested_mode: Optional[str]) -> str:
+        """优化器模式：请求指定 > 系统配置 writer.optimizer_mode.<preset> > writer.optimizer_mode > 默认。"""
+        candidates = [requested_mode]
+        repo = SystemConfigRepository(self.session)
+        values = await repo.get_values([f"writer.optimizer_mode.{preset}", "writer.optimizer_mode"])
+        candidates.extend(values.values())
+        for candidate in candidates:
+            if not candidate:
+                continue
+            mode = str(candidate).strip().lower()
+            if mode in OPTIMIZER_MODES:
+                return mode
+            logger.warning("未知的优化器模式 %s，已忽略", candidate)
+        return DEFAULT_OPTIMIZER_MODE
+
     async def _resolve_version_count(self, requested_count: Optional[int]) -> int:
         if requested_count:
             try:
@@ -419,14 +651,9 @@ class PipelineOrchestrator:
 
         repo = SystemConfigRepository(self.session)
         for key in ("writer.chapter_versions", "writer.version_count"):
-            record = await repo.get_by_key(key)
-            if record and record.value:
-                try:
-                    val = int(record.value)
-                    if val >= 1:
-                        return val
-                except ValueError:
-                    pass
+            val = await repo.get_int(key)
+            if val is not None and val >= 1:
+                return val
 
         for env in ("WRITER_CHAPTER_VERSION_COUNT", "WRITER_CHAPTER_VERSIONS", "WRITER_VERSION_COUNT"):
             v = os.getenv(env)
@@ -449,8 +676,16 @@ class PipelineOrchestrator:
         chapters: List[Chapter],
         user_id: int,
     ) -> Dict[str, Any]:
+        """汇总前文章节的摘要与上一章结尾。
+
+        只读取已有的 ``real_summary``，不在生成请求内同步补摘要。缺失摘要的章节
+        （如刚导入、回填队列尚未处理完）按以下顺序退回，并补登记到回填队列：
+        1. 章节大纲中的 summary（计划内容，与正文可能有出入）；
+        2. 正文开头节选（``_extract_head_excerpt``）。
+        """
         completed_summaries = []
         completed_chapters = []
+        missing_summaries: List[int] = []
         latest_prev_number = -1
         previous_summary_text = ""
         previous_tail_excerpt = ""
@@ -460,39 +695,58 @@ class PipelineOrchestrator:
                 continue
             if existing.selected_version is None or not existing.selected_version.content:
                 continue
-            if not existing.real_summary:
-                summary = await self.llm_service.get_summary(
-                    existing.selected_version.content,
-                    temperature=0.15,
-                    user_id=user_id,
-                    timeout=180.0,
-                )
-                existing.real_summary = remove_think_tags(summary)
-                await self.session.commit()
+            outline = outlines_map.get(existing.chapter_number)
+            summary = existing.real_summary
+            if not summary:
+                missing_summaries.append(existing.chapter_number)
+                outline_summary = (outline.summary or "").strip() if outline else ""
+                summary = outline_summary or self._extract_head_excerpt(existing.selected_version.content)
 
             completed_chapters.append(
                 {
                     "chapter_number": existing.chapter_number,
-                    "title": outlines_map.get(existing.chapter_number).title
-                    if outlines_map.get(existing.chapter_number)
-                    else f"第{existing.chapter_number}章",
-                    "summary": existing.real_summary,
+                    "title": outline.title if outline else f"第{existing.chapter_number}章",
+                    "summary": summary,
                 }
             )
-            completed_summaries.append(existing.real_summary or "")
+            completed_summaries.append(summary)
 
             if existing.chapter_number > latest_prev_number:
                 latest_prev_number = existing.chapter_number
-                previous_summary_text = existing.real_summary or ""
+                previous_summary_text = summary
                 previous_tail_excerpt = self._extract_tail_excerpt(existing.selected_version.content)
 
+        if missing_summaries:
+            logger.info(
+                "前文摘要缺失，使用大纲/正文节选代替并登记回填: project=%s chapters=%d",
+                project_id,
+                len(missing_summaries),
+            )
+            try:
+                await SummaryBackfillService(self.session).enqueue_missing(
+                    project_id, missing_summaries, user_id=user_id
+                )
+            except Exception as exc:  # noqa: BLE001 - 登记失败不影响本次生成
+                logger.warning("登记摘要回填任务失败: %s", exc)
+                await self.session.rollback()
+
         return {
             "completed_chapters": completed_chapters,
             "completed_summaries": completed_summaries,
             "previous_summary": previous_summary_text or "暂无（这是第一章）",
             "previous_tail": previous_tail_excerpt or "暂无（这是第一章）",
+            "missing_summaries": missing_summaries,
         }
 
+    @staticmethod
+    def _extract_head_excerpt(text: Optional[str], limit: int = 300) -> str:
+        if not text:
+            return ""
+        stripped = text.strip()
+        if len(stripped) <= limit:
+            return stripped
+        return stripped[:limit] + "……"
+
     @staticmethod
     def _extract_tail_excerpt(text: Optional[str], limit: int = 500) -> str:
         if not text:
@@ -512,6 +766,98 @@ class PipelineOrchestrator:
                     relation["to"] = relation.pop("character_to")
         return blueprint_dict
 
+    @staticmethod
+    def _enhanced_context_enabled(config: PipelineConfig) -> bool:
+        return bool(
+            config.enable_constitution or config.enable_persona or config.enable_foreshadowing or config.enable_faction
+        )
+
+    async def _assemble_context(
+        self,
+        *,
+        config: PipelineConfig,
+        project_id: str,
+        chapter_number: int,
+        user_id: int,
+        outline_summary: str,
+        mission_kwargs: Dict[str, Any],
+        rag_kwargs: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """并发汇聚写作前的上下文来源，返回 (各来源结果, 各来源耗时与状态)。
+
+        导演脚本、增强上下文、项目记忆与 RAG 互不依赖，各自使用独立会话并发执行；
+        单个来源超时或失败时以空结果降级，不阻塞其他来源。
+        """
+        sources: Dict[str, Tuple[float, ContextFetch, Any]] = {
+            "mission": (
+                settings.writer_context_mission_timeout,
+                lambda worker: worker._generate_chapter_mission(**mission_kwargs),
+                None,
+            ),
+        }
+        if self._enhanced_context_enabled(config):
+            sources["enhanced_context"] = (
+                settings.writer_context_enhanced_timeout,
+                lambda worker: EnhancedWritingFlow(
+                    worker.session, worker.llm_service, worker.prompt_service
+                ).prepare_writing_context(
+                    project_id=project_id,
+                    chapter_number=chapter_number,
+                    chapter_outline=outline_summary,
+                ),
+                None,
+            )
+        sources["project_memory"] = (
+            settings.writer_context_memory_timeout,
+            lambda worker: worker._get_project_memory_text(project_id),
+            None,
+        )
+        if config.enable_rag:
+            sources["rag"] = (
+                settings.writer_context_rag_timeout,
+                lambda worker: worker._get_rag_context(**rag_kwargs),
+                {"chunks": [], "summaries": []},
+            )
+
+        async def run_source(name: str, timeout: float, fetch: ContextFetch, default: Any) -> Tuple[Any, Dict[str, Any]]:
+            async def fetch_with_session() -> Any:
+                async with self.session_factory() as source_session:
+                    worker = type(self)(source_session, session_factory=self.session_factory)
+                    return await fetch(worker)
+
+            await self._emit_stage(name, "started")
+            started = time.perf_counter()
+            result, status = default, "ok"
+            try:
+                result = await asyncio.wait_for(fetch_with_session(), timeout=timeout)
+            except asyncio.TimeoutError:
+                status = "timeout"
+                logger.warning("上下文来源超时，降级继续: source=%s timeout=%.1fs", name, timeout)
+            except Exception as exc:  # noqa: BLE001 - 单个来源失败不应中断生成
+                status = "failed"
+                logger.warning("上下文来源失败，降级继续: source=%s error=%s", name, exc)
+            report = {"status": status, "latency_ms": int((time.perf_counter() - started) * 1000)}
+            await self._emit_stage(
+                name,
+                "finished",
+                available=result is not None,
+                source_status=status,
+                latency_ms=report["latency_ms"],
+            )
+            return result, report
+
+        names = list(sources)
+        outcomes = await gather_in_order([run_source(name, *sources[name]) for name in names])
+        results = {name: outcome[0] for name, outcome in zip(names, outcomes)}
+        latency = {name: outcome[1] for name, outcome in zip(names, outcomes)}
+        logger.info(
+            "Pipeline context assembled: project=%s chapter=%s latency=%s",
+            project_id,
+            chapter_number,
+            {name: report["latency_ms"] for name, report in latency.items()},
+        )
+        return results, latency
+
     async def _generate_chapter_mission(
         self,
         *,
@@ -801,6 +1147,71 @@ class PipelineOrchestrator:
             return None
         return chapter_mission.get("pov") or chapter_mission.get("pov_character")
 
+    async def _generate_versions(
+        self,
+        *,
+        version_count: int,
+        version_style_hints: List[str],
+        user_id: int,
+        config: PipelineConfig,
+        version_kwargs: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """生成全部候选版本，结果按版本序号排列，保证 best_version_index 语义不变。"""
+
+        def style_hint_for(idx: int) -> Optional[str]:
+            return version_style_hints[idx] if idx < len(version_style_hints) else None
+
+        def resumed_version(idx: int) -> Optional[List[Dict[str, Any]]]:
+            return self._checkpoint(f"version:{idx}")
+
+        async def save_version(idx: int, generated: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # 检查点只保留最终采用的那次尝试
+            await self._save_checkpoint(f"version:{idx}", generated[-1:])
+            return generated
+
+        generated_list: List[List[Dict[str, Any]]] = []
+        if not config.parallel_versions or version_count <= 1:
+            for idx in range(version_count):
+                resumed = resumed_version(idx)
+                if resumed is not None:
+                    await self._emit("version_resumed", version=idx)
+                    generated_list.append(resumed)
+                    continue
+                generated = await self._generate_single_version(
+                    index=idx,
+                    style_hint=style_hint_for(idx),
+                    user_id=user_id,
+                    config=config,
+                    **version_kwargs,
+                )
+                generated_list.append(await save_version(idx, generated))
+        else:
+
+            async def run_version(idx: int) -> List[Dict[str, Any]]:
+                resumed = resumed_version(idx)
+                if resumed is not None:
+                    await self._emit("version_resumed", version=idx)
+                    return resumed
+                # 每个版本独立完成 写作 → 护栏 → 校验 → 重试 链路，并使用独立会话
+                async with _version_limiter.slot(user_id):
+                    async with self.session_factory() as version_session:
+                        worker = type(self)(version_session, session_factory=self.session_factory)
+                        worker.event_sink = self.event_sink
+                        generated = await worker._generate_single_version(
+                            index=idx,
+                            style_hint=style_hint_for(idx),
+                            user_id=user_id,
+                            config=config,
+                            **version_kwargs,
+                        )
+                return await save_version(idx, generated)
+
+            logger.info("Generating %d versions concurrently for user %s", version_count, user_id)
+            generated_list = await gather_in_order([run_version(idx) for idx in range(version_count)])
+
+        # Keep only the latest attempt per version; retry history is stored in metadata.
+        return [generated[-1] for generated in generated_list if generated]
+
     async def _generate_single_version(
         self,
         *,
@@ -829,6 +1240,11 @@ class PipelineOrchestrator:
             "pipeline": {"preset": config.preset},
         }
         metadata["validation"] = {"attempts": []}
+        await self._emit("version_started", version=index)
+
+        final_prompt_input = prompt_input
+        if style_hint:
+            final_prompt_input += f"\n\n[版本风格提示]\n{style_hint}"
 
         content = ""
         if config.enable_preview:
@@ -845,19 +1261,19 @@ class PipelineOrchestrator:
             )
             metadata["preview"] = preview_meta
 
+        stream_aborts: List[Dict[str, Any]] = []
         if not content:
-            final_prompt_input = prompt_input
-            if style_hint:
-                final_prompt_input += f"\n\n[版本风格提示]\n{style_hint}"
-
-            response = await self.llm_service.get_llm_response(
-                system_prompt=writer_prompt,
-                conversation_history=[{"role": "user", "content": final_prompt_input}],
-                temperature=0.9,
+            stream_stats = StreamStats()
+            response, stream_aborts = await self._write_with_stream_guard(
+                index=index,
+                writer_prompt=writer_prompt,
+                prompt_input=final_prompt_input,
+                forbidden_characters=forbidden_characters,
+                writing_context=writing_context,
                 user_id=user_id,
-                timeout=600.0,
-                response_format=None,
+                stats=stream_stats,
             )
+            metadata["continuation"] = self._continuation_info(stream_stats)
             cleaned = remove_think_tags(response)
             content = unwrap_markdown_json(cleaned)
 
@@ -875,12 +1291,29 @@ class PipelineOrchestrator:
                 for v in guardrail_result.violations
             ]
             violations_text = self.guardrails.format_violations_for_rewrite(guardrail_result)
-            content = await self._rewrite_with_guardrails(
-                original_text=content,
-                chapter_mission=chapter_mission,
-                violations_text=violations_text,
-                user_id=user_id,
-            )
+            spans = [
+                RepairSpan(v.position, v.end, v.description)
+                for v in guardrail_result.violations
+                if v.position is not None
+            ]
+            repair = None
+            if len(spans) == len(guardrail_result.violations):
+                repair = await self._repair_locally(content, spans, user_id=user_id)
+            if repair:
+                content = repair.content
+                guardrail_metadata["repair"] = {
+                    "mode": "local",
+                    "paragraphs": repair.paragraphs,
+                    "repaired": repair.repaired,
+                }
+            else:
+                content = await self._rewrite_with_guardrails(
+                    original_text=content,
+                    chapter_mission=chapter_mission,
+                    violations_text=violations_text,
+                    user_id=user_id,
+                )
+                guardrail_metadata["repair"] = {"mode": "full"}
 
         parsed_json = None
         extracted_text = None
@@ -920,6 +1353,7 @@ class PipelineOrchestrator:
                 "generation_attempt": 0,
                 "retry_reason_codes": [err.code for err in validation_result.errors if err.severity == "BLOCK"],
                 "retry_directive": validation_result.retry_directive,
+                "stream_aborts": stream_aborts,
             },
             "validation": {
                 "ok": validation_result.ok,
@@ -932,17 +1366,37 @@ class PipelineOrchestrator:
         variants.append(base_variant)
 
         if not validation_result.ok and validation_result.action == "retry":
-            retry_prompt = final_prompt_input + "\n\n[修正指令]\n" + (validation_result.retry_directive or "")
-            response_retry = await self.llm_service.get_llm_response(
-                system_prompt=writer_prompt,
-                conversation_history=[{"role": "user", "content": retry_prompt}],
-                temperature=0.85,
-                user_id=user_id,
-                timeout=600.0,
-                response_format=None,
-            )
-            cleaned_retry = remove_think_tags(response_retry)
-            retry_content = unwrap_markdown_json(cleaned_retry)
+            # 阻断性错误都带有位置时先尝试只重写受影响段落，失败或范围过大再整章重新生成
+            blocking = [err for err in validation_result.errors if err.severity == "BLOCK"]
+            repair = None
+            if blocking and all(err.spans for err in blocking):
+                spans = [RepairSpan(start, end, err.message) for err in blocking for start, end in err.spans]
+                repair = await self._repair_locally(
+                    final_content,
+                    spans,
+                    user_id=user_id,
+                    instructions=validation_result.retry_directive,
+                )
+            await self._emit("version_retry", version=index, attempt=1, mode="local" if repair else "full")
+            if repair:
+                retry_content = repair.content
+                repair_info = {"mode": "local", "paragraphs": repair.paragraphs, "repaired": repair.repaired}
+            else:
+                retry_prompt = final_prompt_input + "\n\n[修正指令]\n" + (validation_result.retry_directive or "")
+                retry_stats = StreamStats()
+                response_retry = await self.llm_service.get_llm_response(
+                    system_prompt=writer_prompt,
+                    conversation_history=[{"role": "user", "content": retry_prompt}],
+                    temperature=0.85,
+                    user_id=user_id,
+                    timeout=600.0,
+                    response_format=None,
+                    on_delta=self._token_forwarder(index, attempt=1),
+                    stats=retry_stats,
+                )
+                cleaned_retry = remove_think_tags(response_retry)
+                retry_content = unwrap_markdown_json(cleaned_retry)
+                repair_info = {"mode": "full", "continuation": self._continuation_info(retry_stats)}
             retry_result = self.validator.validate(retry_content, context=ctx)
             validation_attempts.append(
                 {
@@ -962,6 +1416,7 @@ class PipelineOrchestrator:
                     "generation_attempt": 1,
                     "retry_reason_codes": [err.code for err in validation_result.errors if err.severity == "BLOCK"],
                     "retry_directive": validation_result.retry_directive,
+                    "repair": repair_info,
                 },
                 "validation": {
                     "ok": retry_result.ok,
@@ -979,9 +1434,126 @@ class PipelineOrchestrator:
             "action": validation_result.action,
         }
         metadata["validation"]["final_status"] = final_attempt
+        await self._emit(
+            "version_finished",
+            version=index,
+            attempts=len(variants),
+            validation_ok=bool(final_attempt.get("ok")),
+            chars=len(variants[-1].get("content") or ""),
+        )
 
         return variants
 
+    async def _write_with_stream_guard(
+        self,
+        *,
+        index: int,
+        writer_prompt: str,
+        prompt_input: str,
+        forbidden_characters: List[str],
+        writing_context: Dict[str, Any],
+        user_id: int,
+        stats: Optional[StreamStats] = None,
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        生成章节正文；流式过程中命中禁止角色名或强全知视角 cue 时立即中止上游请求，
+        带修正指令重新生成。
+
+        重新生成次数用尽后的最后一次不再中止，完整正文交由后续护栏检查做局部修复。
+
+        ``stats`` 记录最终成功那次调用的续写轮数等统计。
+
+        Returns:
+            (模型原始输出, 每次中止的记录)
+        """
+        max_restarts = settings.writer_stream_guard_max_restarts if settings.writer_stream_guard_enabled else 0
+        aborts: List[Dict[str, Any]] = []
+        directives: List[str] = []
+        while True:
+            guard = self._build_stream_guard(forbidden_characters, writing_context) if len(aborts) < max_restarts else None
+            prompt = prompt_input
+            if directives:
+                prompt += "\n\n[修正指令]\n" + "\n".join(directives)
+            try:
+                return await self.llm_service.get_llm_response(
+                    system_prompt=writer_prompt,
+                    conversation_history=[{"role": "user", "content": prompt}],
+                    temperature=0.9,
+                    user_id=user_id,
+                    timeout=600.0,
+                    response_format=None,
+                    on_delta=self._token_forwarder(index, attempt=0),
+                    stream_guard=guard.feed if guard is not None else None,
+                    stats=stats,
+                ), aborts
+            except StreamAborted as exc:
+                if stats is not None:
+                    stats.continuation_rounds, stats.truncated = 0, False
+                hit: StreamHit = exc.hit
+                aborts.append(
+                    {
+                        "attempt": len(aborts),
+                        "type": hit.type,
+                        "text": hit.text,
+                        "offset": hit.offset,
+                        "partial_chars": len(exc.partial),
+                        # 下一次是否仍受流式护栏约束；否则生成完整正文后走局部修复
+                        "guarded_restart": len(aborts) + 1 < max_restarts,
+                    }
+                )
+                directive = self._stream_guard_directive(hit)
+                if directive not in directives:
+                    directives.append(directive)
+                logger.info(
+                    "流式护栏中止生成: version=%s type=%s text=%s offset=%d",
+                    index,
+                    hit.type,
+                    hit.text,
+                    hit.offset,
+                )
+                # 已推送的 token 作废，前端据此清空该版本的流式内容
+                await self._emit("version_aborted", version=index, offset=hit.offset, reason=hit.type)
+
+    @staticmethod
+    def _continuation_info(stats: StreamStats) -> Dict[str, Any]:
+        return {"rounds": stats.continuation_rounds, "truncated": stats.truncated}
+
+    @staticmethod
+    def _build_stream_guard(forbidden_characters: List[str], writing_context: Dict[str, Any]) -> Optional[StreamGuard]:
+        """禁止角色名始终检查；强全知视角 cue 与生成后校验一致，仅在不允许切换视角时检查。"""
+        pov = writing_context.get("pov") or {}
+        cues = () if pov.get("pov_switch_allowed") else POV_CUES_STRONG
+        guard = StreamGuard(forbidden_characters or [], omniscient_cues=cues)
+        return guard if guard.enabled else None
+
+    @staticmethod
+    def _stream_guard_directive(hit: StreamHit) -> str:
+        if hit.type == "forbidden_name":
+            return f"本章禁止出现角色「{hit.text}」，不得提及其名字，也不得让其登场。"
+        return f"严格保持视角角色的限知视角，不得使用「{hit.text}」等全知视角写法。"
+
+    async def _emit(self, event: str, **payload: Any) -> None:
+        """向事件回调推送一条事件；回调异常只记录日志，不影响生成流程。"""
+        if self.event_sink is None:
+            return
+        try:
+            await self.event_sink({"event": event, **payload})
+        except Exception as exc:  # pragma: no cover - 回调方异常不应中断流水线
+            logger.debug("Pipeline event sink failed: event=%s error=%s", event, exc)
+
+    async def _emit_stage(self, stage: str, status: str, **payload: Any) -> None:
+        await self._emit("stage", stage=stage, status=status, **payload)
+
+    def _token_forwarder(self, index: int, *, attempt: int) -> Optional[DeltaCallback]:
+        """为指定版本构造 token 增量转发回调；未订阅事件时返回 None。"""
+        if self.event_sink is None:
+            return None
+
+        async def forward(delta: str) -> None:
+            await self._emit("token", version=index, attempt=attempt, delta=delta)
+
+        return forward
+
     async def _generate_with_preview(
         self,
         *,
@@ -1021,6 +1593,24 @@ class PipelineOrchestrator:
 
         return preview_result.get("full_chapter", ""), preview_result
 
+    async def _repair_locally(
+        self,
+        content: str,
+        spans: List[RepairSpan],
+        *,
+        user_id: int,
+        instructions: Optional[str] = None,
+    ) -> Optional[RepairResult]:
+        """只重写违规所在段落；正文是 JSON 包装（段落不可直接拼接）或无法局部修复时返回 None。"""
+        if not spans or content.lstrip().startswith(("{", "[")):
+            return None
+        return await ChapterRepairService(self.llm_service).repair(
+            content,
+            spans,
+            user_id=user_id,
+            instructions=instructions,
+        )
+
     async def _rewrite_with_guardrails(
         self,
         *,
@@ -1148,7 +1738,12 @@ class PipelineOrchestrator:
         user_id: int,
         context: Optional[Dict[str, Any]] = None,
     ) -> Tuple[str, Dict[str, Any]]:
-        service = SelfCritiqueService(self.session, self.llm_service, self.prompt_service)
+        service = SelfCritiqueService(
+            self.session,
+            self.llm_service,
+            self.prompt_service,
+            session_factory=self.session_factory,
+        )
         critique = await service.critique_and_revise_loop(
             chapter_content=chapter_content,
             max_iterations=1,
@@ -1208,17 +1803,29 @@ class PipelineOrchestrator:
         report["auto_fix_applied"] = False
         return chapter_text, report
 
-    async def _run_optimizer(self, chapter_content: str, *, user_id: int) -> Tuple[str, Dict[str, Any]]:
-        prompt_map = {
-            "dialogue": "optimize_dialogue",
-            "environment": "optimize_environment",
-            "psychology": "optimize_psychology",
-            "rhythm": "optimize_rhythm",
-        }
+    async def _run_optimizer(
+        self,
+        chapter_content: str,
+        *,
+        user_id: int,
+        mode: str = "sequential",
+        dimensions: Optional[Sequence[str]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """按所选模式优化正文，返回 (优化后正文, 报告)；报告中保留各维度的优化说明。"""
+        selected = [d for d in OPTIMIZER_DIMENSIONS if dimensions is None or d in dimensions]
+        if mode in ("fused", "patch") and selected:
+            prompt = await self.prompt_service.get_prompt(f"optimize_{mode}")
+            if prompt:
+                if mode == "fused":
+                    return await self._run_fused_optimizer(chapter_content, prompt, selected, user_id=user_id)
+                return await self._run_patch_optimizer(chapter_content, prompt, selected, user_id=user_id)
+            logger.warning("缺少优化提示词 optimize_%s，回退为逐维度优化", mode)
+            mode = "sequential"
 
         optimized_content = chapter_content
         notes = []
-        for dimension, prompt_name in prompt_map.items():
+        for dimension in selected:
+            prompt_name = OPTIMIZER_DIMENSIONS[dimension]["prompt"]
             prompt = await self.prompt_service.get_prompt(prompt_name)
             if not prompt:
                 logger.warning("缺少优化提示词 %s，跳过 %s 维度", prompt_name, dimension)
@@ -1253,7 +1860,116 @@ class PipelineOrchestrator:
             except Exception as exc:
                 logger.warning("优化维度 %s 失败: %s", dimension, exc)
 
-        return optimized_content, {"steps": notes}
+        return optimized_content, {"mode": mode, "steps": notes}
+
+    @staticmethod
+    def _optimizer_dimension_specs(dimensions: Sequence[str]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "dimension": dimension,
+                "name": OPTIMIZER_DIMENSIONS[dimension]["name"],
+                "focus": OPTIMIZER_DIMENSIONS[dimension]["focus"],
+            }
+            for dimension in dimensions
+        ]
+
+    @staticmethod
+    def _optimizer_dimension_notes(parsed: Any, dimensions: Sequence[str]) -> List[Dict[str, Any]]:
+        """把模型返回的 dimension_notes 整理成与逐维度模式一致的 steps 列表。"""
+        raw_notes = parsed.get("dimension_notes") if isinstance(parsed, dict) else None
+        raw_notes = raw_notes if isinstance(raw_notes, dict) else {}
+        return [{"dimension": dimension, "notes": raw_notes.get(dimension) or "优化完成"} for dimension in dimensions]
+
+    async def _run_fused_optimizer(
+        self,
+        chapter_content: str,
+        prompt: str,
+        dimensions: Sequence[str],
+        *,
+        user_id: int,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """单次改写合并全部所选维度：整章只往返一次。"""
+        optimize_input = {
+            "original_content": chapter_content,
+            "dimensions": self._optimizer_dimension_specs(dimensions),
+            "additional_notes": "在不改变剧情走向的前提下，一次性完成所列维度的优化。",
+        }
+        report: Dict[str, Any] = {"mode": "fused", "steps": []}
+        try:
+            response = await self.llm_service.get_llm_response(
+                system_prompt=prompt,
+                conversation_history=[{"role": "user", "content": json.dumps(optimize_input, ensure_ascii=False)}],
+                temperature=0.7,
+                user_id=user_id,
+                timeout=600.0,
+            )
+        except Exception as exc:
+            logger.warning("合并优化失败: %s", exc)
+            report["error"] = str(exc)
+            return chapter_content, report
+
+        cleaned = remove_think_tags(response)
+        try:
+            parsed = json.loads(unwrap_markdown_json(cleaned))
+        except json.JSONDecodeError:
+            parsed = None
+        if not isinstance(parsed, dict):
+            report["steps"] = [{"dimension": d, "notes": "优化完成（响应格式非标准JSON）"} for d in dimensions]
+            return cleaned, report
+        report["steps"] = self._optimizer_dimension_notes(parsed, dimensions)
+        return parsed.get("optimized_content") or chapter_content, report
+
+    async def _run_patch_optimizer(
+        self,
+        chapter_content: str,
+        prompt: str,
+        dimensions: Sequence[str],
+        *,
+        user_id: int,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """模型只返回需要改写的段落，本地按段落序号替换，未改动的段落原样保留。"""
+        document = ParagraphText(chapter_content)
+        optimize_input = {
+            "paragraphs": [{"index": idx, "text": text} for idx, text in enumerate(document.paragraphs)],
+            "dimensions": self._optimizer_dimension_specs(dimensions),
+            "additional_notes": "在不改变剧情走向的前提下，只改写收益最大的段落。",
+        }
+        report: Dict[str, Any] = {"mode": "patch", "steps": [], "patches_applied": 0, "patches_rejected": 0}
+        try:
+            response = await self.llm_service.get_llm_response(
+                system_prompt=prompt,
+                conversation_history=[{"role": "user", "content": json.dumps(optimize_input, ensure_ascii=False)}],
+                temperature=0.7,
+                user_id=user_id,
+                timeout=600.0,
+            )
+            parsed = json.loads(unwrap_markdown_json(remove_think_tags(response)))
+        except Exception as exc:
+            logger.warning("段落补丁优化失败: %s", exc)
+            report["error"] = str(exc)
+            return chapter_content, report
+
+        patches = parsed.get("patches") if isinstance(parsed, dict) else None
+        patched: set = set()
+        for patch in patches if isinstance(patches, list) else []:
+            index = patch.get("index") if isinstance(patch, dict) else None
+            replacement = patch.get("replacement") if isinstance(patch, dict) else None
+            # 只接受指向已有段落、且每段首个的非空补丁
+            if (
+                not isinstance(index, int)
+                or not 0 <= index < len(document)
+                or index in patched
+                or not isinstance(replacement, str)
+                or not replacement.strip()
+            ):
+                report["patches_rejected"] += 1
+                continue
+            document.replace(index, replacement.strip())
+            patched.add(index)
+        report["patches_applied"] = len(patched)
+        report["patched_paragraphs"] = sorted(patched)
+        report["steps"] = self._optimizer_dimension_notes(parsed, dimensions)
+        return document.render(), report
 
     async def _run_enrichment(
         self,
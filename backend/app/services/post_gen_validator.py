@@ -39,6 +39,8 @@ class ValidationErrorDetail:
     severity: str  # BLOCK | WARN
     evidence_snippets: List[str] = field(default_factory=list)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Character spans [start, end) of the offending text, used for localized repair.
+    spans: List[List[int]] = field(default_factory=list)
 
 
 @dataclass
@@ -80,6 +82,7 @@ class PostGenValidator:
         names_to_check = [n for n in introduced if n and n != pov_name]
 
         snippets: List[str] = []
+        spans: List[List[int]] = []
         severity = "BLOCK"
 
         if not pov_switch_allowed:
@@ -88,10 +91,12 @@ class PostGenValidator:
             for match in strong_pattern.finditer(text):
                 snippet = text[max(0, match.start() - 10): match.end() + 10]
                 snippets.append(snippet.strip())
+                spans.append([match.start(), match.end()])
                 severity = "BLOCK"
             for match in soft_pattern.finditer(text):
                 snippet = text[max(0, match.start() - 10): match.end() + 10]
                 snippets.append(snippet.strip())
+                spans.append([match.start(), match.end()])
                 if severity != "BLOCK":
                     severity = "WARN"
 
@@ -102,6 +107,7 @@ class PostGenValidator:
             for match in pattern.finditer(text):
                 snippet = text[max(0, match.start() - 5): match.end() + 5]
                 snippets.append(snippet.strip())
+                spans.append([match.start(), match.end()])
                 severity = "BLOCK"
 
         if snippets:
@@ -111,6 +117,7 @@ class PostGenValidator:
                 severity=severity,
                 evidence_snippets=snippets[:5],
                 metadata={"pov": pov_name},
+                spans=spans,
             )
         return None
 
@@ -124,6 +131,7 @@ class PostGenValidator:
 
         evidence_block: List[str] = []
         evidence_warn: List[str] = []
+        spans: List[List[int]] = []
         for name in new_names:
             idx = text.find(name)
             window = text[max(0, idx - 25): idx + 25]
@@ -133,9 +141,11 @@ class PostGenValidator:
                 # downgrade to warn for ephemeral roles
                 if not intro_hit:
                     evidence_warn.append(window.strip())
+                    spans.append([idx, idx + len(name)])
                 continue
             if background_hit or not intro_hit:
                 evidence_block.append(window.strip())
+                spans.append([idx, idx + len(name)])
 
         if evidence_block or evidence_warn:
             severity = "BLOCK" if evidence_block else "WARN"
@@ -145,6 +155,7 @@ class PostGenValidator:
                 severity=severity,
                 evidence_snippets=(evidence_block + evidence_warn)[:5],
                 metadata={"new_characters": new_names},
+                spans=sorted(spans),
             )
         return None
 
@@ -153,6 +164,7 @@ class PostGenValidator:
         forbidden_nodes = constraints.get("forbidden_outline_nodes") or []
         evidence = []
         hit_nodes = []
+        spans: List[List[int]] = []
 
         lower_text = text.lower()
 
@@ -171,11 +183,13 @@ class PostGenValidator:
             if hits >= 2:
                 hit_nodes.append(node_id or "unknown")
                 evidence.append({"node": node_id or "unknown", "hits": hits, "keywords": keywords, "strong": strong_hit})
+                spans.extend(self._keyword_spans(lower_text, [kw.lower() for kw in keywords if kw]))
 
         for kw in OUTLINE_STAGE_LEAPS:
             if kw in text:
                 hit_nodes.append("stage_leap")
                 evidence.append({"node": "stage_leap", "hits": 1, "keywords": [kw], "strong": True})
+                spans.extend(self._keyword_spans(text, [kw]))
 
         if evidence:
             any_strong = any(e.get("strong") for e in evidence)
@@ -186,6 +200,7 @@ class PostGenValidator:
                 severity=severity,
                 evidence_snippets=[str(e) for e in evidence[:5]],
                 metadata={"forbidden_nodes_hit": hit_nodes},
+                spans=sorted(spans),
             )
         return None
 
@@ -206,6 +221,14 @@ class PostGenValidator:
                 lines.append("禁止出现“反杀/回击/反转/决战/大胜”等强推进词。")
         return "\n".join(lines)
 
+    @staticmethod
+    def _keyword_spans(text: str, keywords: List[str]) -> List[List[int]]:
+        return [
+            [match.start(), match.end()]
+            for kw in keywords
+            for match in re.finditer(re.escape(kw), text)
+        ]
+
     @staticmethod
     def _extract_name_candidates(text: str) -> List[str]:
         # Very simple Chinese name pattern (2-4 chars) and capitalized ASCII words
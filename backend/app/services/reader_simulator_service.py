@@ -3,15 +3,18 @@
 
 模拟不同类型读者的阅读体验，提供爽点检测、弃书风险评估、追读欲望分析。
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from enum import Enum
+import asyncio
 import json
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .llm_service import LLMService
+from .llm_service import LLMService, analysis_limiter
 from .prompt_service import PromptService
+from ..utils.concurrency import gather_in_order
 
 logger = logging.getLogger(__name__)
 
@@ -77,10 +80,31 @@ class ReaderSimulatorService:
         },
     }
 
-    def __init__(self, db: AsyncSession, llm_service: LLMService, prompt_service: PromptService):
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_service: LLMService,
+        prompt_service: PromptService,
+        *,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
         self.db = db
         self.llm_service = llm_service
         self.prompt_service = prompt_service
+        # 提供会话工厂时各读者视角并发模拟，每次调用使用独立会话；否则共享会话只能串行
+        self.session_factory = session_factory
+        self._serial_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def _analysis_llm(self, user_id: int) -> AsyncIterator[LLMService]:
+        """占用共享的分析并发槽位，并提供本次调用使用的 LLMService。"""
+        if self.session_factory is None:
+            async with self._serial_lock, analysis_limiter.slot(user_id):
+                yield self.llm_service
+            return
+        async with analysis_limiter.slot(user_id):
+            async with self.session_factory() as call_session:
+                yield type(self.llm_service)(call_session)
 
     async def simulate_reading_experience(
         self,
@@ -108,17 +132,32 @@ class ReaderSimulatorService:
             "recommendations": []
         }
         
-        # 1. 检测爽点
-        thrill_points = await self._detect_thrill_points(chapter_content, user_id)
-        results["thrill_points"] = thrill_points
-        
-        # 2. 模拟各类读者反馈
+        async def simulate_readers() -> List[Dict[str, Any]]:
+            # 1. 检测爽点（读者模拟依赖爽点结果）
+            async with self._analysis_llm(user_id) as llm:
+                results["thrill_points"] = await self._detect_thrill_points(chapter_content, user_id, llm_service=llm)
+
+            # 2. 模拟各类读者反馈，互不依赖，并发执行
+            async def simulate(reader_type: ReaderType) -> Dict[str, Any]:
+                async with self._analysis_llm(user_id) as llm:
+                    return await self._simulate_single_reader(
+                        chapter_content, chapter_number, reader_type,
+                        results["thrill_points"], previous_summary, user_id,
+                        llm_service=llm,
+                    )
+
+            return await gather_in_order([simulate(reader_type) for reader_type in reader_types])
+
+        async def evaluate_hook() -> Dict[str, Any]:
+            async with self._analysis_llm(user_id) as llm:
+                return await self._evaluate_hook_strength(chapter_content, user_id, llm_service=llm)
+
+        # 钩子强度只看章节结尾，与爽点、读者模拟并行
+        feedbacks, hook_strength = await gather_in_order([simulate_readers(), evaluate_hook()])
+
+        # 按读者类型顺序合并，结果与串行执行一致
         total_score = 0
-        for reader_type in reader_types:
-            feedback = await self._simulate_single_reader(
-                chapter_content, chapter_number, reader_type, 
-                thrill_points, previous_summary, user_id
-            )
+        for reader_type, feedback in zip(reader_types, feedbacks):
             results["reader_feedbacks"][reader_type.value] = feedback
             total_score += feedback.get("satisfaction", 50)
         
@@ -127,8 +166,8 @@ class ReaderSimulatorService:
         # 3. 评估弃书风险
         results["abandon_risks"] = self._evaluate_abandon_risks(results["reader_feedbacks"])
         
-        # 4. 评估追读欲望（钩子强度）
-        results["hook_strength"] = await self._evaluate_hook_strength(chapter_content, user_id)
+        # 4. 追读欲望（钩子强度）
+        results["hook_strength"] = hook_strength
         
         # 5. 生成综合建议
         results["recommendations"] = self._generate_recommendations(results)
@@ -138,7 +177,8 @@ class ReaderSimulatorService:
     async def _detect_thrill_points(
         self, 
         chapter_content: str, 
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> List[Dict[str, Any]]:
         """检测章节中的爽点"""
         prompt = f"""分析以下章节内容，找出所有"爽点"（让读者感到兴奋、满足、痛快的情节点）。
@@ -174,7 +214,7 @@ class ReaderSimulatorService:
 ```"""
 
         try:
-            response = await self.llm_service.get_llm_response(
+            response = await (llm_service or self.llm_service).get_llm_response(
                 system_prompt="你是一个专业的网文分析师，擅长识别读者爽点。请严格按照 JSON 格式输出。",
                 conversation_history=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -200,7 +240,8 @@ class ReaderSimulatorService:
         reader_type: ReaderType,
         thrill_points: List[Dict[str, Any]],
         previous_summary: Optional[str],
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Dict[str, Any]:
         """模拟单个类型读者的阅读体验"""
         profile = self.READER_PROFILES[reader_type]
@@ -239,7 +280,7 @@ class ReaderSimulatorService:
 ```"""
 
         try:
-            response = await self.llm_service.get_llm_response(
+            response = await (llm_service or self.llm_service).get_llm_response(
                 system_prompt=f"你是一个{profile['name']}，正在阅读网络小说。请以真实读者的口吻回答。",
                 conversation_history=[{"role": "user", "content": prompt}],
                 temperature=0.7,
@@ -308,7 +349,8 @@ class ReaderSimulatorService:
     async def _evaluate_hook_strength(
         self, 
         chapter_content: str, 
-        user_id: int
+        user_id: int,
+        llm_service: Optional[LLMService] = None,
     ) -> Dict[str, Any]:
         """评估章节结尾的钩子强度"""
         # 提取章节结尾（最后 500 字）
@@ -330,7 +372,7 @@ class ReaderSimulatorService:
 ```"""
 
         try:
-            response = await self.llm_service.get_llm_response(
+            response = await (llm_service or self.llm_service).get_llm_response(
                 system_prompt="你是一个专业的网文编辑，擅长分析章节钩子。",
                 conversation_history=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -3,15 +3,18 @@
 
 实现"生成 → 自我批评 → 修正 → 再批评 → 再修正"的迭代优化循环。
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from enum import Enum
+import asyncio
 import json
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .llm_service import LLMService
+from .llm_service import LLMService, analysis_limiter
 from .prompt_service import PromptService
+from ..utils.concurrency import gather_in_order
 
 logger = logging.getLogger(__name__)
 
@@ -99,17 +102,39 @@ class SelfCritiqueService:
         }
     }
 
-    def __init__(self, db: AsyncSession, llm_service: LLMService, prompt_service: PromptService):
+    def __init__(
+        self,
+        db: AsyncSession,
+        llm_service: LLMService,
+        prompt_service: PromptService,
+        *,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+    ):
         self.db = db
         self.llm_service = llm_service
         self.prompt_service = prompt_service
+        # 提供会话工厂时各维度并发批评，每次调用使用独立会话；否则共享会话只能串行
+        self.session_factory = session_factory
+        self._serial_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def _analysis_llm(self, user_id: int) -> AsyncIterator[LLMService]:
+        """占用共享的分析并发槽位，并提供本次调用使用的 LLMService。"""
+        if self.session_factory is None:
+            async with self._serial_lock, analysis_limiter.slot(user_id):
+                yield self.llm_service
+            return
+        async with analysis_limiter.slot(user_id):
+            async with self.session_factory() as call_session:
+                yield type(self.llm_service)(call_session)
 
     async def critique_chapter(
         self,
         chapter_content: str,
         dimension: CritiqueDimension,
         context: Optional[Dict[str, Any]] = None,
-        user_id: int = 0
+        user_id: int = 0,
+        llm_service: Optional[LLMService] = None,
     ) -> Dict[str, Any]:
         """
         对章节进行单维度批评
@@ -170,7 +195,7 @@ class SelfCritiqueService:
 - minor：小问题，可以优化"""
 
         try:
-            response = await self.llm_service.get_llm_response(
+            response = await (llm_service or self.llm_service).get_llm_response(
                 system_prompt=f"你是一位专注于{dim_config['name']}的严格编辑。请客观、具体地指出问题。",
                 conversation_history=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -227,14 +252,20 @@ class SelfCritiqueService:
         total_weight = 0
         weighted_score_sum = 0
         
-        for dimension in dimensions:
-            critique = await self.critique_chapter(
-                chapter_content=chapter_content,
-                dimension=dimension,
-                context=context,
-                user_id=user_id
-            )
-            
+        async def critique_dimension(dimension: CritiqueDimension) -> Dict[str, Any]:
+            async with self._analysis_llm(user_id) as llm:
+                return await self.critique_chapter(
+                    chapter_content=chapter_content,
+                    dimension=dimension,
+                    context=context,
+                    user_id=user_id,
+                    llm_service=llm,
+                )
+
+        # 各维度互不依赖，并发批评后按维度顺序合并，保证问题列表与评分与串行执行一致
+        critiques = await gather_in_order([critique_dimension(dimension) for dimension in dimensions])
+
+        for dimension, critique in zip(dimensions, critiques):
             results["dimension_critiques"][dimension.value] = critique
             
             # 统计问题
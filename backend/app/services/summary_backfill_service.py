@@ -0,0 +1,307 @@
+# AIMETA P=摘要回填服务_章节摘要后台预计算|R=摘要任务入队_任务认领_有界并发处理_失败重试|NR=不含生成流程|E=SummaryBackfillService_SummaryBackfillWorker_summary_backfill_worker|X=internal|A=服务类_后台任务|D=sqlalchemy,llm_service|S=db,net|RD=./README.ai
+"""
+章节摘要回填（基于数据库的持久化工作队列）。
+
+导入、编辑、选版与定稿后把章节写入 ``chapter_summary_tasks``，由各进程内的
+``SummaryBackfillWorker`` 以有界并发认领并调用 LLM 生成 ``Chapter.real_summary``。
+认领通过带状态条件的 UPDATE 完成，多进程同时运行时同一任务只会被一个进程处理；
+任务在处理期间被重新入队（章节又被编辑）时，完成写回会失败并保留 pending，
+下一轮会按最新正文重新生成。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.novel import Chapter
+from ..models.summary_task import ChapterSummaryTask
+from ..utils.json_utils import remove_think_tags
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+# 失败重试的退避基数（秒），第 n 次失败后等待 n 倍
+_RETRY_BACKOFF_SECONDS = 30
+# running 超过该时长视为进程崩溃遗留，重新放回队列
+_STALE_RUNNING_SECONDS = 600
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SummaryBackfillService:
+    """摘要回填队列的入队、认领与单任务处理。"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def enqueue(
+        self,
+        project_id: str,
+        chapter_numbers: Iterable[int],
+        *,
+        user_id: Optional[int] = None,
+        notify: bool = True,
+    ) -> int:
+        """把章节加入回填队列；已有任务复位为 pending。返回入队的章节数。"""
+        numbers = sorted(set(chapter_numbers))
+        if not numbers:
+            return 0
+        result = await self.session.execute(
+            select(ChapterSummaryTask).where(
+                ChapterSummaryTask.project_id == project_id,
+                ChapterSummaryTask.chapter_number.in_(numbers),
+            )
+        )
+        existing = {task.chapter_number: task for task in result.scalars().all()}
+        now = _utcnow()
+        for number in numbers:
+            task = existing.get(number)
+            if task is None:
+                self.session.add(
+                    ChapterSummaryTask(
+                        project_id=project_id,
+                        chapter_number=number,
+                        user_id=user_id,
+                        status="pending",
+                        attempts=0,
+                        available_at=now,
+                    )
+                )
+                continue
+            task.status = "pending"
+            task.attempts = 0
+            task.last_error = None
+            task.available_at = now
+            if user_id is not None:
+                task.user_id = user_id
+        await self.session.commit()
+        if notify:
+            summary_backfill_worker.notify()
+        return len(numbers)
+
+    async def enqueue_missing(self, project_id: str, chapter_numbers: Iterable[int], *, user_id: Optional[int] = None) -> int:
+        """只为尚无排队任务的章节入队，供生成流程发现缺失摘要时补登记。"""
+        numbers = sorted(set(chapter_numbers))
+        if not numbers:
+            return 0
+        result = await self.session.execute(
+            select(ChapterSummaryTask.chapter_number).where(
+                ChapterSummaryTask.project_id == project_id,
+                ChapterSummaryTask.chapter_number.in_(numbers),
+                ChapterSummaryTask.status.in_(("pending", "running")),
+            )
+        )
+        queued = set(result.scalars().all())
+        return await self.enqueue(project_id, [n for n in numbers if n not in queued], user_id=user_id)
+
+    async def claim(self, limit: int) -> List[int]:
+        """认领至多 ``limit`` 个到期的 pending 任务，返回任务 ID。"""
+        now = _utcnow()
+        result = await self.session.execute(
+            select(ChapterSummaryTask.id)
+            .where(ChapterSummaryTask.status == "pending", ChapterSummaryTask.available_at <= now)
+            .order_by(ChapterSummaryTask.project_id, ChapterSummaryTask.chapter_number)
+            .limit(limit)
+        )
+        claimed: List[int] = []
+        for task_id in result.scalars().all():
+            outcome = await self.session.execute(
+                update(ChapterSummaryTask)
+                .where(ChapterSummaryTask.id == task_id, ChapterSummaryTask.status == "pending")
+                .values(status="running", updated_at=now)
+            )
+            if outcome.rowcount == 1:
+                claimed.append(task_id)
+        await self.session.commit()
+        return claimed
+
+    async def requeue_stale(self, older_than_seconds: float = _STALE_RUNNING_SECONDS) -> int:
+        """把长时间停留在 running 的任务放回队列（进程崩溃后的恢复）。"""
+        cutoff = _utcnow() - timedelta(seconds=older_than_seconds)
+        outcome = await self.session.execute(
+            update(ChapterSummaryTask)
+            .where(ChapterSummaryTask.status == "running", ChapterSummaryTask.updated_at < cutoff)
+            .values(status="pending", available_at=_utcnow())
+        )
+        await self.session.commit()
+        return outcome.rowcount or 0
+
+    async def process(self, task_id: int) -> str:
+        """处理单个已认领任务，返回最终状态 done / pending / failed。"""
+        task = await self.session.get(ChapterSummaryTask, task_id)
+        if task is None or task.status != "running":
+            return "skipped"
+        project_id, chapter_number, attempts, user_id = task.project_id, task.chapter_number, task.attempts, task.user_id
+        result = await self.session.execute(
+            select(Chapter)
+            .options(selectinload(Chapter.selected_version))
+            .where(Chapter.project_id == project_id, Chapter.chapter_number == chapter_number)
+        )
+        chapter = result.scalars().first()
+        content = chapter.selected_version.content if chapter and chapter.selected_version else None
+        # 释放读事务，避免 LLM 调用期间占用连接上的事务
+        await self.session.commit()
+
+        if not content:
+            return await self._finish(task_id, "done")
+        try:
+            summary = await LLMService(self.session).get_summary(
+                content,
+                temperature=0.15,
+                user_id=user_id,
+                timeout=180.0,
+            )
+            summary = remove_think_tags(summary).strip()
+            if not summary:
+                raise ValueError("摘要结果为空")
+        except Exception as exc:  # noqa: BLE001 - 失败记录在任务上并按退避重试
+            await self.session.rollback()
+            attempts += 1
+            exhausted = attempts >= settings.summary_backfill_max_attempts
+            logger.warning(
+                "章节摘要回填失败: project=%s chapter=%s attempts=%d error=%s",
+                project_id,
+                chapter_number,
+                attempts,
+                exc,
+            )
+            return await self._finish(
+                task_id,
+                "failed" if exhausted else "pending",
+                attempts=attempts,
+                last_error=str(exc)[:2000],
+                available_at=_utcnow() + timedelta(seconds=_RETRY_BACKOFF_SECONDS * attempts),
+            )
+
+        # 只有任务仍处于本次认领的 running 状态才写回；期间被重新入队说明正文已变化
+        outcome = await self.session.execute(
+            update(ChapterSummaryTask)
+            .where(ChapterSummaryTask.id == task_id, ChapterSummaryTask.status == "running")
+            .values(status="done", last_error=None, updated_at=_utcnow())
+        )
+        if outcome.rowcount != 1:
+            await self.session.rollback()
+            return "pending"
+        await self.session.execute(
+            update(Chapter)
+            .where(Chapter.project_id == project_id, Chapter.chapter_number == chapter_number)
+            .values(real_summary=summary)
+        )
+        await self.session.commit()
+        return "done"
+
+    async def _finish(self, task_id: int, status: str, **values) -> str:
+        outcome = await self.session.execute(
+            update(ChapterSummaryTask)
+            .where(ChapterSummaryTask.id == task_id, ChapterSummaryTask.status == "running")
+            .values(status=status, updated_at=_utcnow(), **values)
+        )
+        await self.session.commit()
+        return status if outcome.rowcount == 1 else "pending"
+
+
+class SummaryBackfillWorker:
+    """进程内的摘要回填消费者：轮询认领任务，并以有界并发处理。"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        *,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.concurrency = concurrency or settings.summary_backfill_concurrency
+        self.poll_interval = poll_interval or settings.summary_backfill_poll_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("摘要回填后台任务已启动: concurrency=%d", self.concurrency)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def notify(self) -> None:
+        """有新任务入队时唤醒轮询；未启动时忽略。"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """认领并处理一批任务，返回处理的任务数。"""
+        async with self.session_factory() as session:
+            task_ids = await SummaryBackfillService(session).claim(self.concurrency)
+        if task_ids:
+            await asyncio.gather(*(self._process(task_id) for task_id in task_ids))
+        return len(task_ids)
+
+    async def drain(self) -> int:
+        """反复处理直到没有到期任务，返回处理总数。"""
+        total = 0
+        while True:
+            processed = await self.run_once()
+            if not processed:
+                return total
+            total += processed
+
+    async def _process(self, task_id: int) -> None:
+        async with self.session_factory() as session:
+            try:
+                await SummaryBackfillService(session).process(task_id)
+            except Exception:  # noqa: BLE001 - 单个任务异常不应终止后台循环
+                logger.exception("章节摘要回填任务异常: task=%s", task_id)
+
+    async def _run(self) -> None:
+        try:
+            async with self.session_factory() as session:
+                recovered = await SummaryBackfillService(session).requeue_stale()
+            if recovered:
+                logger.info("恢复 %d 个遗留的摘要回填任务", recovered)
+        except Exception:  # noqa: BLE001 - 恢复失败不影响正常消费
+            logger.exception("恢复遗留摘要回填任务失败")
+        while True:
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001 - 数据库短暂不可用时等待下一轮
+                logger.exception("摘要回填轮询失败")
+                processed = 0
+            if processed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+summary_backfill_worker = SummaryBackfillWorker()
+
+
+__all__ = ["SummaryBackfillService", "SummaryBackfillWorker", "summary_backfill_worker"]
@@ -0,0 +1,210 @@
+# AIMETA P=调用计数缓冲_批量写回|R=计数增量内存聚合_定时批量写库_每日额度分块预占与退还|NR=不含限额配置读取|E=UsageCounterBuffer_usage_counters|X=internal|A=服务类_后台任务|D=sqlalchemy|S=db,mem|RD=./README.ai
+"""
+调用计数的写回缓冲（write-behind）。
+
+每次 LLM 调用都要累加 ``usage_metrics`` 中的请求计数并校验用户的每日额度，
+逐次读改写提交会在热点行上串行化。这里把两者移到内存：
+
+- 计数增量在进程内聚合，按 ``usage_flush_interval`` 以 ``value = value + :delta``
+  的原子 UPDATE 批量写回，多进程各自写增量，结果可直接相加；
+- 每日额度按块预占：一次条件 UPDATE（``request_count + n <= limit``）从数据库
+  领取 ``daily_limit_lease_size`` 次额度，进程内用完再领；空闲的剩余额度在写回时退还。
+  数据库中的计数始终包含各进程已领取的额度，因此多进程下总量不会超过上限。
+  代价是拒绝可能提前：某进程领不到额度时，其他进程手里可能还有未用完的块，最多提前
+  ``(进程数 - 1) × (daily_limit_lease_size - 1)`` 次。为缩小这段差距，单次领取不超过
+  剩余额度的一半，越接近上限块越小；空闲超过一个写回间隔的块也会退还，之后即可再领。
+
+后台任务未启动时（脚本、单次调用）每次都直接写库，行为与逐次提交一致。
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..db.session import AsyncSessionLocal
+from ..models import UsageMetric, UserDailyRequest
+
+logger = logging.getLogger(__name__)
+
+LeaseKey = Tuple[int, date]
+
+
+@dataclass
+class _Lease:
+    """某用户某日已从数据库领取、尚未使用的额度。"""
+
+    remaining: int = 0
+    touched: float = 0.0
+
+
+class UsageCounterBuffer:
+    """计数增量的内存聚合与每日额度的分块预占。"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], AsyncSession]] = None,
+        *,
+        flush_interval: Optional[float] = None,
+        lease_size: Optional[int] = None,
+    ) -> None:
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.flush_interval = flush_interval or settings.usage_flush_interval
+        self.lease_size = lease_size or settings.daily_limit_lease_size
+        self.flushes = 0
+        self._deltas: Dict[str, int] = {}
+        self._leases: Dict[LeaseKey, _Lease] = {}
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info("调用计数写回任务已启动: interval=%.1fs lease=%d", self.flush_interval, self.lease_size)
+
+    async def stop(self) -> None:
+        """停止后台任务，写回全部增量并退还所有未用额度。"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush(release_all=True)
+
+    async def record(self, key: str, amount: int = 1) -> None:
+        """累加计数；后台任务运行时只记在内存，否则立即写库。"""
+        self._deltas[key] = self._deltas.get(key, 0) + amount
+        if not self.running:
+            await self.flush()
+
+    def pending(self, key: str) -> int:
+        """尚未写回数据库的增量，供统计接口与数据库中的值相加展示。"""
+        return self._deltas.get(key, 0)
+
+    async def acquire_daily_request(self, user_id: int, limit: int) -> bool:
+        """占用用户今日的一次请求额度，额度已满时返回 False。"""
+        key = (user_id, date.today())
+        if self._take(key):
+            return True
+        lock = self._user_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            # 等锁期间其他协程可能已经领到新的额度
+            if self._take(key):
+                return True
+            size = self.lease_size if self.running else 1
+            granted = await self._reserve(user_id, key[1], limit, size)
+            if granted <= 0:
+                return False
+            self._leases[key] = _Lease(remaining=granted - 1, touched=time.monotonic())
+            return True
+
+    async def flush(self, *, release_all: bool = False) -> None:
+        """写回计数增量，并退还空闲超过一个写回间隔（或全部）的未用额度；失败时保留到下一轮。"""
+        deltas, self._deltas = self._deltas, {}
+        deltas = {key: value for key, value in deltas.items() if value}
+        refunds: Dict[LeaseKey, int] = {}
+        idle_before = time.monotonic() - self.flush_interval
+        for key, lease in list(self._leases.items()):
+            if release_all or lease.touched <= idle_before or key[1] != date.today():
+                del self._leases[key]
+                if lease.remaining:
+                    refunds[key] = lease.remaining
+        if not deltas and not refunds:
+            return
+        try:
+            async with self.session_factory() as session:
+                await self._write(session, deltas, refunds)
+        except Exception:  # noqa: BLE001 - 写回失败时保留增量，下一轮重试
+            logger.exception("调用计数写回失败，将在下一轮重试: metrics=%s refunds=%d", deltas, len(refunds))
+            for key, value in deltas.items():
+                self._deltas[key] = self._deltas.get(key, 0) + value
+            # 退还失败只会让数据库多计，保留为可用额度等待下次退还
+            for key, remaining in refunds.items():
+                lease = self._leases.setdefault(key, _Lease(touched=time.monotonic()))
+                lease.remaining += remaining
+            return
+        self.flushes += 1
+        logger.debug("调用计数已写回: metrics=%s refunds=%d", deltas, len(refunds))
+
+    def _take(self, key: LeaseKey) -> bool:
+        lease = self._leases.get(key)
+        if lease is None or lease.remaining <= 0:
+            return False
+        lease.remaining -= 1
+        lease.touched = time.monotonic()
+        return True
+
+    async def _reserve(self, user_id: int, day: date, limit: int, size: int) -> int:
+        """以条件 UPDATE 从数据库领取至多 ``size`` 次额度，返回实际领取的次数。
+
+        单次至多领取剩余额度的一半（向上取整），避免接近上限时一个进程把余量全部领走、
+        其他进程提前被拒。
+        """
+        row = (UserDailyRequest.user_id == user_id) & (UserDailyRequest.request_date == day)
+        async with self.session_factory() as session:
+            while True:
+                used = (await session.execute(select(UserDailyRequest.request_count).where(row))).scalar()
+                left = limit - (used or 0)
+                if left <= 0:
+                    return 0
+                want = min(size, (left + 1) // 2)
+                if used is None:
+                    session.add(UserDailyRequest(user_id=user_id, request_date=day, request_count=want))
+                    try:
+                        await session.commit()
+                        return want
+                    except IntegrityError:
+                        # 其他进程刚创建了当日记录，改走条件 UPDATE
+                        await session.rollback()
+                        continue
+                result = await session.execute(
+                    update(UserDailyRequest)
+                    .where(row, UserDailyRequest.request_count + want <= limit)
+                    .values(request_count=UserDailyRequest.request_count + want)
+                )
+                await session.commit()
+                if result.rowcount:
+                    return want
+                # 其他进程抢先领取，重新读取剩余额度
+
+    @staticmethod
+    async def _write(session: AsyncSession, deltas: Dict[str, int], refunds: Dict[LeaseKey, int]) -> None:
+        for key, delta in deltas.items():
+            result = await session.execute(
+                update(UsageMetric).where(UsageMetric.key == key).values(value=UsageMetric.value + delta)
+            )
+            if not result.rowcount:
+                session.add(UsageMetric(key=key, value=delta))
+        for (user_id, day), remaining in refunds.items():
+            await session.execute(
+                update(UserDailyRequest)
+                .where(UserDailyRequest.user_id == user_id, UserDailyRequest.request_date == day)
+                .values(request_count=UserDailyRequest.request_count - remaining)
+            )
+        await session.commit()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+usage_counters = UsageCounterBuffer()
+
+
+__all__ = ["UsageCounterBuffer", "usage_counters"]
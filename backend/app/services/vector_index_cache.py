@@ -0,0 +1,226 @@
+# AIMETA P=向量索引缓存_进程内检索加速|R=按项目缓存向量矩阵_LRU内存预算_增量更新|NR=不含持久化|E=VectorIndexCache_ProjectVectorIndex_vector_index_cache|X=internal|A=缓存类|D=numpy|S=mem|RD=./README.ai
+from __future__ import annotations
+
+"""
+进程内的按项目向量索引缓存。
+
+每个 (表, 项目) 对应一个 ``ProjectVectorIndex``：只保存记录 ID、章节号与归一化后的
+float32 矩阵，不保存正文；检索时一次矩阵-向量乘法 + argpartition 取 top-k，
+再由 VectorStoreService 按 ID 回表读取正文。缓存按 LRU 淘汰并受内存预算约束，
+并通过 ``revision`` 与向量库中的版本号比对，感知其他进程的写入。
+"""
+
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+
+try:  # noqa: SIM105 - NumPy 为可选依赖，缺失时缓存整体停用
+    import numpy as np
+except ImportError:  # pragma: no cover - 未安装时退回逐行扫描
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[str, str]
+# 每条记录除向量外的估算开销（ID 字符串、列表槽位等）
+_ROW_OVERHEAD_BYTES = 96
+
+
+class ProjectVectorIndex:
+    """单个项目的精确向量索引（归一化矩阵上的暴力内积检索）。"""
+
+    def __init__(
+        self,
+        *,
+        ids: List[str],
+        chapter_numbers: Sequence[int],
+        matrix: "np.ndarray",
+        revision: int,
+    ) -> None:
+        self.ids = ids
+        self.chapter_numbers = np.asarray(chapter_numbers, dtype=np.int64)
+        self.matrix = matrix
+        self.revision = revision
+        self._positions: Dict[str, int] = {record_id: pos for pos, record_id in enumerate(ids)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, Any]], *, revision: int) -> "ProjectVectorIndex":
+        """由 (id, chapter_number, float32 BLOB) 行构建索引；仅保留占多数的向量维度。"""
+        rows = [(record_id, chapter, blob) for record_id, chapter, blob in rows if blob]
+        dim_bytes = Counter(len(blob) for _, _, blob in rows).most_common(1)
+        row_bytes = dim_bytes[0][0] if dim_bytes else 0
+        kept = [row for row in rows if len(row[2]) == row_bytes and row_bytes % 4 == 0]
+        dim = row_bytes // 4
+        if kept:
+            matrix = np.frombuffer(b"".join(blob for _, _, blob in kept), dtype=np.float32).reshape(len(kept), dim)
+            matrix = _normalize_rows(matrix)
+        else:
+            matrix = np.zeros((0, dim), dtype=np.float32)
+        return cls(
+            ids=[record_id for record_id, _, _ in kept],
+            chapter_numbers=[chapter for _, chapter, _ in kept],
+            matrix=matrix,
+            revision=revision,
+        )
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes + self.chapter_numbers.nbytes + len(self.ids) * _ROW_OVERHEAD_BYTES)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: Sequence[float], top_k: int) -> List[Tuple[str, float]]:
+        """返回余弦距离最小的 (id, distance)，按距离升序。"""
+        if top_k <= 0 or not self.ids:
+            return []
+        query_vec = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(query_vec))
+        if query_vec.shape[0] != self.dim or norm == 0:
+            return []
+        similarities = self.matrix @ (query_vec / norm)
+        k = min(top_k, similarities.shape[0])
+        if k < similarities.shape[0]:
+            candidates = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            candidates = np.arange(similarities.shape[0])
+        ordered = candidates[np.argsort(-similarities[candidates], kind="stable")]
+        return [(self.ids[int(i)], float(1.0 - similarities[i])) for i in ordered]
+
+    def upsert(self, rows: Sequence[Tuple[str, int, Sequence[float]]]) -> bool:
+        """增量写入或覆盖记录；维度不一致或含空向量时返回 False，由调用方废弃整个索引。"""
+        if not rows:
+            return True
+        # 先校验各行长度一致且非空，参差不齐的输入交给 np.asarray 会直接抛 ValueError
+        dims = {len(vector) for _, _, vector in rows}
+        if len(dims) != 1 or 0 in dims or (self.ids and dims != {self.dim}):
+            return False
+        vectors = np.asarray([vector for _, _, vector in rows], dtype=np.float32)
+        vectors = _normalize_rows(vectors)
+        if not self.ids:
+            self.matrix = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        appended_ids: List[str] = []
+        appended_chapters: List[int] = []
+        appended_rows: List[int] = []
+        for offset, (record_id, chapter_number, _) in enumerate(rows):
+            position = self._positions.get(record_id)
+            if position is not None:
+                self.matrix[position] = vectors[offset]
+                self.chapter_numbers[position] = chapter_number
+                continue
+            self._positions[record_id] = len(self.ids) + len(appended_ids)
+            appended_ids.append(record_id)
+            appended_chapters.append(chapter_number)
+            appended_rows.append(offset)
+        if appended_ids:
+            self.ids.extend(appended_ids)
+            self.chapter_numbers = np.concatenate(
+                [self.chapter_numbers, np.asarray(appended_chapters, dtype=np.int64)]
+            )
+            self.matrix = np.concatenate([self.matrix, vectors[appended_rows]])
+        return True
+
+    def remove_chapters(self, chapter_numbers: Iterable[int], *, keep_ids: Collection[str] = ()) -> None:
+        """移除指定章节的记录；``keep_ids`` 中的记录（增量入库时复用的片段）保留。"""
+        if not self.ids:
+            return
+        keep = ~np.isin(self.chapter_numbers, np.asarray(list(chapter_numbers), dtype=np.int64))
+        if keep_ids:
+            keep |= np.asarray([record_id in keep_ids for record_id in self.ids], dtype=bool)
+        if bool(keep.all()):
+            return
+        self.ids = [record_id for record_id, flag in zip(self.ids, keep) if flag]
+        self.chapter_numbers = self.chapter_numbers[keep]
+        self.matrix = self.matrix[keep]
+        self._positions = {record_id: pos for pos, record_id in enumerate(self.ids)}
+
+
+def _normalize_rows(matrix: "np.ndarray") -> "np.ndarray":
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = np.inf  # 零向量归一化后为全零，相似度恒为 0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+class VectorIndexCache:
+    """按 (表, 项目) 缓存 ProjectVectorIndex，LRU 淘汰并受总内存预算约束。"""
+
+    def __init__(self, *, max_bytes: int) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[IndexKey, ProjectVectorIndex]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None and self.max_bytes > 0
+
+    def get(self, table: str, project_id: str, revision: int) -> Optional[ProjectVectorIndex]:
+        """获取与给定版本号一致的索引；版本落后时视为未命中并丢弃。"""
+        key = (table, project_id)
+        index = self._entries.get(key)
+        if index is None or index.revision != revision:
+            if index is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return index
+
+    def put(self, table: str, project_id: str, index: ProjectVectorIndex) -> None:
+        if not self.enabled:
+            return
+        key = (table, project_id)
+        self._entries.pop(key, None)
+        if index.nbytes > self.max_bytes:
+            logger.info(
+                "项目向量索引超过缓存预算，本次不缓存: table=%s project=%s bytes=%d",
+                table,
+                project_id,
+                index.nbytes,
+            )
+            return
+        self._entries[key] = index
+        self._evict()
+
+    def peek(self, table: str, project_id: str) -> Optional[ProjectVectorIndex]:
+        """获取索引但不影响 LRU 顺序与命中统计，供写入路径增量更新使用。"""
+        return self._entries.get((table, project_id))
+
+    def invalidate(self, table: str, project_id: str) -> None:
+        self._entries.pop((table, project_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _total_bytes(self) -> int:
+        return sum(index.nbytes for index in self._entries.values())
+
+    def _evict(self) -> None:
+        total = self._total_bytes()
+        while total > self.max_bytes and self._entries:
+            key, index = self._entries.popitem(last=False)
+            total -= index.nbytes
+            logger.debug("淘汰项目向量索引: table=%s project=%s", key[0], key[1])
+
+
+vector_index_cache = VectorIndexCache(max_bytes=settings.vector_index_cache_mb * 1024 * 1024)
+
+
+__all__ = ["ProjectVectorIndex", "VectorIndexCache", "vector_index_cache"]
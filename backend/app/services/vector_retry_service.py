@@ -18,6 +18,7 @@ class VectorRetryService:
 
     def __init__(self, *, llm_service: LLMService, vector_store: Optional[VectorStoreService] = None) -> None:
         self.llm_service = llm_service
+        self._store_injected = vector_store is not None
         self.vector_store = vector_store or VectorStoreService()
 
     async def retry(
@@ -32,8 +33,11 @@ class VectorRetryService:
         if not content or not content.strip():
             return {"status": "failed", "error": "empty_content"}
         try:
-            ingest_service = ChapterIngestionService(llm_service=self.llm_service, vector_store=self.vector_store)
-            await ingest_service.ingest_chapter(
+            ingest_service = ChapterIngestionService(
+                llm_service=self.llm_service,
+                vector_store=self.vector_store if self._store_injected else None,
+            )
+            return await ingest_service.ingest_chapter(
                 project_id=project_id,
                 chapter_number=chapter_number,
                 title=title,
@@ -41,7 +45,6 @@ class VectorRetryService:
                 summary=None,
                 user_id=user_id,
             )
-            return {"status": "updated"}
         except Exception as exc:  # pragma: no cover - defensive logging
             logger.error("向量重试失败: %s", exc)
             return {"status": "failed", "error": str(exc)}
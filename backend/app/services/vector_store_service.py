@@ -1,4 +1,4 @@
-# AIMETA P=向量存储服务_文本向量化|R=向量存储_相似搜索|NR=不含业务逻辑|E=VectorStoreService|X=internal|A=服务类|D=chromadb|S=db,fs|RD=./README.ai
+# AIMETA P=向量存储服务_文本向量化|R=向量存储_相似搜索|NR=不含业务逻辑|E=VectorStoreService|X=internal|A=服务类|D=chromadb,numpy|S=db,fs,mem|RD=./README.ai
 from __future__ import annotations
 
 """
@@ -7,23 +7,105 @@ from __future__ import annotations
 本文件中的注释均使用中文，便于团队成员快速理解 RAG 相关逻辑。
 """
 
+import hashlib
 import json
 import logging
 import math
 from array import array
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence
+from typing import Any, Collection, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from ..core.config import settings
+from .vector_index_cache import ProjectVectorIndex, vector_index_cache
 
 try:  # noqa: SIM105 - 明确区分依赖缺失的情况
     import libsql_client
 except ImportError:  # pragma: no cover - 在未安装依赖时提供友好提示
     libsql_client = None  # type: ignore[assignment]
 
+try:  # noqa: SIM105 - 应用层相似度计算优先使用 NumPy 向量化实现
+    import numpy as np
+except ImportError:  # pragma: no cover - 未安装时退回纯 Python 计算
+    np = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
+_WRITE_BATCH_SIZE = 200
+
+_UPSERT_CHUNK_SQL = """
+INSERT INTO rag_chunks (
+    id,
+    project_id,
+    chapter_number,
+    chunk_index,
+    chapter_title,
+    content,
+    embedding,
+    metadata,
+    content_hash
+) VALUES (
+    :id,
+    :project_id,
+    :chapter_number,
+    :chunk_index,
+    :chapter_title,
+    :content,
+    :embedding,
+    :metadata,
+    :content_hash
+)
+ON CONFLICT(id) DO UPDATE SET
+    content=excluded.content,
+    embedding=excluded.embedding,
+    metadata=excluded.metadata,
+    chapter_title=excluded.chapter_title,
+    chunk_index=excluded.chunk_index,
+    content_hash=excluded.content_hash
+"""
+
+# 增量入库时内容未变的片段只更新位置信息，不重写正文与向量
+_UPDATE_CHUNK_POSITION_SQL = """
+UPDATE rag_chunks
+SET chunk_index = :chunk_index, chapter_title = :chapter_title, metadata = :metadata
+WHERE id = :id
+"""
+
+_UPSERT_SUMMARY_SQL = """
+INSERT INTO rag_summaries (
+    id,
+    project_id,
+    chapter_number,
+    title,
+    summary,
+    embedding
+) VALUES (
+    :id,
+    :project_id,
+    :chapter_number,
+    :title,
+    :summary,
+    :embedding
+)
+ON CONFLICT(id) DO UPDATE SET
+    summary=excluded.summary,
+    embedding=excluded.embedding,
+    title=excluded.title
+"""
+
+# 每次写入递增的版本号，供各进程的向量索引缓存判断是否过期
+_BUMP_REVISION_SQL = """
+INSERT INTO rag_index_revisions (project_id, table_name, revision)
+VALUES (:project_id, :table_name, 1)
+ON CONFLICT(project_id, table_name) DO UPDATE SET revision = revision + 1
+RETURNING revision
+"""
+
+
+def content_hash(text: str) -> str:
+    """片段正文的内容哈希，增量入库时据此判断片段是否需要重新嵌入。"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 
 @dataclass
 class RetrievedChunk:
@@ -97,6 +179,7 @@ class VectorStoreService:
                 content TEXT NOT NULL,
                 embedding BLOB NOT NULL,
                 metadata TEXT,
+                content_hash TEXT,
                 created_at INTEGER DEFAULT (unixepoch())
             )
             """,
@@ -119,6 +202,15 @@ class VectorStoreService:
             CREATE INDEX IF NOT EXISTS idx_rag_summaries_project
             ON rag_summaries(project_id, chapter_number)
             """,
+            # 每次写入递增的版本号，供各进程的向量索引缓存判断是否过期
+            """
+            CREATE TABLE IF NOT EXISTS rag_index_revisions (
+                project_id TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                revision INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (project_id, table_name)
+            )
+            """,
         ]
 
         try:
@@ -127,8 +219,16 @@ class VectorStoreService:
             logger.info("已确保向量库表结构存在。")
         except Exception as exc:  # pragma: no cover - 初始化失败时记录日志
             logger.error("创建向量库表结构失败: %s", exc)
-        else:
-            self._schema_ready = True
+            return
+
+        try:
+            # 旧版本建的表没有 content_hash 列；列已存在时 SQLite 报 duplicate column，忽略即可
+            await self._client.execute("ALTER TABLE rag_chunks ADD COLUMN content_hash TEXT")  # type: ignore[union-attr]
+        except Exception as exc:  # pragma: no cover - 依赖具体数据库版本
+            if "duplicate column" not in str(exc).lower():
+                logger.error("为 rag_chunks 补充 content_hash 列失败: %s", exc)
+                return
+        self._schema_ready = True
 
     async def query_chunks(
         self,
@@ -146,6 +246,10 @@ class VectorStoreService:
         if top_k <= 0:
             return []
 
+        index = await self._load_index("rag_chunks", project_id)
+        if index is not None and index.dim == len(embedding):
+            return await self._fetch_chunks_by_ids(index.search(embedding, top_k))
+
         blob = self._to_f32_blob(embedding)
         sql = """
         SELECT
@@ -208,6 +312,10 @@ class VectorStoreService:
         if top_k <= 0:
             return []
 
+        index = await self._load_index("rag_summaries", project_id)
+        if index is not None and index.dim == len(embedding):
+            return await self._fetch_summaries_by_ids(index.search(embedding, top_k))
+
         blob = self._to_f32_blob(embedding)
         sql = """
         SELECT
@@ -256,121 +364,148 @@ class VectorStoreService:
         self,
         *,
         records: Iterable[Dict[str, Any]],
-    ) -> None:
-        """批量写入章节片段，供后续检索使用。"""
+    ) -> int:
+        """批量写入章节片段，供后续检索使用，返回成功写入的行数。"""
         if not self._client:
-            return
+            return 0
 
         await self.ensure_schema()
-        sql = """
-        INSERT INTO rag_chunks (
-            id,
-            project_id,
-            chapter_number,
-            chunk_index,
-            chapter_title,
-            content,
-            embedding,
-            metadata
-        ) VALUES (
-            :id,
-            :project_id,
-            :chapter_number,
-            :chunk_index,
-            :chapter_title,
-            :content,
-            :embedding,
-            :metadata
+        return await self._batched_upsert(
+            "rag_chunks",
+            [(_UPSERT_CHUNK_SQL, self._chunk_params(item), item) for item in records],
         )
-        ON CONFLICT(id) DO UPDATE SET
-            content=excluded.content,
-            embedding=excluded.embedding,
-            metadata=excluded.metadata,
-            chapter_title=excluded.chapter_title
-        """
-        payload = []
-        for item in records:
-            embedding = item.get("embedding", [])
-            payload.append(
-                {
-                    **item,
-                    "embedding": self._to_f32_blob(embedding),
-                    "metadata": json.dumps(item.get("metadata") or {}, ensure_ascii=False),
-                }
-            )
-
-        if not payload:
-            return
-
-        for item in payload:
-            try:
-                await self._client.execute(sql, item)  # type: ignore[union-attr]
-            except Exception as exc:  # pragma: no cover - 单条写入失败时记录日志
-                logger.error("写入 rag_chunks 失败: %s", exc)
-            else:
-                logger.debug(
-                    "已写入章节片段: project=%s chapter=%s chunk=%s",
-                    item.get("project_id"),
-                    item.get("chapter_number"),
-                    item.get("chunk_index"),
-                )
 
     async def upsert_summaries(
         self,
         *,
         records: Iterable[Dict[str, Any]],
-    ) -> None:
-        """同步章节摘要向量，供摘要层检索使用。"""
+    ) -> int:
+        """同步章节摘要向量，供摘要层检索使用，返回成功写入的行数。"""
         if not self._client:
-            return
+            return 0
 
         await self.ensure_schema()
-        sql = """
-        INSERT INTO rag_summaries (
-            id,
-            project_id,
-            chapter_number,
-            title,
-            summary,
-            embedding
-        ) VALUES (
-            :id,
-            :project_id,
-            :chapter_number,
-            :title,
-            :summary,
-            :embedding
+        return await self._batched_upsert(
+            "rag_summaries",
+            [(_UPSERT_SUMMARY_SQL, self._summary_params(item), item) for item in records],
         )
-        ON CONFLICT(id) DO UPDATE SET
-            summary=excluded.summary,
-            embedding=excluded.embedding,
-            title=excluded.title
+
+    async def chapter_chunk_hashes(self, *, project_id: str, chapter_number: int) -> Dict[str, str]:
+        """读取章节现有片段的 ``{id: 内容哈希}``，旧数据缺少哈希时按正文现算。
+
+        读取失败时返回空字典，调用方按全部重新嵌入处理。
         """
+        if not self._client:
+            return {}
 
-        payload = []
-        for item in records:
-            embedding = item.get("embedding", [])
-            payload.append(
-                {
-                    **item,
-                    "embedding": self._to_f32_blob(embedding),
-                }
+        await self.ensure_schema()
+        try:
+            result = await self._client.execute(  # type: ignore[union-attr]
+                """
+                SELECT id, content_hash, CASE WHEN content_hash IS NULL THEN content END AS content
+                FROM rag_chunks
+                WHERE project_id = :project_id AND chapter_number = :chapter_number
+                """,
+                {"project_id": project_id, "chapter_number": chapter_number},
+            )
+        except Exception as exc:  # pragma: no cover - 读取失败时退回全量重建
+            logger.warning(
+                "读取章节片段哈希失败，将全部重新嵌入: project=%s chapter=%s error=%s",
+                project_id,
+                chapter_number,
+                exc,
             )
+            return {}
+        return {
+            row["id"]: row.get("content_hash") or content_hash(row.get("content") or "")
+            for row in self._iter_rows(result)
+        }
 
-        if not payload:
-            return
+    async def replace_chapter(
+        self,
+        *,
+        project_id: str,
+        chapter_number: int,
+        chunk_records: Sequence[Dict[str, Any]],
+        summary_records: Sequence[Dict[str, Any]] = (),
+        kept_chunks: Sequence[Dict[str, Any]] = (),
+        retain_ids: Sequence[str] = (),
+        replace_summaries: bool = True,
+    ) -> Dict[str, int]:
+        """在同一事务内把章节向量同步为给定内容，中途失败不会留下空章节。
+
+        ``chunk_records`` 为需要写入的新片段；``kept_chunks`` 为内容未变、沿用原有向量的片段，
+        只更新 ``chunk_index`` 等位置信息。章节内不在这两者及 ``retain_ids``（原样保留的旧片段）中的
+        旧片段被删除；``replace_summaries`` 为 False 时摘要保持不变，否则整体替换。
+        返回成功写入的 ``chunks`` / ``summaries`` 行数、沿用的 ``kept`` 与删除的 ``deleted`` 片段数；
+        事务失败时均为 0。
+        """
+        if not self._client:
+            return {"chunks": 0, "summaries": 0, "kept": 0, "deleted": 0}
 
-        for item in payload:
-            try:
-                await self._client.execute(sql, item)  # type: ignore[union-attr]
-            except Exception as exc:  # pragma: no cover - 单条写入失败时记录日志
-                logger.error("写入 rag_summaries 失败: %s", exc)
-            else:
-                logger.debug(
-                    "已写入章节摘要: project=%s chapter=%s",
-                    item.get("project_id"),
-                    item.get("chapter_number"),
+        await self.ensure_schema()
+        params = {"project_id": project_id, "chapter_number": chapter_number}
+        keep_ids = [item["id"] for item in kept_chunks] + [item["id"] for item in chunk_records] + list(retain_ids)
+        keep_params = {f"keep_{idx}": record_id for idx, record_id in enumerate(keep_ids)}
+        delete_sql = "DELETE FROM rag_chunks WHERE project_id = :project_id AND chapter_number = :chapter_number"
+        if keep_ids:
+            delete_sql += f" AND id NOT IN ({','.join(':' + name for name in keep_params)})"
+        statements: List[Tuple[str, Dict[str, Any]]] = [(delete_sql, {**params, **keep_params})]
+        if replace_summaries:
+            statements.append(
+                (
+                    "DELETE FROM rag_summaries WHERE project_id = :project_id AND chapter_number = :chapter_number",
+                    params,
                 )
+            )
+        statements.extend((_UPDATE_CHUNK_POSITION_SQL, self._position_params(item)) for item in kept_chunks)
+        statements.extend((_UPSERT_CHUNK_SQL, self._chunk_params(item)) for item in chunk_records)
+        statements.extend((_UPSERT_SUMMARY_SQL, self._summary_params(item)) for item in summary_records)
+        revision_tables = ("rag_chunks", "rag_summaries")
+        statements.extend(
+            (_BUMP_REVISION_SQL, {"project_id": project_id, "table_name": table}) for table in revision_tables
+        )
+
+        try:
+            results = await self._client.batch(statements)  # type: ignore[union-attr]
+        except Exception as exc:  # pragma: no cover - 事务失败时旧向量保持不变
+            logger.error(
+                "章节向量事务写入失败: project=%s chapter=%s error=%s",
+                project_id,
+                chapter_number,
+                exc,
+            )
+            for table in revision_tables:
+                vector_index_cache.invalidate(table, project_id)
+            return {"chunks": 0, "summaries": 0, "kept": 0, "deleted": 0}
+
+        deleted = int(getattr(results[0], "rows_affected", 0) or 0)
+        revisions = results[-len(revision_tables):]
+        for table, records, result in zip(revision_tables, (chunk_records, summary_records), revisions):
+            replaced = table == "rag_chunks" or replace_summaries
+            self._apply_index_update(
+                table,
+                project_id,
+                self._first_int(result),
+                upserted=[self._index_row(item) for item in records],
+                removed_chapters=[chapter_number] if replaced else (),
+                keep_ids=set(keep_ids) if table == "rag_chunks" else (),
+            )
+        logger.info(
+            "章节向量事务写入完成: project=%s chapter=%s chunks=%d kept=%d deleted=%d summaries=%d",
+            project_id,
+            chapter_number,
+            len(chunk_records),
+            len(kept_chunks),
+            deleted,
+            len(summary_records),
+        )
+        return {
+            "chunks": len(chunk_records),
+            "summaries": len(summary_records),
+            "kept": len(kept_chunks),
+            "deleted": deleted,
+        }
 
     async def delete_by_chapters(self, project_id: str, chapter_numbers: Sequence[int]) -> None:
         """根据章节编号批量删除对应的上下文数据。"""
@@ -393,9 +528,15 @@ class VectorStoreService:
         WHERE project_id = :project_id
           AND chapter_number IN ({placeholders})
         """
+        revision_tables = ("rag_chunks", "rag_summaries")
         try:
-            await self._client.execute(chunk_sql, params)  # type: ignore[union-attr]
-            await self._client.execute(summary_sql, params)  # type: ignore[union-attr]
+            results = await self._client.batch(  # type: ignore[union-attr]
+                [
+                    (chunk_sql, params),
+                    (summary_sql, params),
+                    *((_BUMP_REVISION_SQL, {"project_id": project_id, "table_name": table}) for table in revision_tables),
+                ]
+            )
             logger.info(
                 "已删除章节向量: project=%s chapters=%s",
                 project_id,
@@ -403,6 +544,214 @@ class VectorStoreService:
             )
         except Exception as exc:  # pragma: no cover - 删除失败时记录日志
             logger.error("删除章节向量失败: project=%s chapters=%s error=%s", project_id, chapter_numbers, exc)
+            for table in revision_tables:
+                vector_index_cache.invalidate(table, project_id)
+            return
+        for table, result in zip(revision_tables, results[2:]):
+            self._apply_index_update(table, project_id, self._first_int(result), removed_chapters=chapter_numbers)
+
+    # ------------------------------------------------------------------
+    # 进程内向量索引缓存
+    # ------------------------------------------------------------------
+    async def _load_index(self, table: str, project_id: str) -> Optional[ProjectVectorIndex]:
+        """获取项目的内存向量索引；缓存缺失或版本落后时只读取 id、章节号与向量重建。"""
+        if not vector_index_cache.enabled:
+            return None
+        try:
+            revision = await self._read_revision(table, project_id)
+            index = vector_index_cache.get(table, project_id, revision)
+            if index is not None:
+                return index
+            result = await self._client.execute(  # type: ignore[union-attr]
+                f"SELECT id, chapter_number, embedding FROM {table} WHERE project_id = :project_id",
+                {"project_id": project_id},
+            )
+        except Exception as exc:  # pragma: no cover - 加载失败时退回 SQL 检索
+            logger.warning("加载向量索引失败，退回逐行检索: table=%s project=%s error=%s", table, project_id, exc)
+            return None
+
+        index = ProjectVectorIndex.from_rows(
+            (
+                (row.get("id"), row.get("chapter_number", 0), row.get("embedding"))
+                for row in self._iter_rows(result)
+            ),
+            revision=revision,
+        )
+        vector_index_cache.put(table, project_id, index)
+        logger.debug("已构建项目向量索引: table=%s project=%s rows=%d", table, project_id, len(index))
+        return index
+
+    async def _read_revision(self, table: str, project_id: str) -> int:
+        result = await self._client.execute(  # type: ignore[union-attr]
+            """
+            SELECT revision FROM rag_index_revisions
+            WHERE project_id = :project_id AND table_name = :table_name
+            """,
+            {"project_id": project_id, "table_name": table},
+        )
+        return self._first_int(result)
+
+    async def _batched_upsert(
+        self,
+        table: str,
+        items: Sequence[Tuple[str, Dict[str, Any], Dict[str, Any]]],
+    ) -> int:
+        """按批次以单个事务写入（每批附带版本号递增），返回成功写入的行数。"""
+        written = 0
+        for start in range(0, len(items), _WRITE_BATCH_SIZE):
+            batch = items[start:start + _WRITE_BATCH_SIZE]
+            project_ids = sorted({params["project_id"] for _, params, _ in batch})
+            statements: List[Tuple[str, Dict[str, Any]]] = [(sql, params) for sql, params, _ in batch]
+            statements.extend(
+                (_BUMP_REVISION_SQL, {"project_id": project_id, "table_name": table}) for project_id in project_ids
+            )
+            try:
+                results = await self._client.batch(statements)  # type: ignore[union-attr]
+            except Exception as exc:  # pragma: no cover - 整批回滚，仅记录日志
+                logger.error("批量写入 %s 失败: rows=%d error=%s", table, len(batch), exc)
+                for project_id in project_ids:
+                    vector_index_cache.invalidate(table, project_id)
+                continue
+
+            written += len(batch)
+            for project_id, result in zip(project_ids, results[len(batch):]):
+                self._apply_index_update(
+                    table,
+                    project_id,
+                    self._first_int(result),
+                    upserted=[self._index_row(record) for _, params, record in batch if params["project_id"] == project_id],
+                )
+            logger.debug("已批量写入 %s: rows=%d projects=%s", table, len(batch), project_ids)
+        return written
+
+    @staticmethod
+    def _apply_index_update(
+        table: str,
+        project_id: str,
+        revision: int,
+        *,
+        upserted: Sequence[Tuple[str, int, Sequence[float]]] = (),
+        removed_chapters: Sequence[int] = (),
+        keep_ids: Collection[str] = (),
+    ) -> None:
+        """写入已提交后同步本进程缓存：缓存恰好落后一个版本则原地增量更新，否则丢弃等待重建。"""
+        index = vector_index_cache.peek(table, project_id)
+        if index is None:
+            return
+        # 版本号跳跃说明其他进程也写过，增量结果不可信
+        if index.revision != revision - 1:
+            vector_index_cache.invalidate(table, project_id)
+            return
+        if removed_chapters:
+            index.remove_chapters(removed_chapters, keep_ids=keep_ids)
+        if upserted and not index.upsert(upserted):
+            vector_index_cache.invalidate(table, project_id)
+            return
+        index.revision = revision
+        vector_index_cache.put(table, project_id, index)
+
+    @staticmethod
+    def _index_row(record: Dict[str, Any]) -> Tuple[str, int, Sequence[float]]:
+        return record["id"], record.get("chapter_number", 0), record.get("embedding") or []
+
+    def _chunk_params(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": item["id"],
+            "project_id": item["project_id"],
+            "chapter_number": item["chapter_number"],
+            "chunk_index": item.get("chunk_index", 0),
+            "chapter_title": item.get("chapter_title"),
+            "content": item.get("content", ""),
+            "embedding": self._to_f32_blob(item.get("embedding", [])),
+            "metadata": json.dumps(item.get("metadata") or {}, ensure_ascii=False),
+            "content_hash": item.get("content_hash") or content_hash(item.get("content") or ""),
+        }
+
+    @staticmethod
+    def _position_params(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": item["id"],
+            "chunk_index": item.get("chunk_index", 0),
+            "chapter_title": item.get("chapter_title"),
+            "metadata": json.dumps(item.get("metadata") or {}, ensure_ascii=False),
+        }
+
+    def _summary_params(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": item["id"],
+            "project_id": item["project_id"],
+            "chapter_number": item["chapter_number"],
+            "title": item.get("title", ""),
+            "summary": item.get("summary", ""),
+            "embedding": self._to_f32_blob(item.get("embedding", [])),
+        }
+
+    @classmethod
+    def _first_int(cls, result: Any) -> int:
+        rows = list(cls._iter_rows(result))
+        if not rows:
+            return 0
+        value = next(iter(rows[0].values()), 0)
+        return int(value or 0)
+
+    async def _fetch_chunks_by_ids(self, ranked: Sequence[Tuple[str, float]]) -> List[RetrievedChunk]:
+        """按索引返回的 top-k ID 回表读取正文，保持相似度顺序。"""
+        rows = await self._fetch_rows_by_ids(
+            "rag_chunks",
+            "id, content, chapter_number, chapter_title, COALESCE(metadata, '{}') AS metadata",
+            [record_id for record_id, _ in ranked],
+        )
+        items: List[RetrievedChunk] = []
+        for record_id, distance in ranked:
+            row = rows.get(record_id)
+            if row is None:
+                continue
+            items.append(
+                RetrievedChunk(
+                    content=row.get("content", ""),
+                    chapter_number=row.get("chapter_number", 0),
+                    chapter_title=row.get("chapter_title"),
+                    score=distance,
+                    metadata=self._parse_metadata(row.get("metadata")),
+                )
+            )
+        return items
+
+    async def _fetch_summaries_by_ids(self, ranked: Sequence[Tuple[str, float]]) -> List[RetrievedSummary]:
+        rows = await self._fetch_rows_by_ids(
+            "rag_summaries",
+            "id, chapter_number, title, summary",
+            [record_id for record_id, _ in ranked],
+        )
+        items: List[RetrievedSummary] = []
+        for record_id, distance in ranked:
+            row = rows.get(record_id)
+            if row is None:
+                continue
+            items.append(
+                RetrievedSummary(
+                    chapter_number=row.get("chapter_number", 0),
+                    title=row.get("title", ""),
+                    summary=row.get("summary", ""),
+                    score=distance,
+                )
+            )
+        return items
+
+    async def _fetch_rows_by_ids(self, table: str, columns: str, ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if not ids:
+            return {}
+        placeholders = ",".join(":id_" + str(idx) for idx in range(len(ids)))
+        params = {f"id_{idx}": record_id for idx, record_id in enumerate(ids)}
+        try:
+            result = await self._client.execute(  # type: ignore[union-attr]
+                f"SELECT {columns} FROM {table} WHERE id IN ({placeholders})",
+                params,
+            )
+        except Exception as exc:  # pragma: no cover - 查询异常时仅记录
+            logger.warning("按 ID 读取向量记录失败: table=%s error=%s", table, exc)
+            return {}
+        return {row.get("id"): row for row in self._iter_rows(result)}
 
     @staticmethod
     def _to_f32_blob(embedding: Sequence[float]) -> bytes:
@@ -433,6 +782,64 @@ class VectorStoreService:
         similarity = dot / (norm_a * norm_b)
         return 1.0 - similarity
 
+    @staticmethod
+    def _rank_by_cosine(
+        query: Sequence[float],
+        blobs: Sequence[Any],
+        top_k: int,
+    ) -> List[Tuple[int, float]]:
+        """对一组 float32 BLOB 计算余弦距离，返回距离最小的 (行下标, 距离)，按距离升序。
+
+        NumPy 可用时：BLOB 拼接后以 ``np.frombuffer`` 解码为连续 float32 矩阵，
+        预先归一化后做一次矩阵-向量乘法，再用 ``argpartition`` 取 top-k，避免全量排序。
+        维度与查询向量不一致的行（如更换过嵌入模型）直接跳过。
+        """
+        if top_k <= 0 or not blobs:
+            return []
+
+        if np is None:  # pragma: no cover - 仅在缺少 NumPy 时使用
+            if not any(query):
+                return []
+            scored = []
+            for index, blob in enumerate(blobs):
+                vector = VectorStoreService._from_f32_blob(blob)
+                # 与 NumPy 分支一致：维度不一致的行直接跳过，避免 zip 截断后算出错误的距离
+                if len(vector) != len(query):
+                    continue
+                scored.append((index, VectorStoreService._cosine_distance(query, vector)))
+            scored.sort(key=lambda item: item[1])
+            return scored[:top_k]
+
+        query_vec = np.asarray(query, dtype=np.float32)
+        dim = query_vec.shape[0]
+        row_bytes = dim * 4
+        query_norm = float(np.linalg.norm(query_vec))
+        if dim == 0 or query_norm == 0:
+            return []
+
+        indexes: List[int] = []
+        buffers: List[bytes] = []
+        for index, blob in enumerate(blobs):
+            if blob is None or len(blob) != row_bytes:
+                continue
+            indexes.append(index)
+            buffers.append(blob)
+        if not indexes:
+            return []
+
+        matrix = np.frombuffer(b"".join(buffers), dtype=np.float32).reshape(len(indexes), dim)
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = np.inf  # 零向量相似度记为 0，对应距离 1
+        similarities = (matrix @ (query_vec / query_norm)) / norms
+
+        k = min(top_k, similarities.shape[0])
+        if k < similarities.shape[0]:
+            candidates = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            candidates = np.arange(similarities.shape[0])
+        ordered = candidates[np.argsort(-similarities[candidates], kind="stable")]
+        return [(indexes[int(i)], float(1.0 - similarities[i])) for i in ordered]
+
     async def _query_chunks_with_python_similarity(
         self,
         *,
@@ -451,11 +858,12 @@ class VectorStoreService:
         WHERE project_id = :project_id
         """
         result = await self._client.execute(sql, {"project_id": project_id})  # type: ignore[union-attr]
-        scored: List[RetrievedChunk] = []
-        for row in self._iter_rows(result):
-            stored_embedding = self._from_f32_blob(row.get("embedding"))
-            distance = self._cosine_distance(embedding, stored_embedding)
-            scored.append(
+        rows = list(self._iter_rows(result))
+        ranked = self._rank_by_cosine(embedding, [row.get("embedding") for row in rows], top_k)
+        items: List[RetrievedChunk] = []
+        for index, distance in ranked:
+            row = rows[index]
+            items.append(
                 RetrievedChunk(
                     content=row.get("content", ""),
                     chapter_number=row.get("chapter_number", 0),
@@ -464,8 +872,7 @@ class VectorStoreService:
                     metadata=self._parse_metadata(row.get("metadata")),
                 )
             )
-        scored.sort(key=lambda item: item.score)
-        return scored[:top_k]
+        return items
 
     async def _query_summaries_with_python_similarity(
         self,
@@ -484,11 +891,12 @@ class VectorStoreService:
         WHERE project_id = :project_id
         """
         result = await self._client.execute(sql, {"project_id": project_id})  # type: ignore[union-attr]
-        scored: List[RetrievedSummary] = []
-        for row in self._iter_rows(result):
-            stored_embedding = self._from_f32_blob(row.get("embedding"))
-            distance = self._cosine_distance(embedding, stored_embedding)
-            scored.append(
+        rows = list(self._iter_rows(result))
+        ranked = self._rank_by_cosine(embedding, [row.get("embedding") for row in rows], top_k)
+        items: List[RetrievedSummary] = []
+        for index, distance in ranked:
+            row = rows[index]
+            items.append(
                 RetrievedSummary(
                     chapter_number=row.get("chapter_number", 0),
                     title=row.get("title", ""),
@@ -496,8 +904,7 @@ class VectorStoreService:
                     score=distance,
                 )
             )
-        scored.sort(key=lambda item: item.score)
-        return scored[:top_k]
+        return items
 
     @staticmethod
     def _parse_metadata(raw: Any) -> Dict[str, Any]:
@@ -540,6 +947,7 @@ class VectorStoreService:
 
 __all__ = [
     "VectorStoreService",
+    "content_hash",
     "RetrievedChunk",
     "RetrievedSummary",
 ]
@@ -0,0 +1,244 @@
+# AIMETA P=客户端注册表_共享连接池|R=OpenAI客户端复用_Ollama客户端复用_HTTP客户端复用_空闲回收|NR=不含业务逻辑|E=ClientRegistry_client_registry|X=internal|A=连接池管理|D=httpx,openai,ollama|S=net|RD=./README.ai
+"""
+进程级 LLM / 嵌入 / HTTP 客户端注册表。
+
+按 (provider, base_url, api_key 摘要) 复用客户端及其底层 httpx 连接池，
+避免每次调用都重新建连和 TLS 握手；长时间未使用的客户端会被自动关闭回收。
+调用期间以 ``in_use`` 标记客户端，正在使用的客户端不会被回收，被淘汰时等最后一个使用方结束后再关闭。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from ..core.config import settings
+
+try:  # noqa: SIM105 - HTTP/2 依赖 h2，未安装时退回 HTTP/1.1 keep-alive
+    import h2  # noqa: F401
+
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - 可选依赖
+    _HTTP2_AVAILABLE = False
+
+try:  # pragma: no cover - 运行环境未安装时兼容
+    from ollama import AsyncClient as OllamaAsyncClient
+except ImportError:  # pragma: no cover - Ollama 为可选依赖
+    OllamaAsyncClient = None
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, str, str]
+
+
+@dataclass
+class _Entry:
+    client: Any
+    close: Callable[[], Awaitable[None]]
+    loop: Optional[asyncio.AbstractEventLoop]
+    last_used: float
+    # 正在进行中的调用数；大于 0 时不做空闲回收，被淘汰后由最后一个调用方关闭
+    active: int = 0
+    retired: bool = False
+
+
+def _hash_secret(secret: Optional[str]) -> str:
+    if not secret:
+        return "-"
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ClientRegistry:
+    """按提供方、地址与密钥摘要缓存客户端，统一管理连接上限与空闲回收。"""
+
+    def __init__(
+        self,
+        *,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        idle_ttl: float,
+        max_clients: int = 64,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._idle_ttl = idle_ttl
+        self._max_clients = max(1, max_clients)
+        self._entries: "OrderedDict[ClientKey, _Entry]" = OrderedDict()
+        # 按客户端对象查找条目，包含已被淘汰但仍有调用未结束的条目
+        self._by_client: Dict[int, _Entry] = {}
+        # 事件循环只弱引用任务，关闭任务需要在这里持有到完成，否则可能中途被回收
+        self._closing: Set["asyncio.Task[None]"] = set()
+
+    # ------------------------------------------------------------------
+    # 对外获取接口
+    # ------------------------------------------------------------------
+    def get_openai(self, *, api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+        """获取共享的 AsyncOpenAI 客户端，底层连接池在同一 key 下复用。"""
+        key = ("openai", str(base_url or ""), _hash_secret(api_key))
+
+        def build() -> _Entry:
+            http_client = self._build_http_client()
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+            return _Entry(client=client, close=client.close, loop=_current_loop(), last_used=time.monotonic())
+
+        return self._get_or_create(key, build)
+
+    def get_ollama(self, *, host: Optional[str] = None) -> Any:
+        """获取共享的 Ollama 异步客户端。"""
+        if OllamaAsyncClient is None:
+            raise RuntimeError("缺少 Ollama 依赖，请先安装 ollama 包。")
+        key = ("ollama", str(host or ""), "-")
+
+        def build() -> _Entry:
+            client = OllamaAsyncClient(host=host, limits=self._limits)
+            return _Entry(
+                client=client,
+                close=client._client.aclose,  # pylint: disable=protected-access
+                loop=_current_loop(),
+                last_used=time.monotonic(),
+            )
+
+        return self._get_or_create(key, build)
+
+    def get_http(self, *, base_url: Optional[str] = None, timeout: float = 180.0) -> httpx.AsyncClient:
+        """获取共享的通用 httpx 客户端（如图像生成等非 OpenAI SDK 调用）。"""
+        key = ("http", str(base_url or ""), str(timeout))
+
+        def build() -> _Entry:
+            client = self._build_http_client(timeout=httpx.Timeout(timeout, connect=10.0))
+            return _Entry(client=client, close=client.aclose, loop=_current_loop(), last_used=time.monotonic())
+
+        return self._get_or_create(key, build)
+
+    @asynccontextmanager
+    async def in_use(self, client: Any) -> AsyncIterator[Any]:
+        """在一次调用（流式响应、嵌入请求等）期间标记客户端正在使用，防止中途被回收关闭。
+
+        不是由注册表创建的客户端原样返回，不做任何处理。
+        """
+        entry = self._by_client.get(id(client))
+        if entry is None or entry.client is not client:
+            yield client
+            return
+        entry.active += 1
+        try:
+            yield client
+        finally:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.active == 0:
+                self._schedule_close(entry)
+
+    async def aclose(self) -> None:
+        """关闭全部客户端（包括已淘汰但仍有调用未结束的），通常在应用退出时调用。"""
+        entries = {id(entry): entry for entry in (*self._entries.values(), *self._by_client.values())}
+        self._entries.clear()
+        self._by_client.clear()
+        for entry in entries.values():
+            await self._close_entry(entry)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"clients": len(self._entries), "http2": int(_HTTP2_AVAILABLE)}
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _build_http_client(self, *, timeout: Optional[httpx.Timeout] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=self._limits,
+            timeout=timeout or httpx.Timeout(600.0, connect=10.0),
+        )
+
+    def _get_or_create(self, key: ClientKey, build: Callable[[], _Entry]) -> Any:
+        now = time.monotonic()
+        loop = _current_loop()
+        self._evict_idle(now)
+
+        entry = self._entries.get(key)
+        # httpx 连接池绑定事件循环，跨循环（如 Celery 任务中的 asyncio.run）时重新创建
+        if entry is not None and entry.loop is not loop:
+            self._entries.pop(key, None)
+            self._by_client.pop(id(entry.client), None)
+            entry = None
+        if entry is None:
+            entry = build()
+            self._entries[key] = entry
+            self._by_client[id(entry.client)] = entry
+            logger.debug("创建共享客户端: provider=%s base_url=%s", key[0], key[1])
+            while len(self._entries) > self._max_clients:
+                _, oldest = self._entries.popitem(last=False)
+                self._retire(oldest)
+        else:
+            self._entries.move_to_end(key)
+        entry.last_used = now
+        return entry.client
+
+    def _evict_idle(self, now: float) -> None:
+        if self._idle_ttl <= 0:
+            return
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry.active == 0 and now - entry.last_used > self._idle_ttl
+        ]
+        for key in expired:
+            entry = self._entries.pop(key)
+            logger.debug("回收空闲客户端: provider=%s base_url=%s", key[0], key[1])
+            self._retire(entry)
+
+    def _retire(self, entry: _Entry) -> None:
+        """将条目移出缓存：无进行中的调用时立即关闭，否则等最后一个调用结束后关闭。"""
+        entry.retired = True
+        if entry.active == 0:
+            self._schedule_close(entry)
+
+    def _schedule_close(self, entry: _Entry) -> None:
+        if self._by_client.get(id(entry.client)) is entry:
+            del self._by_client[id(entry.client)]
+        loop = _current_loop()
+        if loop is None or entry.loop is not loop:
+            # 不在原事件循环中无法安全关闭，交给垃圾回收
+            return
+        task = loop.create_task(self._close_entry(entry))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_entry(entry: _Entry) -> None:
+        try:
+            await entry.close()
+        except Exception as exc:  # pragma: no cover - 关闭失败仅记录
+            logger.debug("关闭客户端失败: %s", exc)
+
+
+client_registry = ClientRegistry(
+    max_connections=settings.llm_http_max_connections,
+    max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+    keepalive_expiry=settings.llm_http_keepalive_expiry,
+    idle_ttl=settings.llm_client_idle_ttl,
+)
+
+
+__all__ = ["ClientRegistry", "client_registry"]
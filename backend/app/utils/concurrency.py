@@ -0,0 +1,152 @@
+# AIMETA P=并发工具_限流和有序并发|R=全局并发上限_按用户并发上限_有序收集_依赖图并发执行|NR=不含业务逻辑|E=ConcurrencyLimiter_gather_in_order_run_dag|X=internal|A=工具类|D=asyncio|S=none|RD=./README.ai
+"""协程并发辅助工具：两级并发限流、按提交顺序收集结果与按依赖图并发执行。"""
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+# 依赖图中的一个步骤：(依赖的步骤名, 接收已完成步骤结果字典的协程函数)
+DagStep = Tuple[Sequence[str], Callable[[Dict[str, Any]], Awaitable[Any]]]
+
+
+class ConcurrencyLimiter:
+    """全局 + 按键（通常是用户 ID）两级并发限流器，进程内共享。"""
+
+    def __init__(self, global_limit: int, per_key_limit: Optional[int] = None) -> None:
+        self.global_limit = max(1, int(global_limit))
+        self.per_key_limit = max(1, int(per_key_limit)) if per_key_limit else None
+        self._global = asyncio.Semaphore(self.global_limit)
+        # 按键的信号量在无人持有时自动回收，避免长期运行后字典无限增长
+        self._per_key: "weakref.WeakValueDictionary[Hashable, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+    def _key_semaphore(self, key: Optional[Hashable]) -> Optional[asyncio.Semaphore]:
+        if key is None or self.per_key_limit is None:
+            return None
+        semaphore = self._per_key.get(key)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_key_limit)
+            self._per_key[key] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, key: Optional[Hashable] = None) -> AsyncIterator[None]:
+        """占用一个并发槽位；先排队按键限额，再占全局限额，避免单个用户挤占全局槽位。"""
+        key_semaphore = self._key_semaphore(key)
+        if key_semaphore is None:
+            async with self._global:
+                yield
+            return
+        async with key_semaphore:
+            async with self._global:
+                yield
+
+
+async def gather_in_order(aws: Sequence[Awaitable[T]]) -> List[T]:
+    """并发执行并按提交顺序返回结果；任一失败时取消其余任务并抛出原异常。"""
+    tasks: List["asyncio.Future[Any]"] = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _topological_order(steps: Mapping[str, DagStep]) -> List[str]:
+    order: List[str] = []
+    state: Dict[str, int] = {}  # 1 = 访问中，2 = 已完成
+
+    def visit(name: str, path: Tuple[str, ...]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"依赖图存在环: {' -> '.join(path + (name,))}")
+        state[name] = 1
+        for dep in steps[name][0]:
+            if dep not in steps:
+                raise ValueError(f"步骤 {name} 依赖了未定义的步骤 {dep}")
+            visit(dep, path + (name,))
+        state[name] = 2
+        order.append(name)
+
+    for name in steps:
+        visit(name, ())
+    return order
+
+
+async def run_dag(
+    steps: Mapping[str, DagStep],
+    *,
+    max_parallel: int,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """按依赖关系并发执行步骤，同时运行的步骤数不超过 ``max_parallel``。
+
+    每个步骤在其全部依赖成功后启动；依赖失败的步骤标记为 skipped，不会执行。
+    单个步骤的异常被记录在报告中而不向外抛出，调用方根据报告决定整体成败。
+
+    Returns:
+        (results, reports)：results 为成功步骤的返回值；reports 为每个步骤的
+        ``{"status": ok|failed|skipped, "started_ms", "duration_ms", "error"/"skipped_by"}``。
+    """
+    order = _topological_order(steps)
+    semaphore = asyncio.Semaphore(max(1, int(max_parallel)))
+    results: Dict[str, Any] = {}
+    reports: Dict[str, Dict[str, Any]] = {}
+    tasks: Dict[str, "asyncio.Future[None]"] = {}
+    origin = time.perf_counter()
+
+    async def run_step(name: str) -> None:
+        deps, func = steps[name]
+        if deps:
+            await asyncio.gather(*(tasks[dep] for dep in deps))
+        failed = [dep for dep in deps if reports[dep]["status"] != "ok"]
+        if failed:
+            reports[name] = {"status": "skipped", "skipped_by": failed}
+            return
+        async with semaphore:
+            started = time.perf_counter()
+            report: Dict[str, Any] = {"started_ms": round((started - origin) * 1000, 1)}
+            try:
+                results[name] = await func(results)
+                report["status"] = "ok"
+            except Exception as exc:  # noqa: BLE001 - 失败记录在报告中，由调用方处理
+                report["status"] = "failed"
+                report["error"] = str(exc) or exc.__class__.__name__
+            report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            reports[name] = report
+
+    # 按拓扑序创建任务，保证步骤等待依赖时对应任务已存在
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results, {name: reports[name] for name in order}
+
+
+__all__ = ["ConcurrencyLimiter", "DagStep", "gather_in_order", "run_dag"]
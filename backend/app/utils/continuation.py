@@ -0,0 +1,55 @@
+# AIMETA P=续写拼接_截断输出的重叠去重|R=续写片段缓冲_首尾重叠检测_去重拼接|NR=不含LLM调用|E=merge_overlap_OverlapStitcher|X=internal|A=工具类|D=none|S=none|RD=./README.ai
+"""长度截断后的续写拼接：续写片段开头常会重复已输出正文的结尾，拼接前去掉这段重叠。"""
+from __future__ import annotations
+
+from typing import List
+
+# 重叠少于该字数时视为巧合（如常见的标点、短词），不做去重
+MIN_OVERLAP = 8
+
+
+def merge_overlap(head: str, addition: str, *, max_overlap: int, min_overlap: int = MIN_OVERLAP) -> str:
+    """返回 ``addition`` 去掉与 ``head`` 结尾重叠部分后的剩余文本。"""
+    limit = min(len(head), len(addition), max_overlap)
+    for size in range(limit, min_overlap - 1, -1):
+        if head.endswith(addition[:size]):
+            return addition[size:]
+    return addition
+
+
+class OverlapStitcher:
+    """
+    流式续写的重叠去重。
+
+    续写开头先缓冲至 ``max_overlap`` 字（或流结束），确定重叠长度后再放行，
+    之后的增量原样透传，保证转发给前端与护栏的文本不含重复片段。
+    """
+
+    def __init__(self, head: str, *, max_overlap: int):
+        self._head_tail = head[-max_overlap:] if max_overlap > 0 else ""
+        self._max_overlap = max_overlap
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._resolved = max_overlap <= 0
+
+    def feed(self, delta: str) -> str:
+        """追加一段续写增量，返回可以放行的文本（缓冲期间为空串）。"""
+        if self._resolved:
+            return delta
+        self._pending.append(delta)
+        self._pending_chars += len(delta)
+        if self._pending_chars < self._max_overlap:
+            return ""
+        return self.flush()
+
+    def flush(self) -> str:
+        """流结束时放行缓冲区剩余文本。"""
+        if self._resolved:
+            return ""
+        self._resolved = True
+        buffered = "".join(self._pending)
+        self._pending.clear()
+        return merge_overlap(self._head_tail, buffered, max_overlap=self._max_overlap)
+
+
+__all__ = ["MIN_OVERLAP", "OverlapStitcher", "merge_overlap"]
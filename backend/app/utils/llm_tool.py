@@ -8,6 +8,8 @@ from typing import AsyncGenerator, Dict, List, Optional
 
 from openai import AsyncOpenAI
 
+from .client_registry import client_registry
+
 
 @dataclass
 class ChatMessage:
@@ -21,12 +23,25 @@ class ChatMessage:
 class LLMClient:
     """异步流式调用封装，兼容 OpenAI SDK。"""
 
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[AsyncOpenAI] = None,
+    ):
+        if client is not None:
+            self._client = client
+            return
+
         key = api_key or os.environ.get("OPENAI_API_KEY")
         if not key:
             raise ValueError("缺少 OPENAI_API_KEY 配置，请在数据库或环境变量中补全。")
 
-        self._client = AsyncOpenAI(api_key=key, base_url=base_url or os.environ.get("OPENAI_API_BASE"))
+        # 复用进程级共享客户端，避免每次调用重新建连与 TLS 握手
+        self._client = client_registry.get_openai(
+            api_key=key,
+            base_url=base_url or os.environ.get("OPENAI_API_BASE"),
+        )
 
     async def stream_chat(
         self,
@@ -55,12 +70,18 @@ class LLMClient:
         if max_tokens is not None:
             payload["max_tokens"] = max_tokens
 
-        stream = await self._client.chat.completions.create(**payload)
-        async for chunk in stream:
-            if not chunk.choices:
-                continue
-            choice = chunk.choices[0]
-            yield {
-                "content": choice.delta.content,
-                "finish_reason": choice.finish_reason,
-            }
+        # 流式响应期间标记共享客户端正在使用，长章节的续写轮次中途不会被空闲回收关闭
+        async with client_registry.in_use(self._client):
+            stream = await self._client.chat.completions.create(**payload)
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    yield {
+                        "content": choice.delta.content,
+                        "finish_reason": choice.finish_reason,
+                    }
+            finally:
+                # 调用方提前关闭生成器（如流式护栏中止）时立即断开上游响应，停止继续计费
+                await stream.close()
@@ -0,0 +1,58 @@
+# AIMETA P=段落视图_按段落局部替换正文|R=段落切分_保留分隔符_位置映射_段落替换_无损拼回|NR=不含LLM调用|E=ParagraphText|X=internal|A=工具类|D=re|S=none|RD=./README.ai
+"""章节正文的段落视图：按换行切分段落，替换个别段落后无损拼回原文其余部分。"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+# 开头的空白、换行及其后的空白（含全角缩进、空行）整体视为段落分隔符，拼回时原样保留
+_SEPARATOR = re.compile(r"(\A\s+|\n\s*)")
+
+
+class ParagraphText:
+    """把正文切成段落序列；段落序号从 0 开始，只计非空段落。"""
+
+    def __init__(self, text: str) -> None:
+        self._parts: List[str] = _SEPARATOR.split(text or "")
+        # 偶数位是正文片段，奇数位是分隔符；只为非空片段编号
+        self._positions: List[int] = [
+            pos for pos in range(0, len(self._parts), 2) if self._parts[pos].strip()
+        ]
+        # 各段在原文中的 [起, 止) 字符区间，用于把违规位置映射到段落
+        starts: List[int] = []
+        offset = 0
+        for part in self._parts:
+            starts.append(offset)
+            offset += len(part)
+        self._spans: List[Tuple[int, int]] = [
+            (starts[pos], starts[pos] + len(self._parts[pos])) for pos in self._positions
+        ]
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def paragraphs(self) -> List[str]:
+        return [self._parts[pos] for pos in self._positions]
+
+    def __getitem__(self, index: int) -> str:
+        return self._parts[self._positions[index]]
+
+    def indices_for_span(self, start: int, end: Optional[int] = None) -> List[int]:
+        """原文（构造时的正文）``[start, end)`` 区间覆盖的段落序号；落在分隔符上时归入下一段。"""
+        end = max(start + 1, end if end is not None else start + 1)
+        covered = [idx for idx, (p_start, p_end) in enumerate(self._spans) if p_start < end and start < p_end]
+        if covered:
+            return covered
+        following = [idx for idx, (p_start, _) in enumerate(self._spans) if p_start >= start]
+        return following[:1]
+
+    def replace(self, index: int, text: str) -> None:
+        """替换第 ``index`` 段；替换文本内部的换行会原样写入。"""
+        self._parts[self._positions[index]] = text
+
+    def render(self) -> str:
+        return "".join(self._parts)
+
+
+__all__ = ["ParagraphText"]
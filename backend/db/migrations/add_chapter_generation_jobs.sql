@@ -0,0 +1,24 @@
+-- 迁移脚本：新增章节生成任务表
+-- 生成请求提交为后台任务，按阶段保存检查点，进程重启后从最近完成的阶段继续
+
+CREATE TABLE IF NOT EXISTS chapter_generation_jobs (
+    id CHAR(36) PRIMARY KEY,
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    user_id INT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    request JSON NOT NULL,
+    stage VARCHAR(64) NULL,
+    checkpoints JSON NULL,
+    progress JSON NULL,
+    result JSON NULL,
+    error TEXT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    INDEX idx_generation_job_status (status),
+    INDEX idx_generation_job_chapter (project_id, chapter_number),
+    CONSTRAINT fk_generation_job_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
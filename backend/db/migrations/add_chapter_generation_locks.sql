@@ -0,0 +1,20 @@
+-- 迁移脚本：新增章节生成租约表，生成任务增加幂等键
+-- 同一章节的并发生成请求只执行一次，相同请求（含跨进程）等待并共享其结果
+
+CREATE TABLE IF NOT EXISTS chapter_generation_locks (
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    owner CHAR(36) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'running',
+    fingerprint CHAR(64) NOT NULL,
+    idempotency_key VARCHAR(128) NULL,
+    result JSON NULL,
+    error JSON NULL,
+    expires_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (project_id, chapter_number),
+    CONSTRAINT fk_generation_lock_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
+
+ALTER TABLE chapter_generation_jobs ADD COLUMN idempotency_key VARCHAR(128) NULL;
+CREATE INDEX idx_generation_job_idempotency ON chapter_generation_jobs (user_id, idempotency_key);
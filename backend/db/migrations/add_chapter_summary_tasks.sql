@@ -0,0 +1,18 @@
+-- 迁移脚本：新增章节摘要回填任务表
+-- 导入/编辑/选版/定稿后登记任务，由后台 worker 生成 chapters.real_summary
+
+CREATE TABLE IF NOT EXISTS chapter_summary_tasks (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    user_id INT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_summary_task_chapter (project_id, chapter_number),
+    INDEX idx_summary_task_status (status),
+    CONSTRAINT fk_summary_task_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
@@ -0,0 +1,4 @@
+-- 迁移脚本：给 novel_projects 表添加 revision 字段
+-- 每次写操作自增，写作接口的增量响应以此让前端判断本地状态是否连续
+
+ALTER TABLE novel_projects ADD COLUMN revision INT NOT NULL DEFAULT 0;
@@ -0,0 +1,9 @@
+-- 迁移脚本：新增系统配置版本号表
+-- 管理接口写入配置时递增版本号，各进程据此清空进程内的配置缓存
+
+CREATE TABLE IF NOT EXISTS system_config_revisions (
+    id INT PRIMARY KEY,
+    revision INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO system_config_revisions (id, revision) VALUES (1, 0);
@@ -21,6 +21,7 @@ CREATE TABLE IF NOT EXISTS novel_projects (
     status VARCHAR(32) DEFAULT 'draft',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    revision INT NOT NULL DEFAULT 0,
     CONSTRAINT fk_novel_projects_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
@@ -189,6 +190,61 @@ CREATE TABLE IF NOT EXISTS chapter_snapshots (
     CONSTRAINT fk_snapshot_version FOREIGN KEY (version_id) REFERENCES chapter_versions(id) ON DELETE SET NULL
 );
 
+CREATE TABLE IF NOT EXISTS chapter_summary_tasks (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    user_id INT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_summary_task_chapter (project_id, chapter_number),
+    INDEX idx_summary_task_status (status),
+    CONSTRAINT fk_summary_task_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS chapter_generation_jobs (
+    id CHAR(36) PRIMARY KEY,
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    user_id INT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    request JSON NOT NULL,
+    stage VARCHAR(64) NULL,
+    checkpoints JSON NULL,
+    progress JSON NULL,
+    result JSON NULL,
+    error TEXT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP NULL,
+    idempotency_key VARCHAR(128) NULL,
+    INDEX idx_generation_job_status (status),
+    INDEX idx_generation_job_chapter (project_id, chapter_number),
+    INDEX idx_generation_job_idempotency (user_id, idempotency_key),
+    CONSTRAINT fk_generation_job_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS chapter_generation_locks (
+    project_id CHAR(36) NOT NULL,
+    chapter_number INT NOT NULL,
+    owner CHAR(36) NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'running',
+    fingerprint CHAR(64) NOT NULL,
+    idempotency_key VARCHAR(128) NULL,
+    result JSON NULL,
+    error JSON NULL,
+    expires_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (project_id, chapter_number),
+    CONSTRAINT fk_generation_lock_project FOREIGN KEY (project_id) REFERENCES novel_projects(id) ON DELETE CASCADE
+);
+
 CREATE TABLE IF NOT EXISTS prompts (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(100) UNIQUE NOT NULL,
@@ -205,6 +261,11 @@ CREATE TABLE IF NOT EXISTS system_configs (
     description VARCHAR(255) NULL
 );
 
+CREATE TABLE IF NOT EXISTS system_config_revisions (
+    id INT PRIMARY KEY,
+    revision INT NOT NULL DEFAULT 0
+);
+
 CREATE TABLE IF NOT EXISTS admin_settings (
     `key` VARCHAR(64) PRIMARY KEY,
     value TEXT NOT NULL
@@ -47,6 +47,8 @@ export interface Statistics {
   novel_count: number
   user_count: number
   api_request_count: number
+  cancelled_stream_count: number
+  cancelled_tokens_saved: number
 }
 
 export interface AdminUser {
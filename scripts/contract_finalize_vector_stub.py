@@ -19,6 +19,11 @@ class StubLLMService:
     async def get_embedding(self, text: str, *, user_id: Optional[int] = None, model: Optional[str] = None) -> List[float]:
         return [0.1, 0.2, 0.3]  # deterministic stub
 
+    async def get_embeddings(
+        self, texts: List[str], *, user_id: Optional[int] = None, model: Optional[str] = None
+    ) -> List[List[float]]:
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
 
 class StubVectorStore:
     def __init__(self):
@@ -34,6 +39,24 @@ class StubVectorStore:
         # noop for stub
         return
 
+    async def chapter_chunk_hashes(self, *, project_id: str, chapter_number: int) -> Dict[str, str]:
+        return {}
+
+    async def replace_chapter(
+        self,
+        *,
+        project_id: str,
+        chapter_number: int,
+        chunk_records: List[Dict[str, Any]],
+        summary_records: List[Dict[str, Any]] = (),
+        kept_chunks: List[Dict[str, Any]] = (),
+        retain_ids: List[str] = (),
+        replace_summaries: bool = True,
+    ) -> Dict[str, int]:
+        self.add_calls.extend(chunk_records)
+        self.add_calls.extend(summary_records)
+        return {"chunks": len(chunk_records), "summaries": len(summary_records)}
+
 
 async def main():
     llm = StubLLMService()
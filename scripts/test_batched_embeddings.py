@@ -0,0 +1,129 @@
+"""
+Tests for batched embeddings: OpenAI inputs are sent in batches, results stay aligned with inputs,
+and chapter ingestion embeds chunks + summary in one call and reports partial failures.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_batched_embeddings.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("VECTOR_DB_URL", "file:/tmp/test_batched_embeddings.db")
+# batching is asserted on API calls, so keep the persistent embedding cache out of the way
+os.environ.setdefault("EMBEDDING_CACHE_MAX_MB", "0")
+
+from app.core.config import settings  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.chapter_ingest_service import ChapterIngestionService  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    async def create(self, *, input, model):  # noqa: A002 - mirrors the OpenAI SDK signature
+        self.calls.append(list(input))
+        # return items out of order to make sure results are realigned by index
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), float(i)]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+class FakeLLMService(LLMService):
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.session = None
+        self._embedding_dimensions: Dict[str, int] = {}
+
+    async def _get_config_value(self, key: str) -> Optional[str]:
+        return None
+
+    async def _resolve_llm_config(self, user_id):
+        return {"api_key": "sk-test", "base_url": "http://llm.local/v1", "model": None}
+
+
+async def batched_openai():
+    fake = FakeEmbeddingsAPI()
+    original_get_openai = llm_module.client_registry.get_openai
+    original_batch_size = settings.embedding_batch_size
+    llm_module.client_registry.get_openai = lambda **_: SimpleNamespace(embeddings=fake)  # type: ignore[assignment]
+    settings.embedding_batch_size = 2
+    try:
+        service = FakeLLMService()
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        embeddings = await service.get_embeddings(texts, user_id=1)
+        assert fake.calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]], fake.calls
+        assert [vec[0] for vec in embeddings] == [1.0, 2.0, 3.0, 4.0, 5.0], embeddings
+        assert await service.get_embedding_dimension("text-embedding-3-large") == 2
+        single = await service.get_embedding("xyz", user_id=1)
+        assert single == [3.0, 0.0]
+    finally:
+        llm_module.client_registry.get_openai = original_get_openai  # type: ignore[assignment]
+        settings.embedding_batch_size = original_batch_size
+
+
+class StubLLM:
+    def __init__(self, fail_indexes=()):
+        self.calls: List[List[str]] = []
+        self.fail_indexes = set(fail_indexes)
+
+    async def get_embeddings(self, texts, *, user_id=None, model=None):
+        self.calls.append(list(texts))
+        return [[] if i in self.fail_indexes else [0.1, 0.2] for i in range(len(texts))]
+
+
+class StubVectorStore:
+    def __init__(self):
+        self.chunks = []
+        self.summaries = []
+
+    async def chapter_chunk_hashes(self, *, project_id, chapter_number):
+        return {}
+
+    async def replace_chapter(self, *, project_id, chapter_number, chunk_records, summary_records=(), **kwargs):
+        self.chunks.extend(chunk_records)
+        self.summaries.extend(summary_records)
+        return {"chunks": len(chunk_records), "summaries": len(summary_records)}
+
+
+async def ingest_reports():
+    content = "\n\n".join(f"第{i}段。" + "雨夜里他独自前行，" * 40 for i in range(6))
+
+    llm = StubLLM()
+    store = StubVectorStore()
+    service = ChapterIngestionService(llm_service=llm, vector_store=store)  # type: ignore[arg-type]
+    report = await service.ingest_chapter(
+        project_id="p1", chapter_number=1, title="第1章", content=content, summary="摘要", user_id=1
+    )
+    assert len(llm.calls) == 1, "chunks and summary should be embedded in a single batched call"
+    assert len(llm.calls[0]) == report["chunks_total"] + 1 and llm.calls[0][-1] == "摘要"
+    assert report["status"] == "updated" and report["summary"] == "updated", report
+    assert len(store.chunks) == report["chunks_total"] > 1 and len(store.summaries) == 1
+
+    llm = StubLLM(fail_indexes={1})
+    store = StubVectorStore()
+    service = ChapterIngestionService(llm_service=llm, vector_store=store)  # type: ignore[arg-type]
+    report = await service.ingest_chapter(
+        project_id="p1", chapter_number=1, title="第1章", content=content, summary=None, user_id=1
+    )
+    assert report["status"] == "partial" and report["failed_chunks"] == [1], report
+    assert len(store.chunks) == report["chunks_total"] - 1
+
+
+def main():
+    asyncio.run(batched_openai())
+    asyncio.run(ingest_reports())
+    print("✅ test_batched_embeddings passed")
+
+
+def test_batched_embeddings():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Tests for localized paragraph-level repair: violation spans map to paragraphs, only those
+paragraphs (plus read-only context) are sent to the LLM and spliced back, and guardrail,
+validator-retry and consistency fixes fall back to full rewrites when repair is not possible.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_chapter_repair.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.services.chapter_guardrails import ChapterGuardrails  # noqa: E402
+from app.services.chapter_repair_service import ChapterRepairService, RepairSpan  # noqa: E402
+from app.services.consistency_service import (  # noqa: E402
+    ConsistencyService,
+    ConsistencyViolation,
+    ViolationSeverity,
+)
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+from app.services.post_gen_validator import PostGenValidator, ValidationErrorDetail, ValidationResult  # noqa: E402
+
+PARAGRAPHS = [
+    "林舟推开院门，雨还在下。",
+    "他在檐下站了片刻，听见屋里有人咳嗽。",
+    "殊不知，赵衡此刻正在城外布下埋伏。",
+    "林舟没有多想，径直走进堂屋。",
+    "灯下坐着一位陌生的老人。",
+    "老人抬头看了他一眼，没有说话。",
+]
+CHAPTER = "\n\n".join(f"　　{p}" for p in PARAGRAPHS) + "\n"
+
+
+class StubLLMService:
+    def __init__(self, fix=None):
+        self.calls = []
+        self.fix = fix or {}
+
+    async def get_llm_response(self, system_prompt, conversation_history, **kwargs):
+        content = conversation_history[0]["content"]
+        self.calls.append((system_prompt, content))
+        payload = json.loads(content)
+        fixed = [
+            {"index": p["index"], "text": self.fix.get(p["index"], p["text"] + "（已修）")}
+            for p in payload["paragraphs"]
+            if p["role"] == "fix"
+        ]
+        # a stray index outside the requested targets must be ignored
+        fixed.append({"index": 0, "text": "不该被改写"})
+        return json.dumps({"paragraphs": fixed}, ensure_ascii=False)
+
+    async def generate(self, prompt, **kwargs):
+        self.calls.append(("generate", prompt))
+        return "整章修复"
+
+
+async def repair_engine():
+    llm = StubLLMService(fix={2: "林舟并不知道城外的动静。"})
+    service = ChapterRepairService(llm, context_paragraphs=1, max_paragraph_ratio=0.4)
+    start = CHAPTER.index("殊不知")
+    result = await service.repair(CHAPTER, [RepairSpan(start, start + 3, "全知视角")], user_id=1, instructions="只写 POV 所知")
+
+    (_, content), = llm.calls
+    payload = json.loads(content)
+    assert [(p["index"], p["role"]) for p in payload["paragraphs"]] == [(1, "context"), (2, "fix"), (3, "context")]
+    assert payload["paragraphs"][1]["issues"] == ["全知视角"] and payload["instructions"] == "只写 POV 所知"
+    assert CHAPTER[:start] not in content, "only the affected window is sent"
+    assert result.paragraphs == [2] and result.repaired == [2]
+    assert result.content == CHAPTER.replace("殊不知，赵衡此刻正在城外布下埋伏。", "林舟并不知道城外的动静。")
+
+    # too many affected paragraphs: give up without calling the LLM
+    llm = StubLLMService()
+    spans = [RepairSpan(CHAPTER.index(p), None, "x") for p in PARAGRAPHS[:3]]
+    assert await ChapterRepairService(llm, max_paragraph_ratio=0.4).repair(CHAPTER, spans, user_id=1) is None
+    assert not llm.calls
+
+
+async def guardrail_and_validator_repair():
+    guardrails = ChapterGuardrails()
+    result = guardrails.check(CHAPTER, ["赵衡"])
+    violation = next(v for v in result.violations if v.type == "forbidden_name")
+    assert CHAPTER[violation.position:violation.end] == "赵衡"
+
+    validation = PostGenValidator().validate(CHAPTER, context={"pov": {"pov_name": "林舟"}})
+    pov_error = next(err for err in validation.errors if err.code == "E_POV_LEAK")
+    assert [CHAPTER[start:end] for start, end in pov_error.spans] == ["殊不知"]
+
+    class StubPromptService:
+        async def get_prompt(self, name):
+            return f"<{name}>"
+
+    class ScriptedValidator:
+        def __init__(self):
+            self.texts = []
+
+        def validate(self, text, *, context):
+            self.texts.append(text)
+            if len(self.texts) == 1:
+                start = text.index("老人抬头")
+                error = ValidationErrorDetail(
+                    code="E_POV_LEAK", message="非POV内心描写", severity="BLOCK", spans=[[start, start + 4]]
+                )
+                return ValidationResult(ok=False, errors=[error], action="retry", retry_directive="仅写 POV 所知")
+            return ValidationResult(ok=True, errors=[], action="accept")
+
+    class WriterLLM(StubLLMService):
+        async def get_llm_response(self, system_prompt, conversation_history, **kwargs):
+            if system_prompt == "<writing>":
+                self.calls.append((system_prompt, "write"))
+                return CHAPTER
+            return await super().get_llm_response(system_prompt, conversation_history, **kwargs)
+
+    orchestrator = PipelineOrchestrator(None)
+    orchestrator.llm_service = WriterLLM()
+    orchestrator.prompt_service = StubPromptService()
+    orchestrator.validator = ScriptedValidator()
+    variants = await orchestrator._generate_single_version(
+        index=0,
+        prompt_input="写第三章",
+        writer_prompt="<writing>",
+        style_hint=None,
+        project_id="p1",
+        chapter_number=3,
+        outline_title="雨夜",
+        outline_summary="归家",
+        chapter_mission=None,
+        forbidden_characters=["赵衡"],
+        allowed_new_characters=[],
+        user_id=1,
+        writer_blueprint={},
+        memory_context=None,
+        enhanced_context=None,
+        config=PipelineConfig(),
+        writing_context={},
+        outline_constraints={},
+    )
+    prompts = [system for system, _ in orchestrator.llm_service.calls]
+    assert prompts.count("<writing>") == 1, "neither the guardrail nor the validator retry regenerates the chapter"
+    assert "<rewrite_guardrails>" not in prompts
+
+    guardrail = variants[0]["metadata"]["guardrail"]
+    assert guardrail["repair"]["mode"] == "local" and guardrail["repair"]["repaired"] == [2]
+    assert variants[0]["content"].count("（已修）") == 1 and PARAGRAPHS[2] + "（已修）" in variants[0]["content"]
+    retry = variants[-1]
+    assert retry["lineage"]["repair"] == {"mode": "local", "paragraphs": [5], "repaired": [5]}
+    assert retry["content"].count("（已修）") == 2 and retry["validation"]["ok"]
+    assert retry["content"].endswith(PARAGRAPHS[5] + "（已修）") and "不该被改写" not in retry["content"]
+
+
+async def consistency_repair():
+    async def check_context(project_id, include_foreshadowing=True):
+        return {"novel_setting": "架空古代", "character_state": "", "global_summary": "前情"}
+
+    llm = StubLLMService()
+    service = ConsistencyService(None, llm)
+    service._get_check_context = check_context  # type: ignore[assignment]
+    located = ConsistencyViolation(
+        severity=ViolationSeverity.CRITICAL,
+        category="character",
+        description="老人此前已登场",
+        location="“灯下坐着一位陌生的老人……”",
+    )
+    fixed = await service.auto_fix("p1", CHAPTER, [located], user_id=1)
+    (_, content), = llm.calls
+    payload = json.loads(content)
+    assert "架空古代" in payload["reference"] and "前情" in payload["reference"]
+    assert fixed == CHAPTER.replace("灯下坐着一位陌生的老人。", "灯下坐着一位陌生的老人。（已修）")
+
+    unlocated = ConsistencyViolation(
+        severity=ViolationSeverity.CRITICAL, category="plot", description="时间线错乱", location="第三段某处"
+    )
+    llm.calls.clear()
+    assert await service.auto_fix("p1", CHAPTER, [located, unlocated], user_id=1) == "整章修复"
+    assert [kind for kind, _ in llm.calls] == ["generate"]
+
+
+def main():
+    asyncio.run(repair_engine())
+    asyncio.run(guardrail_and_validator_repair())
+    asyncio.run(consistency_repair())
+    print("✅ test_chapter_repair passed")
+
+
+def test_chapter_repair():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Tests for the process-wide LLM/embedding client registry: reuse per key, idle eviction, loop isolation,
+and clients in use are never closed under a running call.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_client_registry.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.utils.client_registry import ClientRegistry, client_registry  # noqa: E402
+from app.utils.llm_tool import LLMClient  # noqa: E402
+
+
+async def reuse_and_evict():
+    registry = ClientRegistry(max_connections=10, max_keepalive_connections=5, keepalive_expiry=5, idle_ttl=60)
+    a = registry.get_openai(api_key="sk-a", base_url="http://llm.local/v1")
+    assert registry.get_openai(api_key="sk-a", base_url="http://llm.local/v1") is a
+    assert registry.get_openai(api_key="sk-b", base_url="http://llm.local/v1") is not a
+    assert registry.get_openai(api_key="sk-a", base_url="http://other.local/v1") is not a
+    assert registry.stats()["clients"] == 3
+
+    for entry in registry._entries.values():  # pylint: disable=protected-access
+        entry.last_used -= 120  # pretend every client has been idle past the TTL
+    fresh = registry.get_openai(api_key="sk-a", base_url="http://llm.local/v1")
+    assert fresh is not a, "idle client should have been evicted"
+    assert registry.stats()["clients"] == 1
+    await asyncio.sleep(0)  # let scheduled closes run
+    assert a.is_closed()
+
+    http = registry.get_http(timeout=30.0)
+    assert registry.get_http(timeout=30.0) is http
+    await registry.aclose()
+    assert registry.stats()["clients"] == 0 and http.is_closed
+
+
+async def in_use_not_closed():
+    registry = ClientRegistry(
+        max_connections=10, max_keepalive_connections=5, keepalive_expiry=5, idle_ttl=60, max_clients=2
+    )
+    streaming = registry.get_openai(api_key="sk-stream", base_url="http://llm.local/v1")
+    async with registry.in_use(streaming):
+        # idle past the TTL while a long stream is still running: the client stays cached and open
+        for entry in registry._entries.values():  # pylint: disable=protected-access
+            entry.last_used -= 120
+        registry.get_openai(api_key="sk-other", base_url="http://llm.local/v1")
+        assert registry.get_openai(api_key="sk-stream", base_url="http://llm.local/v1") is streaming
+
+        # pushed out by the client limit mid-stream: it is retired but only closed once the stream ends
+        registry.get_openai(api_key="sk-third", base_url="http://llm.local/v1")
+        registry.get_openai(api_key="sk-fourth", base_url="http://llm.local/v1")
+        assert registry.get_openai(api_key="sk-stream", base_url="http://llm.local/v1") is not streaming
+        await asyncio.sleep(0)
+        assert not streaming.is_closed()
+    await asyncio.sleep(0)
+    assert streaming.is_closed(), "a retired client closes when its last user finishes"
+    await asyncio.gather(*registry._closing)  # pylint: disable=protected-access
+    await asyncio.sleep(0)
+    assert not registry._closing, "finished close tasks are released"  # pylint: disable=protected-access
+
+    # shutdown while a retired client is still mid-stream: aclose closes it too
+    pinned = registry.get_openai(api_key="sk-pinned", base_url="http://llm.local/v1")
+    async with registry.in_use(pinned):
+        registry.get_openai(api_key="sk-fifth", base_url="http://llm.local/v1")
+        registry.get_openai(api_key="sk-sixth", base_url="http://llm.local/v1")
+        assert not pinned.is_closed()
+        await registry.aclose()
+        assert pinned.is_closed(), "aclose must close retired clients that are still in use"
+    await registry.aclose()
+
+
+async def shared_llm_client():
+    first = LLMClient(api_key="sk-shared", base_url="http://llm.local/v1")
+    second = LLMClient(api_key="sk-shared", base_url="http://llm.local/v1")
+    assert first._client is second._client  # pylint: disable=protected-access
+    return first._client  # pylint: disable=protected-access
+
+
+def main():
+    asyncio.run(reuse_and_evict())
+    asyncio.run(in_use_not_closed())
+    client_in_loop_one = asyncio.run(shared_llm_client())
+    client_in_loop_two = asyncio.run(shared_llm_client())
+    assert client_in_loop_one is not client_in_loop_two, "clients must not leak across event loops"
+    print("✅ test_client_registry passed")
+
+
+def test_client_registry():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Tests for the concurrent context-assembly stage of the writing pipeline: mission, enhanced
+context, project memory and RAG run side by side on their own sessions, and a slow or failing
+source degrades to an empty result with its latency and status reported.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_context_assembly.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.core.config import settings  # noqa: E402
+from app.services import pipeline_orchestrator  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+
+DELAY = 0.2
+
+
+class Tracker:
+    sessions = []
+    delays = {}
+    failures = set()
+
+
+async def source(name, value):
+    await asyncio.sleep(Tracker.delays.get(name, DELAY))
+    if name in Tracker.failures:
+        raise RuntimeError(f"{name} down")
+    return value
+
+
+class StubOrchestrator(PipelineOrchestrator):
+    async def _generate_chapter_mission(self, **kwargs):
+        return await source("mission", {"macro_beat": kwargs["outline_title"], "session": self.session})
+
+    async def _get_project_memory_text(self, project_id):
+        return await source("project_memory", f"memory of {project_id}")
+
+    async def _get_rag_context(self, **kwargs):
+        return await source("rag", {"chunks": ["chunk"], "summaries": []})
+
+
+class StubEnhancedWritingFlow:
+    def __init__(self, db, llm_service, prompt_service):
+        self.db = db
+
+    async def prepare_writing_context(self, project_id, chapter_number, chapter_outline=None):
+        return await source("enhanced_context", {"constitution": chapter_outline})
+
+
+@asynccontextmanager
+async def session_factory():
+    session = object()
+    Tracker.sessions.append(session)
+    yield session
+
+
+async def assemble(orchestrator, config):
+    return await orchestrator._assemble_context(  # pylint: disable=protected-access
+        config=config,
+        project_id="p1",
+        chapter_number=3,
+        user_id=1,
+        outline_summary="outline",
+        mission_kwargs={"outline_title": "C3"},
+        rag_kwargs={"project_id": "p1"},
+    )
+
+
+async def main_async():
+    pipeline_orchestrator.EnhancedWritingFlow = StubEnhancedWritingFlow  # type: ignore[assignment]
+    main_session = object()
+    orchestrator = StubOrchestrator(main_session, session_factory=session_factory)
+    events = []
+
+    async def sink(event):
+        events.append((event["stage"], event["status"]))
+
+    orchestrator.event_sink = sink
+    enhanced = PipelineConfig(preset="enhanced", enable_constitution=True)
+
+    started = time.perf_counter()
+    results, latency = await assemble(orchestrator, enhanced)
+    elapsed = time.perf_counter() - started
+    assert elapsed < DELAY * 2, f"sources should overlap, took {elapsed:.2f}s"
+    assert set(results) == {"mission", "enhanced_context", "project_memory", "rag"}
+    assert results["mission"]["macro_beat"] == "C3" and results["enhanced_context"] == {"constitution": "outline"}
+    assert results["project_memory"] == "memory of p1" and results["rag"]["chunks"] == ["chunk"]
+    assert all(report["status"] == "ok" and report["latency_ms"] >= DELAY * 1000 - 5 for report in latency.values())
+    assert len(Tracker.sessions) == 4 and main_session not in Tracker.sessions
+    assert results["mission"]["session"] is not main_session
+    assert ("rag", "started") in events and ("rag", "finished") in events
+
+    # a slow RAG source times out and a failing mission degrades to None without stalling the stage
+    Tracker.delays["rag"] = 5
+    Tracker.failures.add("mission")
+    original_timeout = settings.writer_context_rag_timeout
+    settings.writer_context_rag_timeout = 0.3
+    try:
+        started = time.perf_counter()
+        results, latency = await assemble(orchestrator, PipelineConfig())
+        elapsed = time.perf_counter() - started
+    finally:
+        settings.writer_context_rag_timeout = original_timeout
+    assert elapsed < 1.0, elapsed
+    assert "enhanced_context" not in results, "basic preset skips the enhanced context"
+    assert results["rag"] == {"chunks": [], "summaries": []} and latency["rag"]["status"] == "timeout"
+    assert results["mission"] is None and latency["mission"]["status"] == "failed"
+    assert results["project_memory"] == "memory of p1" and latency["project_memory"]["status"] == "ok"
+
+    results, latency = await assemble(orchestrator, PipelineConfig(enable_rag=False))
+    assert "rag" not in results and "rag" not in latency
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_context_assembly passed")
+
+
+def test_context_assembly():
+    main()
+
+
+if __name__ == "__main__":
+    main()
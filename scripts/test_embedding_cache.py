@@ -0,0 +1,162 @@
+"""
+Tests for the persistent embedding cache: vectors are keyed by provider/model/dimension/content,
+stored as float32 and survive a restart, the least recently used entries are evicted under the
+size cap (tracked incrementally, without summing the table on every write), and both LLMService and
+EmbeddingService only call the embedding API on cache misses.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_embedding_cache.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.services import embedding_cache as cache_module  # noqa: E402
+from app.services import embedding_service as embedding_service_module  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.embedding_cache import EmbeddingCache  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+
+VECTOR_BYTES = 3 * 4
+
+
+async def cache_store(path):
+    cache = EmbeddingCache(path=path, max_bytes=1024)
+    assert await cache.get_many("openai", "m", 0, ["雨夜", "灯下"]) == [None, None]
+    await cache.put_many("openai", "m", 0, [("雨夜", [0.5, 0.25, 1.0]), ("灯下", [])])
+    assert await cache.get_many("openai", "m", 0, ["雨夜", "灯下", "雨夜"]) == [[0.5, 0.25, 1.0], None, [0.5, 0.25, 1.0]]
+    # every part of the key matters
+    assert await cache.get_many("openai", "m", 256, ["雨夜"]) == [None]
+    assert await cache.get_many("openai", "other", 0, ["雨夜"]) == [None]
+    assert await cache.get_many("ollama", "m", 0, ["雨夜"]) == [None]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (2, 6, 1, VECTOR_BYTES)
+    cache.close()
+
+    # a fresh instance (process restart) reads the same file
+    restarted = EmbeddingCache(path=path, max_bytes=1024)
+    assert await restarted.get_many("openai", "m", 0, ["雨夜"]) == [[0.5, 0.25, 1.0]]
+    restarted.close()
+
+    # LRU eviction under a cap of three vectors
+    lru = EmbeddingCache(path=path + ".lru", max_bytes=3 * VECTOR_BYTES)
+    for text in ("a", "b", "c"):
+        await lru.put_many("openai", "m", 0, [(text, [1.0, 2.0, 3.0])])
+        time.sleep(0.01)
+    assert await lru.get_many("openai", "m", 0, ["a"]) != [None], "touching 'a' makes 'b' the oldest"
+    time.sleep(0.01)
+    await lru.put_many("openai", "m", 0, [("d", [1.0, 2.0, 3.0])])
+    found = await lru.get_many("openai", "m", 0, ["a", "b", "c", "d"])
+    assert [item is not None for item in found] == [True, False, False, True]
+    assert lru.stats()["evictions"] == 2 and lru.stats()["bytes"] <= 3 * VECTOR_BYTES
+    lru.close()
+
+    # the byte total is kept incrementally: writes below the cap never sum the whole table
+    sized = EmbeddingCache(path=path + ".sized", max_bytes=10 * VECTOR_BYTES)
+    await sized.put_many("openai", "m", 0, [("a", [1.0, 2.0, 3.0])])
+    full_scans = []
+    sized._conn.set_trace_callback(  # pylint: disable=protected-access
+        lambda sql: full_scans.append(sql) if sql.rstrip().endswith("FROM embedding_cache") else None
+    )
+    await sized.put_many("openai", "m", 0, [("b", [1.0, 2.0, 3.0]), ("a", [1.0, 2.0, 3.0, 4.0])])
+    await sized.put_many("openai", "m", 0, [("c", [1.0]), ("c", [1.0, 2.0])])
+    assert not full_scans, full_scans
+    assert sized._total_bytes == sized.stats()["bytes"] == 9 * 4  # pylint: disable=protected-access
+    sized.close()
+
+    disabled = EmbeddingCache(path=path, max_bytes=0)
+    assert not disabled.enabled and await disabled.get_many("openai", "m", 0, ["雨夜"]) == [None]
+
+
+class FakeEmbeddingsAPI:
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    async def create(self, *, input, model):  # noqa: A002 - mirrors the OpenAI SDK signature
+        batch = [input] if isinstance(input, str) else list(input)
+        self.calls.append(batch)
+        return SimpleNamespace(
+            data=[SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(batch)]
+        )
+
+
+class FakeLLMService(LLMService):
+    def __init__(self, config: Dict[str, str]):  # pylint: disable=super-init-not-called
+        self.session = None
+        self._embedding_dimensions: Dict[str, int] = {}
+        self.config = config
+
+    async def _get_config_value(self, key: str) -> Optional[str]:
+        return self.config.get(key)
+
+    async def _resolve_llm_config(self, user_id):
+        return {"api_key": "sk-test", "base_url": "http://llm.local/v1", "model": None}
+
+
+async def call_sites(path):
+    cache = EmbeddingCache(path=path, max_bytes=1024 * 1024)
+    fake = FakeEmbeddingsAPI()
+    originals = (
+        llm_module.embedding_cache,
+        embedding_service_module.embedding_cache,
+        llm_module.client_registry.get_openai,
+    )
+    llm_module.embedding_cache = cache
+    embedding_service_module.embedding_cache = cache
+    llm_module.client_registry.get_openai = lambda **_: SimpleNamespace(embeddings=fake)  # type: ignore[assignment]
+    try:
+        service = FakeLLMService({})
+        first = await service.get_embeddings(["甲", "乙乙", "甲"], user_id=1)
+        assert fake.calls == [["甲", "乙乙"]], "duplicates inside a batch are embedded once"
+        assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+
+        again = await service.get_embeddings(["乙乙", "丙丙丙"], user_id=1)
+        assert fake.calls[-1] == ["丙丙丙"] and again == [[2.0, 1.0], [3.0, 1.0]]
+        assert await service.get_embedding("甲", user_id=1) == [1.0, 1.0] and len(fake.calls) == 2
+        assert await service.get_embedding_dimension() == 2
+
+        # a different configured dimension is a different cache key
+        resized = FakeLLMService({"embedding.model_vector_size": "2"})
+        await resized.get_embedding("甲", user_id=1)
+        assert fake.calls[-1] == ["甲"]
+
+        legacy = EmbeddingService.__new__(EmbeddingService)
+        legacy._client = SimpleNamespace(embeddings=fake)
+        legacy._model = "text-embedding-3-large"
+        calls = len(fake.calls)
+        assert await legacy.get_embedding("甲") == [1.0, 1.0] and len(fake.calls) == calls, "shares the cache"
+        batch = await legacy.get_embeddings_batch(["甲", "丁丁丁丁"])
+        assert batch == [[1.0, 1.0], [4.0, 1.0]] and fake.calls[-1] == ["丁丁丁丁"]
+        assert await service.get_embedding("丁丁丁丁", user_id=1) == [4.0, 1.0] and len(fake.calls) == calls + 1
+        assert cache_module.text_hash("甲") != cache_module.text_hash("乙")
+    finally:
+        (
+            llm_module.embedding_cache,
+            embedding_service_module.embedding_cache,
+            llm_module.client_registry.get_openai,
+        ) = originals
+        cache.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(cache_store(os.path.join(tmp, "store.db")))
+        asyncio.run(call_sites(os.path.join(tmp, "calls.db")))
+    print("✅ test_embedding_cache passed")
+
+
+def test_embedding_cache():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Tests for the parallel finalize DAG: independent LLM steps overlap under the configured limit,
+the snapshot waits for its inputs, per-step timing is reported, and failures skip dependents.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_finalize_dag.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("VECTOR_DB_URL", "file:finalize_dag_unused.db")  # the stub store never opens it
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import ChapterSnapshot, ProjectMemory  # noqa: E402
+from app.services.finalize_service import FinalizeService  # noqa: E402
+from app.utils.concurrency import run_dag  # noqa: E402
+
+LLM_DELAY = 0.2
+
+
+class Tracker:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.sessions = 0
+
+
+tracker = Tracker()
+
+
+class StubLLMService:
+    """Each instance is bound to one session, like LLMService."""
+
+    def __init__(self, session=None):
+        self.session = session
+
+    async def generate(self, prompt, **kwargs):
+        tracker.active += 1
+        tracker.peak = max(tracker.peak, tracker.active)
+        try:
+            await asyncio.sleep(LLM_DELAY)
+        finally:
+            tracker.active -= 1
+        if "剧情线追踪" in prompt:
+            return '{"unresolved_hooks": [], "main_conflicts": [], "character_arcs": []}'
+        if "摘要（100-200字）" in prompt:
+            return "chapter summary"
+        return "updated text"
+
+    async def get_embeddings(self, texts, *, user_id=None, model=None):
+        await asyncio.sleep(LLM_DELAY)
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+
+class StubVectorStore:
+    async def chapter_chunk_hashes(self, *, project_id, chapter_number):
+        return {}
+
+    async def replace_chapter(self, *, project_id, chapter_number, chunk_records, summary_records=(), **kwargs):
+        return {"chunks": len(chunk_records), "summaries": len(summary_records)}
+
+
+@asynccontextmanager
+async def session_factory():
+    tracker.sessions += 1
+    yield object()
+
+
+async def dag_semantics():
+    calls = []
+
+    async def ok(name):
+        calls.append(name)
+        return name
+
+    async def boom(_):
+        raise RuntimeError("boom")
+
+    results, reports = await run_dag(
+        {
+            "a": ((), lambda done: ok("a")),
+            "b": (("a",), boom),
+            "c": (("b",), lambda done: ok("c")),
+            "d": (("a",), lambda done: ok("d")),
+        },
+        max_parallel=2,
+    )
+    assert results == {"a": "a", "d": "d"} and "c" not in calls
+    assert reports["b"]["status"] == "failed" and reports["b"]["error"] == "boom"
+    assert reports["c"] == {"status": "skipped", "skipped_by": ["b"]}
+    try:
+        await run_dag({"x": (("y",), ok), "y": (("x",), ok)}, max_parallel=1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("cycles must be rejected")
+
+
+async def finalize_flow(db):
+    service = FinalizeService(
+        db,
+        StubLLMService(),
+        StubVectorStore(),
+        session_factory=session_factory,
+        max_parallel_steps=8,
+    )
+    saved_states = []
+
+    async def save_state(project_id, chapter_number, state_text):
+        saved_states.append(state_text)
+
+    # character_states uses a BIGINT primary key that SQLite cannot autoincrement
+    service._save_character_state = save_state  # type: ignore[assignment]
+    started = time.perf_counter()
+    result = await service.finalize_chapter(
+        project_id="p1",
+        chapter_number=1,
+        chapter_text="正文。" * 200,
+        user_id=1,
+        chapter_version_id=7,
+    )
+    elapsed = time.perf_counter() - started
+
+    assert result["success"], result
+    steps = result["steps"]
+    assert all(report["status"] == "ok" for report in steps.values()), steps
+    assert tracker.peak == 4 and tracker.sessions == 5, (tracker.peak, tracker.sessions)
+    assert elapsed < LLM_DELAY * 2.5, f"LLM steps should overlap, took {elapsed:.2f}s"
+    snapshot_start = steps["snapshot"]["started_ms"]
+    for dep in ("global_summary", "character_state", "plot_arcs", "chapter_summary"):
+        assert steps[dep]["started_ms"] + steps[dep]["duration_ms"] <= snapshot_start + 1, dep
+    assert result["updates"]["vector_store"]["status"] == "updated"
+    assert result["updates"]["snapshot"] == "created"
+
+    snapshot = db.query(ChapterSnapshot).filter(ChapterSnapshot.project_id == "p1").one()
+    assert snapshot.chapter_summary == "chapter summary" and snapshot.global_summary_snapshot == "updated text"
+    assert snapshot.version_id == 7 and saved_states == ["updated text"]
+    memory = db.query(ProjectMemory).filter(ProjectMemory.project_id == "p1").one()
+    assert memory.last_updated_chapter == 1 and memory.plot_arcs["unresolved_hooks"] == []
+
+    # without a session factory the shared LLMService session forces serial execution
+    tracker.peak = 0
+    serial = FinalizeService(db, StubLLMService(), None)
+    serial._save_character_state = save_state  # type: ignore[assignment]
+    result = await serial.finalize_chapter(project_id="p1", chapter_number=2, chapter_text="正文", user_id=1)
+    assert result["success"] and tracker.peak == 1 and "vector_store" not in result["steps"]
+
+    # a failing database step skips its dependents and rolls the finalize back
+    async def broken_memory(project_id):
+        raise RuntimeError("db down")
+
+    failing = FinalizeService(db, StubLLMService(), None, session_factory=session_factory)
+    failing._get_or_create_project_memory = broken_memory  # type: ignore[assignment]
+    result = await failing.finalize_chapter(project_id="p1", chapter_number=3, chapter_text="正文", user_id=1)
+    assert not result["success"] and "memory: db down" in result["error"]
+    assert result["steps"]["snapshot"]["status"] == "skipped"
+    assert result["steps"]["chapter_summary"]["status"] == "ok"
+    assert db.query(ChapterSnapshot).filter(ChapterSnapshot.chapter_number == 3).count() == 0
+
+
+def main():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    asyncio.run(dag_semantics())
+    with sessionmaker(bind=engine)() as db:
+        asyncio.run(finalize_flow(db))
+    print("✅ test_finalize_dag passed")
+
+
+def test_finalize_dag():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Tests for cancelling chapter generation when the client goes away: a disconnect during
+/advanced/generate or the SSE stream cancels the pipeline, closes the upstream model stream,
+stops further model calls, puts the chapter back out of "generating", and records the cancelled
+stream with its estimated token savings; queued jobs are cancelled through the API.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_generation_cancel.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.api.routers import writer  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    Chapter,
+    ChapterOutline,
+    NovelBlueprint,
+    NovelProject,
+    Prompt,
+    SystemConfig,
+    UsageMetric,
+    User,
+)
+from app.repositories.system_config_cache import system_config_cache  # noqa: E402
+from app.schemas.novel import AdvancedGenerateRequest  # noqa: E402
+from app.schemas.user import UserInDB  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services import pipeline_orchestrator as orchestrator_module  # noqa: E402
+from app.services.generation_job_service import GenerationJobService  # noqa: E402
+from app.services.generation_single_flight import generation_single_flight  # noqa: E402
+from app.services.usage_counter_service import usage_counters  # noqa: E402
+
+PARAGRAPH = "　　林舟推开院门，雨还在下。"
+CHUNKS = 40
+HELD_AFTER = 3
+
+
+class HoldingClient:
+    """Fake LLM streaming one paragraph per chunk; when holding, stops after a few chunks until cancelled."""
+
+    calls = 0
+    closed = 0
+    hold = False
+    started: asyncio.Event
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, *, messages, **kwargs):
+        cls = HoldingClient
+        cls.calls += 1
+        try:
+            for index in range(CHUNKS):
+                if cls.hold and index == HELD_AFTER:
+                    cls.started.set()
+                    await asyncio.Event().wait()
+                yield {"content": PARAGRAPH, "finish_reason": None}
+            yield {"content": None, "finish_reason": "stop"}
+        finally:
+            cls.closed += 1
+
+
+class FakeRequest:
+    """Stands in for the HTTP request: reports a disconnect once the model stream has started."""
+
+    async def is_disconnected(self):
+        return HoldingClient.started.is_set()
+
+
+def reset_client(hold):
+    HoldingClient.calls = 0
+    HoldingClient.closed = 0
+    HoldingClient.hold = hold
+    HoldingClient.started = asyncio.Event()
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="writer", hashed_password="x", email="writer@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Cancel"))
+        session.add(NovelBlueprint(project_id="p1", title="Cancel", one_sentence_summary="雨夜归乡"))
+        for number in range(1, 5):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"第{number}章", summary="归乡"))
+        session.add(Prompt(name="writing", content="你是一位小说作者。"))
+        session.add(SystemConfig(key="llm.api_key", value="k"))
+        await session.commit()
+        return UserInDB.model_validate(user, from_attributes=True)
+
+
+async def chapter_status(session_factory, number):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Chapter.status).where(Chapter.project_id == "p1", Chapter.chapter_number == number)
+        )
+        return result.scalar()
+
+
+async def metric(session_factory, key):
+    async with session_factory() as session:
+        row = await session.get(UsageMetric, key)
+        return row.value if row else 0
+
+
+def generate_request(number):
+    return AdvancedGenerateRequest(
+        project_id="p1",
+        chapter_number=number,
+        flow_config={"preset": "basic", "versions": 2, "enable_rag": False, "parallel_versions": False},
+    )
+
+
+async def main_async(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    usage_counters.session_factory = generation_single_flight.session_factory = session_factory
+    writer.AsyncSessionLocal = orchestrator_module.AsyncSessionLocal = session_factory
+    writer.DISCONNECT_POLL_SECONDS = 0.02
+    user = await seed(session_factory)
+
+    # a completed generation teaches the process how long a full answer is
+    reset_client(hold=False)
+    result = await writer.advanced_generate_chapter(generate_request(1), FakeRequest(), user, None)
+    assert len(result.variants) == 2
+    assert llm_module.output_length_estimate.remaining(0) == CHUNKS
+
+    # the client disconnects mid-stream: the model stream is closed and nothing else is generated
+    reset_client(hold=True)
+    try:
+        await writer.advanced_generate_chapter(generate_request(2), FakeRequest(), user, None)
+    except HTTPException as exc:
+        assert exc.status_code == 499
+    else:
+        raise AssertionError("a disconnected request does not produce a result")
+    calls = HoldingClient.calls
+    await asyncio.sleep(0.1)
+    assert HoldingClient.calls == calls == 1, "the second version is never requested"
+    assert HoldingClient.closed == 1, "the upstream stream was closed"
+    assert await chapter_status(session_factory, 2) == "not_generated"
+    assert await metric(session_factory, "llm_cancelled_streams") == 1
+    assert await metric(session_factory, "llm_cancelled_tokens_saved") == CHUNKS - HELD_AFTER
+
+    # closing the SSE response cancels the pipeline the same way
+    reset_client(hold=True)
+    response = await writer.advanced_generate_chapter_stream(generate_request(3), user, None)
+    events = response.body_iterator
+    async for chunk in events:
+        if "event: token" in chunk:
+            break
+    await HoldingClient.started.wait()
+    await events.aclose()
+
+    async def restored():
+        return await chapter_status(session_factory, 3) == "not_generated"
+
+    deadline = asyncio.get_running_loop().time() + 5
+    while not await restored():
+        assert asyncio.get_running_loop().time() < deadline, "chapter still marked as generating"
+        await asyncio.sleep(0.02)
+    assert HoldingClient.calls == 1 and HoldingClient.closed == 1
+    assert await metric(session_factory, "llm_cancelled_streams") == 2
+
+    # queued jobs are cancelled through the API before they ever reach the model
+    async with session_factory() as session:
+        job = await GenerationJobService(session).submit(project_id="p1", chapter_number=4, user_id=user.id)
+        cancelled = await writer.cancel_generation_job(job.id, session, user)
+    assert cancelled.status == "cancelled" and cancelled.finished_at is not None
+    await engine.dispose()
+
+
+def main():
+    original_client, original_factory = llm_module.LLMClient, usage_counters.session_factory
+    original_flight_factory = generation_single_flight.session_factory
+    original_sessions, original_poll = writer.AsyncSessionLocal, writer.DISCONNECT_POLL_SECONDS
+    original_orchestrator_sessions = orchestrator_module.AsyncSessionLocal
+    original_estimate = llm_module.output_length_estimate
+    llm_module.LLMClient = HoldingClient
+    llm_module.output_length_estimate = llm_module.OutputLengthEstimate()
+    system_config_cache.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(main_async(os.path.join(tmp, "cancel.db")))
+    finally:
+        llm_module.LLMClient, usage_counters.session_factory = original_client, original_factory
+        generation_single_flight.session_factory = original_flight_factory
+        writer.AsyncSessionLocal, writer.DISCONNECT_POLL_SECONDS = original_sessions, original_poll
+        orchestrator_module.AsyncSessionLocal = original_orchestrator_sessions
+        llm_module.output_length_estimate = original_estimate
+        system_config_cache.clear()
+    print("✅ test_generation_cancel passed")
+
+
+def test_generation_cancel():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Tests for background chapter generation jobs: a submitted job runs to completion with stage progress
+and checkpoints, a worker shutdown puts the running job back in the queue and the next worker resumes
+after the last completed stage, queued and running jobs can be cancelled, failures are recorded, and
+jobs whose worker stopped heartbeating are requeued.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_generation_jobs.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy import select, update  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    Chapter,
+    ChapterGenerationJob,
+    ChapterOutline,
+    NovelBlueprint,
+    NovelProject,
+    Prompt,
+    SystemConfig,
+    User,
+)
+from app.repositories.system_config_cache import system_config_cache  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.generation_job_service import GenerationJobService, GenerationJobWorker  # noqa: E402
+from app.services.generation_single_flight import generation_single_flight  # noqa: E402
+from app.services.usage_counter_service import usage_counters  # noqa: E402
+
+PARAGRAPH = "　　林舟推开院门，雨还在下。"
+
+
+class ScriptedClient:
+    """Fake LLM: every call returns text tagged with its call number; calls can be held or made to fail."""
+
+    calls = 0
+    hold_from = None
+    fail = False
+    release: asyncio.Event
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, *, messages, **kwargs):
+        cls = ScriptedClient
+        cls.calls += 1
+        call = cls.calls
+        if cls.fail:
+            raise RuntimeError("upstream exploded")
+        if cls.hold_from is not None and call >= cls.hold_from:
+            await cls.release.wait()
+        yield {"content": f"【第{call}次调用】" + PARAGRAPH * 40, "finish_reason": None}
+        yield {"content": None, "finish_reason": "stop"}
+
+
+def reset_client(hold_from=None):
+    ScriptedClient.calls = 0
+    ScriptedClient.hold_from = hold_from
+    ScriptedClient.fail = False
+    ScriptedClient.release = asyncio.Event()
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="writer", hashed_password="x", email="writer@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Jobs"))
+        session.add(NovelBlueprint(project_id="p1", title="Jobs", one_sentence_summary="雨夜归乡"))
+        for number in range(1, 7):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"第{number}章", summary="归乡"))
+        session.add(Prompt(name="writing", content="你是一位小说作者。"))
+        session.add(SystemConfig(key="llm.api_key", value="k"))
+        await session.commit()
+        return user.id
+
+
+async def load_job(session_factory, job_id):
+    async with session_factory() as session:
+        return await session.get(ChapterGenerationJob, job_id)
+
+
+async def chapter_status(session_factory, number):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Chapter.status).where(Chapter.project_id == "p1", Chapter.chapter_number == number)
+        )
+        return result.scalar()
+
+
+async def wait_for(predicate, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.02)
+
+
+async def submit(session_factory, user_id, chapter_number, versions=1):
+    async with session_factory() as session:
+        job = await GenerationJobService(session).submit(
+            project_id="p1",
+            chapter_number=chapter_number,
+            user_id=user_id,
+            flow_config={"preset": "basic", "versions": versions, "enable_rag": False, "parallel_versions": False},
+        )
+        return job.id
+
+
+async def main_async(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    usage_counters.session_factory = generation_single_flight.session_factory = session_factory
+    user_id = await seed(session_factory)
+
+    def make_worker():
+        return GenerationJobWorker(session_factory, concurrency=2, poll_interval=0.05, heartbeat_interval=0.05)
+
+    # a job runs to completion and records its progress and checkpoints
+    reset_client()
+    job_id = await submit(session_factory, user_id, 1, versions=2)
+    assert (await load_job(session_factory, job_id)).status == "queued"
+    assert await make_worker().drain() == 1
+    job = await load_job(session_factory, job_id)
+    assert job.status == "succeeded" and job.finished_at is not None, (job.status, job.error)
+    assert len(job.result["variants"]) == 2 and job.result["finalized"] is False
+    assert {"context", "version:0", "version:1", "review"} <= set(job.checkpoints)
+    seqs = [entry["seq"] for entry in job.progress]
+    assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+    assert any(entry.get("stage") == "persist" and entry.get("status") == "finished" for entry in job.progress)
+    assert job.stage == "persist"
+    assert await chapter_status(session_factory, 1) == "waiting_for_confirm"
+    # writing plus validator retries: every version costs the same number of calls against the fake
+    calls_per_version = ScriptedClient.calls // 2
+
+    # shutting the worker down mid-job requeues it; the next worker reuses the finished stages
+    reset_client(hold_from=calls_per_version + 1)
+    job_id = await submit(session_factory, user_id, 2, versions=2)
+    worker = make_worker()
+    worker.start()
+
+    async def first_version_saved():
+        job = await load_job(session_factory, job_id)
+        return "version:0" in (job.checkpoints or {}) and ScriptedClient.calls > calls_per_version
+
+    await wait_for(first_version_saved)
+    await worker.stop()
+    job = await load_job(session_factory, job_id)
+    assert job.status == "queued" and job.attempts == 1, (job.status, job.attempts)
+    assert "version:1" not in job.checkpoints
+    first_version = job.checkpoints["version:0"][0]["content"]
+
+    ScriptedClient.hold_from = None
+    calls_before = ScriptedClient.calls
+    assert await make_worker().drain() == 1
+    job = await load_job(session_factory, job_id)
+    assert job.status == "succeeded" and job.attempts == 2, (job.status, job.error)
+    assert job.result["variants"][0]["content"] == first_version, "version 0 comes from the checkpoint"
+    assert ScriptedClient.calls - calls_before == calls_per_version, "only the unfinished version is generated again"
+    events = [(entry["event"], entry.get("stage"), entry.get("status")) for entry in job.progress]
+    assert ("stage", "context", "resumed") in events and ("version_resumed", None, None) in events
+    assert await chapter_status(session_factory, 2) == "waiting_for_confirm"
+
+    # a queued job is cancelled at once
+    job_id = await submit(session_factory, user_id, 3)
+    async with session_factory() as session:
+        job = await GenerationJobService(session).request_cancel(job_id, user_id)
+        assert job.status == "cancelled"
+        try:
+            await GenerationJobService(session).request_cancel(job_id, user_id + 1)
+        except Exception as exc:  # noqa: BLE001
+            assert getattr(exc, "status_code", None) == 404
+        else:
+            raise AssertionError("other users cannot see the job")
+    assert await make_worker().drain() == 0
+
+    # a running job stops at the next heartbeat and the chapter leaves "generating"
+    reset_client(hold_from=1)
+    job_id = await submit(session_factory, user_id, 4)
+    worker = make_worker()
+    worker.start()
+    await wait_for(lambda: asyncio.sleep(0, ScriptedClient.calls >= 1))
+    assert await chapter_status(session_factory, 4) == "generating"
+    async with session_factory() as session:
+        job = await GenerationJobService(session).request_cancel(job_id, user_id)
+        assert job.status == "running" and job.cancel_requested
+
+    async def cancelled():
+        return (await load_job(session_factory, job_id)).status == "cancelled"
+
+    await wait_for(cancelled)
+    await worker.stop()
+    assert await chapter_status(session_factory, 4) == "not_generated"
+
+    # failures are recorded on the job and the chapter is marked failed
+    reset_client()
+    ScriptedClient.fail = True
+    job_id = await submit(session_factory, user_id, 5)
+    await make_worker().drain()
+    job = await load_job(session_factory, job_id)
+    assert job.status == "failed" and job.error, job.status
+    assert await chapter_status(session_factory, 5) == "failed"
+
+    # a job whose worker stopped heartbeating goes back to the queue, until attempts run out
+    stale = datetime.now(timezone.utc) - timedelta(hours=1)
+    job_id = await submit(session_factory, user_id, 6)
+    async with session_factory() as session:
+        await session.execute(
+            update(ChapterGenerationJob)
+            .where(ChapterGenerationJob.id == job_id)
+            .values(status="running", attempts=1, updated_at=stale)
+        )
+        await session.commit()
+        assert await GenerationJobService(session).requeue_stale() == 1
+    assert (await load_job(session_factory, job_id)).status == "queued"
+    async with session_factory() as session:
+        await session.execute(
+            update(ChapterGenerationJob)
+            .where(ChapterGenerationJob.id == job_id)
+            .values(status="running", attempts=99, updated_at=stale)
+        )
+        session.add(Chapter(project_id="p1", chapter_number=6, status="generating"))
+        await session.commit()
+        await GenerationJobService(session).requeue_stale()
+    assert (await load_job(session_factory, job_id)).status == "failed"
+    assert await chapter_status(session_factory, 6) == "failed"
+    await engine.dispose()
+
+
+def main():
+    original_client, original_factory = llm_module.LLMClient, usage_counters.session_factory
+    original_flight_factory = generation_single_flight.session_factory
+    llm_module.LLMClient = ScriptedClient
+    system_config_cache.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(main_async(os.path.join(tmp, "jobs.db")))
+    finally:
+        llm_module.LLMClient, usage_counters.session_factory = original_client, original_factory
+        generation_single_flight.session_factory = original_flight_factory
+        system_config_cache.clear()
+    print("✅ test_generation_jobs passed")
+
+
+def test_generation_jobs():
+    main()
+
+
+if __name__ == "__main__":
+    main()
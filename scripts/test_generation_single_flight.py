@@ -0,0 +1,290 @@
+"""
+Tests for single-flight chapter generation: identical concurrent requests for a chapter share one
+generation (one waiter leaving does not cancel it for the others), a different request gets 409,
+Idempotency-Key retries replay the stored result, a second process waits on the database lease and
+takes over an expired one, duplicate job submissions return the existing job, and cancelling a job
+that a synchronous request shares leaves the chapter to that request.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_generation_single_flight.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.api.routers import writer  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    Chapter,
+    ChapterGenerationJob,
+    ChapterGenerationLock,
+    ChapterOutline,
+    ChapterVersion,
+    NovelBlueprint,
+    NovelProject,
+    Prompt,
+    SystemConfig,
+    User,
+)
+from app.repositories.system_config_cache import system_config_cache  # noqa: E402
+from app.schemas.novel import AdvancedGenerateRequest  # noqa: E402
+from app.schemas.user import UserInDB  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services import pipeline_orchestrator as orchestrator_module  # noqa: E402
+from app.services.generation_job_service import GenerationJobService, GenerationJobWorker  # noqa: E402
+from app.services.generation_single_flight import GenerationSingleFlight, generation_single_flight  # noqa: E402
+from app.services.usage_counter_service import usage_counters  # noqa: E402
+
+PARAGRAPH = "　　林舟推开院门，雨还在下。"
+
+
+class GatedClient:
+    """Fake LLM whose first call waits for the gate; every call is counted."""
+
+    calls = 0
+    gate: asyncio.Event
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, *, messages, **kwargs):
+        cls = GatedClient
+        cls.calls += 1
+        await cls.gate.wait()
+        yield {"content": PARAGRAPH * 40, "finish_reason": None}
+        yield {"content": None, "finish_reason": "stop"}
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="writer", hashed_password="x", email="writer@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Flight"))
+        session.add(NovelBlueprint(project_id="p1", title="Flight", one_sentence_summary="雨夜归乡"))
+        for number in range(1, 8):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"第{number}章", summary="归乡"))
+        session.add(Prompt(name="writing", content="你是一位小说作者。"))
+        session.add(SystemConfig(key="llm.api_key", value="k"))
+        await session.commit()
+        return UserInDB.model_validate(user, from_attributes=True)
+
+
+async def version_count(session_factory, number):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(func.count(ChapterVersion.id))
+            .join(Chapter, ChapterVersion.chapter_id == Chapter.id)
+            .where(Chapter.project_id == "p1", Chapter.chapter_number == number)
+        )
+        return result.scalar()
+
+
+def generate_request(number, notes=None):
+    return AdvancedGenerateRequest(
+        project_id="p1",
+        chapter_number=number,
+        writing_notes=notes,
+        flow_config={"preset": "basic", "versions": 1, "enable_rag": False},
+    )
+
+
+async def generate(user, number, notes=None, key=None):
+    return await writer.advanced_generate_chapter(generate_request(number, notes), ConnectedRequest(), user, key)
+
+
+async def wait_until(predicate, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.01)
+
+
+async def expect_status(awaitable, status_code):
+    try:
+        await awaitable
+    except HTTPException as exc:
+        assert exc.status_code == status_code, (exc.status_code, exc.detail)
+    else:
+        raise AssertionError(f"expected HTTP {status_code}")
+
+
+async def chapter_status(session_factory, number):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(Chapter.status).where(Chapter.project_id == "p1", Chapter.chapter_number == number)
+        )
+        return result.scalar()
+
+
+async def main_async(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    usage_counters.session_factory = generation_single_flight.session_factory = session_factory
+    writer.AsyncSessionLocal = orchestrator_module.AsyncSessionLocal = session_factory
+    writer.DISCONNECT_POLL_SECONDS = 0.02
+    user = await seed(session_factory)
+
+    # baseline: what one generation costs against the fake
+    GatedClient.gate = asyncio.Event()
+    GatedClient.gate.set()
+    GatedClient.calls = 0
+    await generate(user, 2)
+    calls_per_generation = GatedClient.calls
+
+    # three identical requests share one generation; one of them leaving does not cancel it
+    GatedClient.gate = asyncio.Event()
+    GatedClient.calls = 0
+    requests = [asyncio.create_task(generate(user, 1)) for _ in range(3)]
+    await wait_until(lambda: generation_single_flight.waiters("p1", 1) == 3 and GatedClient.calls == 1)
+    await expect_status(generate(user, 1, notes="换一个开头"), 409)
+    requests[0].cancel()
+    await asyncio.gather(requests[0], return_exceptions=True)
+    GatedClient.gate.set()
+    first, second = await asyncio.gather(*requests[1:])
+    assert first.variants[0].version_id == second.variants[0].version_id
+    assert GatedClient.calls == calls_per_generation, (GatedClient.calls, calls_per_generation)
+    assert await version_count(session_factory, 1) == 1
+    assert generation_single_flight.waiters("p1", 1) == 0
+
+    # without a key a finished generation is not replayed; with a key a retry returns the stored result
+    GatedClient.calls = 0
+    keyed = await generate(user, 1, key="retry-1")
+    assert GatedClient.calls == calls_per_generation, "a finished generation without a key runs again"
+    replayed = await generate(user, 1, key="retry-1")
+    assert GatedClient.calls == calls_per_generation, "the retry does not call the model"
+    assert replayed.variants[0].version_id == keyed.variants[0].version_id
+    await expect_status(generate(user, 1, notes="换一个开头", key="retry-1"), 422)
+
+    # another process: identical requests wait on the database lease and receive the result
+    other_process = GenerationSingleFlight(session_factory, lease_seconds=5, poll_interval=0.02)
+    gate = asyncio.Event()
+    runs = []
+
+    async def produce():
+        runs.append(1)
+        await gate.wait()
+        return {"value": len(runs)}
+
+    leader = asyncio.create_task(generation_single_flight.run("p1", 3, produce, fingerprint="same"))
+    await wait_until(lambda: runs == [1])
+    follower = asyncio.create_task(other_process.run("p1", 3, produce, fingerprint="same"))
+    await wait_until(lambda: other_process.waiters("p1", 3) == 1)
+    third_process = GenerationSingleFlight(session_factory, lease_seconds=5, poll_interval=0.02)
+    await expect_status(third_process.run("p1", 3, produce, fingerprint="different"), 409)
+    await asyncio.sleep(0.1)
+    gate.set()
+    assert await leader == await follower == {"value": 1}
+    assert runs == [1], "the second process never generated"
+
+    # a lease left behind by a crashed process is taken over once it expires
+    async with session_factory() as session:
+        session.add(
+            ChapterGenerationLock(
+                project_id="p1",
+                chapter_number=4,
+                owner="crashed",
+                status="running",
+                fingerprint="same",
+                expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            )
+        )
+        await session.commit()
+    assert await other_process.run("p1", 4, produce, fingerprint="same") == {"value": 2}
+    async with session_factory() as session:
+        lease = await session.get(ChapterGenerationLock, ("p1", 4))
+        assert lease.status == "succeeded" and lease.owner != "crashed"
+
+    # duplicate job submissions return the existing job
+    async with session_factory() as session:
+        service = GenerationJobService(session)
+        job = await service.submit(project_id="p1", chapter_number=5, user_id=user.id, notify=False)
+        again = await service.submit(project_id="p1", chapter_number=5, user_id=user.id, notify=False)
+        assert again.id == job.id
+        await expect_status(
+            service.submit(project_id="p1", chapter_number=5, user_id=user.id, writing_notes="不同", notify=False),
+            409,
+        )
+        keyed_job = await service.submit(
+            project_id="p1", chapter_number=6, user_id=user.id, idempotency_key="job-1", notify=False
+        )
+        await service.request_cancel(keyed_job.id, user.id)
+        replayed_job = await service.submit(
+            project_id="p1", chapter_number=6, user_id=user.id, idempotency_key="job-1", notify=False
+        )
+        assert replayed_job.id == keyed_job.id and replayed_job.status == "cancelled"
+        await service.request_cancel(job.id, user.id)
+
+    # a cancelled job whose generation a synchronous request shares: the job ends, the chapter is left alone
+    GatedClient.gate = asyncio.Event()
+    GatedClient.calls = 0
+    async with session_factory() as session:
+        shared_job = await GenerationJobService(session).submit(
+            project_id="p1",
+            chapter_number=7,
+            user_id=user.id,
+            flow_config=generate_request(7).flow_config.model_dump(),
+            notify=False,
+        )
+    worker = GenerationJobWorker(session_factory, concurrency=1, poll_interval=0.02, heartbeat_interval=0.02)
+    worker.start()
+    await wait_until(lambda: GatedClient.calls == 1)
+    attached = asyncio.create_task(generate(user, 7))
+    await wait_until(lambda: generation_single_flight.waiters("p1", 7) == 2)
+
+    async with session_factory() as session:
+        await GenerationJobService(session).request_cancel(shared_job.id, user.id)
+    await wait_until(lambda: generation_single_flight.waiters("p1", 7) == 1)
+    await asyncio.sleep(0.1)
+    async with session_factory() as session:
+        assert (await session.get(ChapterGenerationJob, shared_job.id)).status == "cancelled"
+    assert await chapter_status(session_factory, 7) == "generating"
+    GatedClient.gate.set()
+    result = await attached
+    assert result.variants and await chapter_status(session_factory, 7) == "waiting_for_confirm"
+    await worker.stop()
+    await engine.dispose()
+
+
+def main():
+    original_client, original_factory = llm_module.LLMClient, usage_counters.session_factory
+    original_flight_factory = generation_single_flight.session_factory
+    original_sessions, original_poll = writer.AsyncSessionLocal, writer.DISCONNECT_POLL_SECONDS
+    original_orchestrator_sessions = orchestrator_module.AsyncSessionLocal
+    llm_module.LLMClient = GatedClient
+    system_config_cache.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(main_async(os.path.join(tmp, "flight.db")))
+    finally:
+        llm_module.LLMClient, usage_counters.session_factory = original_client, original_factory
+        generation_single_flight.session_factory = original_flight_factory
+        writer.AsyncSessionLocal, writer.DISCONNECT_POLL_SECONDS = original_sessions, original_poll
+        orchestrator_module.AsyncSessionLocal = original_orchestrator_sessions
+        system_config_cache.clear()
+    print("✅ test_generation_single_flight passed")
+
+
+def test_generation_single_flight():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Tests for incremental chapter re-ingest: chunk boundaries are content-defined and stay put around an
+edit, chunk content hashes are stored in rag_chunks, and re-ingesting an edited chapter only embeds
+the changed chunks, keeps the untouched rows and deletes the stale ones. When embeddings fail, stale
+rows and the old summary stay in place until a retry succeeds.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_incremental_ingest.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+_db_dir = tempfile.mkdtemp(prefix="incremental_ingest_")
+os.environ["VECTOR_DB_URL"] = f"file:{_db_dir}/vectors.db"
+
+from app.core.config import settings  # noqa: E402
+from app.services.chapter_ingest_service import ChapterIngestionService  # noqa: E402
+from app.services.vector_store_service import VectorStoreService, content_hash  # noqa: E402
+
+settings.vector_db_url = os.environ["VECTOR_DB_URL"]
+
+PHRASES = ["雨落在青石板上，", "林舟握紧了伞柄，", "远处传来更鼓声，", "他想起了师父的话，", "灯笼在风里摇晃，"]
+
+
+def paragraph(index):
+    body = "".join(PHRASES[(index + step) % len(PHRASES)] for step in range(2 + index % 5))
+    return f"　　第{index}段。{body}夜色更深了。"
+
+
+CHAPTER = "\n".join(paragraph(i) for i in range(200))
+
+
+class CountingLLM:
+    def __init__(self):
+        self.embedded = []
+        self.failing = False
+
+    async def get_embeddings(self, texts, *, user_id=None, model=None):
+        self.embedded.extend(texts)
+        if self.failing:
+            return [[] for _ in texts]
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+async def chapter_rows(store):
+    result = await store._client.execute(  # pylint: disable=protected-access
+        "SELECT id, chunk_index, content, content_hash FROM rag_chunks "
+        "WHERE project_id = 'p1' AND chapter_number = 3 ORDER BY chunk_index"
+    )
+    return list(store._iter_rows(result))  # pylint: disable=protected-access
+
+
+async def summary_rows(store):
+    result = await store._client.execute(  # pylint: disable=protected-access
+        "SELECT summary FROM rag_summaries WHERE project_id = 'p1' AND chapter_number = 3"
+    )
+    return [row["summary"] for row in store._iter_rows(result)]  # pylint: disable=protected-access
+
+
+async def main_async():
+    llm = CountingLLM()
+    store = VectorStoreService()
+    service = ChapterIngestionService(llm_service=llm, vector_store=store)  # type: ignore[arg-type]
+
+    async def ingest(content, summary=None):
+        llm.embedded.clear()
+        return await service.ingest_chapter(
+            project_id="p1", chapter_number=3, title="雨夜", content=content, summary=summary, user_id=1
+        )
+
+    report = await ingest(CHAPTER)
+    total = report["chunks_total"]
+    assert report["status"] == "updated" and total >= 20 and report["chunks_embedded"] == total
+    rows = await chapter_rows(store)
+    assert len(rows) == total and all(row["content_hash"] == content_hash(row["content"]) for row in rows)
+    assert all(len(row["content"]) <= settings.vector_chunk_size + settings.vector_chunk_overlap for row in rows)
+
+    # unchanged text: nothing to embed, nothing to delete
+    report = await ingest(CHAPTER)
+    assert (report["chunks_embedded"], report["chunks_reused"], report["chunks_deleted"]) == (0, total, 0)
+    assert llm.embedded == []
+
+    # a one-sentence fix in the middle only touches the chunks around it
+    edited = CHAPTER.replace("　　第100段。", "　　第100段。他停下脚步，回头望了一眼。")
+    report = await ingest(edited)
+    assert report["status"] == "updated"
+    assert 1 <= report["chunks_embedded"] <= total // 10, report
+    assert report["chunks_deleted"] == report["chunks_embedded"], report
+    assert report["chunks_reused"] + report["chunks_embedded"] == report["chunks_total"]
+    rows = await chapter_rows(store)
+    assert [row["content"] for row in rows] == service._split_into_chunks(edited)  # pylint: disable=protected-access
+    assert [row["chunk_index"] for row in rows] == list(range(len(rows)))
+
+    # inserting a paragraph shifts positions but reuses everything outside the edit
+    inserted = edited.replace(paragraph(20), paragraph(20) + "\n　　门外忽然响起了敲门声。")
+    report = await ingest(inserted)
+    assert report["chunks_embedded"] <= total // 10 and report["chunks_reused"] >= total - total // 10, report
+    rows = await chapter_rows(store)
+    assert [row["content"] for row in rows] == service._split_into_chunks(inserted)  # pylint: disable=protected-access
+
+    # rows written before content hashes existed are matched by their content
+    await store._client.execute("UPDATE rag_chunks SET content_hash = NULL")  # pylint: disable=protected-access
+    report = await ingest(inserted)
+    assert report["chunks_embedded"] == 0 and report["chunks_reused"] == report["chunks_total"]
+
+    # every embedding fails: nothing is written or deleted, the retry redoes the work
+    await ingest(inserted, summary="旧摘要")
+    before = await chapter_rows(store)
+    llm.failing = True
+    rewritten = inserted.replace("　　第150段。", "　　第150段。雨停了。")
+    report = await ingest(rewritten, summary="新摘要")
+    assert report["status"] == "failed" and report["rows_written"] == 0, report
+    assert await chapter_rows(store) == before and await summary_rows(store) == ["旧摘要"]
+
+    # only the summary fails: new chunks are written, stale chunks replaced, the old summary kept
+    llm.failing = False
+    real_embeddings = llm.get_embeddings
+
+    async def summary_fails(texts, **kwargs):
+        vectors = await real_embeddings(texts, **kwargs)
+        return [[] if text == "新摘要" else vector for text, vector in zip(texts, vectors)]
+
+    llm.get_embeddings = summary_fails
+    report = await ingest(rewritten, summary="新摘要")
+    assert report["status"] == "partial" and report["chunks_deleted"] == report["chunks_embedded"] >= 1, report
+    assert await summary_rows(store) == ["旧摘要"]
+    llm.get_embeddings = real_embeddings
+
+    # some chunks fail: the stale rows they would have replaced are kept
+    async def first_fails(texts, **kwargs):
+        vectors = await real_embeddings(texts, **kwargs)
+        return [[]] + vectors[1:]
+
+    edited_twice = rewritten.replace(paragraph(10), paragraph(10) + "风更大了。").replace(
+        paragraph(180), paragraph(180) + "他终于到了。"
+    )
+    before_ids = {row["id"] for row in await chapter_rows(store)}
+    llm.get_embeddings = first_fails
+    report = await ingest(edited_twice)
+    llm.get_embeddings = real_embeddings
+    assert report["status"] == "partial" and report["chunks_deleted"] == 0, report
+    assert before_ids <= {row["id"] for row in await chapter_rows(store)}
+    report = await ingest(edited_twice)
+    assert report["status"] == "updated" and report["chunks_deleted"] >= 2, report
+    rows = await chapter_rows(store)
+    assert [row["content"] for row in rows] == service._split_into_chunks(edited_twice)  # pylint: disable=protected-access
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_incremental_ingest passed")
+
+
+def test_incremental_ingest():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Tests for the optimizer modes of the writing pipeline: fused mode rewrites once for all selected
+dimensions, patch mode replaces only the returned paragraphs, sequential mode keeps the
+per-dimension rewrites, and the mode resolves per request, per preset, or from the default.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_optimizer_modes.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.schemas.config import SystemConfigCreate  # noqa: E402
+from app.services.config_service import ConfigService  # noqa: E402
+from app.services.pipeline_orchestrator import OPTIMIZER_DIMENSIONS, PipelineOrchestrator  # noqa: E402
+from app.utils.paragraphs import ParagraphText  # noqa: E402
+
+CHAPTER = "　　第一段。\n\n　　“走吧。”他说。\n　　第三段。\n"
+
+
+class StubPromptService:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+
+    async def get_prompt(self, name):
+        return None if name in self.missing else f"<{name}>"
+
+
+class StubLLMService:
+    def __init__(self):
+        self.calls = []
+
+    async def get_llm_response(self, system_prompt, conversation_history, **kwargs):
+        payload = json.loads(conversation_history[0]["content"])
+        self.calls.append((system_prompt, payload))
+        if system_prompt == "<optimize_fused>":
+            names = [spec["dimension"] for spec in payload["dimensions"]]
+            return json.dumps(
+                {
+                    "optimized_content": payload["original_content"] + "（已合并优化）",
+                    "dimension_notes": {name: f"{name} done" for name in names[:-1]},
+                },
+                ensure_ascii=False,
+            )
+        if system_prompt == "<optimize_patch>":
+            return "```json\n" + json.dumps(
+                {
+                    "patches": [
+                        {"index": 1, "dimensions": ["dialogue"], "replacement": "“走吧。”他头也不回。"},
+                        {"index": 1, "replacement": "duplicate"},
+                        {"index": 9, "replacement": "out of range"},
+                        {"index": 2, "replacement": "   "},
+                    ],
+                    "dimension_notes": {"dialogue": "收紧对白"},
+                },
+                ensure_ascii=False,
+            ) + "\n```"
+        dimension = system_prompt.strip("<>").replace("optimize_", "")
+        return json.dumps(
+            {"optimized_content": f"{payload['original_content']}+{dimension}", "optimization_notes": dimension},
+            ensure_ascii=False,
+        )
+
+
+def make_orchestrator(session=None, missing=()):
+    orchestrator = PipelineOrchestrator(session)
+    orchestrator.llm_service = StubLLMService()
+    orchestrator.prompt_service = StubPromptService(missing)
+    return orchestrator
+
+
+async def optimizer_modes():
+    paragraphs = ParagraphText(CHAPTER)
+    assert paragraphs.paragraphs == ["第一段。", "“走吧。”他说。", "第三段。"] and paragraphs.render() == CHAPTER
+
+    orchestrator = make_orchestrator()
+    content, report = await orchestrator._run_optimizer(CHAPTER, user_id=1, mode="fused")
+    assert len(orchestrator.llm_service.calls) == 1, "fused mode rewrites the chapter once"
+    assert content == CHAPTER + "（已合并优化）"
+    assert report["mode"] == "fused"
+    assert [step["dimension"] for step in report["steps"]] == list(OPTIMIZER_DIMENSIONS)
+    assert report["steps"][0]["notes"] == "dialogue done" and report["steps"][-1]["notes"] == "优化完成"
+
+    orchestrator = make_orchestrator()
+    content, report = await orchestrator._run_optimizer(
+        CHAPTER, user_id=1, mode="patch", dimensions=("rhythm", "dialogue")
+    )
+    (_, payload), = orchestrator.llm_service.calls
+    assert [p["index"] for p in payload["paragraphs"]] == [0, 1, 2]
+    assert [spec["dimension"] for spec in payload["dimensions"]] == ["dialogue", "rhythm"]
+    assert content == CHAPTER.replace("“走吧。”他说。", "“走吧。”他头也不回。")
+    assert report["patches_applied"] == 1 and report["patches_rejected"] == 3
+    assert report["patched_paragraphs"] == [1]
+    assert report["steps"] == [
+        {"dimension": "dialogue", "notes": "收紧对白"},
+        {"dimension": "rhythm", "notes": "优化完成"},
+    ]
+
+    orchestrator = make_orchestrator()
+    content, report = await orchestrator._run_optimizer(CHAPTER, user_id=1, mode="sequential")
+    assert len(orchestrator.llm_service.calls) == 4
+    assert content == CHAPTER + "+dialogue+environment+psychology+rhythm"
+    assert report == {"mode": "sequential", "steps": [{"dimension": d, "notes": d} for d in OPTIMIZER_DIMENSIONS]}
+
+    # without the fused prompt the optimizer falls back to the per-dimension rewrites
+    orchestrator = make_orchestrator(missing={"optimize_fused"})
+    content, report = await orchestrator._run_optimizer(CHAPTER, user_id=1, mode="fused", dimensions=["rhythm"])
+    assert report["mode"] == "sequential" and content == CHAPTER + "+rhythm"
+
+
+async def mode_resolution():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as session:
+        orchestrator = make_orchestrator(session)
+        config = await orchestrator._resolve_config({"preset": "basic", "enable_optimizer": True, "versions": 1})
+        # without any opt-in the optimizer keeps its original per-dimension rewrites
+        assert config.optimizer_mode == "sequential" and config.optimizer_dimensions == tuple(OPTIMIZER_DIMENSIONS)
+
+        # written through the admin service so the config cache is invalidated
+        service = ConfigService(session)
+        await service.upsert_config(SystemConfigCreate(key="writer.optimizer_mode.enhanced", value="fused"))
+        await service.upsert_config(SystemConfigCreate(key="writer.optimizer_mode", value="patch"))
+        config = await orchestrator._resolve_config({"preset": "enhanced", "enable_optimizer": True, "versions": 1})
+        assert config.optimizer_mode == "fused"
+        config = await orchestrator._resolve_config({"preset": "basic", "enable_optimizer": True, "versions": 1})
+        assert config.optimizer_mode == "patch"
+        config = await orchestrator._resolve_config(
+            {
+                "preset": "enhanced",
+                "enable_optimizer": True,
+                "versions": 1,
+                "optimizer_mode": "FUSED",
+                "optimizer_dimensions": ["rhythm", "unknown", "dialogue"],
+            }
+        )
+        assert config.optimizer_mode == "fused" and config.optimizer_dimensions == ("dialogue", "rhythm")
+        config = await orchestrator._resolve_config({"preset": "basic", "optimizer_mode": "bogus", "versions": 1})
+        assert not config.enable_optimizer
+    await engine.dispose()
+
+
+def main():
+    asyncio.run(optimizer_modes())
+    asyncio.run(mode_resolution())
+    print("✅ test_optimizer_modes passed")
+
+
+def test_optimizer_modes():
+    main()
+
+
+if __name__ == "__main__":
+    main()
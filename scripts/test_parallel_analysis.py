@@ -0,0 +1,123 @@
+"""
+Tests for parallel dimension execution in SelfCritiqueService and ReaderSimulatorService:
+independent LLM analyses overlap under the shared limiter, each call gets its own session,
+results merge in a deterministic order, and without a session factory calls stay serial.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_parallel_analysis.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.services.llm_service import analysis_limiter  # noqa: E402
+from app.services.reader_simulator_service import ReaderSimulatorService, ReaderType  # noqa: E402
+from app.services.self_critique_service import CritiqueDimension, SelfCritiqueService  # noqa: E402
+
+DELAY = 0.1
+
+
+class Tracker:
+    active = 0
+    peak = 0
+    sessions = 0
+
+
+def reply_for(system_prompt, prompt):
+    if "严格编辑" in system_prompt:
+        dimension = prompt.split('"dimension": "')[1].split('"')[0]
+        severity = "critical" if dimension == "logic" else "minor"
+        return json.dumps(
+            {"overall_score": 80, "issues": [{"severity": severity, "problem": dimension}], "summary": dimension}
+        )
+    if "爽点" in system_prompt:
+        return json.dumps({"thrill_points": [{"type": "打脸", "intensity": 8}]})
+    if "钩子" in system_prompt:
+        return json.dumps({"hook_strength": 9, "hook_type": "悬念"})
+    satisfaction = 40 + 10 * len(system_prompt) % 50
+    return json.dumps({"satisfaction": satisfaction, "abandon_risk": 2, "comment": system_prompt[:8]})
+
+
+class StubLLMService:
+    def __init__(self, session=None):
+        self.session = session
+
+    async def get_llm_response(self, system_prompt, conversation_history, **kwargs):
+        Tracker.active += 1
+        Tracker.peak = max(Tracker.peak, Tracker.active)
+        try:
+            # random latency so completion order differs from submission order
+            await asyncio.sleep(DELAY * random.uniform(0.5, 1.5))
+        finally:
+            Tracker.active -= 1
+        return reply_for(system_prompt, conversation_history[0]["content"])
+
+
+@asynccontextmanager
+async def session_factory():
+    Tracker.sessions += 1
+    yield object()
+
+
+def reset():
+    Tracker.active = Tracker.peak = Tracker.sessions = 0
+
+
+async def main_async():
+    assert (analysis_limiter.global_limit, analysis_limiter.per_key_limit) == (8, 4)
+    dimensions = list(CritiqueDimension)
+    serial = await SelfCritiqueService(None, StubLLMService(), None).full_critique("正文", dimensions=dimensions)
+    assert Tracker.peak == 1 and Tracker.sessions == 0
+
+    reset()
+    critic = SelfCritiqueService(None, StubLLMService(), None, session_factory=session_factory)
+    started = time.perf_counter()
+    parallel = await critic.full_critique("正文", dimensions=dimensions)
+    elapsed = time.perf_counter() - started
+    assert Tracker.peak == 4, "per-user limit of the shared limiter caps the fan-out"
+    assert Tracker.sessions == len(dimensions)
+    assert elapsed < DELAY * 1.5 * 3, elapsed
+    assert list(parallel["dimension_critiques"]) == [d.value for d in dimensions]
+    assert [issue["dimension"] for issue in parallel["all_issues"]] == [d.value for d in dimensions]
+    assert parallel == serial, "parallel merge must match the serial result"
+    assert parallel["critical_count"] == 1 and parallel["needs_revision"]
+
+    reset()
+    readers = list(ReaderType)
+    simulator = ReaderSimulatorService(None, StubLLMService(), None, session_factory=session_factory)
+    started = time.perf_counter()
+    report = await simulator.simulate_reading_experience("正文" * 400, 3, reader_types=readers, user_id=7)
+    elapsed = time.perf_counter() - started
+    # thrill detection, then five readers under the per-user limit of four; the hook runs alongside
+    assert elapsed < DELAY * 5, elapsed
+    assert Tracker.sessions == len(readers) + 2 and Tracker.peak == 4
+    assert list(report["reader_feedbacks"]) == [r.value for r in readers]
+    assert report["hook_strength"]["hook_strength"] == 9 and len(report["thrill_points"]) == 1
+
+    reset()
+    serial_report = await ReaderSimulatorService(None, StubLLMService(), None).simulate_reading_experience(
+        "正文" * 400, 3, reader_types=readers, user_id=7
+    )
+    assert Tracker.peak == 1
+    assert serial_report == report
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_parallel_analysis passed")
+
+
+def test_parallel_analysis():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Stub test for concurrent chapter version generation in PipelineOrchestrator.
+
+Checks that versions run on separate sessions, respect the per-user cap and come back in index order.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_parallel_versions.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.core.config import settings  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+
+
+class StubSession:
+    opened = 0
+
+    async def __aenter__(self):
+        StubSession.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class StubOrchestrator(PipelineOrchestrator):
+    running = 0
+    peak = 0
+    sessions = set()
+
+    async def _generate_single_version(self, *, index: int, style_hint, **kwargs):
+        cls = StubOrchestrator
+        cls.running += 1
+        cls.peak = max(cls.peak, cls.running)
+        cls.sessions.add(self.session)
+        try:
+            # later versions finish first, so ordering must come from the index
+            await asyncio.sleep(0.01 * (10 - index))
+        finally:
+            cls.running -= 1
+        return [{"index": index, "content": f"v{index}", "style_hint": style_hint}]
+
+
+async def main():
+    orchestrator = StubOrchestrator(StubSession(), session_factory=StubSession)
+    version_count = 5
+    hints = [f"hint-{idx}" for idx in range(version_count)]
+
+    versions = await orchestrator._generate_versions(  # pylint: disable=protected-access
+        version_count=version_count,
+        version_style_hints=hints,
+        user_id=1,
+        config=PipelineConfig(parallel_versions=True),
+        version_kwargs={},
+    )
+    assert [v["index"] for v in versions] == list(range(version_count)), versions
+    assert [v["style_hint"] for v in versions] == hints
+    assert StubSession.opened == version_count, "each version should open its own session"
+    assert len(StubOrchestrator.sessions) == version_count
+    assert 1 < StubOrchestrator.peak <= settings.writer_version_concurrency_per_user, StubOrchestrator.peak
+
+    StubOrchestrator.peak = 0
+    StubSession.opened = 0
+    sequential = await orchestrator._generate_versions(  # pylint: disable=protected-access
+        version_count=3,
+        version_style_hints=hints,
+        user_id=1,
+        config=PipelineConfig(parallel_versions=False),
+        version_kwargs={},
+    )
+    assert [v["index"] for v in sequential] == [0, 1, 2]
+    assert StubOrchestrator.peak == 1 and StubSession.opened == 0
+    print("✅ test_parallel_versions passed")
+
+
+def test_parallel_versions():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
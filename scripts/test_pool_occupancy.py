@@ -0,0 +1,164 @@
+"""
+Tests that chapter generation returns its database connections to the pool while waiting on the LLM:
+several concurrent generations share a pool smaller than their number, all of them reach the model
+at the same time with no connection checked out, and every one persists its versions afterwards.
+An LLM call never commits changes its caller has not committed yet: they can still be rolled back.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_pool_occupancy.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    Chapter,
+    ChapterOutline,
+    ChapterVersion,
+    NovelBlueprint,
+    NovelProject,
+    Prompt,
+    SystemConfig,
+    User,
+)
+from app.repositories.system_config_cache import system_config_cache  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineOrchestrator  # noqa: E402
+from app.services.usage_counter_service import usage_counters  # noqa: E402
+
+GENERATIONS = 6
+POOL_SIZE = 2
+CHAPTER_TEXT = "　　林舟推开院门，雨还在下。" * 40
+
+current_generation: contextvars.ContextVar[int] = contextvars.ContextVar("current_generation", default=-1)
+
+
+class GatedClient:
+    """Fake LLM: the first call of every generation waits until all generations are waiting on the model."""
+
+    engine = None
+    waiting: set = set()
+    all_waiting: asyncio.Event
+    checked_out_while_waiting = None
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, *, messages, **kwargs):
+        cls = GatedClient
+        cls.calls += 1
+        if not cls.all_waiting.is_set():
+            cls.waiting.add(current_generation.get())
+            if len(cls.waiting) == GENERATIONS:
+                cls.checked_out_while_waiting = cls.engine.sync_engine.pool.checkedout()
+                cls.all_waiting.set()
+            await asyncio.wait_for(cls.all_waiting.wait(), timeout=10)
+        await asyncio.sleep(0.01)
+        yield {"content": CHAPTER_TEXT, "finish_reason": None}
+        yield {"content": None, "finish_reason": "stop"}
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="writer", hashed_password="x", email="writer@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Pool"))
+        session.add(NovelBlueprint(project_id="p1", title="Pool", one_sentence_summary="雨夜归乡"))
+        for number in range(1, GENERATIONS + 1):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"第{number}章", summary="归乡"))
+        session.add(Prompt(name="writing", content="你是一位小说作者。"))
+        session.add(SystemConfig(key="llm.api_key", value="k"))
+        await session.commit()
+        return user.id
+
+
+async def main_async(path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=10,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user_id = await seed(session_factory)
+
+    GatedClient.engine = engine
+    GatedClient.all_waiting = asyncio.Event()
+    usage_counters.session_factory = session_factory
+
+    async def generate(index):
+        current_generation.set(index)
+        async with session_factory() as session:
+            orchestrator = PipelineOrchestrator(session, session_factory=session_factory)
+            return await orchestrator.generate_chapter(
+                project_id="p1",
+                chapter_number=index + 1,
+                user_id=user_id,
+                flow_config={"preset": "basic", "versions": 1, "enable_rag": False},
+            )
+
+    results = await asyncio.wait_for(asyncio.gather(*(generate(i) for i in range(GENERATIONS))), timeout=60)
+
+    # with connections held across LLM calls, a pool of two could never let six generations reach the model
+    assert GatedClient.all_waiting.is_set()
+    assert GatedClient.checked_out_while_waiting == 0, GatedClient.checked_out_while_waiting
+    assert engine.sync_engine.pool.checkedout() == 0
+    assert all(len(result["variants"]) == 1 for result in results)
+
+    async with session_factory() as session:
+        chapters = (await session.execute(select(Chapter).order_by(Chapter.chapter_number))).scalars().all()
+        assert [chapter.status for chapter in chapters] == ["waiting_for_confirm"] * GENERATIONS
+        versions = (await session.execute(select(ChapterVersion))).scalars().all()
+        assert len(versions) == GENERATIONS and all(version.content for version in versions)
+
+    # uncommitted changes (pending or already autoflushed) stay in the caller's transaction across an LLM call
+    for flush in (False, True):
+        async with session_factory() as session:
+            chapter = await session.get(Chapter, chapters[0].id)
+            chapter.status = "generating"
+            if flush:
+                await session.flush()
+            await LLMService(session).get_llm_response("system", [{"role": "user", "content": "hi"}])
+            assert session.in_transaction(), "the LLM call must not end the caller's transaction"
+            await session.rollback()
+        async with session_factory() as session:
+            assert (await session.get(Chapter, chapters[0].id)).status == "waiting_for_confirm"
+    await engine.dispose()
+
+
+def main():
+    original_client, original_factory = llm_module.LLMClient, usage_counters.session_factory
+    llm_module.LLMClient = GatedClient
+    system_config_cache.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(main_async(os.path.join(tmp, "pool.db")))
+    finally:
+        llm_module.LLMClient, usage_counters.session_factory = original_client, original_factory
+        system_config_cache.clear()
+    print("✅ test_pool_occupancy passed")
+
+
+def test_pool_occupancy():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Tests for delta responses of the writer endpoints: ?delta=true returns only the touched chapters
+plus the project revision, and every write bumps the revision exactly once.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_project_delta.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.api.routers import writer  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.models import Chapter, ChapterOutline, ChapterVersion, NovelBlueprint, NovelProject, User  # noqa: E402
+from app.schemas.novel import (  # noqa: E402
+    DeleteChapterRequest,
+    NovelProject as NovelProjectSchema,
+    NovelProjectDelta,
+    UpdateChapterOutlineRequest,
+)
+from app.schemas.user import UserInDB  # noqa: E402
+from app.services.novel_service import NovelService  # noqa: E402
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="owner", hashed_password="x", email="owner@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Delta"))
+        session.add(NovelBlueprint(project_id="p1", title="Delta"))
+        for number in range(1, 5):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"C{number}", summary="s"))
+            chapter = Chapter(project_id="p1", chapter_number=number, status="waiting_for_confirm")
+            session.add(chapter)
+            await session.flush()
+            session.add_all([ChapterVersion(chapter_id=chapter.id, content=f"c{number}-v{i}") for i in range(2)])
+        await session.commit()
+        return UserInDB.model_validate(user, from_attributes=True)
+
+
+async def main_async():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user = await seed(session_factory)
+
+    async with session_factory() as session:
+        service = NovelService(session)
+        full = await service.get_project_schema("p1", user.id)
+        assert full.revision == 0 and len(full.chapters) == 4
+
+        chapter = await service.get_or_create_chapter("p1", 2)
+        await service.select_chapter_version(chapter, 1)
+        delta = await service.get_project_delta("p1", user.id, chapter_numbers=[2])
+        assert delta.revision == 1, delta
+        assert [c.chapter_number for c in delta.chapters] == [2]
+        assert delta.chapters[0].content == "c2-v1" and delta.chapters[0].versions == ["c2-v0", "c2-v1"]
+
+        # a chapter already in the identity map must not leak a stale version list into the delta
+        session.add(ChapterVersion(chapter_id=chapter.id, content="c2-manual"))
+        await session.commit()
+        await service.touch_project("p1")
+        delta = await service.get_project_delta("p1", user.id, chapter_numbers=[2, 99])
+        assert delta.revision == 2
+        assert delta.chapters[0].versions[-1] == "c2-manual" and len(delta.chapters) == 1
+
+    async with session_factory() as session:
+        response = await writer.update_chapter_outline(
+            "p1",
+            UpdateChapterOutlineRequest(chapter_number=3, title="New", summary="changed"),
+            delta=True,
+            session=session,
+            current_user=user,
+        )
+        assert isinstance(response, NovelProjectDelta)
+        assert response.revision == 3 and response.chapters[0].title == "New"
+
+        response = await writer.delete_chapters(
+            "p1", DeleteChapterRequest(chapter_numbers=[4]), delta=True, session=session, current_user=user
+        )
+        assert response.revision == 4 and response.deleted_chapters == [4] and response.chapters == []
+
+        response = await writer.update_chapter_outline(
+            "p1",
+            UpdateChapterOutlineRequest(chapter_number=1, title="Full", summary="s"),
+            delta=False,
+            session=session,
+            current_user=user,
+        )
+        assert isinstance(response, NovelProjectSchema)
+        assert response.revision == 5 and [c.chapter_number for c in response.chapters] == [1, 2, 3]
+
+        compact = await NovelService(session).get_project_delta("p1", user.id, chapter_numbers=[1])
+        assert len(compact.model_dump_json()) < len(response.model_dump_json())
+
+    await engine.dispose()
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_project_delta passed")
+
+
+def test_project_delta():
+    main()
+
+
+if __name__ == "__main__":
+    main()
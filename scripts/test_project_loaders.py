@@ -0,0 +1,118 @@
+"""
+Tests for the tiered project loaders in NovelService: the ownership check loads no relationships,
+the writer context loads only selected versions, and single-chapter/section reads avoid the full loader.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_project_loaders.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import event, inspect  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    Chapter,
+    ChapterOutline,
+    ChapterVersion,
+    NovelBlueprint,
+    NovelConversation,
+    NovelProject,
+    User,
+)
+from app.schemas.novel import NovelSectionType  # noqa: E402
+from app.services.novel_service import NovelService  # noqa: E402
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="owner", hashed_password="x", email="owner@example.com")
+        other = User(username="other", hashed_password="x", email="other@example.com")
+        session.add_all([user, other])
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Loaders"))
+        session.add(NovelBlueprint(project_id="p1", title="Loaders"))
+        session.add(NovelConversation(project_id="p1", seq=1, role="user", content="hi"))
+        for number in range(1, 4):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"C{number}", summary="s"))
+            chapter = Chapter(project_id="p1", chapter_number=number, status="successful")
+            session.add(chapter)
+            await session.flush()
+            versions = [ChapterVersion(chapter_id=chapter.id, content=f"c{number}-v{i}") for i in range(3)]
+            session.add_all(versions)
+            await session.flush()
+            chapter.selected_version_id = versions[-1].id
+        await session.commit()
+        return user.id, other.id
+
+
+async def main_async():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    owner_id, other_id = await seed(session_factory)
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    async with session_factory() as session:
+        service = NovelService(session)
+        statements.clear()
+        project = await service.ensure_project_owner("p1", owner_id)
+        assert len(statements) == 1, statements
+        unloaded = inspect(project).unloaded
+        assert {"chapters", "outlines", "conversations", "blueprint"} <= unloaded, unloaded
+
+        for project_id, user_id, code in (("missing", owner_id, 404), ("p1", other_id, 403)):
+            try:
+                await service.ensure_project_owner(project_id, user_id)
+            except HTTPException as exc:
+                assert exc.status_code == code
+            else:
+                raise AssertionError("ownership check should fail")
+
+    async with session_factory() as session:
+        service = NovelService(session)
+        project = await service.load_writer_context("p1", owner_id)
+        assert "conversations" in inspect(project).unloaded
+        chapter = project.chapters[0]
+        assert chapter.selected_version.content == "c1-v2"
+        assert {"versions", "evaluations"} <= inspect(chapter).unloaded
+        assert service._build_blueprint_schema(project).chapter_outline[0].title == "C1"  # pylint: disable=protected-access
+
+    async with session_factory() as session:
+        service = NovelService(session)
+        statements.clear()
+        chapter_schema = await service.get_chapter_schema("p1", owner_id, 2)
+        assert chapter_schema.content == "c2-v2" and chapter_schema.versions == ["c2-v0", "c2-v1", "c2-v2"]
+        assert not any("novel_conversations" in sql for sql in statements), "single chapter read must not load the project"
+
+        section = await service.get_section_data("p1", owner_id, NovelSectionType.CHAPTERS)
+        assert section.data["total"] == 3 and section.data["chapters"][0]["content"] is None
+
+        full = await service.get_project_schema("p1", owner_id)
+        assert len(full.chapters) == 3 and full.conversation_history[0]["content"] == "hi"
+        assert full.chapters[0].versions == ["c1-v0", "c1-v1", "c1-v2"]
+
+    await engine.dispose()
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_project_loaders passed")
+
+
+def test_project_loaders():
+    main()
+
+
+if __name__ == "__main__":
+    main()
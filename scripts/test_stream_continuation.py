@@ -0,0 +1,203 @@
+"""
+Tests for continuation of length-truncated LLM responses: truncated text output is kept and
+continued from its tail, the overlap repeated by the continuation is removed before it is
+forwarded, the round budget and the daily quota are respected, and the writer records the rounds in metadata.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_stream_continuation.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.llm_service import CONTINUATION_PROMPT, LLMService, StreamStats  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+from app.services.post_gen_validator import ValidationResult  # noqa: E402
+from app.utils.continuation import OverlapStitcher, merge_overlap  # noqa: E402
+
+FIRST = "　　林舟推开院门，雨还在下。他在檐下站了片刻，听见屋里"
+SECOND = "他在檐下站了片刻，听见屋里有人咳嗽。"
+THIRD = "\n　　灯下坐着一位老人。"
+
+
+def stitching():
+    assert merge_overlap(FIRST, SECOND, max_overlap=300) == "有人咳嗽。"
+    assert merge_overlap(FIRST, "屋里有人", max_overlap=300) == "屋里有人", "short overlaps are kept"
+    assert merge_overlap(FIRST, SECOND, max_overlap=5) == SECOND
+
+    stitcher = OverlapStitcher(FIRST, max_overlap=16)
+    assert stitcher.feed("他在檐下站了") == "", "the head of a continuation is buffered"
+    assert stitcher.feed("片刻，听见屋里有人咳嗽。") == "有人咳嗽。"
+    assert stitcher.feed("灯下") == "灯下" and stitcher.flush() == ""
+    stitcher = OverlapStitcher(FIRST, max_overlap=300)
+    assert stitcher.feed(SECOND) == "" and stitcher.flush() == "有人咳嗽。"
+
+
+class ScriptedClient:
+    rounds = []
+    requests = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, *, messages, **kwargs):
+        ScriptedClient.requests.append([(m.role, m.content) for m in messages])
+        chunks, finish_reason = ScriptedClient.rounds.pop(0)
+        for chunk in chunks:
+            yield {"content": chunk, "finish_reason": None}
+        yield {"content": None, "finish_reason": finish_reason}
+
+
+class StubUsage:
+    def __init__(self):
+        self.count = 0
+
+    async def increment(self, key):
+        self.count += 1
+
+
+def make_service(*, metered=False, quota=0):
+    service = LLMService(None)
+    service.usage_service = StubUsage()
+    service.quota_requests = 0
+
+    async def resolve(user_id):
+        return {"api_key": "k", "base_url": None, "model": "m", "metered": metered}
+
+    async def acquire(user_id):
+        service.quota_requests += 1
+        return service.quota_requests <= quota
+
+    service._resolve_llm_config = resolve  # type: ignore[assignment]
+    service._acquire_daily_request = acquire  # type: ignore[assignment]
+    return service
+
+
+async def continuation():
+    original = llm_module.LLMClient
+    llm_module.LLMClient = ScriptedClient
+    try:
+        service = make_service()
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        ScriptedClient.requests = []
+        ScriptedClient.rounds = [
+            ([FIRST[:10], FIRST[10:]], "length"),
+            ([SECOND[:6], SECOND[6:]], "length"),
+            ([THIRD], "stop"),
+        ]
+        stats = StreamStats()
+        history = [{"role": "user", "content": "写第三章"}]
+        result = await service.get_llm_response(
+            "system", history, response_format=None, user_id=1, on_delta=on_delta, stats=stats
+        )
+        assert result == FIRST + "有人咳嗽。" + THIRD
+        assert "".join(deltas) == result, "forwarded deltas never contain the repeated overlap"
+        assert (stats.continuation_rounds, stats.truncated, stats.finish_reason) == (2, False, "stop")
+        assert service.usage_service.count == 3
+        second_request = ScriptedClient.requests[1]
+        assert second_request[:2] == [("system", "system"), ("user", "写第三章")]
+        assert second_request[2:] == [("assistant", FIRST), ("user", CONTINUATION_PROMPT)]
+        assert ScriptedClient.requests[2][2] == ("assistant", FIRST + "有人咳嗽。")
+
+        # the budget is exhausted: keep the text and flag it as truncated
+        ScriptedClient.rounds = [([FIRST], "length"), ([SECOND], "length"), ([THIRD], "length"), (["多余"], "stop")]
+        stats = StreamStats()
+        rounds = settings.llm_continuation_max_rounds
+        settings.llm_continuation_max_rounds = 2
+        try:
+            result = await service.get_llm_response("system", history, response_format=None, user_id=1, stats=stats)
+            assert result == FIRST + "有人咳嗽。" + THIRD and stats.truncated and stats.continuation_rounds == 2
+
+            # continuation disabled, or JSON output that cannot be stitched: truncation is still an error
+            settings.llm_continuation_max_rounds = 0
+            for response_format, script in ((None, [([FIRST], "length")]), ("json_object", [(["{"], "length")])):
+                ScriptedClient.rounds = script
+                try:
+                    await service.get_llm_response("system", history, response_format=response_format, user_id=1)
+                    raise AssertionError("truncation should be reported")
+                except HTTPException as exc:
+                    assert exc.status_code == 500
+            # every continuation on the shared key takes a daily quota unit; continuing stops when none is left
+            settings.llm_continuation_max_rounds = 3
+            metered = make_service(metered=True, quota=1)
+            ScriptedClient.rounds = [([FIRST], "length"), ([SECOND], "length"), ([THIRD], "stop")]
+            stats = StreamStats()
+            result = await metered.get_llm_response("system", history, response_format=None, user_id=1, stats=stats)
+            assert result == FIRST + "有人咳嗽。" and stats.truncated and stats.continuation_rounds == 1
+            assert metered.quota_requests == 2 and metered.usage_service.count == 2
+
+            ScriptedClient.rounds = [(["{"], "length")]
+            try:
+                await service.get_llm_response("system", history, user_id=1)
+                raise AssertionError("JSON output is never continued")
+            except HTTPException as exc:
+                assert exc.status_code == 500 and not ScriptedClient.rounds
+        finally:
+            settings.llm_continuation_max_rounds = rounds
+    finally:
+        llm_module.LLMClient = original
+
+
+class ContinuingLLM:
+    async def get_llm_response(self, system_prompt, conversation_history, *, stats=None, **kwargs):
+        stats.continuation_rounds = 2
+        return FIRST + "有人咳嗽。"
+
+
+class AcceptingValidator:
+    def validate(self, text, *, context):
+        return ValidationResult(ok=True, errors=[], action="accept")
+
+
+async def writer_metadata():
+    orchestrator = PipelineOrchestrator(None)
+    orchestrator.llm_service = ContinuingLLM()
+    orchestrator.validator = AcceptingValidator()
+    variants = await orchestrator._generate_single_version(
+        index=0,
+        prompt_input="写第三章",
+        writer_prompt="<writing>",
+        style_hint=None,
+        project_id="p1",
+        chapter_number=3,
+        outline_title="雨夜",
+        outline_summary="归家",
+        chapter_mission=None,
+        forbidden_characters=[],
+        allowed_new_characters=[],
+        user_id=1,
+        writer_blueprint={},
+        memory_context=None,
+        enhanced_context=None,
+        config=PipelineConfig(),
+        writing_context={"pov": {"pov_switch_allowed": True}},
+        outline_constraints={},
+    )
+    assert variants[0]["metadata"]["continuation"] == {"rounds": 2, "truncated": False}
+
+
+def main():
+    stitching()
+    asyncio.run(continuation())
+    asyncio.run(writer_metadata())
+    print("✅ test_stream_continuation passed")
+
+
+def test_stream_continuation():
+    main()
+
+
+if __name__ == "__main__":
+    main()
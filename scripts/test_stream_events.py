@@ -0,0 +1,78 @@
+"""
+Stub test for pipeline streaming events: version lifecycle events and per-version token deltas.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_stream_events.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+
+
+class StubLLM:
+    async def get_llm_response(self, *, on_delta=None, **kwargs):
+        pieces = ["他推开门，", "看见院子里", "落满了雪。"]
+        for piece in pieces:
+            if on_delta is not None:
+                await on_delta(piece)
+        return "".join(pieces)
+
+
+async def main():
+    events = []
+
+    async def sink(event):
+        events.append(event)
+
+    orchestrator = PipelineOrchestrator(object())  # type: ignore[arg-type]
+    orchestrator.llm_service = StubLLM()  # type: ignore[assignment]
+    orchestrator.event_sink = sink
+
+    variants = await orchestrator._generate_single_version(  # pylint: disable=protected-access
+        index=1,
+        prompt_input="写一段",
+        writer_prompt="system",
+        style_hint=None,
+        project_id="p1",
+        chapter_number=1,
+        outline_title="第1章",
+        outline_summary="雪夜",
+        chapter_mission=None,
+        forbidden_characters=[],
+        allowed_new_characters=[],
+        user_id=1,
+        writer_blueprint={},
+        memory_context=None,
+        enhanced_context=None,
+        config=PipelineConfig(),
+        writing_context={"pov": {}, "introduced_characters": [], "outline_constraints": {}},
+        outline_constraints={},
+    )
+
+    names = [e["event"] for e in events]
+    assert names[0] == "version_started" and names[-1] == "version_finished", names
+    tokens = [e for e in events if e["event"] == "token"]
+    assert tokens and all(e["version"] == 1 for e in tokens), tokens
+    first_attempt = "".join(e["delta"] for e in tokens if e["attempt"] == 0)
+    assert first_attempt == variants[0]["content"]
+    # a validator retry streams under its own attempt number
+    assert {e["attempt"] for e in tokens} == set(range(len(variants)))
+
+    # without a sink nothing is forwarded
+    orchestrator.event_sink = None
+    assert orchestrator._token_forwarder(0, attempt=0) is None  # pylint: disable=protected-access
+    print("✅ test_stream_events passed")
+
+
+def test_stream_events():
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,215 @@
+"""
+Tests for the streaming guardrail: the multi-pattern matcher catches forbidden names split across
+stream chunks, the LLM service stops reading and closes the upstream stream on a hit, and the
+writer restarts with a corrective directive, recording the abort and its offset in lineage.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_stream_guard.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from app.core.config import settings  # noqa: E402
+from app.services import llm_service as llm_module  # noqa: E402
+from app.services.chapter_guardrails import StreamGuard  # noqa: E402
+from app.services.llm_service import LLMService, StreamAborted  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineConfig, PipelineOrchestrator  # noqa: E402
+from app.services.post_gen_validator import ValidationResult  # noqa: E402
+
+LEAKY = ["　　林舟推开院门，", "雨还在下。赵", "衡站在檐下。", "\n　　这一段不该被读取。"]
+CLEAN = ["　　林舟推开院门，", "雨还在下。", "\n　　屋里有人咳嗽。"]
+
+
+def matcher():
+    guard = StreamGuard(["赵衡", "赵衡之"], omniscient_cues=["殊不知"])
+    assert guard.feed("林舟推开院门，赵") is None
+    hit = guard.feed("衡之站在檐下")
+    assert (hit.type, hit.text, hit.offset, hit.end) == ("forbidden_name", "赵衡之", 7, 10)
+
+    guard = StreamGuard(["赵衡"], omniscient_cues=["殊不知"])
+    assert guard.feed("<think>不能写赵衡") is None, "reasoning blocks are not checked"
+    hit = guard.feed("</think>林舟不知道，殊不")
+    assert hit is None
+    hit = guard.feed("知城外")
+    assert hit.type == "omniscient_cue" and hit.offset == len("<think>不能写赵衡</think>林舟不知道，")
+
+    assert not StreamGuard(["", None]).enabled  # type: ignore[list-item]
+
+
+class FakeClient:
+    closed = False
+    consumed = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def stream_chat(self, **kwargs):
+        try:
+            for chunk in LEAKY:
+                FakeClient.consumed += 1
+                yield {"content": chunk, "finish_reason": None}
+            yield {"content": None, "finish_reason": "stop"}
+        finally:
+            FakeClient.closed = True
+
+
+class StubUsage:
+    def __init__(self):
+        self.counts = []
+
+    async def increment(self, key):
+        self.counts.append(key)
+
+
+async def llm_abort():
+    service = LLMService(None)
+    service.usage_service = StubUsage()
+
+    async def resolve(user_id):
+        return {"api_key": "k", "base_url": None, "model": "m"}
+
+    service._resolve_llm_config = resolve  # type: ignore[assignment]
+    original = llm_module.LLMClient
+    llm_module.LLMClient = FakeClient
+    try:
+        deltas = []
+
+        async def on_delta(delta):
+            deltas.append(delta)
+
+        guard = StreamGuard(["赵衡"])
+        try:
+            await service.get_llm_response("system", [], user_id=1, on_delta=on_delta, stream_guard=guard.feed)
+            raise AssertionError("the guard should abort the stream")
+        except StreamAborted as exc:
+            assert exc.partial == "".join(LEAKY[:3]) and exc.hit.offset == exc.partial.index("赵衡")
+        assert FakeClient.consumed == 3 and FakeClient.closed, "upstream stream is closed right after the hit"
+        assert deltas == LEAKY[:3] and service.usage_service.counts == ["api_request_count"]
+
+        FakeClient.closed = False
+        response = await service.get_llm_response("system", [], user_id=1, stream_guard=StreamGuard([]).feed)
+        assert response == "".join(LEAKY) and FakeClient.closed
+    finally:
+        llm_module.LLMClient = original
+
+
+class AcceptingValidator:
+    def validate(self, text, *, context):
+        return ValidationResult(ok=True, errors=[], action="accept")
+
+
+class StubPromptService:
+    async def get_prompt(self, name):
+        return None
+
+
+class StreamingLLM:
+    """Replays scripted chunks through the guard the way LLMService does."""
+
+    def __init__(self, scripts):
+        self.scripts = list(scripts)
+        self.calls = []
+        self.repairs = 0
+
+    async def get_llm_response(self, system_prompt, conversation_history, *, stream_guard=None, on_delta=None, **kwargs):
+        if system_prompt != "<writing>":
+            self.repairs += 1
+            return '{"paragraphs": []}'
+        self.calls.append((conversation_history[0]["content"], stream_guard))
+        partial = ""
+        for chunk in self.scripts.pop(0):
+            partial += chunk
+            if on_delta is not None:
+                await on_delta(chunk)
+            hit = stream_guard(chunk) if stream_guard else None
+            if hit is not None:
+                raise StreamAborted(partial, hit)
+        return partial
+
+
+async def writer_restart(max_restarts, scripts):
+    settings.writer_stream_guard_max_restarts = max_restarts
+    events = []
+
+    async def sink(event):
+        events.append(event)
+
+    orchestrator = PipelineOrchestrator(None)
+    orchestrator.llm_service = StreamingLLM(scripts)
+    orchestrator.event_sink = sink
+    orchestrator.validator = AcceptingValidator()
+    orchestrator.prompt_service = StubPromptService()
+    variants = await orchestrator._generate_single_version(
+        index=0,
+        prompt_input="写第三章",
+        writer_prompt="<writing>",
+        style_hint=None,
+        project_id="p1",
+        chapter_number=3,
+        outline_title="雨夜",
+        outline_summary="归家",
+        chapter_mission=None,
+        forbidden_characters=["赵衡"],
+        allowed_new_characters=[],
+        user_id=1,
+        writer_blueprint={},
+        memory_context=None,
+        enhanced_context=None,
+        config=PipelineConfig(),
+        writing_context={"pov": {"pov_name": "林舟"}},
+        outline_constraints={},
+    )
+    return orchestrator.llm_service.calls, events, variants, orchestrator.llm_service.repairs
+
+
+async def writer_flow():
+    calls, events, variants, repairs = await writer_restart(2, [LEAKY, CLEAN])
+    assert len(calls) == 2 and "[修正指令]" not in calls[0][0]
+    assert "「赵衡」" in calls[1][0] and calls[1][1] is not None, "the restart is still guarded"
+    (abort,) = variants[0]["lineage"]["stream_aborts"]
+    assert abort == {
+        "attempt": 0,
+        "type": "forbidden_name",
+        "text": "赵衡",
+        "offset": "".join(LEAKY).index("赵衡"),
+        "partial_chars": len("".join(LEAKY[:3])),
+        "guarded_restart": True,
+    }
+    assert [e for e in events if e["event"] == "version_aborted"] == [
+        {"event": "version_aborted", "version": 0, "offset": abort["offset"], "reason": "forbidden_name"}
+    ]
+    assert variants[0]["content"] == "".join(CLEAN).lstrip() and variants[0]["metadata"]["guardrail"]["passed"]
+    assert repairs == 0
+
+    # once restarts are used up the last attempt streams unguarded and the guardrail takes over
+    calls, _, variants, repairs = await writer_restart(1, [LEAKY, LEAKY])
+    assert [guard is None for _, guard in calls] == [False, True]
+    assert variants[0]["lineage"]["stream_aborts"][0]["guarded_restart"] is False
+    assert not variants[0]["metadata"]["guardrail"]["passed"] and repairs == 1
+
+    calls, _, variants, _ = await writer_restart(0, [LEAKY])
+    assert calls[0][1] is None and variants[0]["lineage"]["stream_aborts"] == []
+
+
+def main():
+    restarts = settings.writer_stream_guard_max_restarts
+    try:
+        matcher()
+        asyncio.run(llm_abort())
+        asyncio.run(writer_flow())
+    finally:
+        settings.writer_stream_guard_max_restarts = restarts
+    print("✅ test_stream_guard passed")
+
+
+def test_stream_guard():
+    main()
+
+
+if __name__ == "__main__":
+    main()
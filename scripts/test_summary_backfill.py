@@ -0,0 +1,178 @@
+"""
+Tests for the chapter summary backfill queue: enqueue/claim/process with bounded concurrency,
+retry with backoff, re-enqueue during processing, the background worker loop, and the
+read-only history context fallback in PipelineOrchestrator.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_summary_backfill.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy import select, update  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import Chapter, ChapterOutline, ChapterSummaryTask, ChapterVersion, NovelProject, User  # noqa: E402
+from app.services import summary_backfill_service  # noqa: E402
+from app.services.pipeline_orchestrator import PipelineOrchestrator  # noqa: E402
+from app.services.summary_backfill_service import SummaryBackfillService, SummaryBackfillWorker  # noqa: E402
+
+CHAPTERS = 6
+
+
+class Tracker:
+    active = 0
+    peak = 0
+    calls = 0
+    fail_once = {"c3"}
+    on_call = None
+
+
+class StubLLMService:
+    def __init__(self, session):
+        self.session = session
+
+    async def get_summary(self, content, **kwargs):
+        Tracker.calls += 1
+        Tracker.active += 1
+        Tracker.peak = max(Tracker.peak, Tracker.active)
+        try:
+            await asyncio.sleep(0.02)
+            if Tracker.on_call:
+                await Tracker.on_call(content)
+            if content in Tracker.fail_once:
+                Tracker.fail_once.discard(content)
+                raise RuntimeError("llm timeout")
+            return f"<think>x</think>summary of {content}"
+        finally:
+            Tracker.active -= 1
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        user = User(username="owner", hashed_password="x", email="owner@example.com")
+        session.add(user)
+        await session.flush()
+        session.add(NovelProject(id="p1", user_id=user.id, title="Backfill"))
+        for number in range(1, CHAPTERS + 1):
+            session.add(ChapterOutline(project_id="p1", chapter_number=number, title=f"C{number}", summary=f"outline {number}"))
+            chapter = Chapter(project_id="p1", chapter_number=number, status="successful")
+            session.add(chapter)
+            await session.flush()
+            version = ChapterVersion(chapter_id=chapter.id, content=f"c{number}")
+            session.add(version)
+            await session.flush()
+            chapter.selected_version_id = version.id
+        await session.commit()
+        return user.id
+
+
+async def summaries(session_factory):
+    async with session_factory() as session:
+        rows = await session.execute(select(Chapter.chapter_number, Chapter.real_summary).order_by(Chapter.chapter_number))
+        return dict(rows.all())
+
+
+async def task_of(session_factory, number):
+    async with session_factory() as session:
+        result = await session.execute(select(ChapterSummaryTask).where(ChapterSummaryTask.chapter_number == number))
+        return result.scalars().one()
+
+
+async def main_async():
+    db_dir = tempfile.mkdtemp(prefix="summary_backfill_")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_dir}/app.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    user_id = await seed(session_factory)
+    summary_backfill_service.LLMService = StubLLMService  # type: ignore[assignment]
+
+    # generation only reads summaries: missing ones fall back to the outline and get queued
+    async with session_factory() as session:
+        orchestrator = PipelineOrchestrator(session, session_factory=session_factory)
+        project = await orchestrator.novel_service.load_writer_context("p1", user_id)
+        context = await orchestrator._collect_history_context(  # pylint: disable=protected-access
+            project_id="p1",
+            chapter_number=5,
+            outlines_map={outline.chapter_number: outline for outline in project.outlines},
+            chapters=project.chapters,
+            user_id=user_id,
+        )
+    assert Tracker.calls == 0, "history context must not call the LLM inline"
+    assert context["missing_summaries"] == [1, 2, 3, 4]
+    assert context["completed_summaries"] == ["outline 1", "outline 2", "outline 3", "outline 4"]
+    assert context["previous_tail"] == "c4"
+
+    async with session_factory() as session:
+        queued = await SummaryBackfillService(session).enqueue_missing("p1", range(1, CHAPTERS + 1), user_id=user_id)
+    assert queued == 2, "chapters 1-4 are already pending"
+
+    worker = SummaryBackfillWorker(session_factory, concurrency=2, poll_interval=0.05)
+    processed = await worker.drain()
+    assert processed == CHAPTERS, processed
+    assert 1 < Tracker.peak <= 2, Tracker.peak
+    result = await summaries(session_factory)
+    assert result[1] == "summary of c1" and result[3] is None
+
+    failed = await task_of(session_factory, 3)
+    assert failed.status == "pending" and failed.attempts == 1 and failed.last_error == "llm timeout"
+    assert await worker.drain() == 0, "retry waits for its backoff"
+    async with session_factory() as session:
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await session.execute(update(ChapterSummaryTask).values(available_at=past).where(ChapterSummaryTask.chapter_number == 3))
+        await session.commit()
+    assert await worker.drain() == 1
+    assert (await summaries(session_factory))[3] == "summary of c3"
+
+    # an edit that re-enqueues the chapter mid-flight keeps the task pending instead of marking it done
+    async def edit_during_summary(content):
+        if content == "c2":
+            Tracker.on_call = None
+            async with session_factory() as session:
+                await session.execute(update(ChapterVersion).where(ChapterVersion.content == "c2").values(content="c2-edited"))
+                await session.commit()
+                await SummaryBackfillService(session).enqueue("p1", [2], user_id=user_id)
+
+    Tracker.on_call = edit_during_summary
+    async with session_factory() as session:
+        await SummaryBackfillService(session).enqueue("p1", [2], user_id=user_id)
+    await worker.run_once()
+    assert (await task_of(session_factory, 2)).status == "pending"
+    await worker.drain()
+    assert (await summaries(session_factory))[2] == "summary of c2-edited"
+
+    # the background loop wakes up on enqueue and drains the queue
+    worker.start()
+    async with session_factory() as session:
+        await SummaryBackfillService(session).enqueue("p1", [6], user_id=user_id)
+    worker.notify()
+    for _ in range(100):
+        if (await task_of(session_factory, 6)).status == "done":
+            break
+        await asyncio.sleep(0.02)
+    await worker.stop()
+    assert (await task_of(session_factory, 6)).status == "done" and not worker.running
+
+    await engine.dispose()
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_summary_backfill passed")
+
+
+def test_summary_backfill():
+    main()
+
+
+if __name__ == "__main__":
+    main()
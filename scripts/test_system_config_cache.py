@@ -0,0 +1,100 @@
+"""
+Tests for the process-wide system config cache: repeated lookups (including missing keys) hit the
+database once, admin writes invalidate the cache immediately, writes from another process are picked
+up through the revision row, and direct database edits expire with the TTL.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_system_config_cache.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy import event, update  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import SystemConfig  # noqa: E402
+from app.repositories.system_config_cache import system_config_cache  # noqa: E402
+from app.repositories.system_config_repository import SystemConfigRepository  # noqa: E402
+from app.schemas.config import SystemConfigCreate, SystemConfigUpdate  # noqa: E402
+from app.services.config_service import ConfigService  # noqa: E402
+from app.services.llm_service import LLMService  # noqa: E402
+
+
+async def main_async():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as session:
+        service = ConfigService(session)
+        await service.upsert_config(SystemConfigCreate(key="llm.model", value="m1"))
+        await service.upsert_config(SystemConfigCreate(key="embedding.model_vector_size", value="256"))
+
+        llm = LLMService(session)
+        queries.clear()
+        for _ in range(5):
+            assert await llm._get_config_value("llm.model") == "m1"
+            assert await llm._get_config_value("llm.base_url") is None, "missing keys are cached too"
+            assert await llm.get_embedding_dimension() == 256
+        # one revision check plus one query per distinct key (the dimension lookup also reads provider and model)
+        config_queries = [sql for sql in queries if "system_config" in sql]
+        assert len(config_queries) == 6, config_queries
+
+        repo = SystemConfigRepository(session)
+        assert await repo.get_values(["llm.base_url", "llm.model"]) == {"llm.base_url": None, "llm.model": "m1"}
+        assert await repo.get_int("embedding.model_vector_size") == 256 and await repo.get_int("llm.model") is None
+
+        # admin writes are visible immediately
+        await service.patch_config("llm.model", SystemConfigUpdate(value="m2"))
+        assert await llm._get_config_value("llm.model") == "m2"
+        await service.upsert_config(SystemConfigCreate(key="llm.base_url", value="http://llm.local/v1"))
+        assert await llm._get_config_value("llm.base_url") == "http://llm.local/v1"
+        await service.remove_config("llm.base_url")
+        assert await llm._get_config_value("llm.base_url") is None
+
+        # another worker updates the row and bumps the revision; this process notices after the sync interval
+        async with session_factory() as other:
+            await other.execute(update(SystemConfig).where(SystemConfig.key == "llm.model").values(value="m3"))
+            await SystemConfigRepository(other).bump_revision()
+            await other.commit()
+        assert await llm._get_config_value("llm.model") == "m2", "still within the sync interval"
+        await asyncio.sleep(0.3)
+        assert await llm._get_config_value("llm.model") == "m3"
+
+        # an edit that bypasses the admin API (no revision bump) is only picked up once the entry expires
+        async with session_factory() as other:
+            await other.execute(update(SystemConfig).where(SystemConfig.key == "llm.model").values(value="m4"))
+            await other.commit()
+        assert await llm._get_config_value("llm.model") == "m3"
+        await asyncio.sleep(1.0)
+        assert await llm._get_config_value("llm.model") == "m4"
+    await engine.dispose()
+
+
+def main():
+    ttl, interval = system_config_cache.ttl, system_config_cache.sync_interval
+    system_config_cache.clear()
+    system_config_cache.ttl, system_config_cache.sync_interval = 1.0, 0.3
+    try:
+        asyncio.run(main_async())
+    finally:
+        system_config_cache.ttl, system_config_cache.sync_interval = ttl, interval
+        system_config_cache.clear()
+    print("✅ test_system_config_cache passed")
+
+
+def test_system_config_cache():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Tests for the write-behind usage counters: request counts are aggregated in memory and written back
+in one commit, the daily limit is enforced exactly across two workers sharing a database through
+block leases that shrink near the limit, unused quota is refunded on shutdown, and failed write-backs are retried.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_usage_counters.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from datetime import date
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.models import UsageMetric, UserDailyRequest  # noqa: E402
+from app.services.usage_counter_service import UsageCounterBuffer  # noqa: E402
+
+
+async def daily_count(session_factory, user_id):
+    async with session_factory() as session:
+        result = await session.execute(
+            select(UserDailyRequest.request_count).where(
+                UserDailyRequest.user_id == user_id, UserDailyRequest.request_date == date.today()
+            )
+        )
+        return result.scalar() or 0
+
+
+async def metric(session_factory, key):
+    async with session_factory() as session:
+        row = await session.get(UsageMetric, key)
+        return row.value if row else 0
+
+
+async def main_async(path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    commits = []
+    event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    # two workers with their own buffers share one database: the limit holds exactly
+    workers = [UsageCounterBuffer(session_factory, flush_interval=60, lease_size=10) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    commits.clear()
+    granted = await asyncio.gather(*(workers[i % 2].acquire_daily_request(1, 25) for i in range(40)))
+    assert sum(granted) == 25, sum(granted)
+    assert await daily_count(session_factory, 1) == 25
+    # blocks shrink near the limit (10, 8, 4, 2, 1), so a few extra small leases are expected
+    assert len(commits) <= 10, f"quota is leased in blocks, not committed per call: {len(commits)}"
+
+    # near the limit a block takes at most half of what is left, so a worker holding a block
+    # cannot starve the other one: 6 of 12 go to the first lease, the second worker still gets 6
+    assert await workers[0].acquire_daily_request(4, 12)
+    assert await daily_count(session_factory, 4) == 6
+    second = [await workers[1].acquire_daily_request(4, 12) for _ in range(7)]
+    assert second == [True] * 6 + [False], second
+    assert await daily_count(session_factory, 4) == 12
+
+    # request counts stay in memory until the flush, then land in one commit
+    commits.clear()
+    for _ in range(100):
+        await workers[0].record("api_request_count")
+    await workers[1].record("api_request_count", 5)
+    assert commits == [] and workers[0].pending("api_request_count") == 100
+    await workers[0].flush()
+    await workers[1].flush()
+    assert len(commits) == 2 and await metric(session_factory, "api_request_count") == 105
+    assert workers[0].pending("api_request_count") == 0
+
+    # unused leased quota goes back on shutdown
+    assert await workers[0].acquire_daily_request(2, 100)
+    assert await workers[0].acquire_daily_request(2, 100)
+    assert await daily_count(session_factory, 2) == 10
+    for worker in workers:
+        await worker.stop()
+    assert await daily_count(session_factory, 2) == 2
+
+    # without the background task every call writes through, so short-lived processes lose nothing
+    direct = UsageCounterBuffer(session_factory, flush_interval=60, lease_size=10)
+    assert await direct.acquire_daily_request(3, 2) and await direct.acquire_daily_request(3, 2)
+    assert not await direct.acquire_daily_request(3, 2)
+    assert await daily_count(session_factory, 3) == 2
+    await direct.record("api_request_count")
+    assert await metric(session_factory, "api_request_count") == 106 and direct.pending("api_request_count") == 0
+
+    # a failed write-back keeps the deltas for the next round
+    def broken_factory():
+        raise RuntimeError("database unavailable")
+
+    failing = UsageCounterBuffer(broken_factory, flush_interval=60, lease_size=10)
+    failing._deltas["api_request_count"] = 7  # pylint: disable=protected-access
+    await failing.flush()
+    assert failing.pending("api_request_count") == 7
+    failing.session_factory = session_factory
+    await failing.flush()
+    assert await metric(session_factory, "api_request_count") == 113
+    await engine.dispose()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(main_async(os.path.join(tmp, "usage.db")))
+    print("✅ test_usage_counters passed")
+
+
+def test_usage_counters():
+    main()
+
+
+if __name__ == "__main__":
+    main()
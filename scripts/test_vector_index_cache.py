@@ -0,0 +1,144 @@
+"""
+Tests for the per-project in-memory vector index: lazy load, incremental upsert/delete,
+cross-process invalidation via the revision table, and the LRU memory budget.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_vector_index_cache.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+_db_dir = tempfile.mkdtemp(prefix="vector_index_cache_")
+os.environ["VECTOR_DB_URL"] = f"file:{_db_dir}/vectors.db"
+
+from app.core.config import settings  # noqa: E402
+from app.services.vector_index_cache import ProjectVectorIndex, VectorIndexCache, vector_index_cache  # noqa: E402
+from app.services.vector_store_service import VectorStoreService  # noqa: E402
+
+settings.vector_db_url = os.environ["VECTOR_DB_URL"]
+DIM = 32
+
+
+def chunk(project_id, chapter, vec):
+    return {
+        "id": f"{project_id}:{chapter}:0",
+        "project_id": project_id,
+        "chapter_number": chapter,
+        "chunk_index": 0,
+        "chapter_title": f"第{chapter}章",
+        "content": f"chunk-{chapter}",
+        "embedding": vec,
+        "metadata": {},
+    }
+
+
+def lru_budget():
+    rng = random.Random(3)
+
+    def build(rows, revision=0):
+        blobs = [
+            (f"id{i}", i, VectorStoreService._to_f32_blob([rng.random() for _ in range(DIM)]))  # pylint: disable=protected-access
+            for i in range(rows)
+        ]
+        return ProjectVectorIndex.from_rows(blobs, revision=revision)
+
+    small = build(10)
+    cache = VectorIndexCache(max_bytes=small.nbytes * 2 + 1)
+    cache.put("rag_chunks", "a", small)
+    cache.put("rag_chunks", "b", build(10))
+    assert cache.get("rag_chunks", "a", 0) is small  # touch a so b becomes least recently used
+    cache.put("rag_chunks", "c", build(10))
+    assert cache.stats()["entries"] == 2
+    assert cache.get("rag_chunks", "b", 0) is None, "least recently used entry should be evicted"
+    assert cache.get("rag_chunks", "a", 1) is None, "stale revision must be treated as a miss"
+    cache.put("rag_chunks", "huge", build(100))
+    assert cache.peek("rag_chunks", "huge") is None, "entries larger than the budget are not cached"
+
+
+def ragged_upsert():
+    index = ProjectVectorIndex.from_rows([], revision=0)
+    assert not index.upsert([("a", 1, [0.1, 0.2]), ("b", 1, [0.1, 0.2, 0.3])]), "ragged rows are rejected"
+    assert not index.upsert([("a", 1, [])]), "empty embeddings are rejected"
+    assert len(index) == 0
+    assert index.upsert([("a", 1, [0.1, 0.2])]) and len(index) == 1
+    assert not index.upsert([("b", 2, [0.1, 0.2, 0.3])]), "dimension must match the existing matrix"
+
+    # applied after the libsql commit: a bad batch must drop the cached index, not raise
+    vector_index_cache.clear()
+    vector_index_cache.put("rag_chunks", "p", ProjectVectorIndex.from_rows([], revision=0))
+    VectorStoreService._apply_index_update(  # pylint: disable=protected-access
+        "rag_chunks", "p", 1, upserted=[("a", 1, [0.1, 0.2]), ("b", 1, [])]
+    )
+    assert vector_index_cache.peek("rag_chunks", "p") is None
+
+
+async def store_flow():
+    vector_index_cache.clear()
+    store = VectorStoreService()
+    rng = random.Random(5)
+    vectors = {chapter: [rng.uniform(-1, 1) for _ in range(DIM)] for chapter in range(1, 201)}
+    await store.upsert_chunks(records=[chunk("p1", c, v) for c, v in vectors.items()])
+
+    result = await store.query_chunks(project_id="p1", embedding=vectors[42], top_k=3)
+    assert result[0].chapter_number == 42 and result[0].content == "chunk-42"
+    index = vector_index_cache.peek("rag_chunks", "p1")
+    assert index is not None and len(index) == 200
+
+    # incremental upsert keeps the same index object and makes the new chapter searchable
+    new_vec = [rng.uniform(-1, 1) for _ in range(DIM)]
+    await store.upsert_chunks(records=[chunk("p1", 201, new_vec)])
+    assert vector_index_cache.peek("rag_chunks", "p1") is index and len(index) == 201
+    result = await store.query_chunks(project_id="p1", embedding=new_vec, top_k=1)
+    assert result[0].chapter_number == 201
+
+    # deleting chapters removes them from the cached index as well
+    await store.delete_by_chapters("p1", [42, 201])
+    assert vector_index_cache.peek("rag_chunks", "p1") is index and len(index) == 199
+    result = await store.query_chunks(project_id="p1", embedding=vectors[42], top_k=5)
+    assert all(item.chapter_number != 42 for item in result)
+
+    # a write from another process bumps the revision, so the next query reloads from libsql
+    other_vec = [rng.uniform(-1, 1) for _ in range(DIM)]
+    await store._client.execute(  # pylint: disable=protected-access
+        "INSERT INTO rag_chunks (id, project_id, chapter_number, chunk_index, chapter_title, content, embedding, metadata)"
+        " VALUES ('p1:300:0', 'p1', 300, 0, 't', 'chunk-300', :embedding, '{}')",
+        {"embedding": VectorStoreService._to_f32_blob(other_vec)},  # pylint: disable=protected-access
+    )
+    await store._client.execute(  # pylint: disable=protected-access
+        "UPDATE rag_index_revisions SET revision = revision + 1 WHERE project_id = 'p1' AND table_name = 'rag_chunks'"
+    )
+    result = await store.query_chunks(project_id="p1", embedding=other_vec, top_k=1)
+    assert result[0].chapter_number == 300
+    assert vector_index_cache.peek("rag_chunks", "p1") is not index
+
+    # summaries are cached independently per table
+    await store.upsert_summaries(
+        records=[
+            {"id": "p1:1:summary", "project_id": "p1", "chapter_number": 1, "title": "t", "summary": "s1", "embedding": vectors[1]},
+            {"id": "p1:2:summary", "project_id": "p1", "chapter_number": 2, "title": "t", "summary": "s2", "embedding": vectors[2]},
+        ]
+    )
+    summaries = await store.query_summaries(project_id="p1", embedding=vectors[2], top_k=1)
+    assert summaries[0].summary == "s2"
+    assert len(vector_index_cache.peek("rag_summaries", "p1")) == 2
+
+
+def main():
+    lru_budget()
+    ragged_upsert()
+    asyncio.run(store_flow())
+    print("✅ test_vector_index_cache passed")
+
+
+def test_vector_index_cache():
+    main()
+
+
+if __name__ == "__main__":
+    main()
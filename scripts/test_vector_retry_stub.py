@@ -16,6 +16,9 @@ class StubLLM:
     async def get_embedding(self, text: str, *, user_id: int | None = None, model: str | None = None):
         return [0.1, 0.2, 0.3]
 
+    async def get_embeddings(self, texts, *, user_id: int | None = None, model: str | None = None):
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
 
 class StubVectorStore:
     def __init__(self):
@@ -30,6 +33,14 @@ class StubVectorStore:
     async def upsert_summaries(self, records):
         self.chunks.extend(records)
 
+    async def chapter_chunk_hashes(self, *, project_id, chapter_number):
+        return {}
+
+    async def replace_chapter(self, *, project_id, chapter_number, chunk_records, summary_records=(), **kwargs):
+        self.chunks.extend(chunk_records)
+        self.chunks.extend(summary_records)
+        return {"chunks": len(chunk_records), "summaries": len(summary_records)}
+
 
 async def main():
     service = VectorRetryService(llm_service=StubLLM(), vector_store=StubVectorStore())  # type: ignore[arg-type]
@@ -0,0 +1,113 @@
+"""
+Tests for the vectorized cosine fallback in VectorStoreService: results match a pure-Python reference,
+mismatched dimensions are skipped, and both rag_chunks and rag_summaries use the NumPy path.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_vector_similarity.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "test")
+_db_dir = tempfile.mkdtemp(prefix="vector_similarity_")
+os.environ["VECTOR_DB_URL"] = f"file:{_db_dir}/vectors.db"
+
+from app.core.config import settings  # noqa: E402
+from app.services.vector_index_cache import vector_index_cache  # noqa: E402
+from app.services.vector_store_service import VectorStoreService  # noqa: E402
+
+settings.vector_db_url = os.environ["VECTOR_DB_URL"]
+vector_index_cache.max_bytes = 0  # exercise the libsql fallback path, not the in-memory index
+DIM = 64
+
+
+def reference_rank(query, vectors, top_k):
+    scored = [(i, VectorStoreService._cosine_distance(query, vec)) for i, vec in enumerate(vectors)]  # pylint: disable=protected-access
+    scored.sort(key=lambda item: item[1])
+    return scored[:top_k]
+
+
+def rank_matches_reference():
+    rng = random.Random(7)
+    vectors = [[rng.uniform(-1, 1) for _ in range(DIM)] for _ in range(300)]
+    vectors[5] = [0.0] * DIM  # zero vector should rank as distance 1
+    query = [rng.uniform(-1, 1) for _ in range(DIM)]
+    blobs = [VectorStoreService._to_f32_blob(vec) for vec in vectors]  # pylint: disable=protected-access
+    blobs.append(VectorStoreService._to_f32_blob([1.0] * (DIM // 2)))  # pylint: disable=protected-access
+
+    ranked = VectorStoreService._rank_by_cosine(query, blobs, 10)  # pylint: disable=protected-access
+    expected = reference_rank(query, vectors, 10)
+    assert [i for i, _ in ranked] == [i for i, _ in expected], (ranked, expected)
+    for (_, got), (_, want) in zip(ranked, expected):
+        assert abs(got - want) < 1e-5
+
+    everything = VectorStoreService._rank_by_cosine(query, blobs, 1000)  # pylint: disable=protected-access
+    assert len(everything) == len(vectors), "row with mismatched dimension must be skipped"
+    assert VectorStoreService._rank_by_cosine([0.0] * DIM, blobs, 3) == []  # pylint: disable=protected-access
+
+
+async def store_fallback():
+    store = VectorStoreService()
+    rng = random.Random(11)
+    chapters = 2000
+    chunk_records = []
+    summary_records = []
+    for chapter in range(1, chapters + 1):
+        vec = [rng.uniform(-1, 1) for _ in range(DIM)]
+        chunk_records.append(
+            {
+                "id": f"p1:{chapter}:0",
+                "project_id": "p1",
+                "chapter_number": chapter,
+                "chunk_index": 0,
+                "chapter_title": f"第{chapter}章",
+                "content": f"chunk-{chapter}",
+                "embedding": vec,
+                "metadata": {"chunk_id": f"p1:{chapter}:0"},
+            }
+        )
+        summary_records.append(
+            {
+                "id": f"p1:{chapter}:summary",
+                "project_id": "p1",
+                "chapter_number": chapter,
+                "title": f"第{chapter}章",
+                "summary": f"summary-{chapter}",
+                "embedding": vec,
+            }
+        )
+    await store.upsert_chunks(records=chunk_records)
+    await store.upsert_summaries(records=summary_records)
+
+    target = chunk_records[1233]["embedding"]
+    started = time.perf_counter()
+    chunks = await store.query_chunks(project_id="p1", embedding=target, top_k=5)
+    summaries = await store.query_summaries(project_id="p1", embedding=target, top_k=3)
+    elapsed = time.perf_counter() - started
+
+    assert chunks[0].chapter_number == 1234 and chunks[0].score < 1e-5, chunks[0]
+    assert chunks[0].metadata == {"chunk_id": "p1:1234:0"}
+    assert [c.score for c in chunks] == sorted(c.score for c in chunks)
+    assert summaries[0].summary == "summary-1234" and len(summaries) == 3
+    assert await store.query_chunks(project_id="other", embedding=target, top_k=5) == []
+    print(f"   fallback retrieval over {chapters} chapters: {elapsed * 1000:.1f} ms (chunks + summaries)")
+
+
+def main():
+    rank_matches_reference()
+    asyncio.run(store_fallback())
+    print("✅ test_vector_similarity passed")
+
+
+def test_vector_similarity():
+    main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Tests for batched, transactional writes in VectorStoreService: upserts go out as a few libsql batches
+and report row counts, and replace_chapter swaps a chapter's vectors atomically.
+
+Usage:
+    PYTHONPATH=backend python3 scripts/test_vector_store_writes.py
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "test")
+_db_dir = tempfile.mkdtemp(prefix="vector_store_writes_")
+os.environ["VECTOR_DB_URL"] = f"file:{_db_dir}/vectors.db"
+
+from app.core.config import settings  # noqa: E402
+from app.services.vector_store_service import VectorStoreService  # noqa: E402
+
+settings.vector_db_url = os.environ["VECTOR_DB_URL"]
+
+
+def chunk(chapter, index, content="text"):
+    return {
+        "id": f"p1:{chapter}:{index}",
+        "project_id": "p1",
+        "chapter_number": chapter,
+        "chunk_index": index,
+        "chapter_title": f"第{chapter}章",
+        "content": content,
+        "embedding": [float(chapter), float(index) + 1.0, 1.0],
+        "metadata": {},
+    }
+
+
+class CountingClient:
+    """Wraps the real libsql client and counts round-trips."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.execute_calls = 0
+        self.batch_calls = 0
+
+    async def execute(self, *args, **kwargs):
+        self.execute_calls += 1
+        return await self.inner.execute(*args, **kwargs)
+
+    async def batch(self, statements):
+        self.batch_calls += 1
+        return await self.inner.batch(statements)
+
+
+async def count_rows(store, chapter):
+    result = await store._client.execute(  # pylint: disable=protected-access
+        "SELECT COUNT(*) AS n FROM rag_chunks WHERE project_id = 'p1' AND chapter_number = :c", {"c": chapter}
+    )
+    return store._first_int(result)  # pylint: disable=protected-access
+
+
+async def main_async():
+    store = VectorStoreService()
+    await store.ensure_schema()
+    client = CountingClient(store._client)  # pylint: disable=protected-access
+    store._client = client  # pylint: disable=protected-access
+
+    records = [chunk(chapter, index) for chapter in range(1, 101) for index in range(5)]
+    written = await store.upsert_chunks(records=records)
+    assert written == 500, written
+    assert client.execute_calls == 0 and client.batch_calls <= 3, (client.execute_calls, client.batch_calls)
+    assert await count_rows(store, 7) == 5
+
+    report = await store.replace_chapter(
+        project_id="p1",
+        chapter_number=7,
+        chunk_records=[chunk(7, 0, "new"), chunk(7, 1, "new")],
+        summary_records=[
+            {"id": "p1:7:summary", "project_id": "p1", "chapter_number": 7, "title": "t", "summary": "s", "embedding": [1.0, 1.0, 1.0]}
+        ],
+    )
+    assert report == {"chunks": 2, "summaries": 1, "kept": 0, "deleted": 3}, report
+    assert await count_rows(store, 7) == 2, "stale chunks of the chapter must be removed in the same transaction"
+
+    # a failing insert rolls back the delete too, so the chapter keeps its previous vectors
+    broken = chunk(7, 2)
+    broken["content"] = None  # violates NOT NULL
+    report = await store.replace_chapter(project_id="p1", chapter_number=7, chunk_records=[chunk(7, 0), broken])
+    assert report == {"chunks": 0, "summaries": 0, "kept": 0, "deleted": 0}, report
+    assert await count_rows(store, 7) == 2
+
+
+def main():
+    asyncio.run(main_async())
+    print("✅ test_vector_store_writes passed")
+
+
+def test_vector_store_writes():
+    main()
+
+
+if __name__ == "__main__":
+    main()